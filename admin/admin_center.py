@@ -7,6 +7,7 @@
 
 import streamlit as st
 from core.config import get_supabase_client
+from core.navigation import page_link
 
 def show_admin_center():
     """显示管理员中心"""
@@ -55,9 +56,7 @@ def _show_super_admin_panel():
 
     # --- 物品管理入口 ---
     st.subheader("📦 物品管理")
-    if st.button("🔧 编辑物品描述", key="go_item_manager_super"):
-        st.session_state.page = 'item_manager'
-        st.rerun()
+    page_link('item_manager', "编辑物品描述", icon="🔧")
 
 def _show_normal_admin_panel():
     """普通管理员面板：仅能封禁普通用户"""
@@ -68,9 +67,7 @@ def _show_normal_admin_panel():
 
     # --- 物品管理入口 ---
     st.subheader("📦 物品管理")
-    if st.button("🔧 编辑物品描述", key="go_item_manager_normal"):
-        st.session_state.page = 'item_manager'
-        st.rerun()
+    page_link('item_manager', "编辑物品描述", icon="🔧")
 
 def _ban_user_section(supabase, can_ban_admins: bool):
     """封禁用户功能区（复用组件）"""
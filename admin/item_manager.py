@@ -6,6 +6,7 @@
 
 import streamlit as st
 from core.config import get_supabase_client
+from core.catalog import get_item_catalog
 
 def show_item_manager():
     user = st.session_state.user
@@ -18,8 +19,9 @@ def show_item_manager():
 
     supabase = get_supabase_client()
 
-    # 获取所有物品（保持原逻辑）
-    items = supabase.table("items").select("*").order("name").execute().data
+    # 获取所有物品（走图鉴缓存）
+    catalog = get_item_catalog()
+    items = catalog.all_items()
     if not items:
         st.info("暂无物品")
         return
@@ -65,6 +67,7 @@ def show_item_manager():
                         supabase.table("items").update({
                             "effect": new_effect
                         }).eq("id", item["id"]).execute()
+                        catalog.invalidate()
                         st.success("✅ 已更新")
                         st.session_state[edit_key] = False
                         st.rerun()
@@ -10,75 +10,64 @@ import streamlit as st
 # 导入核心模块
 # ==============================#
 from core.session import initialize_session_state
-from core.config import FEATURES
-
-# ==============================#
-# 导入所有页面模块
-# ==============================#
-from modules.login import show_login_page
-from modules.main_city import show_main_page
-from modules.backpack import show_backpack_page
-from modules.sect import show_sect_page
-from modules.alchemy import show_alchemy_page
-from modules.forge import show_forge_page
-from modules.array import show_array_page
-from modules.dungeon import show_dungeon_page
-
-# 注意：藏宝阁使用新版模块结构
-from modules.shop.shop_main import show_shop_page          # ← 藏宝阁主页
-from modules.shop.list_item import show_list_item_page     # ← 上架页面
-from modules.shop.my_listings import show_my_listings_page # ← 新增：我的摊位！
-
-# ==============================#
-# 导入管理员模块（从 admin/ 目录）
-# ==============================#
-from admin.admin_center import show_admin_center   # ← 管理员中心
-from admin.item_manager import show_item_manager   # ← 物品管理器
+from core.instrumentation import query_recorder
+from core.navigation import PAGE_META, lazy_page, register_pages, page_key, can_access, go_to
+from core.auctions import get_auction_scheduler
 
 # ==============================#
 # 页面路由映射表
+# 页面模块在首次打开时才导入（见 core.navigation.lazy_page），
+# 冷启动只加载登录页需要的模块
 # ==============================#
 PAGE_MAP = {
-    'login': show_login_page,
-    'main': show_main_page,
-    'shop': show_shop_page,
-    'backpack': show_backpack_page,
-    'sect': show_sect_page,
-    'alchemy': show_alchemy_page,
-    'forge': show_forge_page,
-    'array': show_array_page,
-    'dungeon': show_dungeon_page,
-    'admin_center': show_admin_center,
-    'item_manager': show_item_manager,
-    'list_item': show_list_item_page,
-    'my_listings': show_my_listings_page,  # ← 新增这行！
+    'login': lazy_page("modules.login", "show_login_page"),
+    'main': lazy_page("modules.main_city", "show_main_page"),
+    'backpack': lazy_page("modules.backpack", "show_backpack_page"),
+    'player_trade': lazy_page("modules.player_trade", "show_player_trade_page"),
+    'sect': lazy_page("modules.sect", "show_sect_page"),
+    'alchemy': lazy_page("modules.alchemy", "show_alchemy_page"),
+    'forge': lazy_page("modules.forge", "show_forge_page"),
+    'array': lazy_page("modules.array", "show_array_page"),
+    'dungeon': lazy_page("modules.dungeon", "show_dungeon_page"),
+
+    # 注意：藏宝阁使用新版模块结构
+    'shop': lazy_page("modules.shop.shop_main", "show_shop_page"),            # ← 藏宝阁主页
+    'list_item': lazy_page("modules.shop.list_item", "show_list_item_page"),  # ← 上架页面
+    'my_listings': lazy_page("modules.shop.my_listings", "show_my_listings_page"),  # ← 我的摊位
+    'order_book': lazy_page("modules.shop.order_book", "show_order_book_page"),  # ← 材料交易所
+    'auction_house': lazy_page("modules.shop.auction_house", "show_auction_house_page"),  # ← 拍卖行
+
+    # 管理员模块（从 admin/ 目录）
+    'admin_center': lazy_page("admin.admin_center", "show_admin_center"),   # ← 管理员中心
+    'item_manager': lazy_page("admin.item_manager", "show_item_manager"),   # ← 物品管理器
+    'xuanli_admin': lazy_page("modules.admin", "show_xuanli_admin_page"),   # ← 轩璃专属（仅主管理员）
 }
 
 def main():
     initialize_session_state()
-    current_page = st.session_state.get('page', 'login')
 
-    # 🔒 安全检查：仅检查存在的管理员页面
-    if current_page in ['admin_center', 'item_manager']:
-        if 'user' not in st.session_state or st.session_state.user is None:
-            st.session_state.page = 'login'
-            st.rerun()
-        user = st.session_state.user
-        if current_page == 'admin_center' and not user.is_admin:
-            st.error("❌ 无权访问管理员中心")
-            st.session_state.page = 'main'
-            st.rerun()
-        elif current_page == 'item_manager' and not user.is_admin:
-            st.error("❌ 无权访问物品管理器")
-            st.session_state.page = 'main'
-            st.rerun()
+    # 路由：st.navigation 根据 URL 选出当前页面（导航菜单由各页面自行渲染）
+    pages = register_pages(PAGE_MAP)
+    # 拍卖到期调度为进程级后台线程，随应用启动（不依赖有人打开拍卖行）
+    get_auction_scheduler()
+    page = st.navigation(list(pages.values()), position="hidden")
+    current_page = page_key(page)
+    st.session_state.page = current_page
+    query_recorder.begin_render(current_page)
+
+    # 🔒 安全检查：未登录只能访问登录页，管理员页面校验权限
+    user = st.session_state.get('user')
+    access = PAGE_META[current_page][2]
+    if access and user is None:
+        go_to('login')
+    if not can_access(current_page, user):
+        st.error(f"❌ 无权访问{PAGE_META[current_page][0]}")
+        go_to('main')
+    if current_page == 'login' and user is not None:
+        go_to('main')
 
-    # 路由分发
-    if current_page in PAGE_MAP:
-        PAGE_MAP[current_page]()
-    else:
-        st.session_state.page = 'login'
-        show_login_page()
+    # 页面分发
+    page.run()
 
 # ==============================#
 # 应用入口
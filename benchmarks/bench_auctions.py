@@ -0,0 +1,205 @@
+# ==================================================
+# 拍卖到期调度基准
+# 功能：
+#   1. 调度器（虚拟时钟 + 内存结算）：N 个拍卖在一天内陆续到期，部分拍卖被出价顺延，
+#      比较最小堆调度与「每秒扫描全部拍卖」两种方式每结算一个拍卖的耗时，
+#      验证堆调度的单次结算开销不随拍卖总数增长
+#   2. 端到端（本地 SQLite）：发起拍卖 → 并发出价 → 到期结算，校验灵石与物品守恒
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_auctions.py
+#   PYTHONPATH=. python benchmarks/bench_auctions.py --sizes 10000 100000 1000000 --e2e-auctions 5000
+# ==================================================
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from core.auctions import AuctionScheduler
+from core.sqlite_backend import SQLiteClient
+import core.sqlite_rpc  # noqa: F401  注册 SQLite 版 RPC
+
+DAY = 86400
+SNIPE_EXTEND = 60
+
+
+def _simulate_auctions(n: int, rng: random.Random):
+    """生成 n 个拍卖的结束时间和出价顺延事件（内部函数）"""
+    ends = {i: rng.uniform(0, DAY) for i in range(1, n + 1)}
+    # 30% 的拍卖在临近结束时被出价，结束时间顺延 1~3 次
+    extensions = []
+    for auction_id in rng.sample(range(1, n + 1), int(n * 0.3)):
+        for version in range(1, rng.randint(1, 3) + 1):
+            extensions.append((auction_id, version))
+    return ends, extensions
+
+
+def bench_heap(n: int, seed: int, stale_ratio: float) -> dict:
+    """最小堆调度：每秒调用一次 run_due，统计每结算一个拍卖的耗时（内部函数）"""
+    rng = random.Random(seed)
+    ends, extensions = _simulate_auctions(n, rng)
+    truth = dict(ends)
+    versions = {auction_id: 0 for auction_id in ends}
+    now = [0.0]
+
+    def settle(auction_id):
+        # 服务端：未到期（被其他进程的出价顺延）时返回 open 行
+        if truth[auction_id] > now[0]:
+            return {"id": auction_id, "status": "open", "ends_at": truth[auction_id], "version": versions[auction_id]}
+        return {"id": auction_id, "status": "sold"}
+
+    scheduler = AuctionScheduler(client=object(), settle=settle, clock=lambda: now[0])
+    for auction_id, ends_at in ends.items():
+        scheduler.schedule(auction_id, ends_at, 0)
+    for auction_id, _ in extensions:
+        versions[auction_id] += 1
+        truth[auction_id] += SNIPE_EXTEND
+        # 大部分顺延发生在本进程（立即压入新版本）；其余来自其他进程，由结算时重新排期
+        if rng.random() >= stale_ratio:
+            scheduler.schedule(auction_id, truth[auction_id], versions[auction_id])
+
+    start = time.perf_counter()
+    closed = 0
+    for tick in range(0, DAY + 4 * SNIPE_EXTEND):
+        now[0] = float(tick)
+        closed += scheduler.run_due()
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    return {
+        "closed": closed,
+        "elapsed": elapsed,
+        "per_closure_us": elapsed / closed * 1e6,
+        "stale": stats["stale_skipped"],
+        "rescheduled": stats["rescheduled"],
+        "pending": stats["pending"],
+    }
+
+
+def bench_scan(n: int, seed: int, ticks: int) -> dict:
+    """对照组：每秒扫描全部未结束拍卖（只模拟前 ticks 秒，按比例估算）（内部函数）"""
+    rng = random.Random(seed)
+    ends, _ = _simulate_auctions(n, rng)
+    open_auctions = dict(ends)
+    start = time.perf_counter()
+    closed = 0
+    for tick in range(ticks):
+        due = [auction_id for auction_id, ends_at in open_auctions.items() if ends_at <= tick]
+        for auction_id in due:
+            del open_auctions[auction_id]
+        closed += len(due)
+    elapsed = time.perf_counter() - start
+    return {"closed": closed, "per_closure_us": elapsed / max(closed, 1) * 1e6, "per_tick_ms": elapsed / ticks * 1000}
+
+
+def bench_end_to_end(args) -> int:
+    """端到端：SQLite 上发起 / 出价 / 结算，返回失败的校验数（内部函数）"""
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench_auctions.db")
+    client = SQLiteClient(db_path)
+    rng = random.Random(args.seed)
+
+    item_uuid = str(uuid.uuid4())
+    item = client.table("items").insert({"uuid_id": item_uuid, "name": f"基准法宝-{item_uuid[:4]}",
+                                         "category": "法宝", "price": 1000}).execute().data[0]
+    sellers = [str(uuid.uuid4()) for _ in range(20)]
+    bidders = [str(uuid.uuid4()) for _ in range(200)]
+    client.table("users").insert(
+        [{"id": u, "username": f"seller-{u[:8]}", "spirit_stones": 0} for u in sellers]
+        + [{"id": u, "username": f"bidder-{u[:8]}", "spirit_stones": 10_000_000} for u in bidders]
+    ).execute()
+    per_seller = args.e2e_auctions // len(sellers) + 1
+    client.rpc("apply_inventory_deltas", {"p_changes": [
+        {"user_id": u, "item_id": item["id"], "delta": per_seller} for u in sellers
+    ]}).execute()
+    initial_stones = 10_000_000 * len(bidders)
+    initial_items = per_seller * len(sellers)
+
+    scheduler = AuctionScheduler(client=client)
+    t0 = time.perf_counter()
+    auctions = []
+    for i in range(args.e2e_auctions):
+        auction = client.rpc("create_auction", {
+            "p_seller_id": sellers[i % len(sellers)], "p_item_uuid": item_uuid, "p_quantity": 1,
+            "p_start_price": 1000, "p_min_increment": 50, "p_duration_seconds": 2,
+        }).execute().data
+        scheduler.schedule_row(auction)
+        auctions.append(auction)
+    create_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bids = 0
+    for auction in rng.sample(auctions, int(len(auctions) * 0.7)):
+        amount = 1000
+        for _ in range(rng.randint(1, 3)):
+            row = client.rpc("place_bid", {
+                "p_auction_id": auction["id"], "p_bidder_id": rng.choice(bidders), "p_amount": amount,
+                "p_snipe_window_seconds": 0, "p_extend_seconds": 0,
+            }).execute().data
+            scheduler.schedule_row(row)
+            amount += 50
+            bids += 1
+    bid_s = time.perf_counter() - t0
+
+    time.sleep(max(0.0, 2.1 - (time.perf_counter() - t0)))
+    deadline = time.time() + 10
+    t0 = time.perf_counter()
+    closed = 0
+    while scheduler.stats()["pending"] and time.time() < deadline:
+        closed += scheduler.run_due()
+        time.sleep(0.05)
+    settle_s = time.perf_counter() - t0
+
+    print(f"\n【端到端 · SQLite】拍卖 {args.e2e_auctions} 个 · 出价 {bids} 次")
+    print(f"发起 {args.e2e_auctions / create_s:,.0f} 个/s · 出价 {bids / bid_s:,.0f} 次/s · "
+          f"结算 {closed / settle_s:,.0f} 个/s（{closed} 个，作废堆元素 {scheduler.stats()['stale_skipped']} 个）")
+
+    rows = client.table("auctions").select("status, current_bid, current_bidder_id").execute().data
+    users = client.table("users").select("spirit_stones").execute().data
+    inventory = client.table("user_inventory").select("quantity").eq("item_id", item["id"]).execute().data
+    sold = [r for r in rows if r["status"] == "sold"]
+    checks = [
+        ("全部拍卖已结算", all(r["status"] != "open" for r in rows)),
+        ("有出价的拍卖成交、无出价的流拍",
+         all((r["status"] == "sold") == (r["current_bidder_id"] is not None) for r in rows)),
+        ("灵石守恒（卖家收入 = 买家支出）", sum(u["spirit_stones"] for u in users) == initial_stones),
+        ("物品守恒（托管全部交付或退还）", sum(i["quantity"] for i in inventory) == initial_items),
+        ("成交记录与成交拍卖一致",
+         len(client.table("market_trades").select("id").eq("item_id", item["id"]).execute().data) == len(sold)),
+    ]
+    failed = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed += not ok
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拍卖到期调度基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="拍卖总数（可多个）")
+    parser.add_argument("--scan-ticks", type=int, default=300, help="扫描对照组模拟的秒数")
+    parser.add_argument("--stale-ratio", type=float, default=0.1, help="由其他进程顺延（需结算时重新排期）的比例")
+    parser.add_argument("--e2e-auctions", type=int, default=2000, help="端到端拍卖数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--db", default=None, help="SQLite 文件路径（默认临时文件）")
+    args = parser.parse_args()
+
+    print("【调度器 · 虚拟时钟】每秒一次调度，一天内全部到期")
+    print(f"{'拍卖数':>10}{'结算数':>10}{'堆调度 µs/个':>14}{'扫描 µs/个':>12}{'扫描 ms/秒':>12}"
+          f"{'作废元素':>10}{'重新排期':>10}")
+    for n in args.sizes:
+        heap = bench_heap(n, args.seed, args.stale_ratio)
+        scan = bench_scan(n, args.seed, args.scan_ticks)
+        print(f"{n:>10,}{heap['closed']:>10,}{heap['per_closure_us']:>14.2f}{scan['per_closure_us']:>12.1f}"
+              f"{scan['per_tick_ms']:>12.2f}{heap['stale']:>10,}{heap['rescheduled']:>10,}")
+        if heap["closed"] != n or heap["pending"]:
+            print(f"❌ 有拍卖未结算（结算 {heap['closed']} / {n}，剩余 {heap['pending']}）")
+            sys.exit(1)
+
+    failed = bench_end_to_end(args)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# ==================================================
+# 秘境战斗模拟基准
+# 功能：
+#   1. 吞吐：NumPy 批量模拟 vs 逐场调用 fight() 的每秒场数
+#   2. 一致性：两种方式的胜率差在统计误差内；同一种子结果完全相同
+#   3. 调参表：给定玩家属性，列出要求等级 1~N 的秘境（妖兽属性按等级推算）的胜率、平均回合、
+#      每次挑战的期望灵石和单次估算耗时，供调整 dungeons 表时参考
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_battle.py
+#   PYTHONPATH=. python benchmarks/bench_battle.py --runs 1000000 --hp 300 --attack 30 --defense 15 --levels 20
+# ==================================================
+
+import argparse
+import math
+import sys
+import time
+
+from core.battle import Combatant, estimate_dungeon, fight, monster_for, simulate
+from core.config import BATTLE_ESTIMATE_RUNS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="秘境战斗模拟基准")
+    parser.add_argument("--runs", type=int, default=200_000, help="批量模拟场数")
+    parser.add_argument("--scalar-runs", type=int, default=5_000, help="逐场模拟场数")
+    parser.add_argument("--hp", type=int, default=100, help="玩家生命")
+    parser.add_argument("--mp", type=int, default=50, help="玩家灵力")
+    parser.add_argument("--attack", type=int, default=10, help="玩家攻击")
+    parser.add_argument("--defense", type=int, default=5, help="玩家防御")
+    parser.add_argument("--level", type=int, default=3, help="吞吐与一致性测试使用的秘境要求等级")
+    parser.add_argument("--levels", type=int, default=10, help="调参表列出的最高要求等级")
+    parser.add_argument("--reward", type=int, default=100, help="调参表中每级秘境的灵石奖励（× 等级）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    player = Combatant("玩家", args.hp, args.attack, args.defense, args.mp)
+    monster = monster_for({"name": "基准秘境", "required_level": args.level})
+
+    # ===== 1. 吞吐 =====
+    vector = simulate(player, monster, args.runs, args.seed)
+    t0 = time.perf_counter()
+    scalar_wins = sum(fight(player, monster, seed=args.seed + i)["victory"] for i in range(args.scalar_runs))
+    scalar_s = time.perf_counter() - t0
+    vector_rate = args.runs / (vector["elapsed_ms"] / 1000)
+    scalar_rate = args.scalar_runs / scalar_s
+    print(f"玩家 生命 {player.hp} · 灵力 {player.mp} · 攻击 {player.attack} · 防御 {player.defense}；"
+          f"妖兽（等级 {args.level}）生命 {monster.hp} · 攻击 {monster.attack} · 防御 {monster.defense}")
+    print(f"【吞吐】批量 {args.runs:,} 场 {vector['elapsed_ms']:.1f} ms（{vector_rate:,.0f} 场/s）· "
+          f"逐场 {args.scalar_runs:,} 场 {scalar_s * 1000:.0f} ms（{scalar_rate:,.0f} 场/s）· "
+          f"加速 {vector_rate / scalar_rate:,.0f}×")
+
+    # ===== 2. 一致性 =====
+    scalar_rate_win = scalar_wins / args.scalar_runs
+    p = vector["win_rate"]
+    tolerance = 4 * math.sqrt(max(p * (1 - p), 1e-4) / args.scalar_runs)
+    repeat = simulate(player, monster, args.runs, args.seed)
+    checks = [
+        (f"胜率一致（批量 {p:.2%} · 逐场 {scalar_rate_win:.2%} · 容差 ±{tolerance:.2%}）",
+         abs(p - scalar_rate_win) <= tolerance),
+        ("同一种子结果完全相同", all(repeat[k] == vector[k] for k in ("wins", "avg_rounds", "avg_hp_left"))),
+    ]
+
+    # ===== 3. 调参表 =====
+    print(f"\n【调参表】每个秘境模拟 {BATTLE_ESTIMATE_RUNS:,} 场")
+    print(f"{'等级':>4}{'妖兽生命':>10}{'攻击':>6}{'防御':>6}{'胜率':>8}{'平均回合':>10}{'期望灵石':>10}{'耗时 ms':>10}")
+    for level in range(1, args.levels + 1):
+        dungeon = {"id": level, "name": f"等级{level}", "required_level": level,
+                   "reward_spirit_stones": args.reward * level}
+        m = monster_for(dungeon)
+        estimate = estimate_dungeon(player, dungeon)
+        print(f"{level:>4}{m.hp:>10,}{m.attack:>6}{m.defense:>6}{estimate['win_rate']:>8.1%}"
+              f"{estimate['avg_rounds']:>10.1f}{estimate['expected_stones']:>10,.0f}{estimate['elapsed_ms']:>10.2f}")
+
+    print()
+    failed = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# ==================================================
+# 阵法增益引擎基准
+# 功能：在本地 SQLite 后端上比较
+#   1. 读取生效属性：每次查询 user_buffs 并汇总（旧写法的做法）vs 引擎缓存的修正矩阵
+#   2. 到期处理：时钟推进后一次 expire_due 移除大量增益的耗时（只弹出到期的堆顶元素）
+#   3. 正确性：引擎结果与直接查询汇总一致；全部到期后修正矩阵归零
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_buffs.py
+#   PYTHONPATH=. python benchmarks/bench_buffs.py --users 2000 --reads 20000
+# ==================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from core.buffs import BuffEngine, aggregate_modifiers
+from core.sqlite_backend import SQLiteClient
+import core.sqlite_rpc  # noqa: F401  注册 SQLite 版 RPC
+
+# 基准阵法：(效果类型, 效果值, 持续分钟)
+ARRAYS = [("attack", 5, 30), ("attack_pct", 20, 60), ("defense", 3, 90), ("craft_success", 10, 120)]
+
+
+def _seed(client: SQLiteClient, users: int) -> list:
+    """创建阵法和玩家，每个玩家激活全部阵法中的前 3 个（内部函数）"""
+    tag = uuid.uuid4().hex[:4]
+    array_ids = [
+        client.table("arrays").insert({"name": f"基准阵{tag}-{i}", "effect_type": effect, "effect_value": value,
+                                       "duration_minutes": minutes, "spirit_stone_cost": 0}).execute().data[0]["id"]
+        for i, (effect, value, minutes) in enumerate(ARRAYS)
+    ]
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    client.table("users").insert([{"id": u, "username": f"buff-{u[:8]}", "spirit_stones": 0} for u in user_ids]).execute()
+    for i, user_id in enumerate(user_ids):
+        for array_id in array_ids[i % 2:][:3]:
+            client.rpc("activate_array", {"p_user_id": user_id, "p_array_id": array_id,
+                                          "p_max_active": 3, "p_max_stacks": 3}).execute()
+    return user_ids
+
+
+def _query_modifiers(client, user_id: str) -> np.ndarray:
+    """每次读取都查询并汇总（对照组）（内部函数）"""
+    rows = client.table("user_buffs").select("*").eq("user_id", user_id).execute().data or []
+    return aggregate_modifiers(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="阵法增益引擎基准")
+    parser.add_argument("--users", type=int, default=500, help="玩家数")
+    parser.add_argument("--reads", type=int, default=5000, help="读取生效属性的次数")
+    parser.add_argument("--db", default=None, help="SQLite 文件路径（默认临时文件）")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench_buffs.db")
+    client = SQLiteClient(db_path)
+    user_ids = _seed(client, args.users)
+    rng = np.random.default_rng(0)
+    reads = [user_ids[i] for i in rng.integers(0, len(user_ids), args.reads)]
+
+    clock = [time.time()]
+    engine = BuffEngine(client=client, clock=lambda: clock[0])
+
+    # ===== 1. 读取 =====
+    t0 = time.perf_counter()
+    for user_id in reads:
+        _query_modifiers(client, user_id)
+    query_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    for user_id in reads:
+        engine.modifiers(user_id)
+    engine_ms = (time.perf_counter() - t0) * 1000
+    stats = engine.stats()
+    print(f"【读取】{args.reads:,} 次（{args.users:,} 名玩家）")
+    print(f"  每次查询汇总 {query_ms:8.1f} ms（{query_ms / args.reads * 1000:6.1f} µs/次）")
+    print(f"  引擎缓存     {engine_ms:8.1f} ms（{engine_ms / args.reads * 1000:6.1f} µs/次）· "
+          f"加载 {stats['loads']:,} 次 · 重算 {stats['recomputes']:,} 次")
+
+    checks = [("引擎结果与直接查询一致",
+               all(np.allclose(engine.modifiers(u), _query_modifiers(client, u)) for u in user_ids))]
+
+    # ===== 2. 到期 =====
+    for user_id in user_ids:
+        engine.modifiers(user_id)
+    heap_size = engine.stats()["heap_size"]
+    clock[0] += 45 * 60
+    t0 = time.perf_counter()
+    first = engine.expire_due()
+    first_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    idle = engine.expire_due()
+    idle_ms = (time.perf_counter() - t0) * 1000
+    print(f"\n【到期】堆中 {heap_size:,} 条增益")
+    print(f"  推进 45 分钟：移除 {first:,} 条，耗时 {first_ms:.2f} ms")
+    print(f"  无到期时再次检查：移除 {idle} 条，耗时 {idle_ms * 1000:.1f} µs")
+
+    clock[0] += 24 * 3600
+    engine.expire_due()
+    checks.append(("全部到期后修正矩阵归零", all(not engine.modifiers(u).any() for u in user_ids)))
+    checks.append(("无到期时不做任何移除", idle == 0))
+
+    print()
+    failed = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
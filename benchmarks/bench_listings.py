@@ -0,0 +1,229 @@
+# ==================================================
+# 摊位上架 / 下架基准
+# 功能：在本地 SQLite 后端上比较
+#   1. 旧写法（客户端依次读写 shop_listings / user_inventory，每次操作 3~4 次往返）
+#      与服务端单事务 RPC（list_item / unlist_listing / confiscate_listing，1 次往返）的单次延迟，
+#      以及按 --rtt-ms 估算的远程数据库延迟（本地延迟 + 往返次数 × RTT）
+#   2. 批量 RPC（list_items / unlist_listings）每件商品的平均耗时
+#   3. 下架与购买并发时物品是否守恒（旧写法先读剩余数量再退回，可能把刚卖出的数量也退回背包）
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_listings.py
+#   PYTHONPATH=. python benchmarks/bench_listings.py --ops 2000 --batch 50 --rtt-ms 40
+# ==================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from core.sqlite_backend import SQLiteClient
+import core.sqlite_rpc  # noqa: F401  注册 SQLite 版 RPC
+
+# 每次操作的数据库往返次数
+ROUND_TRIPS = {
+    "legacy_list": 3,     # 插入摊位 → 读背包 → 更新 / 删除背包
+    "legacy_unlist": 4,   # 读摊位 → 下架 → 读背包 → 更新 / 插入背包
+    "rpc": 1,
+}
+
+
+def _seed(client: SQLiteClient, sellers: int, stock: int) -> dict:
+    """创建物品、卖家和买家，卖家背包各放 stock 个物品（内部函数）"""
+    item_uuid = str(uuid.uuid4())
+    item = client.table("items").insert({"uuid_id": item_uuid, "name": f"基准灵草-{item_uuid[:4]}",
+                                         "category": "材料", "price": 10}).execute().data[0]
+    seller_ids = [str(uuid.uuid4()) for _ in range(sellers)]
+    buyer_id = str(uuid.uuid4())
+    client.table("users").insert(
+        [{"id": u, "username": f"seller-{u[:8]}", "spirit_stones": 0} for u in seller_ids]
+        + [{"id": buyer_id, "username": f"buyer-{buyer_id[:8]}", "spirit_stones": 10**12}]
+    ).execute()
+    client.table("user_inventory").insert([
+        {"user_id": u, "item_id": item["id"], "item_uuid": item_uuid, "quantity": stock} for u in seller_ids
+    ]).execute()
+    return {"item": item, "sellers": seller_ids, "buyer": buyer_id}
+
+
+def legacy_list(client, seller_id, item, price, quantity) -> int:
+    """旧写法上架（与改造前的 list_item.py 相同的读写顺序），返回摊位 ID（内部函数）"""
+    listing = client.table("shop_listings").insert({
+        "item_uuid": item["uuid_id"], "seller_id": seller_id, "price": price, "quantity": quantity, "is_active": True,
+    }).execute().data[0]
+    inv = client.table("user_inventory").select("id, quantity")\
+        .eq("user_id", seller_id).eq("item_id", item["id"]).execute().data[0]
+    new_quantity = inv["quantity"] - quantity
+    if new_quantity == 0:
+        client.table("user_inventory").delete().eq("id", inv["id"]).execute()
+    else:
+        client.table("user_inventory").update({"quantity": new_quantity}).eq("id", inv["id"]).execute()
+    return listing["id"]
+
+
+def legacy_unlist(client, seller_id, item, listing_id):
+    """旧写法下架（与改造前的 _toggle_listing_status 相同的读写顺序）（内部函数）"""
+    listing = client.table("shop_listings").select("*").eq("id", listing_id).execute().data[0]
+    client.table("shop_listings").update({"is_active": False}).eq("id", listing_id).execute()
+    existing = client.table("user_inventory").select("id, quantity")\
+        .eq("user_id", seller_id).eq("item_id", item["id"]).execute().data
+    if existing:
+        client.table("user_inventory").update({"quantity": existing[0]["quantity"] + listing["quantity"]})\
+            .eq("id", existing[0]["id"]).execute()
+    else:
+        client.table("user_inventory").insert({"user_id": seller_id, "item_id": item["id"],
+                                               "item_uuid": item["uuid_id"], "quantity": listing["quantity"]}).execute()
+
+
+def _timed(fn, *args) -> float:
+    """执行一次并返回耗时（ms）（内部函数）"""
+    t0 = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - t0) * 1000
+
+
+def bench_latency(client, seed, args) -> list:
+    """单次操作延迟：旧写法 vs RPC，返回表格行（内部函数）"""
+    item, seller = seed["item"], seed["sellers"][0]
+    rpc = lambda name, params: client.rpc(name, params).execute().data  # noqa: E731
+    rows = []
+
+    listed, legacy_list_ms, legacy_unlist_ms = [], [], []
+    for _ in range(args.ops):
+        t0 = time.perf_counter()
+        listed.append(legacy_list(client, seller, item, 10, 1))
+        legacy_list_ms.append((time.perf_counter() - t0) * 1000)
+    for listing_id in listed:
+        legacy_unlist_ms.append(_timed(legacy_unlist, client, seller, item, listing_id))
+
+    rpc_list_ms, rpc_unlist_ms, rpc_confiscate_ms, listed = [], [], [], []
+    for _ in range(args.ops):
+        t0 = time.perf_counter()
+        listed.append(rpc("list_item", {"p_seller_id": seller, "p_item_uuid": item["uuid_id"],
+                                        "p_price": 10, "p_quantity": 1})["id"])
+        rpc_list_ms.append((time.perf_counter() - t0) * 1000)
+    for i, listing_id in enumerate(listed):
+        if i % 2:
+            rpc_confiscate_ms.append(_timed(rpc, "confiscate_listing", {"p_listing_id": listing_id}))
+        else:
+            rpc_unlist_ms.append(_timed(rpc, "unlist_listing", {"p_listing_id": listing_id, "p_seller_id": seller}))
+
+    for name, samples, trips in [
+        ("上架 · 旧写法", legacy_list_ms, ROUND_TRIPS["legacy_list"]),
+        ("上架 · RPC", rpc_list_ms, ROUND_TRIPS["rpc"]),
+        ("下架 · 旧写法", legacy_unlist_ms, ROUND_TRIPS["legacy_unlist"]),
+        ("下架 · RPC", rpc_unlist_ms, ROUND_TRIPS["rpc"]),
+        ("没收 · RPC", rpc_confiscate_ms, ROUND_TRIPS["rpc"]),
+    ]:
+        p50, p99 = np.percentile(samples, [50, 99])
+        rows.append((name, trips, p50, p99, p50 + trips * args.rtt_ms))
+    return rows
+
+
+def bench_bulk(client, seed, args) -> list:
+    """批量上架 / 下架每件商品的平均耗时（内部函数）"""
+    item, seller = seed["item"], seed["sellers"][1]
+    rounds = max(1, args.ops // args.batch)
+    list_ms, unlist_ms = [], []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        rows = client.rpc("list_items", {
+            "p_seller_id": seller,
+            "p_listings": [{"item_uuid": item["uuid_id"], "price": 10, "quantity": 1}] * args.batch,
+        }).execute().data
+        list_ms.append((time.perf_counter() - t0) * 1000)
+        unlist_ms.append(_timed(lambda: client.rpc("unlist_listings", {
+            "p_listing_ids": [r["id"] for r in rows], "p_seller_id": seller,
+        }).execute()))
+    return [
+        (f"批量上架 ×{args.batch}", float(np.median(list_ms)), float(np.median(list_ms)) / args.batch),
+        (f"批量下架 ×{args.batch}", float(np.median(unlist_ms)), float(np.median(unlist_ms)) / args.batch),
+    ]
+
+
+def _item_total(client, seed, seller_id) -> int:
+    """卖家背包 + 卖家在售数量 + 买家背包（内部函数）"""
+    item = seed["item"]
+    inventory = client.table("user_inventory").select("quantity")\
+        .eq("item_id", item["id"]).in_("user_id", [seller_id, seed["buyer"]]).execute().data
+    listings = client.table("shop_listings").select("quantity")\
+        .eq("seller_id", seller_id).eq("is_active", True).execute().data
+    return sum(r["quantity"] for r in inventory) + sum(r["quantity"] for r in listings)
+
+
+def bench_race(client, seed, args, use_rpc: bool, seller_id: str) -> int:
+    """每个摊位同时被购买 1 件和下架，返回物品守恒偏差（内部函数）"""
+    item = seed["item"]
+    initial = _item_total(client, seed, seller_id)
+    for _ in range(args.race_rounds):
+        if use_rpc:
+            listing_id = client.rpc("list_item", {"p_seller_id": seller_id, "p_item_uuid": item["uuid_id"],
+                                                  "p_price": 10, "p_quantity": 5}).execute().data["id"]
+        else:
+            listing_id = legacy_list(client, seller_id, item, 10, 5)
+        gate = threading.Event()
+
+        def buy():
+            gate.wait()
+            try:
+                client.rpc("purchase_listing", {"p_buyer_id": seed["buyer"], "p_quantity": 1,
+                                                "p_listing_id": listing_id}).execute()
+            except Exception:
+                pass
+
+        def unlist():
+            gate.wait()
+            try:
+                if use_rpc:
+                    client.rpc("unlist_listing", {"p_listing_id": listing_id, "p_seller_id": seller_id}).execute()
+                else:
+                    legacy_unlist(client, seller_id, item, listing_id)
+            except Exception:
+                pass
+
+        threads = [threading.Thread(target=buy), threading.Thread(target=unlist)]
+        for t in threads:
+            t.start()
+        gate.set()
+        for t in threads:
+            t.join()
+    return _item_total(client, seed, seller_id) - initial
+
+
+def main():
+    parser = argparse.ArgumentParser(description="摊位上架 / 下架基准")
+    parser.add_argument("--ops", type=int, default=500, help="每种单次操作的执行次数")
+    parser.add_argument("--batch", type=int, default=20, help="批量 RPC 每次处理的商品数")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="估算远程数据库延迟时每次往返的耗时（ms）")
+    parser.add_argument("--race-rounds", type=int, default=200, help="购买与下架并发的轮数")
+    parser.add_argument("--db", default=None, help="SQLite 文件路径（默认临时文件）")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench_listings.db")
+    client = SQLiteClient(db_path)
+    seed = _seed(client, sellers=4, stock=args.ops * 10 + args.batch + args.race_rounds * 5)
+
+    print(f"【单次操作】各 {args.ops} 次，估算远程延迟按每次往返 {args.rtt_ms:.0f} ms")
+    print(f"{'操作':<12}{'往返':>6}{'本地 p50 ms':>14}{'本地 p99 ms':>14}{'估算远程 ms':>14}")
+    for name, trips, p50, p99, remote in bench_latency(client, seed, args):
+        print(f"{name:<12}{trips:>6}{p50:>14.2f}{p99:>14.2f}{remote:>14.1f}")
+
+    print(f"\n【批量 RPC】每批 {args.batch} 件（1 次往返）")
+    print(f"{'操作':<14}{'每批 ms':>10}{'每件 ms':>10}")
+    for name, per_batch, per_item in bench_bulk(client, seed, args):
+        print(f"{name:<14}{per_batch:>10.2f}{per_item:>10.3f}")
+
+    legacy_gap = bench_race(client, seed, args, use_rpc=False, seller_id=seed["sellers"][2])
+    rpc_gap = bench_race(client, seed, args, use_rpc=True, seller_id=seed["sellers"][3])
+    print(f"\n【购买与下架并发】{args.race_rounds} 轮，物品守恒偏差：旧写法 {legacy_gap:+d} 件 · RPC {rpc_gap:+d} 件")
+
+    ok = rpc_gap == 0
+    print(f"{'✅' if ok else '❌'} RPC 下架与购买并发时物品守恒")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# ==================================================
+# 行情统计基准
+# 功能：生成跨 7 天的随机成交，比较
+#   1. 增量 K 线写入吞吐
+#   2. 滚动统计（1h / 24h / 7d）查询延迟：K 线合并（冷 / 缓存命中）vs 每次用 pandas 扫描原始成交
+#   3. 统计结果与扫描原始成交的精确结果是否一致
+#   4. 列式历史（压缩后的小时 K 线）与原始成交的 parquet 体积
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_market_stats.py
+#   PYTHONPATH=. python benchmarks/bench_market_stats.py --trades 2000000 --items 100
+# ==================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from core.market_stats import CANDLE_INTERVALS, STATS_WINDOWS, MarketStats, weighted_median
+from core.sqlite_backend import SQLiteClient
+
+
+def _generate(args, now: float) -> pd.DataFrame:
+    """生成随机成交：每个物品围绕各自基准价随机游走（内部函数）"""
+    rng = np.random.default_rng(args.seed)
+    items = np.array([str(uuid.uuid4()) for _ in range(args.items)])
+    base = rng.integers(100, 10_000, size=args.items)
+    item_index = rng.integers(0, args.items, size=args.trades)
+    ts = np.sort(rng.uniform(now - 7 * 86400, now, size=args.trades))
+    noise = rng.normal(1.0, 0.05, size=args.trades)
+    price = np.maximum(1, (base[item_index] * noise).round()).astype(np.int64)
+    return pd.DataFrame({
+        "item_uuid": pd.Categorical(items[item_index]),
+        "price": price,
+        "quantity": rng.integers(1, 20, size=args.trades),
+        "ts": ts,
+    })
+
+
+def _scan(trades: pd.DataFrame, item_uuid: str, start: float) -> dict:
+    """直接扫描原始成交计算窗口统计（对照组，内部函数）"""
+    rows = trades[(trades["item_uuid"] == item_uuid) & (trades["ts"] >= start)]
+    if rows.empty:
+        return {"median": None, "volume": 0, "min": None, "max": None}
+    prices = rows.groupby("price")["quantity"].sum()
+    return {
+        "median": weighted_median(dict(prices.items())),
+        "volume": int(rows["quantity"].sum()),
+        "min": int(rows["price"].min()),
+        "max": int(rows["price"].max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情统计基准")
+    parser.add_argument("--trades", type=int, default=500_000, help="成交条数（均匀分布在最近 7 天）")
+    parser.add_argument("--items", type=int, default=50, help="物品数量")
+    parser.add_argument("--queries", type=int, default=200, help="每个窗口的统计查询次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    now = time.time()
+    trades = _generate(args, now)
+    items = list(trades["item_uuid"].cat.categories)
+
+    # 使用空的本地库作为事件源，使 poll() 不拉到任何额外事件
+    client = SQLiteClient(os.path.join(tempfile.mkdtemp(), "bench_market_stats.db"))
+    market = MarketStats(poll_seconds=3600, client=client)
+    market.poll(force=True)
+
+    # ===== 1. 写入 =====
+    events = zip(trades["item_uuid"].astype(str), trades["price"].tolist(), trades["quantity"].tolist(),
+                 trades["ts"].tolist())
+    start = time.perf_counter()
+    market.ingest_many("trade", events)
+    ingest_s = time.perf_counter() - start
+    print(f"成交 {args.trades:,} 条 · 物品 {args.items} 个")
+    print(f"【写入】{ingest_s:.2f} s，{args.trades / ingest_s:,.0f} 条/s，"
+          f"内存 K 线 {market.cache_stats()['live_candles']:,} 根")
+
+    # ===== 2. 查询延迟 =====
+    rng = np.random.default_rng(args.seed)
+    print(f"\n【查询】每个窗口 {args.queries} 次，单位 ms/次")
+    print(f"{'窗口':<6}{'K 线冷查询':>12}{'缓存命中':>10}{'扫描原始成交':>14}")
+    mismatches = 0
+    for window, (seconds, interval) in STATS_WINDOWS.items():
+        sample = [items[i] for i in rng.integers(0, len(items), size=args.queries)]
+        step = CANDLE_INTERVALS[interval]
+        window_start = (time.time() - seconds) // step * step
+
+        market._stats_cache.clear()
+        t0 = time.perf_counter()
+        cold = [market.stats(item, window) for item in sample]
+        cold_ms = (time.perf_counter() - t0) * 1000 / args.queries
+
+        t0 = time.perf_counter()
+        for item in sample:
+            market.stats(item, window)
+        warm_ms = (time.perf_counter() - t0) * 1000 / args.queries
+
+        t0 = time.perf_counter()
+        scans = [_scan(trades, item, window_start) for item in sample]
+        scan_ms = (time.perf_counter() - t0) * 1000 / args.queries
+
+        for got, expected in zip(cold, scans):
+            if any(got[key] != expected[key] for key in expected):
+                mismatches += 1
+        print(f"{window:<6}{cold_ms:>12.3f}{warm_ms:>10.4f}{scan_ms:>14.3f}")
+
+    # ===== 3. 列式历史 =====
+    history = pd.DataFrame([
+        (item, "trade", bucket, c.open, c.high, c.low, c.close, c.volume, c.count)
+        for (kind, item, interval), series in market._candles.items() if interval == "1h"
+        for bucket, c in series.items()
+    ], columns=["item_uuid", "kind", "bucket", "open", "high", "low", "close", "volume", "count"])
+    market._history_rows = list(history.itertuples(index=False, name=None))
+    frame = market.history_frame()
+    tmp = tempfile.mkdtemp()
+    market.save_history(os.path.join(tmp, "candles.parquet"))
+    trades.to_parquet(os.path.join(tmp, "trades.parquet"), index=False)
+    candle_kb = os.path.getsize(os.path.join(tmp, "candles.parquet")) / 1024
+    trade_kb = os.path.getsize(os.path.join(tmp, "trades.parquet")) / 1024
+    print(f"\n【列式历史】小时 K 线 {len(frame):,} 行，内存 {frame.memory_usage(deep=True).sum() / 1024:,.0f} KB，"
+          f"parquet {candle_kb:,.0f} KB（原始成交 parquet {trade_kb:,.0f} KB）")
+
+    ok = mismatches == 0
+    print(f"\n{'✅' if ok else '❌'} K 线统计与扫描原始成交结果一致（不一致 {mismatches} 次）")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# ==================================================
+# 导航重跑次数基准
+# 功能：用 Streamlit AppTest + 本地 SQLite 后端，统计从主城点击一次导航
+#      到各页面时脚本运行了几次、访问了几次数据库
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_navigation.py
+#   PYTHONPATH=. python benchmarks/bench_navigation.py --legacy   # 旧版「按钮 + st.rerun()」导航
+# ==================================================
+
+import argparse
+import os
+import sys
+import tempfile
+
+from streamlit.testing.v1 import AppTest
+from streamlit.util import calc_md5
+
+from core.instrumentation import query_recorder
+
+TARGET_PAGES = ["shop", "sect", "alchemy", "forge", "array", "dungeon"]
+
+
+def _new_app(db_path: str) -> AppTest:
+    """创建使用本地 SQLite 并开启查询监控的 AppTest，并以主管理员登录（内部函数）"""
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.secrets["DATABASE_BACKEND"] = "sqlite"
+    at.secrets["SQLITE_PATH"] = db_path
+    at.secrets["QUERY_INSTRUMENTATION"] = True
+    at.run()
+
+    # core.config 在导入时读取 secrets，必须等 AppTest 设置好 secrets 并运行后再导入
+    from core.config import MAIN_ADMIN_USERNAME, MAIN_ADMIN_PASSWORD
+    at.text_input(key="login_username").input(MAIN_ADMIN_USERNAME)
+    at.text_input(key="login_password").input(MAIN_ADMIN_PASSWORD)
+    at.button[0].click().run()
+    return at
+
+
+def _navigate(at: AppTest, page: str, legacy: bool):
+    """从主城导航到目标页面（内部函数）"""
+    if legacy:
+        # 旧版：点击主城快捷按钮，按钮回调修改 page 后 st.rerun()
+        at.button(key=f"main_btn_{page}").click().run()
+    else:
+        # 新版：等价于点击 st.page_link（AppTest 没有 page_link 点击接口，直接切换页面哈希）
+        at._page_hash = calc_md5(page)
+        at.run()
+
+
+def _go_main(at: AppTest, legacy: bool):
+    """回到主城（内部函数）"""
+    if legacy:
+        at.session_state.page = "main"
+        at.session_state.main_nav_radio = "🏠 主城"
+    else:
+        at._page_hash = calc_md5("main")
+    at.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计每次导航的脚本运行次数和数据库查询数")
+    parser.add_argument("--legacy", action="store_true", help="使用旧版按钮导航")
+    parser.add_argument("--repeat", type=int, default=3, help="每个页面重复次数")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    at = _new_app(db_path)
+    query_recorder.enabled = True
+
+    print(f"{'页面':<10}{'脚本运行/次':>12}{'数据库查询/次':>14}")
+    total_runs = 0
+    for page in TARGET_PAGES:
+        runs, queries = 0, 0
+        for _ in range(args.repeat):
+            _go_main(at, args.legacy)
+            runs_before = query_recorder.render_count
+            queries_before = len(query_recorder.recent(limit=10 ** 6))
+            _navigate(at, page, args.legacy)
+            if at.exception:
+                print(f"{page}: {at.exception[0].message}", file=sys.stderr)
+            runs += query_recorder.render_count - runs_before
+            queries += len(query_recorder.recent(limit=10 ** 6)) - queries_before
+        total_runs += runs
+        print(f"{page:<10}{runs / args.repeat:>12.1f}{queries / args.repeat:>14.1f}")
+
+    print(f"平均每次导航脚本运行 {total_runs / (args.repeat * len(TARGET_PAGES)):.2f} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# ==================================================
+# 挂单撮合基准
+# 功能：
+#   1. 纯内存撮合吞吐：随机买卖单送入订单簿，统计每秒撮合订单数
+#   2. 端到端（本地 SQLite）：并发下单 / 撤单 + 成交批量落库，统计吞吐和延迟，
+#      并校验灵石守恒、物品守恒、成交与挂单剩余数量一致
+#   3. 恢复：租约未释放时新引擎不能撮合；释放后用新引擎从数据库重建订单簿，与运行中的订单簿逐项比对
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_orderbook.py
+#   PYTHONPATH=. python benchmarks/bench_orderbook.py --orders 200000 --e2e-orders 20000 --concurrency 16
+# ==================================================
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.orderbook import Order, OrderBookEngine
+from core.sqlite_backend import SQLiteClient
+import core.sqlite_rpc  # noqa: F401  注册 SQLite 版 RPC
+
+MID_PRICE = 250
+USER_STONES = 10_000_000
+USER_ITEMS = 10_000
+
+
+def _random_order(rng: random.Random, items: list, users: list) -> tuple:
+    """生成一笔围绕中间价随机波动的限价单（内部函数）"""
+    side = rng.choice(("buy", "sell"))
+    # 买单略低、卖单略高于中间价，约一半订单会与对手盘交叉成交
+    offset = rng.randint(-10, 10) + (-3 if side == "buy" else 3)
+    return rng.choice(users), rng.choice(items), side, MID_PRICE + offset, rng.randint(1, 10)
+
+
+def bench_memory(args):
+    """纯内存撮合吞吐"""
+    rng = random.Random(args.seed)
+    items = [str(uuid.uuid4()) for _ in range(args.items)]
+    users = [str(uuid.uuid4()) for _ in range(args.users)]
+    orders = [
+        Order(i + 1, item, user, side, price, qty)
+        for i, (user, item, side, price, qty) in enumerate(_random_order(rng, items, users) for _ in range(args.orders))
+    ]
+    cancel_every = max(1, int(1 / args.cancel_ratio)) if args.cancel_ratio > 0 else 0
+
+    engine = OrderBookEngine(client=object())
+    engine.recovered = True
+    start = time.perf_counter()
+    for order in orders:
+        engine.submit(order)
+        if cancel_every and order.id % cancel_every == 0:
+            # 撤销一笔较早的挂单（只测内存部分）
+            victim = orders[rng.randrange(order.id)]
+            engine.withdraw(victim.id, victim.user_id)
+    elapsed = time.perf_counter() - start
+
+    stats = engine.stats()
+    print(f"【内存撮合】订单 {args.orders} · 物品 {args.items} · 用户 {args.users}")
+    print(f"耗时 {elapsed:.2f} s，吞吐 {args.orders / elapsed:,.0f} 单/s，"
+          f"平均 {elapsed / args.orders * 1e6:.1f} µs/单")
+    print(f"成交 {stats['fills_matched']} 笔 · 剩余挂单 {stats['open_orders']} · 订单簿 {stats['books']} 个")
+
+
+def _seed(client: SQLiteClient, args) -> dict:
+    """创建材料和用户：每个用户有充足灵石和每种材料若干（内部函数）"""
+    items = []
+    for i in range(args.items):
+        item_uuid = str(uuid.uuid4())
+        row = client.table("items").insert({
+            "uuid_id": item_uuid, "name": f"基准材料-{i}-{item_uuid[:4]}", "category": "材料", "price": MID_PRICE,
+        }).execute().data[0]
+        items.append((item_uuid, row["id"]))
+
+    users = [str(uuid.uuid4()) for _ in range(args.users)]
+    client.table("users").insert(
+        [{"id": u, "username": f"trader-{u[:8]}", "spirit_stones": USER_STONES} for u in users]
+    ).execute()
+    client.rpc("apply_inventory_deltas", {"p_changes": [
+        {"user_id": u, "item_id": item_id, "delta": USER_ITEMS} for u in users for _, item_id in items
+    ]}).execute()
+    return {"items": items, "users": users}
+
+
+def bench_end_to_end(args) -> int:
+    """端到端：并发下单 / 撤单 + 批量落库，返回失败的校验数"""
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench_orderbook.db")
+    client = SQLiteClient(db_path)
+    seed = _seed(client, args)
+    item_uuids = [item_uuid for item_uuid, _ in seed["items"]]
+
+    engine = OrderBookEngine(client=client, flush_batch=args.flush_batch)
+    engine.recover()
+    rng = random.Random(args.seed)
+    requests = [_random_order(rng, item_uuids, seed["users"]) for _ in range(args.e2e_orders)]
+
+    latencies = []
+    placed = []
+    errors = []
+    lock = threading.Lock()
+
+    def place(request):
+        user_id, item_uuid, side, price, qty = request
+        t0 = time.perf_counter()
+        try:
+            result = engine.place(user_id, item_uuid, side, price, qty)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(elapsed)
+            placed.append(result["order"])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(place, requests))
+    engine.flush(raise_errors=True)
+    wall = time.perf_counter() - start
+
+    # 撤销一部分仍在挂着的订单
+    cancelled = 0
+    for order in rng.sample(placed, int(len(placed) * args.cancel_ratio)):
+        try:
+            engine.cancel(order["id"], order["user_id"])
+            cancelled += 1
+        except ValueError:
+            pass  # 已全部成交
+
+    stats = engine.stats()
+    lat = np.array(latencies)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    print(f"\n【端到端 · SQLite】订单 {args.e2e_orders} · 并发 {args.concurrency} · 批量 {args.flush_batch}")
+    print(f"耗时 {wall:.2f} s，吞吐 {len(placed) / wall:,.0f} 单/s（含冻结 + 撮合 + 落库）")
+    print(f"下单延迟 p50 {p50:.2f} ms · p95 {p95:.2f} ms · p99 {p99:.2f} ms")
+    print(f"成交 {stats['fills_settled']} 笔，落库 {stats['flush_batches']} 批 · 撤单 {cancelled} · "
+          f"失败 {len(errors)} · 剩余挂单 {stats['open_orders']}")
+
+    # ===== 一致性校验 =====
+    users = client.table("users").select("spirit_stones").in_("id", seed["users"]).execute().data
+    inventory = client.table("user_inventory").select("quantity").in_("user_id", seed["users"]).execute().data
+    open_rows = client.table("market_orders").select("id, side, price, remaining")\
+        .eq("status", "open").execute().data
+    fills = client.table("market_fills").select("quantity, price").execute().data
+    trades = client.table("market_trades").select("quantity, total_price").execute().data
+    memory_open = {o["id"]: o["remaining"] for u in seed["users"] for o in engine.open_orders(u)}
+
+    reserved_stones = sum(o["price"] * o["remaining"] for o in open_rows if o["side"] == "buy")
+    reserved_items = sum(o["remaining"] for o in open_rows if o["side"] == "sell")
+    checks = [
+        ("灵石守恒（余额 + 买单冻结 = 初始）",
+         sum(u["spirit_stones"] for u in users) + reserved_stones == USER_STONES * len(seed["users"])),
+        ("物品守恒（背包 + 卖单冻结 = 初始）",
+         sum(i["quantity"] for i in inventory) + reserved_items == USER_ITEMS * len(seed["users"]) * len(item_uuids)),
+        ("成交记录与 market_trades 一致",
+         sum(f["quantity"] for f in fills) == sum(t["quantity"] for t in trades)
+         and sum(f["quantity"] * f["price"] for f in fills) == sum(t["total_price"] for t in trades)),
+        ("数据库未完成挂单 = 内存订单簿", {o["id"]: o["remaining"] for o in open_rows} == memory_open),
+        ("没有下单失败", not errors),
+    ]
+
+    # ===== 恢复 =====
+    running = {(u, side): engine.depth(u, 1000)[side] for u in item_uuids for side in ("bids", "asks")}
+    rebuilt = OrderBookEngine(client=client)
+    try:
+        rebuilt.recover()
+        single_matcher = False
+    except RuntimeError:
+        single_matcher = True
+    checks.append(("租约未释放时其他进程不能撮合", single_matcher))
+    engine.release()
+
+    start = time.perf_counter()
+    replayed = rebuilt.recover()
+    recover_ms = (time.perf_counter() - start) * 1000
+    print(f"\n【恢复】重放 {replayed} 笔未完成挂单，耗时 {recover_ms:.1f} ms")
+    same_books = all(rebuilt.depth(u, 1000)[side] == depth for (u, side), depth in running.items())
+    checks.append(("恢复后盘口与运行中一致", same_books))
+    checks.append(("恢复时没有新成交（订单簿不交叉）", rebuilt.stats()["pending_fills"] == 0))
+
+    failed = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed += not ok
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="挂单撮合基准")
+    parser.add_argument("--orders", type=int, default=200_000, help="纯内存撮合的订单数")
+    parser.add_argument("--e2e-orders", type=int, default=10_000, help="端到端下单数")
+    parser.add_argument("--items", type=int, default=8, help="物品（订单簿）数量")
+    parser.add_argument("--users", type=int, default=200, help="交易用户数")
+    parser.add_argument("--concurrency", type=int, default=8, help="端到端并发线程数")
+    parser.add_argument("--flush-batch", type=int, default=200, help="成交批量落库条数")
+    parser.add_argument("--cancel-ratio", type=float, default=0.1, help="撤单比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--db", default=None, help="SQLite 文件路径（默认临时文件）")
+    args = parser.parse_args()
+
+    bench_memory(args)
+    failed = bench_end_to_end(args)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
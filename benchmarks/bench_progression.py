@@ -0,0 +1,146 @@
+# ==================================================
+# 修炼进度基准
+# 功能：经验活动为全部玩家增加经验的两种方式（本地 SQLite 内存库）
+#   1. 逐个玩家：读取经验 → 本地查表得出新层数 → 写回 user_cultivation 与 users（原背包使用丹药的路径）
+#   2. 集合语句：grant_exp 一次为所有玩家查表、突破并写入（core/sqlite_rpc._apply_exp 的路径）
+#   内存库没有网络往返；使用 Supabase 时逐个玩家每人还要多 3 次请求，差距远大于这里的结果
+#   并检查两种方式结果一致、服务端境界表与 core/progression 的查表一致、一次跨越多个境界的突破
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_progression.py
+#   PYTHONPATH=. python benchmarks/bench_progression.py --users 100000
+# ==================================================
+
+import argparse
+import sqlite3
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from core.progression import LEVEL_TABLE, level_for_exp, level_table_rows, progress, realm_of
+from core.sqlite_rpc import grant_exp
+
+SCHEMA_PATH = "database/sqlite_schema.sql"
+STAT_COLUMNS = ("hp", "mp", "attack", "defense")
+
+
+def _open_db(exps: np.ndarray) -> sqlite3.Connection:
+    """建立内存库并写入玩家（内部函数）"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    rows = []
+    for i, exp in enumerate(exps):
+        level = level_for_exp(int(exp))
+        stats = [100 + int(LEVEL_TABLE["hp_total"][level - 1]), 50 + int(LEVEL_TABLE["mp_total"][level - 1]),
+                 10 + int(LEVEL_TABLE["attack_total"][level - 1]), 5 + int(LEVEL_TABLE["defense_total"][level - 1])]
+        rows.append((f"user-{i:07d}", int(exp), level, realm_of(level), stats))
+    conn.executemany(
+        "INSERT INTO users (id, username, cultivation_level, realm, stage, hp, mp, attack, defense) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(uid, uid, level, r["realm"], r["stage"], *stats) for uid, _, level, r, stats in rows],
+    )
+    conn.executemany(
+        "INSERT INTO user_cultivation (user_id, exp, realm, stage, hp, mp, attack, defense) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(uid, exp, r["realm"], r["stage"], *stats) for uid, exp, _, r, stats in rows],
+    )
+    conn.commit()
+    return conn
+
+
+def _per_user(conn: sqlite3.Connection, amount: int):
+    """逐个玩家增加经验（内部函数）"""
+    for (uid,) in conn.execute("SELECT id FROM users").fetchall():
+        exp = conn.execute("SELECT exp FROM user_cultivation WHERE user_id = ?", (uid,)).fetchone()[0]
+        old, new = level_for_exp(exp), level_for_exp(exp + amount)
+        realm = realm_of(new)
+        deltas = [int(LEVEL_TABLE[f"{key}_total"][new - 1] - LEVEL_TABLE[f"{key}_total"][old - 1])
+                  for key in STAT_COLUMNS]
+        conn.execute(
+            "UPDATE user_cultivation SET exp = ?, realm = ?, stage = ?, "
+            "hp = hp + ?, mp = mp + ?, attack = attack + ?, defense = defense + ? WHERE user_id = ?",
+            (exp + amount, realm["realm"], realm["stage"], *deltas, uid),
+        )
+        conn.execute(
+            "UPDATE users SET cultivation_level = ?, realm = ?, stage = ?, "
+            "hp = hp + ?, mp = mp + ?, attack = attack + ?, defense = defense + ? WHERE id = ?",
+            (new, realm["realm"], realm["stage"], *deltas, uid),
+        )
+    conn.commit()
+
+
+def _snapshot(conn: sqlite3.Connection):
+    """按 user_id 排序的最终状态（内部函数）"""
+    return conn.execute(
+        "SELECT uc.user_id, uc.exp, uc.realm, uc.stage, uc.hp, uc.mp, uc.attack, uc.defense, "
+        "       u.cultivation_level, u.realm, u.stage, u.hp, u.attack "
+        "  FROM user_cultivation uc JOIN users u ON u.id = uc.user_id ORDER BY uc.user_id"
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="修炼进度基准")
+    parser.add_argument("--users", type=int, default=20_000, help="玩家数")
+    parser.add_argument("--amount", type=int, default=200_000, help="每人增加的经验")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    exps = rng.integers(0, int(LEVEL_TABLE["cumulative_exp"][-1]), args.users)
+
+    # ===== 逐个玩家 =====
+    conn = _open_db(exps)
+    t0 = time.perf_counter()
+    _per_user(conn, args.amount)
+    single_ms = (time.perf_counter() - t0) * 1000
+    single = [tuple(row) for row in _snapshot(conn)]
+    conn.close()
+
+    # ===== 集合语句 =====
+    conn = _open_db(exps)
+    t0 = time.perf_counter()
+    result = grant_exp(conn, str(uuid.uuid4()), args.amount, p_filter="all")
+    conn.commit()
+    batch_ms = (time.perf_counter() - t0) * 1000
+    batch = [tuple(row) for row in _snapshot(conn)]
+
+    print(f"【经验活动】{args.users:,} 名玩家，每人 +{args.amount:,} 修为，{result['breakthroughs']:,} 人突破")
+    print(f"  逐个玩家 {single_ms:9.1f} ms（{single_ms / args.users * 1000:6.2f} µs/人）")
+    print(f"  集合语句 {batch_ms:9.1f} ms（{batch_ms / args.users * 1000:6.2f} µs/人）· 加速 {single_ms / batch_ms:,.1f}×")
+
+    # ===== 查表 =====
+    server_rows = [dict(row) for row in conn.execute("SELECT * FROM cultivation_levels ORDER BY level")]
+    t0 = time.perf_counter()
+    levels = level_for_exp(exps)
+    lookup_us = (time.perf_counter() - t0) * 1e6
+    print(f"  本地查表 {args.users:,} 个经验值 {lookup_us:,.0f} µs")
+
+    # ===== 一次跨越多个境界 =====
+    conn.execute("UPDATE user_cultivation SET exp = 0, realm = '练气', stage = 1, hp = 100, mp = 50, "
+                 "attack = 10, defense = 5 WHERE user_id = 'user-0000000'")
+    jump = int(LEVEL_TABLE["cumulative_exp"][29])
+    grant_exp(conn, str(uuid.uuid4()), jump, p_user_ids=["user-0000000"])
+    jumped = conn.execute("SELECT exp, realm, stage, attack FROM user_cultivation WHERE user_id = 'user-0000000'").fetchone()
+    expected = progress(jump)
+    conn.close()
+
+    checks = [
+        ("逐个与集合语句结果一致", single == batch),
+        ("服务端境界表与本地查表一致", server_rows == level_table_rows()),
+        ("查表层数在范围内且随经验单调", bool(levels.min() >= 1 and np.all(np.diff(levels[np.argsort(exps)]) >= 0))),
+        ("一次跨越 3 个境界的突破", (jumped["realm"], jumped["stage"]) == (expected["realm"], expected["stage"])
+         and jumped["attack"] == 10 + int(LEVEL_TABLE["attack_total"][expected["level"] - 1])),
+    ]
+    print()
+    failed = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# ==================================================
+# 冷启动基准
+# 功能：在全新的解释器中测量 `import app` 的导入耗时（等价于 python -X importtime），
+#      以及首次渲染登录页的耗时和此时已加载的页面模块
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_startup.py
+#   PYTHONPATH=. python benchmarks/bench_startup.py --top 30 --budget-ms 300
+#   （--budget-ms：导入耗时超过预算时以非零状态码退出，便于发现回归）
+# ==================================================
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# streamlit 本身的导入和首次读取 secrets（约 0.4 s，与应用代码无关）不计入应用启动耗时，
+# 完成后写入分隔标记
+_MARKER = "--- app import start ---"
+
+_IMPORT_SCRIPT = f"""
+import sys
+import streamlit
+streamlit.secrets.get("DATABASE_BACKEND")
+sys.stderr.write({_MARKER!r} + "\\n")
+import app
+"""
+
+_RENDER_SCRIPT = """
+import json, sys, tempfile, time, os
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60)
+at.secrets["DATABASE_BACKEND"] = "sqlite"
+at.secrets["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+start = time.perf_counter()
+at.run()
+elapsed = (time.perf_counter() - start) * 1000
+pages = sorted(m for m in sys.modules if m.startswith(("modules.", "admin.")))
+print(json.dumps({"first_render_ms": elapsed, "page_modules": pages,
+                  "exceptions": [e.message for e in at.exception]}))
+"""
+
+
+def _run(script: str, *flags: str) -> subprocess.CompletedProcess:
+    """在仓库根目录用全新解释器执行脚本（内部函数）"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    return subprocess.run(
+        [sys.executable, *flags, "-c", script],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    解析 -X importtime 输出（只取分隔标记之后的部分）
+
+    返回:
+        [(模块名, 层级, 自身耗时 us, 累计耗时 us)]
+    """
+    rows = []
+    started = False
+    for line in stderr.splitlines():
+        if line.strip() == _MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量应用冷启动的导入耗时")
+    parser.add_argument("--top", type=int, default=20, help="显示累计耗时最高的前 N 个模块")
+    parser.add_argument("--budget-ms", type=float, default=None, help="导入耗时预算（毫秒）")
+    args = parser.parse_args()
+
+    rows = parse_importtime(_run(_IMPORT_SCRIPT, "-X", "importtime").stderr)
+    total_ms = sum(self_us for _, _, self_us, _ in rows) / 1000
+
+    print(f"import app 总耗时：{total_ms:.1f} ms（{len(rows)} 个模块，不含 streamlit 自身）")
+    print(f"\n累计耗时最高的 {args.top} 个模块：")
+    print(f"{'累计 ms':>9}{'自身 ms':>9}  模块")
+    for name, depth, self_us, cumulative_us in sorted(rows, key=lambda r: -r[3])[:args.top]:
+        print(f"{cumulative_us / 1000:>9.1f}{self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+
+    page_modules: Dict[str, int] = {
+        name: cumulative_us for name, _, _, cumulative_us in rows if name.startswith(("modules.", "admin."))
+    }
+    print(f"\n启动时导入的页面模块：{', '.join(page_modules) or '无'}")
+
+    render = json.loads(_run(_RENDER_SCRIPT).stdout.strip().splitlines()[-1])
+    print(f"\n首次渲染登录页：{render['first_render_ms']:.1f} ms")
+    print(f"此时已加载的页面模块：{', '.join(render['page_modules']) or '无'}")
+    if render["exceptions"]:
+        print(f"⚠️ 渲染异常：{render['exceptions']}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\n❌ 导入耗时 {total_ms:.1f} ms 超出预算 {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
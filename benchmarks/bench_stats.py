@@ -0,0 +1,77 @@
+# ==================================================
+# 玩家属性汇总基准
+# 功能：数值调整后重算全部玩家属性块的两种方式
+#   1. 逐个玩家：每人汇总各层修正矩阵再计算（单个玩家读取时的路径）
+#   2. 批量：所有玩家的基础属性与修正矩阵堆叠后一次矩阵运算（StatEngine.recompute_all 的路径）
+#   并检查两种方式结果一致、装备增量更新（加新减旧）与从头汇总一致
+# 用法：
+#   PYTHONPATH=. python benchmarks/bench_stats.py
+#   PYTHONPATH=. python benchmarks/bench_stats.py --users 200000
+# ==================================================
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from core.buffs import FLAT, PCT, STAT_KEYS, apply_modifiers
+
+# 每个玩家的加成层数（装备、宗门、阵法）与装备部位数
+LAYER_COUNT = 3
+SLOT_COUNT = 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="玩家属性汇总基准")
+    parser.add_argument("--users", type=int, default=50_000, help="玩家数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    k = len(STAT_KEYS)
+    bases = rng.integers(50, 500, (args.users, k)).astype(np.float64)
+    bases[:, STAT_KEYS.index("craft_success")] = 0
+    layers = np.zeros((args.users, LAYER_COUNT, 2, k))
+    layers[:, :, FLAT, :] = rng.integers(0, 30, (args.users, LAYER_COUNT, k))
+    layers[:, :, PCT, :] = rng.choice([0.0, 0.1, 0.2, 0.5], (args.users, LAYER_COUNT, k))
+
+    # ===== 逐个玩家 =====
+    t0 = time.perf_counter()
+    single = np.empty_like(bases)
+    for i in range(args.users):
+        single[i] = apply_modifiers(bases[i], sum(layers[i]))
+    single_ms = (time.perf_counter() - t0) * 1000
+
+    # ===== 批量 =====
+    t0 = time.perf_counter()
+    batch = apply_modifiers(bases, layers.sum(axis=1))
+    batch_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"【重算全部玩家】{args.users:,} 名玩家，{LAYER_COUNT} 层加成")
+    print(f"  逐个玩家 {single_ms:9.1f} ms（{single_ms / args.users * 1000:6.2f} µs/人）")
+    print(f"  批量     {batch_ms:9.1f} ms（{batch_ms / args.users * 1000:6.2f} µs/人）· 加速 {single_ms / batch_ms:,.0f}×")
+
+    # ===== 装备增量更新 =====
+    items = np.zeros((SLOT_COUNT + 1, 2, k))
+    items[:, FLAT, STAT_KEYS.index("attack")] = rng.integers(5, 50, SLOT_COUNT + 1)
+    items[:, PCT, STAT_KEYS.index("attack")] = rng.choice([0.1, 0.4, 0.5], SLOT_COUNT + 1)
+    equipment = list(range(SLOT_COUNT))
+    layer = items[equipment].sum(axis=0)
+    layer = layer - items[equipment[0]] + items[SLOT_COUNT]
+    equipment[0] = SLOT_COUNT
+
+    checks = [
+        ("逐个与批量结果一致", np.allclose(single, batch)),
+        ("装备增量更新与从头汇总一致", np.allclose(layer, items[equipment].sum(axis=0))),
+    ]
+    print()
+    failed = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
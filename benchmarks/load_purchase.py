@@ -0,0 +1,147 @@
+# ==================================================
+# 购买引擎并发压测
+# 功能：在本地 SQLite 后端上让大量买家并发抢购同一个热门商品，
+#      统计吞吐量和延迟，并校验不超卖、灵石守恒、背包与成交记录一致
+# 用法：
+#   PYTHONPATH=. python benchmarks/load_purchase.py
+#   PYTHONPATH=. python benchmarks/load_purchase.py --buyers 1000 --concurrency 300 --stock 100
+#   PYTHONPATH=. python benchmarks/load_purchase.py --target system   # 抢购限量系统商品
+# ==================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.sqlite_backend import SQLiteClient
+import core.sqlite_rpc  # noqa: F401  注册 SQLite 版 RPC
+
+UNIT_PRICE = 10
+BUYER_STONES = 1000
+
+
+def _seed(client: SQLiteClient, args) -> dict:
+    """创建卖家、买家和热门商品（内部函数）"""
+    seller_id = str(uuid.uuid4())
+    buyers = [str(uuid.uuid4()) for _ in range(args.buyers)]
+    client.table("users").insert(
+        [{"id": seller_id, "username": f"seller-{seller_id[:8]}", "spirit_stones": 0}]
+        + [{"id": b, "username": f"buyer-{b[:8]}", "spirit_stones": BUYER_STONES} for b in buyers]
+    ).execute()
+
+    item_uuid = str(uuid.uuid4())
+    item = client.table("items").insert({
+        "uuid_id": item_uuid,
+        "name": f"热门丹药-{item_uuid[:4]}",
+        "category": "丹药",
+        "price": UNIT_PRICE,
+        "stock": args.stock if args.target == "system" else -1,
+        "is_system": args.target == "system",
+    }).execute().data[0]
+
+    params = {"p_item_uuid": item_uuid}
+    if args.target == "listing":
+        listing = client.table("shop_listings").insert({
+            "item_uuid": item_uuid,
+            "seller_id": seller_id,
+            "price": UNIT_PRICE,
+            "quantity": args.stock,
+            "is_active": True,
+        }).execute().data[0]
+        params = {"p_listing_id": listing["id"]}
+
+    return {"seller_id": seller_id, "buyers": buyers, "item": item, "params": params}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="购买引擎并发压测")
+    parser.add_argument("--buyers", type=int, default=500, help="买家数量（每人抢购一次）")
+    parser.add_argument("--concurrency", type=int, default=200, help="并发线程数")
+    parser.add_argument("--stock", type=int, default=100, help="商品库存")
+    parser.add_argument("--qty", type=int, default=1, help="每次购买数量")
+    parser.add_argument("--target", choices=["listing", "system"], default="listing", help="抢购玩家摊位或限量系统商品")
+    parser.add_argument("--db", default=None, help="SQLite 文件路径（默认临时文件）")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "load_purchase.db")
+    client = SQLiteClient(db_path)
+    seed = _seed(client, args)
+
+    start_gate = threading.Event()
+    latencies = []
+    outcomes = {"ok": 0, "insufficient stock": 0, "other": 0}
+    lock = threading.Lock()
+
+    def buy(buyer_id: str):
+        start_gate.wait()
+        t0 = time.perf_counter()
+        try:
+            client.rpc("purchase_listing", {
+                "p_buyer_id": buyer_id, "p_quantity": args.qty, **seed["params"],
+            }).execute()
+            outcome = "ok"
+        except Exception as e:
+            outcome = "insufficient stock" if "insufficient stock" in str(e) else "other"
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(buy, b) for b in seed["buyers"]]
+        wall_start = time.perf_counter()
+        start_gate.set()
+        for f in futures:
+            f.result()
+        wall = time.perf_counter() - wall_start
+
+    lat = np.array(latencies)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    print(f"买家 {args.buyers} · 并发 {args.concurrency} · 库存 {args.stock} · 目标 {args.target}")
+    print(f"耗时 {wall:.2f} s，吞吐 {args.buyers / wall:.0f} 次购买请求/s")
+    print(f"延迟 p50 {p50:.1f} ms · p95 {p95:.1f} ms · p99 {p99:.1f} ms")
+    print(f"成功 {outcomes['ok']} · 库存不足 {outcomes['insufficient stock']} · 其他失败 {outcomes['other']}")
+
+    # ===== 一致性校验 =====
+    expected_sold = min(args.stock // args.qty, args.buyers) * args.qty
+    sold = outcomes["ok"] * args.qty
+    item = seed["item"]
+    trades = client.table("market_trades").select("quantity, total_price").eq("item_id", item["id"]).execute().data
+    inventory = client.table("user_inventory").select("quantity").eq("item_id", item["id"]).execute().data
+    buyer_stones = client.table("users").select("spirit_stones").in_("id", seed["buyers"]).execute().data
+    spent = args.buyers * BUYER_STONES - sum(u["spirit_stones"] for u in buyer_stones)
+
+    if args.target == "listing":
+        listing = client.table("shop_listings").select("quantity, is_active")\
+            .eq("id", seed["params"]["p_listing_id"]).single().execute().data
+        remaining, active = listing["quantity"], listing["is_active"]
+        seller = client.table("users").select("spirit_stones").eq("id", seed["seller_id"]).single().execute().data
+        received = seller["spirit_stones"]
+    else:
+        remaining = client.table("items").select("stock").eq("id", item["id"]).single().execute().data["stock"]
+        active, received = remaining > 0, spent
+
+    checks = [
+        ("售出数量 = 可售数量（不超卖、不少卖）", sold == expected_sold),
+        ("剩余库存 = 初始库存 - 售出", remaining == args.stock - sold),
+        ("售罄后自动下架", active == (remaining > 0)),
+        ("成交记录数量 = 售出数量", sum(t["quantity"] for t in trades) == sold),
+        ("买家背包增加 = 售出数量", sum(i["quantity"] for i in inventory) == sold),
+        ("买家支出 = 成交金额 = 卖家收入", spent == sum(t["total_price"] for t in trades) == received),
+        ("没有非预期错误", outcomes["other"] == 0),
+    ]
+    failed = False
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failed = failed or not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# ==================================================
+# 拍卖行模块
+# 功能：发起拍卖、出价、到期结算
+#      到期结算由进程级调度器驱动：所有未结束拍卖按结束时间放进一个最小堆，
+#      调度线程只处理堆顶已到期的拍卖，不需要每轮扫描全部拍卖
+# 约定：
+#   - 出价会使拍卖 version + 1（防狙击时还会顺延结束时间），同时压入新的堆元素；
+#     旧元素在出堆时发现 version 不是最新就直接丢弃（惰性失效）
+#   - settle_auction 在服务端再次校验结束时间并按状态幂等，
+#     多个进程同时运行调度器也不会重复结算
+# ==================================================
+
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.helpers import parse_timestamp
+
+from .config import (
+    AUCTION_SNIPE_EXTEND_SECONDS, AUCTION_SNIPE_WINDOW_SECONDS, AUCTION_TICK_SECONDS, get_supabase_client,
+)
+
+# 服务端错误信息 → 玩家可读的提示
+AUCTION_ERRORS = {
+    "auction closed": "拍卖已结束",
+    "cannot bid on own auction": "不能竞拍自己的拍品",
+    "bid too low": "出价低于最低加价要求，可能已有人出了更高价",
+    "insufficient spirit stones": "灵石不足",
+    "insufficient inventory": "背包中该物品数量不足",
+    "price and quantity must be positive": "价格和数量必须大于 0",
+    "invalid duration": "拍卖时长无效",
+    "unknown item": "物品不存在",
+    "deadlock detected": "出价冲突，请重试",
+}
+
+# 结算失败后的重试间隔（秒）与最多尝试次数（超过后不再排期，进程重启时由 recover 重新加载）
+SETTLE_RETRY_SECONDS = 5.0
+SETTLE_MAX_ATTEMPTS = 5
+
+# 结算时出现即不再重试的错误（拍卖已不存在）
+SETTLE_FATAL_ERRORS = ("unknown auction",)
+
+# 恢复时每次读取的拍卖条数
+RECOVER_PAGE_SIZE = 1000
+
+
+# ==============================
+# 📡 服务端调用
+# ==============================
+
+def create_auction(seller_id: str, item_uuid: str, quantity: int, start_price: int,
+                   min_increment: int, duration_seconds: int) -> Dict[str, Any]:
+    """
+    发起拍卖：物品从卖家背包托管到拍卖，并加入到期调度
+
+    参数:
+        seller_id: 卖家用户 ID
+        item_uuid: 物品 uuid_id
+        quantity: 数量
+        start_price: 起拍价（总价）
+        min_increment: 最低加价
+        duration_seconds: 拍卖时长（秒）
+
+    返回:
+        拍卖行
+    """
+    auction = get_supabase_client().rpc("create_auction", {
+        "p_seller_id": str(seller_id),
+        "p_item_uuid": str(item_uuid),
+        "p_quantity": int(quantity),
+        "p_start_price": int(start_price),
+        "p_min_increment": int(min_increment),
+        "p_duration_seconds": int(duration_seconds),
+    }).execute().data
+    get_auction_scheduler().schedule_row(auction)
+    return auction
+
+
+def place_bid(auction_id: int, bidder_id: str, amount: int) -> Dict[str, Any]:
+    """
+    出价：冻结出价灵石、退还上一位最高出价者；临近结束时顺延结束时间
+
+    参数:
+        auction_id: 拍卖 ID
+        bidder_id: 出价用户 ID
+        amount: 出价（总价）
+
+    返回:
+        出价后的拍卖行
+    """
+    auction = get_supabase_client().rpc("place_bid", {
+        "p_auction_id": int(auction_id),
+        "p_bidder_id": str(bidder_id),
+        "p_amount": int(amount),
+        "p_snipe_window_seconds": AUCTION_SNIPE_WINDOW_SECONDS,
+        "p_extend_seconds": AUCTION_SNIPE_EXTEND_SECONDS,
+    }).execute().data
+    get_auction_scheduler().schedule_row(auction)
+    return auction
+
+
+def settle_auction(auction_id: int) -> Dict[str, Any]:
+    """
+    结算拍卖（未到期或已结算时原样返回拍卖行）
+
+    返回:
+        拍卖行，status 为 "sold" / "unsold" 表示已结算，"open" 表示尚未到期
+    """
+    return get_supabase_client().rpc("settle_auction", {"p_auction_id": int(auction_id)}).execute().data
+
+
+def min_next_bid(auction: Dict[str, Any]) -> int:
+    """当前允许的最低出价"""
+    if auction.get("current_bid") is None:
+        return auction["start_price"]
+    return auction["current_bid"] + auction["min_increment"]
+
+
+# ==============================
+# ⏰ 到期调度
+# ==============================
+
+class AuctionScheduler:
+    """
+    拍卖到期调度器
+
+    堆元素为 (结束时间, 拍卖 ID, version)，_versions 记录每个拍卖最新的 version。
+    每次结算只弹出堆顶元素，工作量与拍卖总数无关（堆操作 O(log n)）；
+    被出价作废的旧元素在各自的结束时间出堆时丢弃。
+    """
+
+    def __init__(self, client=None, settle: Optional[Callable[[int], Dict[str, Any]]] = None,
+                 clock: Callable[[], float] = time.time, tick_seconds: float = AUCTION_TICK_SECONDS):
+        self._client = client
+        self._settle = settle or self._settle_via_rpc
+        self._clock = clock
+        self.tick_seconds = tick_seconds
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, int]] = []
+        self._versions: Dict[int, int] = {}
+        # 拍卖 ID → 连续结算失败次数
+        self._attempts: Dict[int, int] = {}
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.recovered = False
+
+        self.closed = 0
+        self.stale_skipped = 0
+        self.rescheduled = 0
+        self.errors = 0
+        self.dropped = 0
+
+    @property
+    def client(self):
+        return self._client or get_supabase_client()
+
+    def _settle_via_rpc(self, auction_id: int) -> Dict[str, Any]:
+        """调用 settle_auction 结算（内部函数）"""
+        return self.client.rpc("settle_auction", {"p_auction_id": int(auction_id)}).execute().data
+
+    def schedule(self, auction_id: int, ends_at: float, version: int):
+        """
+        加入 / 更新一个拍卖的结束时间
+
+        参数:
+            auction_id: 拍卖 ID
+            ends_at: 结束时间（Unix 秒）
+            version: 拍卖 version（比已知 version 旧的更新直接忽略）
+        """
+        with self._lock:
+            if version < self._versions.get(auction_id, -1):
+                return
+            self._versions[auction_id] = version
+            heapq.heappush(self._heap, (ends_at, auction_id, version))
+            is_earliest = self._heap[0][1] == auction_id and self._heap[0][2] == version
+        if is_earliest:
+            # 新的最早到期时间，唤醒调度线程重新计算休眠时长
+            self._wakeup.set()
+
+    def schedule_row(self, auction: Dict[str, Any]):
+        """按拍卖行加入调度（已结算的拍卖忽略）"""
+        if auction and auction.get("status") == "open":
+            self.schedule(auction["id"], parse_timestamp(auction["ends_at"]), auction["version"])
+
+    def _pop_due(self, now: float) -> Optional[Tuple[int, int]]:
+        """弹出一个已到期且未作废的拍卖（内部函数）"""
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, auction_id, version = heapq.heappop(self._heap)
+                if self._versions.get(auction_id) != version:
+                    self.stale_skipped += 1
+                    continue
+                del self._versions[auction_id]
+                return auction_id, version
+        return None
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """
+        结算所有已到期的拍卖
+
+        参数:
+            now: 当前时间（默认取时钟）
+
+        返回:
+            本次结算的拍卖数
+        """
+        now = self._clock() if now is None else now
+        closed = 0
+        while True:
+            due = self._pop_due(now)
+            if due is None:
+                return closed
+            auction_id, version = due
+            try:
+                auction = self._settle(auction_id)
+            except Exception as error:
+                self.errors += 1
+                attempts = self._attempts.get(auction_id, 0) + 1
+                message = getattr(error, "message", None) or str(error)
+                if attempts >= SETTLE_MAX_ATTEMPTS or any(key in message for key in SETTLE_FATAL_ERRORS):
+                    # 持续失败的拍卖不再排期，避免每隔几秒无休止地重试
+                    self._attempts.pop(auction_id, None)
+                    self.dropped += 1
+                else:
+                    self._attempts[auction_id] = attempts
+                    self.schedule(auction_id, now + SETTLE_RETRY_SECONDS, version)
+                continue
+            self._attempts.pop(auction_id, None)
+
+            if auction.get("status") == "open":
+                # 服务端尚未到期（其他进程的出价顺延了结束时间），按最新结束时间重新排期
+                # （服务端时钟略慢时结束时间可能仍早于 now，推迟重试避免空转）
+                self.rescheduled += 1
+                ends_at = parse_timestamp(auction["ends_at"])
+                self.schedule(auction_id, ends_at if ends_at > now else now + SETTLE_RETRY_SECONDS,
+                              auction["version"])
+            else:
+                self.closed += 1
+                closed += 1
+
+    def next_deadline(self) -> Optional[float]:
+        """堆顶（最早）的结束时间"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        """
+        启动调度线程：先从数据库恢复未结算的拍卖（失败时每 tick_seconds 秒重试），
+        之后休眠到最早结束时间（最长 tick_seconds 秒），醒来后结算到期拍卖
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                if not self.recovered:
+                    try:
+                        self.recover()
+                    except Exception:
+                        self.errors += 1
+                        time.sleep(self.tick_seconds)
+                        continue
+                deadline = self.next_deadline()
+                wait = self.tick_seconds if deadline is None else min(self.tick_seconds, deadline - self._clock())
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    self._wakeup.clear()
+                self.run_due()
+
+        self._thread = threading.Thread(target=run, name="auction-scheduler", daemon=True)
+        self._thread.start()
+
+    def recover(self) -> int:
+        """
+        从数据库加载所有未结算的拍卖重建堆（一次 heapify）
+
+        返回:
+            加载的拍卖数
+        """
+        supabase = self.client
+        entries = []
+        last_id = 0
+        while True:
+            rows = supabase.table("auctions")\
+                .select("id, ends_at, version")\
+                .eq("status", "open")\
+                .gt("id", last_id)\
+                .order("id")\
+                .limit(RECOVER_PAGE_SIZE)\
+                .execute().data or []
+            entries.extend((parse_timestamp(r["ends_at"]), r["id"], r["version"]) for r in rows)
+            if len(rows) < RECOVER_PAGE_SIZE:
+                break
+            last_id = rows[-1]["id"]
+
+        with self._lock:
+            for ends_at, auction_id, version in entries:
+                if version >= self._versions.get(auction_id, -1):
+                    self._versions[auction_id] = version
+                    self._heap.append((ends_at, auction_id, version))
+            heapq.heapify(self._heap)
+            self.recovered = True
+        self._wakeup.set()
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度统计"""
+        deadline = self.next_deadline()
+        return {
+            "pending": len(self._versions),
+            "heap_size": len(self._heap),
+            "closed": self.closed,
+            "stale_skipped": self.stale_skipped,
+            "rescheduled": self.rescheduled,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "next_in_seconds": round(deadline - self._clock(), 1) if deadline is not None else None,
+        }
+
+
+_scheduler: Optional[AuctionScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_auction_scheduler() -> AuctionScheduler:
+    """获取进程级拍卖调度器（首次调用时启动调度线程，由线程从数据库恢复）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                scheduler = AuctionScheduler()
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
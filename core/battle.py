@@ -0,0 +1,205 @@
+# ==================================================
+# 秘境战斗模块
+# 功能：玩家与秘境守关妖兽的回合制自动战斗
+#      - fight：单场战斗（进入秘境时使用），附带战斗记录
+#      - simulate：同一对局一次模拟 N 场（NumPy 数组按回合整体推进，种子可复现），
+#        用于显示胜率 / 期望收益和「扫荡 ×N」
+# 规则：
+#   - 玩家先手，双方轮流攻击，最多 BATTLE_MAX_ROUNDS 回合，超时算战败
+#   - 伤害 = max(1, 攻击 × 浮动 × 暴击倍率 - 防御 × DEFENSE_FACTOR)（向下取整）
+#   - 玩家灵力足够时释放法术（消耗 SKILL_MP_COST，伤害 × SKILL_MULTIPLIER）
+# ==================================================
+
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import BATTLE_ESTIMATE_RUNS, BATTLE_MAX_ROUNDS
+
+# 伤害浮动（±10%）、暴击率与暴击倍率、防御减伤系数
+DAMAGE_VARIANCE = 0.1
+CRIT_RATE = 0.1
+CRIT_MULTIPLIER = 1.5
+DEFENSE_FACTOR = 0.5
+
+# 玩家法术：灵力消耗与伤害倍率
+SKILL_MP_COST = 10
+SKILL_MULTIPLIER = 2.0
+
+
+class Combatant:
+    """参战单位的战斗属性"""
+
+    __slots__ = ("name", "hp", "mp", "attack", "defense")
+
+    def __init__(self, name: str, hp: int, attack: int, defense: int, mp: int = 0):
+        self.name = name
+        self.hp = max(1, int(hp))
+        self.mp = max(0, int(mp))
+        self.attack = max(0, int(attack))
+        self.defense = max(0, int(defense))
+
+    @classmethod
+    def from_user(cls, user, stats: Optional[Dict[str, Any]] = None) -> "Combatant":
+        """
+        由会话中的 User 构造玩家
+
+        参数:
+            user: 会话中的 User
+            stats: 属性块（core/stats.get_stat_block，含装备 / 宗门 / 阵法加成）；默认使用 User 的基础属性
+        """
+        if stats is None:
+            return cls(user.username or "你", user.hp, user.attack, user.defense, user.mp)
+        return cls(user.username or "你", stats["hp"], stats["attack"], stats["defense"], stats["mp"])
+
+    def key(self) -> Tuple[int, int, int, int]:
+        """属性元组（用作缓存键）"""
+        return (self.hp, self.mp, self.attack, self.defense)
+
+
+def monster_for(dungeon: Dict[str, Any]) -> Combatant:
+    """
+    秘境守关妖兽：优先使用 dungeons 表中的 monster_* 列，未配置的属性按要求等级推算
+
+    参数:
+        dungeon: 秘境行（dungeons / dungeon_status）
+    """
+    level = dungeon.get("required_level") or 1
+    return Combatant(
+        dungeon.get("monster_name") or f"{dungeon.get('name', '秘境')}守卫",
+        dungeon.get("monster_hp") or 60 + 20 * level,
+        dungeon.get("monster_attack") or 6 + 3 * level,
+        dungeon.get("monster_defense") or 2 + level,
+    )
+
+
+def _damage(attack, defense, roll, crit):
+    """伤害公式（标量与数组通用）（内部函数）"""
+    raw = attack * roll * np.where(crit, CRIT_MULTIPLIER, 1.0) - defense * DEFENSE_FACTOR
+    return np.maximum(1, np.floor(raw))
+
+
+# ==============================
+# ⚔️ 单场战斗
+# ==============================
+
+def fight(player: Combatant, monster: Combatant, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    进行一场战斗
+
+    参数:
+        player: 玩家
+        monster: 妖兽
+        seed: 随机种子（默认不固定）
+
+    返回:
+        {"victory", "rounds", "player_hp", "monster_hp", "log": [每回合文字]}
+    """
+    rng = np.random.default_rng(seed)
+    p_hp, m_hp, mp = player.hp, monster.hp, player.mp
+    log: List[str] = []
+    for round_no in range(1, BATTLE_MAX_ROUNDS + 1):
+        skill = mp >= SKILL_MP_COST
+        if skill:
+            mp -= SKILL_MP_COST
+        crit = rng.random() < CRIT_RATE
+        dmg = int(_damage(player.attack * (SKILL_MULTIPLIER if skill else 1.0), monster.defense,
+                          rng.uniform(1 - DAMAGE_VARIANCE, 1 + DAMAGE_VARIANCE), crit))
+        m_hp -= dmg
+        action = "施展法术" if skill else "出手"
+        log.append(f"第 {round_no} 回合：{player.name}{action}{'（暴击）' if crit else ''}，造成 {dmg} 点伤害")
+        if m_hp <= 0:
+            return {"victory": True, "rounds": round_no, "player_hp": p_hp, "monster_hp": 0, "log": log}
+
+        crit = rng.random() < CRIT_RATE
+        dmg = int(_damage(monster.attack, player.defense, rng.uniform(1 - DAMAGE_VARIANCE, 1 + DAMAGE_VARIANCE), crit))
+        p_hp -= dmg
+        log.append(f"第 {round_no} 回合：{monster.name}反击{'（暴击）' if crit else ''}，造成 {dmg} 点伤害")
+        if p_hp <= 0:
+            return {"victory": False, "rounds": round_no, "player_hp": 0, "monster_hp": m_hp, "log": log}
+
+    log.append(f"{BATTLE_MAX_ROUNDS} 回合内未分胜负，{player.name}力竭退出")
+    return {"victory": False, "rounds": BATTLE_MAX_ROUNDS, "player_hp": p_hp, "monster_hp": m_hp, "log": log}
+
+
+# ==============================
+# 🧮 批量模拟
+# ==============================
+
+def simulate(player: Combatant, monster: Combatant, runs: int, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    同一对局模拟 runs 场：每个数组元素是一场战斗，逐回合整体推进，
+    已分出胜负的场次用掩码冻结，全部结束后提前退出
+
+    参数:
+        player: 玩家
+        monster: 妖兽
+        runs: 模拟场数
+        seed: 随机种子（相同种子结果相同）
+
+    返回:
+        {"runs", "wins", "win_rate", "avg_rounds", "avg_hp_left", "elapsed_ms"}
+        （avg_hp_left 为获胜场次的平均剩余生命）
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    p_hp = np.full(runs, player.hp, dtype=np.float64)
+    m_hp = np.full(runs, monster.hp, dtype=np.float64)
+    mp = np.full(runs, player.mp, dtype=np.int64)
+    rounds = np.full(runs, BATTLE_MAX_ROUNDS, dtype=np.int64)
+    won = np.zeros(runs, dtype=bool)
+    pending = np.ones(runs, dtype=bool)
+
+    low, high = 1 - DAMAGE_VARIANCE, 1 + DAMAGE_VARIANCE
+    for round_no in range(1, BATTLE_MAX_ROUNDS + 1):
+        skill = pending & (mp >= SKILL_MP_COST)
+        mp -= np.where(skill, SKILL_MP_COST, 0)
+        attack = player.attack * np.where(skill, SKILL_MULTIPLIER, 1.0)
+        dmg = _damage(attack, monster.defense, rng.uniform(low, high, runs), rng.random(runs) < CRIT_RATE)
+        m_hp -= np.where(pending, dmg, 0)
+        finished = pending & (m_hp <= 0)
+        won |= finished
+        rounds[finished] = round_no
+        pending &= ~finished
+
+        dmg = _damage(monster.attack, player.defense, rng.uniform(low, high, runs), rng.random(runs) < CRIT_RATE)
+        p_hp -= np.where(pending, dmg, 0)
+        finished = pending & (p_hp <= 0)
+        rounds[finished] = round_no
+        pending &= ~finished
+        if not pending.any():
+            break
+
+    wins = int(won.sum())
+    return {
+        "runs": runs,
+        "wins": wins,
+        "win_rate": wins / runs if runs else 0.0,
+        "avg_rounds": float(rounds.mean()) if runs else 0.0,
+        "avg_hp_left": float(p_hp[won].mean()) if wins else 0.0,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+@lru_cache(maxsize=1024)
+def _estimate(player_key: Tuple[int, int, int, int], monster_key: Tuple[int, int, int, int],
+              runs: int, seed: int) -> Dict[str, Any]:
+    """按属性元组缓存的模拟结果（内部函数）"""
+    hp, mp, attack, defense = player_key
+    m_hp, _, m_attack, m_defense = monster_key
+    return simulate(Combatant("", hp, attack, defense, mp), Combatant("", m_hp, m_attack, m_defense), runs, seed)
+
+
+def estimate_dungeon(player: Combatant, dungeon: Dict[str, Any], runs: int = BATTLE_ESTIMATE_RUNS) -> Dict[str, Any]:
+    """
+    估算玩家挑战某个秘境的胜率与期望收益（固定种子，同样的属性得到同样的结果并被缓存）
+
+    返回:
+        simulate 的结果，另加 expected_stones / expected_items（每次挑战的期望奖励）
+    """
+    result = dict(_estimate(player.key(), monster_for(dungeon).key(), runs, int(dungeon.get("id") or 0)))
+    result["expected_stones"] = result["win_rate"] * (dungeon.get("reward_spirit_stones") or 0)
+    result["expected_items"] = result["win_rate"] * (dungeon.get("reward_item_qty") or 0)
+    return result
@@ -0,0 +1,279 @@
+# ==================================================
+# 阵法增益模块
+# 功能：激活阵法（服务端 activate_array，单事务）、汇总生效中的增益，
+#      得出阵法层的属性修正矩阵（与装备、宗门加成一起在 core/stats.py 汇总）
+#      增益由进程级引擎管理：
+#        - 每个玩家的增益只在首次访问时查询一次，之后由激活操作直接更新
+#        - 所有增益按到期时间放进一个最小堆，读取时只弹出堆顶已到期的增益
+#        - 每个玩家的属性修正向量只在增益开始或到期时重新计算，其余读取直接返回缓存
+# 效果类型（arrays.effect_type）：
+#   hp / mp / attack / defense                 固定值加成
+#   hp_pct / mp_pct / attack_pct / defense_pct 百分比加成（effect_value = 10 表示 +10%）
+#   craft_success                              炼丹 / 炼器成功率加成（百分点）
+#   不同阵法的同类效果不叠加，只取最强的一个；其他效果类型不参与属性计算
+# ==================================================
+
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.helpers import parse_timestamp
+
+from .config import ARRAY_MAX_ACTIVE, ARRAY_MAX_STACKS, get_supabase_client
+
+# 属性向量的分量顺序
+STAT_KEYS = ("hp", "mp", "attack", "defense", "craft_success")
+_STAT_INDEX = {key: i for i, key in enumerate(STAT_KEYS)}
+
+# 修正矩阵的行：固定值加成、百分比加成
+FLAT, PCT = 0, 1
+
+# 效果类型 → (行, 属性分量, effect_value 的换算系数)
+EFFECTS: Dict[str, Tuple[int, int, float]] = {
+    **{key: (FLAT, _STAT_INDEX[key], 1.0) for key in ("hp", "mp", "attack", "defense")},
+    **{f"{key}_pct": (PCT, _STAT_INDEX[key], 0.01) for key in ("hp", "mp", "attack", "defense")},
+    "craft_success": (FLAT, _STAT_INDEX["craft_success"], 0.01),
+}
+
+EFFECT_LABELS = {
+    "hp": "生命", "mp": "灵力", "attack": "攻击", "defense": "防御",
+    "hp_pct": "生命", "mp_pct": "灵力", "attack_pct": "攻击", "defense_pct": "防御",
+    "craft_success": "炼制成功率",
+}
+
+# 服务端错误信息 → 玩家可读的提示
+ARRAY_ERRORS = {
+    "insufficient spirit stones": "灵石不足",
+    "too many active arrays": f"最多同时激活 {ARRAY_MAX_ACTIVE} 个阵法",
+    "array fully stacked": f"续期已达上限（剩余时间最多为 {ARRAY_MAX_STACKS} 个持续时间）",
+    "unknown array": "阵法不存在",
+    "invalid duration": "阵法持续时间无效",
+}
+
+
+def describe_effect(effect_type: Optional[str], effect_value) -> str:
+    """效果文字，如「攻击 +10」「攻击 +10%」"""
+    value = f"{float(effect_value or 0):g}"
+    if effect_type not in EFFECTS:
+        return f"{effect_type or '未知'} +{value}"
+    suffix = "%" if EFFECTS[effect_type][2] != 1.0 else ""
+    return f"{EFFECT_LABELS[effect_type]} +{value}{suffix}"
+
+
+# ==============================
+# 🧮 修正向量
+# ==============================
+
+def aggregate_modifiers(buffs: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    把一组增益汇总成修正矩阵（同类效果取最大值，不同类效果相加）
+
+    参数:
+        buffs: 增益行（effect_type / effect_value）
+
+    返回:
+        形状为 (2, len(STAT_KEYS)) 的矩阵：第 FLAT 行为固定值加成，第 PCT 行为百分比加成（小数）
+    """
+    strongest: Dict[str, float] = {}
+    for buff in buffs:
+        effect = buff.get("effect_type")
+        if effect in EFFECTS:
+            strongest[effect] = max(strongest.get(effect, 0.0), float(buff.get("effect_value") or 0))
+
+    modifiers = np.zeros((2, len(STAT_KEYS)))
+    for effect, value in strongest.items():
+        row, col, scale = EFFECTS[effect]
+        modifiers[row, col] += value * scale
+    return modifiers
+
+
+def apply_modifiers(base: np.ndarray, modifiers: np.ndarray) -> np.ndarray:
+    """
+    生效属性 = (基础属性 + 固定值加成) × (1 + 百分比加成)
+
+    参数:
+        base: 属性向量，或多个玩家的属性矩阵 (N, len(STAT_KEYS))
+        modifiers: 修正矩阵，或多个玩家的修正矩阵 (N, 2, len(STAT_KEYS))
+    """
+    return (base + modifiers[..., FLAT, :]) * (1 + modifiers[..., PCT, :])
+
+
+# ==============================
+# ⏳ 增益引擎
+# ==============================
+
+class BuffEngine:
+    """
+    阵法增益引擎
+
+    _buffs 记录已加载玩家生效中的增益（array_id → 增益行，另存到期 Unix 秒 _expires），
+    _modifiers 为每个玩家缓存的修正矩阵。
+    堆元素为 (到期时间, 用户 ID, 阵法 ID)；续期会压入新元素，
+    旧元素出堆时发现到期时间与当前记录不一致就直接丢弃（惰性失效）。
+    """
+
+    def __init__(self, client=None, clock: Callable[[], float] = time.time):
+        self._client = client
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buffs: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._modifiers: Dict[str, np.ndarray] = {}
+        self._heap: List[Tuple[float, str, int]] = []
+
+        self.loads = 0
+        self.recomputes = 0
+        self.expired = 0
+        self.stale_skipped = 0
+
+    @property
+    def client(self):
+        return self._client or get_supabase_client()
+
+    def _fetch(self, user_id: str) -> List[Dict[str, Any]]:
+        """查询玩家生效中的增益（内部函数）"""
+        now = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(self._clock()))
+        return self.client.table("user_buffs")\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .gt("expires_at", now)\
+            .execute().data or []
+
+    def _put(self, user_id: str, buff: Dict[str, Any]):
+        """记录一条增益并压入堆（调用方持有锁）（内部函数）"""
+        buff = dict(buff, _expires=parse_timestamp(buff["expires_at"]))
+        self._buffs.setdefault(user_id, {})[buff["array_id"]] = buff
+        heapq.heappush(self._heap, (buff["_expires"], user_id, buff["array_id"]))
+
+    def _recompute(self, user_id: str):
+        """重新计算玩家的修正矩阵（调用方持有锁）（内部函数）"""
+        modifiers = aggregate_modifiers(list(self._buffs.get(user_id, {}).values()))
+        modifiers.flags.writeable = False
+        self._modifiers[user_id] = modifiers
+        self.recomputes += 1
+
+    def _ensure_loaded(self, user_id: str):
+        """首次访问时加载玩家的增益（内部函数）"""
+        if user_id in self._modifiers:
+            return
+        rows = self._fetch(user_id)
+        with self._lock:
+            if user_id in self._modifiers:
+                return
+            self._buffs[user_id] = {}
+            for row in rows:
+                self._put(user_id, row)
+            self._recompute(user_id)
+            self.loads += 1
+
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """
+        移除所有已到期的增益，并重新计算受影响玩家的修正矩阵
+
+        返回:
+            本次移除的增益数
+        """
+        now = self._clock() if now is None else now
+        removed = 0
+        dirty = set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires, user_id, array_id = heapq.heappop(self._heap)
+                buff = self._buffs.get(user_id, {}).get(array_id)
+                if buff is None or buff["_expires"] != expires:
+                    self.stale_skipped += 1
+                    continue
+                del self._buffs[user_id][array_id]
+                dirty.add(user_id)
+                removed += 1
+            for user_id in dirty:
+                self._recompute(user_id)
+            self.expired += removed
+        return removed
+
+    def apply(self, user_id: str, buff: Dict[str, Any]):
+        """记录激活 / 续期后的增益行（activate_array 的返回值），并重新计算修正矩阵"""
+        self._ensure_loaded(user_id)
+        with self._lock:
+            self._put(user_id, buff)
+            self._recompute(user_id)
+
+    def invalidate(self, user_id: str):
+        """丢弃玩家的缓存，下次访问时重新加载"""
+        with self._lock:
+            self._buffs.pop(user_id, None)
+            self._modifiers.pop(user_id, None)
+
+    def modifiers(self, user_id: str) -> np.ndarray:
+        """玩家当前的修正矩阵（只读，共享数据）"""
+        self.expire_due()
+        modifiers = self._modifiers.get(user_id)
+        if modifiers is None:
+            self._ensure_loaded(user_id)
+            modifiers = self._modifiers[user_id]
+        return modifiers
+
+    def active_buffs(self, user_id: str) -> List[Dict[str, Any]]:
+        """玩家生效中的增益（按到期时间排序）"""
+        self.expire_due()
+        self._ensure_loaded(user_id)
+        with self._lock:
+            buffs = list(self._buffs.get(user_id, {}).values())
+        return sorted(buffs, key=lambda b: b["_expires"])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回引擎统计"""
+        return {
+            "users": len(self._modifiers),
+            "heap_size": len(self._heap),
+            "loads": self.loads,
+            "recomputes": self.recomputes,
+            "expired": self.expired,
+            "stale_skipped": self.stale_skipped,
+        }
+
+
+_engine: Optional[BuffEngine] = None
+_engine_lock = threading.Lock()
+
+def get_buff_engine() -> BuffEngine:
+    """获取进程级增益引擎"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = BuffEngine()
+    return _engine
+
+
+# ==============================
+# 📡 对外接口
+# ==============================
+
+def activate_array(user_id: str, array_id: int) -> Dict[str, Any]:
+    """
+    激活 / 续期阵法：扣除灵石、校验叠加规则并写入增益，全部原子完成
+
+    参数:
+        user_id: 用户 ID
+        array_id: 阵法 ID
+
+    返回:
+        增益行（user_buffs）
+    """
+    buff = get_supabase_client().rpc("activate_array", {
+        "p_user_id": str(user_id),
+        "p_array_id": int(array_id),
+        "p_max_active": ARRAY_MAX_ACTIVE,
+        "p_max_stacks": ARRAY_MAX_STACKS,
+    }).execute().data
+    get_buff_engine().apply(str(user_id), buff)
+    return buff
+
+
+def get_active_buffs(user_id: str) -> List[Dict[str, Any]]:
+    """玩家生效中的增益（按到期时间排序，_expires 为到期 Unix 秒）"""
+    return get_buff_engine().active_buffs(str(user_id))
+
@@ -0,0 +1,134 @@
+# ==================================================
+# 物品图鉴缓存模块
+# 功能：进程级共享的 items 表缓存，按 id / uuid / 名称 / 分类查询
+# ==================================================
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import ITEM_CATALOG_TTL_SECONDS, get_supabase_client
+
+
+class ItemCatalog:
+    """
+    物品图鉴缓存
+
+    items 表很少变动，整表加载一次后在所有会话间共享，
+    过期（TTL）或被显式失效后，下一次查询时重新加载。
+    返回的物品字典为共享数据，调用方只读不改。
+    """
+
+    def __init__(self, ttl_seconds: float = ITEM_CATALOG_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+
+        self._items: List[Dict[str, Any]] = []
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._by_uuid: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    # ==============================
+    # 🔄 加载与失效
+    # ==============================
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.time() - self._loaded_at < self.ttl_seconds
+
+    def _ensure_loaded(self):
+        """确保缓存可用，过期则重新加载（内部函数）"""
+        if self._is_fresh():
+            self.hits += 1
+            return
+
+        with self._lock:
+            # 双重检查：等待锁期间可能已被其他线程加载
+            if self._is_fresh():
+                self.hits += 1
+                return
+            self.misses += 1
+            self._load()
+
+    def _load(self):
+        """从数据库整表加载并建立索引（内部函数）"""
+        supabase = get_supabase_client()
+        items = supabase.table("items").select("*").order("name").execute().data or []
+
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            by_category.setdefault(item.get("category"), []).append(item)
+
+        self._items = items
+        self._by_id = {item.get("id"): item for item in items}
+        self._by_uuid = {item.get("uuid_id"): item for item in items if item.get("uuid_id")}
+        self._by_name = {item.get("name"): item for item in items}
+        self._by_category = by_category
+        self._loaded_at = time.time()
+
+    def invalidate(self):
+        """使缓存失效（物品被修改后调用）"""
+        with self._lock:
+            self._loaded_at = None
+
+    # ==============================
+    # 🔍 查询接口
+    # ==============================
+
+    def all_items(self) -> List[Dict[str, Any]]:
+        """获取所有物品（按名称排序）"""
+        self._ensure_loaded()
+        return self._items
+
+    def system_items(self) -> List[Dict[str, Any]]:
+        """获取所有系统商品（is_system = true）"""
+        return [item for item in self.all_items() if item.get("is_system")]
+
+    def get_by_id(self, item_id) -> Optional[Dict[str, Any]]:
+        """按 id 获取物品"""
+        self._ensure_loaded()
+        return self._by_id.get(item_id)
+
+    def get_by_uuid(self, item_uuid: str) -> Optional[Dict[str, Any]]:
+        """按 uuid_id 获取物品"""
+        self._ensure_loaded()
+        return self._by_uuid.get(item_uuid)
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """按名称获取物品"""
+        self._ensure_loaded()
+        return self._by_name.get(name)
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        """获取某分类下的所有物品"""
+        self._ensure_loaded()
+        return self._by_category.get(category, [])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "items": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "age_seconds": round(time.time() - self._loaded_at, 1) if self._loaded_at else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+_catalog: Optional[ItemCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_item_catalog() -> ItemCatalog:
+    """获取进程级物品图鉴缓存（所有会话共享）"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ItemCatalog()
+    return _catalog
@@ -0,0 +1,182 @@
+# ==================================================
+# 数据库连接池模块
+# 功能：进程级共享的 Supabase 客户端，复用 HTTP 连接池
+# ==================================================
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """带请求计数的 HTTP 传输层（内部类）"""
+
+    def __init__(self, manager: "SupabaseClientManager", **kwargs):
+        super().__init__(**kwargs)
+        self._manager = manager
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._manager._on_request_start()
+        failed = True
+        try:
+            response = super().handle_request(request)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            self._manager._on_request_end(failed)
+
+
+class SupabaseClientManager:
+    """
+    进程级 Supabase 客户端管理器
+
+    所有 Streamlit 会话共享同一个客户端和同一个 httpx 连接池，
+    避免每个浏览器标签页重复建立 TLS 连接。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.url = url.rstrip("/")
+        self.key = key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._client: Optional["Client"] = None
+        self._http_client: Optional[httpx.Client] = None
+        self._transport: Optional[_CountingTransport] = None
+        self._created_at: Optional[float] = None
+
+        # 请求计数（由传输层统计）
+        self._total_requests = 0
+        self._in_flight = 0
+        self._failed_requests = 0
+
+    # ==============================
+    # 🔑 客户端获取
+    # ==============================
+
+    @property
+    def client(self) -> "Client":
+        """获取共享客户端（首次访问时创建，线程安全）"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _create_client(self) -> "Client":
+        """创建带连接池的客户端（内部函数）"""
+        # supabase 包导入耗时较长，推迟到首次建立连接时，不拖慢冷启动
+        from supabase import ClientOptions, create_client
+
+        self._transport = _CountingTransport(self, limits=self.limits, http2=True)
+        self._http_client = httpx.Client(
+            transport=self._transport,
+            timeout=self.timeout,
+            follow_redirects=True,
+        )
+        options = ClientOptions(httpx_client=self._http_client)
+        client = create_client(self.url, self.key, options=options)
+        # 提前初始化 postgrest 子客户端，避免多线程首次访问时重复创建
+        _ = client.postgrest
+        self._created_at = time.time()
+        return client
+
+    def close(self):
+        """关闭连接池（进程退出或重建时调用）"""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._client = None
+            self._http_client = None
+            self._transport = None
+
+    # ==============================
+    # 📊 统计与健康检查
+    # ==============================
+
+    def _on_request_start(self):
+        with self._stats_lock:
+            self._total_requests += 1
+            self._in_flight += 1
+
+    def _on_request_end(self, failed: bool):
+        with self._stats_lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed_requests += 1
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        返回连接池使用情况，用于调整连接池大小
+
+        返回:
+            包含连接数、空闲连接数、请求计数等信息的字典
+        """
+        connections = []
+        if self._transport is not None:
+            pool = getattr(self._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+
+        idle = sum(1 for conn in connections if conn.is_idle())
+        with self._stats_lock:
+            return {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "open_connections": len(connections),
+                "idle_connections": idle,
+                "active_connections": len(connections) - idle,
+                "total_requests": self._total_requests,
+                "in_flight_requests": self._in_flight,
+                "failed_requests": self._failed_requests,
+                "uptime_seconds": round(time.time() - self._created_at, 1) if self._created_at else 0,
+            }
+
+    def health_check(self) -> Dict[str, Any]:
+        """
+        检查数据库 REST 接口是否可达
+
+        返回:
+            {"ok": bool, "status_code": int, "latency_ms": float, "error": str}
+        """
+        _ = self.client
+        start = time.perf_counter()
+        try:
+            response = self._http_client.get(
+                f"{self.url}/rest/v1/",
+                headers={"apikey": self.key, "Authorization": f"Bearer {self.key}"},
+            )
+            latency_ms = (time.perf_counter() - start) * 1000
+            return {
+                "ok": response.status_code < 500,
+                "status_code": response.status_code,
+                "latency_ms": round(latency_ms, 1),
+                "error": None,
+            }
+        except httpx.HTTPError as e:
+            latency_ms = (time.perf_counter() - start) * 1000
+            return {
+                "ok": False,
+                "status_code": None,
+                "latency_ms": round(latency_ms, 1),
+                "error": str(e)[:200],
+            }
@@ -3,8 +3,17 @@
 # 功能：管理全局常量、Supabase 连接、功能开关
 # ==================================================
 
+import threading
+from typing import TYPE_CHECKING, Optional, Union
+
 import streamlit as st
-from supabase import create_client, Client
+
+from .client_pool import SupabaseClientManager
+from .instrumentation import InstrumentedClient, query_recorder
+
+if TYPE_CHECKING:
+    from supabase import Client
+    from .sqlite_backend import SQLiteBackendManager
 
 # ==============================
 # 🛡️ 系统常量
@@ -33,23 +42,101 @@ SECT_CATEGORIES = ["天罚监司", "冥界", "人", "妖", "魔", "散修"]
 # 🔑 数据库连接管理
 # ==============================
 
-def get_supabase_client() -> Client:
+# 存储后端："supabase"（默认）或 "sqlite"（本地单机 / 离线）
+DATABASE_BACKEND = st.secrets.get("DATABASE_BACKEND", "supabase")
+SQLITE_PATH = st.secrets.get("SQLITE_PATH", "data/huanyu.db")
+
+# 连接池参数（可在 secrets.toml 中覆盖）
+SUPABASE_POOL_MAX_CONNECTIONS = 50       # 最大并发连接数
+SUPABASE_POOL_MAX_KEEPALIVE = 20         # 最大保活连接数
+SUPABASE_POOL_KEEPALIVE_EXPIRY = 30.0    # 空闲连接保活秒数
+SUPABASE_REQUEST_TIMEOUT = 10.0          # 单次请求超时（秒）
+SUPABASE_CONNECT_TIMEOUT = 5.0           # 建立连接超时（秒）
+
+# 物品图鉴缓存有效期（秒），物品编辑时会主动失效
+ITEM_CATALOG_TTL_SECONDS = 300
+
+# 宗门变更流拉取间隔（秒），其他会话中的加入 / 退出 / 踢出最多延迟这么久生效
+SECT_FEED_POLL_SECONDS = 5
+
+# 事件流读取时跳过的 id（事务尚未提交）在多少秒内继续补查，之后视为已回滚
+FEED_GAP_GRACE_SECONDS = 60
+
+# 挂单撮合的成交批量落库：攒够条数或到达间隔（秒）即写入数据库
+ORDER_BOOK_FLUSH_BATCH = 200
+ORDER_BOOK_FLUSH_SECONDS = 1.0
+
+# 撮合租约时长（秒）：同一数据库只允许一个进程撮合，持有者每三分之一租约续期一次
+ORDER_BOOK_LEASE_SECONDS = 30
+
+# 行情统计拉取成交 / 上架事件的间隔（秒）
+MARKET_STATS_POLL_SECONDS = 10
+
+# 拍卖：可选时长（秒）、防狙击窗口与顺延时长（秒）、调度器最长休眠间隔（秒）
+AUCTION_DURATIONS = {"1 小时": 3600, "6 小时": 6 * 3600, "24 小时": 86400, "3 天": 3 * 86400}
+AUCTION_SNIPE_WINDOW_SECONDS = 60
+AUCTION_SNIPE_EXTEND_SECONDS = 60
+AUCTION_TICK_SECONDS = 1.0
+
+# 玩家交易：未完成交易的有效期（秒）、每个进程清理过期交易的最短间隔（秒）
+PLAYER_TRADE_TTL_SECONDS = 1800
+PLAYER_TRADE_EXPIRE_INTERVAL_SECONDS = 60
+
+# 秘境战斗：单场最多回合数、胜率估算的模拟场数、扫荡模拟的最大场数
+BATTLE_MAX_ROUNDS = 30
+BATTLE_ESTIMATE_RUNS = 2000
+BATTLE_SWEEP_MAX_RUNS = 100_000
+
+# 阵法：同时生效的阵法上限、同一阵法续期后剩余时间的上限（持续时间的倍数）
+ARRAY_MAX_ACTIVE = 3
+ARRAY_MAX_STACKS = 3
+
+# 查询监控开关（也可在管理后台「操作日志」中临时开启）
+query_recorder.enabled = bool(st.secrets.get("QUERY_INSTRUMENTATION", False))
+
+_client_manager: Optional[Union[SupabaseClientManager, "SQLiteBackendManager"]] = None
+_client_manager_lock = threading.Lock()
+
+def get_client_manager() -> Union[SupabaseClientManager, "SQLiteBackendManager"]:
+    """
+    获取进程级客户端管理器（所有会话共享）
+    首次调用时读取配置并创建，之后直接复用
+    """
+    global _client_manager
+    if _client_manager is None:
+        with _client_manager_lock:
+            if _client_manager is None and DATABASE_BACKEND == "sqlite":
+                from .sqlite_backend import SQLiteBackendManager
+                _client_manager = SQLiteBackendManager(SQLITE_PATH)
+            elif _client_manager is None:
+                # 从 secrets.toml 读取配置，如果没有则使用占位符
+                _client_manager = SupabaseClientManager(
+                    url=st.secrets.get("SUPABASE_URL", "https://your-supabase-url.supabase.co"),
+                    key=st.secrets.get("SUPABASE_ANON_KEY", "your-supabase-anon-key-here"),
+                    max_connections=int(st.secrets.get("SUPABASE_POOL_MAX_CONNECTIONS", SUPABASE_POOL_MAX_CONNECTIONS)),
+                    max_keepalive_connections=int(st.secrets.get("SUPABASE_POOL_MAX_KEEPALIVE", SUPABASE_POOL_MAX_KEEPALIVE)),
+                    keepalive_expiry=float(st.secrets.get("SUPABASE_POOL_KEEPALIVE_EXPIRY", SUPABASE_POOL_KEEPALIVE_EXPIRY)),
+                    timeout=float(st.secrets.get("SUPABASE_REQUEST_TIMEOUT", SUPABASE_REQUEST_TIMEOUT)),
+                    connect_timeout=float(st.secrets.get("SUPABASE_CONNECT_TIMEOUT", SUPABASE_CONNECT_TIMEOUT)),
+                )
+    return _client_manager
+
+def get_supabase_client() -> "Client":
     """
-    获取 Supabase 客户端（单例模式）
-    避免重复创建连接，提高性能
+    获取 Supabase 客户端（进程级单例）
+    所有会话共享同一个客户端和连接池，避免重复建立连接；
+    DATABASE_BACKEND = "sqlite" 时返回接口相同的本地 SQLite 客户端
     """
-    if 'supabase_client' not in st.session_state:
-        # 从 secrets.toml 读取配置，如果没有则使用占位符
-        url = st.secrets.get("SUPABASE_URL", "https://your-supabase-url.supabase.co")
-        key = st.secrets.get("SUPABASE_ANON_KEY", "your-supabase-anon-key-here")
-        
-        try:
-            st.session_state.supabase_client = create_client(url, key)
-        except Exception as e:
-            st.error(f"❌ 数据库连接失败：{str(e)}")
-            st.stop()
+    try:
+        client = get_client_manager().client
+    except Exception as e:
+        st.error(f"❌ 数据库连接失败：{str(e)}")
+        st.stop()
     
-    return st.session_state.supabase_client
+    # 查询监控默认关闭；关闭时直接返回原始客户端，没有额外开销
+    if query_recorder.enabled:
+        return InstrumentedClient(client, query_recorder)
+    return client
 
 # ==============================
 # 💰 游戏数据常量
@@ -68,4 +155,29 @@ FORGE_MATERIAL_BONUS = {
     "御灵铁": 0.1, "引灵玉": 0.1, "剑心髓": 0.4,
     # ... (把你原来的所有材料加成复制到这里)
     "古老强者神魂碎片": 0.5,
-}
\ No newline at end of file
+}
+# 装备部位
+EQUIP_SLOTS = {"weapon": "兵器", "armor": "护甲", "accessory": "饰品"}
+
+# 宗门类别属性加成（效果类型与阵法相同，见 core/buffs.py）
+SECT_STAT_BONUS = {
+    "天罚监司": {"defense_pct": 10},
+    "冥界": {"mp_pct": 15},
+    "人": {"craft_success": 5},
+    "妖": {"hp_pct": 10},
+    "魔": {"attack_pct": 10},
+    "散修": {},
+}
+
+# 修炼进度：境界（每个境界 CULTIVATION_STAGES 层）
+CULTIVATION_REALMS = ["练气", "筑基", "金丹", "元婴", "化神", "炼虚", "合体", "大乘", "渡劫"]
+CULTIVATION_STAGES = 9
+
+# 经验曲线：从上一层突破到第 L 层（全局层数，练气 1 层为 1）所需经验 = EXP_BASE × (L - 1)²，
+# 跨境界突破（每个境界的第 1 层）再 × REALM_BREAKTHROUGH_MULTIPLIER
+# （修改后在管理后台「经验活动」中同步境界表；database/migrations/015_cultivation_progress.sql 使用相同公式初始化）
+EXP_BASE = 100
+REALM_BREAKTHROUGH_MULTIPLIER = 3
+
+# 每突破一层的属性成长（× 所在境界序号，练气为 1）
+STAGE_STAT_GAINS = {"hp": 20, "mp": 10, "attack": 3, "defense": 2}
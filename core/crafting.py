@@ -0,0 +1,138 @@
+# ==================================================
+# 合成计算模块
+# 功能：炼丹 / 炼器共用的材料需求矩阵与可合成次数计算
+# ==================================================
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import get_supabase_client
+
+# 配方中的材料字段（炼丹配方与炼器图纸结构相同）
+MATERIAL_SLOTS = [("material_1_id", "material_1_qty"), ("material_2_id", "material_2_qty")]
+
+# 无任何消耗的配方理论上可无限合成，显示时封顶
+MAX_CRAFTABLE_CAP = 9999
+
+
+def build_requirement_matrix(recipes: List[Dict[str, Any]]) -> Tuple[np.ndarray, List[Any]]:
+    """
+    构建 配方 × 材料 的需求矩阵
+
+    参数:
+        recipes: 配方列表（alchemy_recipes 或 forge_blueprints 行）
+
+    返回:
+        (需求矩阵 shape=(配方数, 材料数), 矩阵列对应的材料 id 列表)
+    """
+    material_ids: List[Any] = []
+    column_of: Dict[Any, int] = {}
+    for recipe in recipes:
+        for id_key, _ in MATERIAL_SLOTS:
+            mat_id = recipe.get(id_key)
+            if mat_id and mat_id not in column_of:
+                column_of[mat_id] = len(material_ids)
+                material_ids.append(mat_id)
+
+    matrix = np.zeros((len(recipes), len(material_ids)), dtype=np.int64)
+    for row, recipe in enumerate(recipes):
+        for id_key, qty_key in MATERIAL_SLOTS:
+            mat_id = recipe.get(id_key)
+            if mat_id:
+                # 同一材料出现在两个槽位时需求累加
+                matrix[row, column_of[mat_id]] += recipe.get(qty_key) or 0
+
+    return matrix, material_ids
+
+
+def compute_max_craftable(
+    recipes: List[Dict[str, Any]],
+    inventory: Dict[Any, int],
+    spirit_stones: int,
+) -> np.ndarray:
+    """
+    计算每个配方最多可合成的次数
+
+    参数:
+        recipes: 配方列表
+        inventory: 用户背包 {item_id: quantity}
+        spirit_stones: 用户当前灵石
+
+    返回:
+        与 recipes 顺序一致的可合成次数数组（int64）
+    """
+    if not recipes:
+        return np.zeros(0, dtype=np.int64)
+
+    matrix, material_ids = build_requirement_matrix(recipes)
+    owned = np.array([inventory.get(mat_id, 0) for mat_id in material_ids], dtype=np.int64)
+
+    # 材料限制：每种所需材料 floor(持有 / 需求) 的最小值，不需要的材料视为不限
+    per_material = np.where(matrix > 0, owned // np.maximum(matrix, 1), MAX_CRAFTABLE_CAP)
+    by_materials = per_material.min(axis=1) if material_ids else np.full(len(recipes), MAX_CRAFTABLE_CAP)
+
+    # 灵石限制
+    costs = np.array([recipe.get("spirit_stone_cost") or 0 for recipe in recipes], dtype=np.int64)
+    by_stones = np.where(costs > 0, max(spirit_stones, 0) // np.maximum(costs, 1), MAX_CRAFTABLE_CAP)
+
+    return np.minimum(np.minimum(by_materials, by_stones), MAX_CRAFTABLE_CAP).astype(np.int64)
+
+
+def plan_craft_batch(
+    recipe: Dict[str, Any],
+    times: int,
+    default_success_rate: float = 1.0,
+    rng: Optional[np.random.Generator] = None,
+    success_bonus: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    一次性掷出 N 次合成结果，并汇总所有背包与灵石变动
+
+    参数:
+        recipe: 配方（炼丹配方或炼器图纸）
+        times: 合成次数
+        default_success_rate: 配方未设置成功率时的默认值
+        rng: 随机数生成器（可传入带种子的生成器便于复现）
+        success_bonus: 成功率加成（属性块的 craft_success，见 core/stats.get_stat_block），加成后不超过 1
+
+    返回:
+        {"times", "successes", "failures", "stone_cost", "changes": {item_id: delta}}
+    """
+    rng = rng or np.random.default_rng()
+    success_rate = min(1.0, recipe.get("success_rate", default_success_rate) + success_bonus)
+    successes = int((rng.random(times) <= success_rate).sum())
+
+    changes: Dict[Any, int] = {}
+    for id_key, qty_key in MATERIAL_SLOTS:
+        mat_id = recipe.get(id_key)
+        if mat_id:
+            changes[mat_id] = changes.get(mat_id, 0) - (recipe.get(qty_key) or 0) * times
+
+    result_id = recipe.get("result_item_id")
+    if result_id and successes:
+        changes[result_id] = changes.get(result_id, 0) + recipe.get("result_qty", 1) * successes
+
+    return {
+        "times": times,
+        "successes": successes,
+        "failures": times - successes,
+        "stone_cost": (recipe.get("spirit_stone_cost") or 0) * times,
+        "changes": {item_id: delta for item_id, delta in changes.items() if delta},
+    }
+
+
+def apply_craft_batch(user_id: str, plan: Dict[str, Any]):
+    """
+    把批量合成结果一次性写入数据库（服务端 craft_batch 函数，单事务）
+
+    参数:
+        user_id: 用户 ID
+        plan: plan_craft_batch 的返回值
+    """
+    supabase = get_supabase_client()
+    supabase.rpc("craft_batch", {
+        "p_user_id": user_id,
+        "p_stone_cost": plan["stone_cost"],
+        "p_changes": [{"item_id": item_id, "delta": delta} for item_id, delta in plan["changes"].items()],
+    }).execute()
@@ -4,10 +4,18 @@
 # ==================================================#
 
 import uuid
+from typing import List, Optional
 from .config import get_supabase_client
+from .sect_cache import get_sect_cache
+
+# 批量发放灵石的目标筛选
+GRANT_FILTERS = {
+    "all_active": "全部未封禁用户",
+    "all": "全部用户",
+}
 
 def get_user_sect(user_id: str):
-    """ 获取用户当前所属宗门 """
+    """ 获取用户当前所属宗门（进程级缓存，见 core/sect_cache.py） """
     if not user_id:
         return None
     
@@ -17,14 +25,12 @@ def get_user_sect(user_id: str):
     except ValueError:
         return None
 
-    supabase = get_supabase_client()
-    members = supabase.table("sect_members").select("sect_id").eq("user_id", str(user_id)).execute()
-    if not members.data:
-        return None
-        
-    sect_id = members.data[0]["sect_id"]
-    sect = supabase.table("sects").select("*").eq("id", sect_id).execute()
-    return sect.data[0] if sect.data else None
+    return get_sect_cache().get(str(user_id))
+
+def invalidate_user_sect(user_id: str):
+    """ 用户宗门归属变化后使缓存失效 """
+    if user_id:
+        get_sect_cache().invalidate(str(user_id))
 
 def get_user_inventory_count(user_id: str) -> int:
     """ 获取用户背包物品总数 """
@@ -32,8 +38,39 @@ def get_user_inventory_count(user_id: str) -> int:
     result = supabase.table("user_inventory").select("quantity").eq("user_id", user_id).execute()
     return sum(item.get("quantity", 0) for item in (result.data or []))
 
+def get_user_inventory_quantities(user_id: str) -> dict:
+    """ 获取用户背包物品数量表 {item_id: quantity}（一次查询） """
+    supabase = get_supabase_client()
+    result = supabase.table("user_inventory").select("item_id, quantity").eq("user_id", user_id).execute()
+    return {item["item_id"]: item["quantity"] for item in (result.data or [])}
+
 def get_user_cultivation(user_id: str):
     """ 获取用户修炼数据 """
     supabase = get_supabase_client()
     result = supabase.table("user_cultivation").select("*").eq("user_id", user_id).execute()
-    return result.data[0] if result.data else None
\ No newline at end of file
+    return result.data[0] if result.data else None
+
+def grant_spirit_stones(grant_id: str, amount: int, user_ids: Optional[List[str]] = None,
+                        target_filter: Optional[str] = None, granted_by: Optional[str] = None) -> dict:
+    """
+    批量发放灵石（服务端一条集合语句，原子且按 grant_id 幂等）
+
+    参数:
+        grant_id: 发放批次 ID（重试时复用同一个 ID 不会重复发放）
+        amount: 每人发放数量
+        user_ids: 指定用户 ID 列表（与 target_filter 二选一）
+        target_filter: GRANT_FILTERS 中的筛选条件
+        granted_by: 操作人 ID
+
+    返回:
+        {"grant_id", "affected_rows", "already_applied"}
+    """
+    supabase = get_supabase_client()
+    result = supabase.rpc("grant_spirit_stones", {
+        "p_grant_id": grant_id,
+        "p_amount": amount,
+        "p_user_ids": user_ids,
+        "p_filter": target_filter,
+        "p_granted_by": granted_by,
+    }).execute()
+    return result.data
@@ -0,0 +1,49 @@
+# ==================================================
+# 秘境模块
+# 功能：结算秘境挑战（服务端 claim_dungeon，单事务）、查询全部秘境的可挑战状态
+#      战斗胜负由 core/battle.py 计算
+#      冷却按秘境分别计算，等级与冷却都以服务端为准
+# ==================================================
+
+from typing import Any, Dict, List
+
+from .config import get_supabase_client
+
+# 服务端错误信息 → 玩家可读的提示
+DUNGEON_ERRORS = {
+    "dungeon on cooldown": "秘境冷却中，请稍后再来",
+    "level too low": "等级不足",
+    "unknown dungeon": "秘境不存在",
+    "unknown user": "角色数据不存在",
+}
+
+
+def claim_dungeon(user_id: str, dungeon_id: int, victory: bool = True) -> Dict[str, Any]:
+    """
+    结算一次秘境挑战：校验等级与冷却、记录冷却，获胜时发放灵石和物品，全部原子完成
+
+    参数:
+        user_id: 用户 ID
+        dungeon_id: 秘境 ID
+        victory: 战斗是否获胜（战败同样消耗冷却，不发奖励）
+
+    返回:
+        {"dungeon_id", "victory", "spirit_stones", "item_id", "item_qty", "next_available_at"}
+    """
+    supabase = get_supabase_client()
+    return supabase.rpc("claim_dungeon", {
+        "p_user_id": str(user_id),
+        "p_dungeon_id": int(dungeon_id),
+        "p_victory": bool(victory),
+    }).execute().data
+
+
+def get_dungeon_status(user_id: str) -> List[Dict[str, Any]]:
+    """
+    一次查询返回所有秘境及该用户的挑战状态
+
+    返回:
+        秘境行列表，附加 reward_item_name、level_ok、cooldown_remaining（秒）、eligible
+    """
+    supabase = get_supabase_client()
+    return supabase.rpc("dungeon_status", {"p_user_id": str(user_id)}).execute().data or []
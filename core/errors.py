@@ -1,11 +1,13 @@
 # ==================================================
 # 错误处理模块
-# 功能：提供安全的页面加载上下文，隔离错误
+# 功能：提供安全的页面加载上下文，隔离错误；把服务端错误转换为玩家可读的提示
 # ==================================================
 
 import streamlit as st
 from contextlib import contextmanager
 from datetime import datetime
+from typing import Dict
+from .navigation import page_link
 
 @contextmanager
 def safe_page_load(page_name: str):
@@ -36,10 +38,25 @@ def safe_page_load(page_name: str):
         }
         
         # 提供返回按钮
-        if st.button("🏠 返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城", icon="🏠")
 
 def log_error(message: str, error: Exception):
     """记录错误日志（可扩展为写入文件或数据库）"""
-    print(f"[ERROR] {message}: {str(error)}")
\ No newline at end of file
+    print(f"[ERROR] {message}: {str(error)}")
+
+def describe_error(error: Exception, mapping: Dict[str, str]) -> str:
+    """
+    把服务端异常转换为玩家可读的提示
+
+    参数:
+        error: 调用 RPC 抛出的异常
+        mapping: 服务端错误信息片段 → 提示（各模块的 XXX_ERRORS）
+
+    返回:
+        第一个匹配片段对应的提示；都不匹配时返回原始信息的前 100 个字符
+    """
+    message = getattr(error, "message", None) or str(error)
+    for key, text in mapping.items():
+        if key in message:
+            return text
+    return message[:100]
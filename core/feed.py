@@ -0,0 +1,71 @@
+# ==================================================
+# 事件流游标模块
+# 功能：按自增 id 增量读取事件表（宗门变更流、成交 / 上架事件）时的游标
+#      id 在事务内分配、按提交顺序可见：较小 id 的事务可能在较大 id 已被读取之后才提交。
+#      游标记录读取时跳过的 id（空洞），宽限期内每次只按 id 补查这些空洞，
+#      没有空洞时不产生额外查询；超过宽限期仍未出现的 id 视为已回滚
+# ==================================================
+
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .config import FEED_GAP_GRACE_SECONDS
+
+# 最多同时追踪的空洞数（序列大幅跳号时只保留最近的部分）
+FEED_MAX_GAPS = 1000
+
+
+class FeedCursor:
+    """
+    事件流游标
+
+    position 为已读取的最大 id（None 表示尚未初始化）；
+    _gaps[id] = 发现该空洞的时间。
+    不加锁，由调用方保证同一时间只有一个线程推进游标。
+    """
+
+    def __init__(self, grace_seconds: float = FEED_GAP_GRACE_SECONDS, clock: Callable[[], float] = time.time):
+        self.grace_seconds = grace_seconds
+        self._clock = clock
+        self.position: Optional[int] = None
+        self._gaps: Dict[int, float] = {}
+
+    def reset(self, position: Optional[int] = None):
+        """重新定位游标并丢弃所有空洞"""
+        self.position = position
+        self._gaps.clear()
+
+    def advance(self, ids: Iterable[int]):
+        """
+        读取到游标之后的一批事件后推进游标，把中间缺失的 id 记为空洞
+
+        参数:
+            ids: 本批事件的 id（升序）
+        """
+        now = self._clock()
+        for event_id in ids:
+            if self.position is not None:
+                start = max(self.position + 1, event_id - FEED_MAX_GAPS)
+                for missing in range(start, event_id):
+                    self._gaps[missing] = now
+                self.position = max(self.position, event_id)
+            else:
+                self.position = event_id
+        if len(self._gaps) > FEED_MAX_GAPS:
+            for missing in sorted(self._gaps)[:len(self._gaps) - FEED_MAX_GAPS]:
+                del self._gaps[missing]
+
+    def pending_gaps(self) -> List[int]:
+        """仍在宽限期内、需要补查的空洞（升序），顺带丢弃已超时的空洞"""
+        cutoff = self._clock() - self.grace_seconds
+        for missing in [i for i, seen_at in self._gaps.items() if seen_at < cutoff]:
+            del self._gaps[missing]
+        return sorted(self._gaps)
+
+    def fill(self, ids: Iterable[int]):
+        """补查到的空洞事件已处理"""
+        for event_id in ids:
+            self._gaps.pop(event_id, None)
+
+    def stats(self):
+        return {"position": self.position, "gaps": len(self._gaps)}
@@ -0,0 +1,199 @@
+# ==================================================
+# 查询监控模块
+# 功能：可选地包装 Supabase 客户端，记录每次 execute() / rpc() 的
+#      表名、操作、过滤条件结构、返回行数、耗时和所在页面
+# ==================================================
+
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# 触发「操作类型」变化的构建方法
+_OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+
+# 记录列名的过滤 / 修饰方法（只记录结构，不记录值）
+_COLUMN_FILTERS = {
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_",
+    "contains", "contained_by", "filter", "match", "order",
+}
+_SHAPE_ONLY = {"or_", "limit", "range", "single", "maybe_single", "not_"}
+
+
+class QueryRecorder:
+    """
+    查询记录器（进程级共享）
+
+    每条记录对应一次 execute()，按 render_id 归属到某一次页面渲染，
+    用于统计每个页面每次渲染的查询次数和耗时分位数。
+    """
+
+    def __init__(self, max_records: int = 5000):
+        self.enabled = False
+        self._records: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._render_ids = itertools.count(1)
+        self.render_count = 0
+
+    # ==============================
+    # 🧭 渲染上下文
+    # ==============================
+
+    def begin_render(self, page: str):
+        """标记一次新的页面渲染开始（每次脚本运行调用一次）"""
+        self._local.page = page
+        self._local.render_id = next(self._render_ids)
+        # 脚本运行次数（进程累计），用于统计每次导航触发的重跑次数
+        self.render_count = self._local.render_id
+
+    def _context(self):
+        return getattr(self._local, "page", "unknown"), getattr(self._local, "render_id", 0)
+
+    # ==============================
+    # 📝 记录
+    # ==============================
+
+    def record(self, table: str, operation: str, filters: List[str], rows: int,
+               latency_ms: float, error: Optional[str] = None):
+        page, render_id = self._context()
+        entry = {
+            "time": time.time(),
+            "page": page,
+            "render_id": render_id,
+            "table": table,
+            "operation": operation,
+            "filters": ",".join(filters),
+            "rows": rows,
+            "latency_ms": round(latency_ms, 2),
+            "error": error,
+        }
+        with self._lock:
+            self._records.append(entry)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def recent(self, limit: int = 200) -> List[Dict[str, Any]]:
+        """最近的查询记录（新的在前）"""
+        with self._lock:
+            records = list(self._records)
+        return records[::-1][:limit]
+
+    # ==============================
+    # 📊 统计
+    # ==============================
+
+    def page_summary(self) -> List[Dict[str, Any]]:
+        """
+        按页面汇总：渲染次数、每次渲染查询数、单条查询与整次渲染耗时的 p50/p95/p99
+
+        返回:
+            每个页面一行的统计字典列表
+        """
+        import numpy as np  # 仅统计时需要，不在启动时导入
+
+        with self._lock:
+            records = list(self._records)
+
+        pages: Dict[str, Dict[int, List[float]]] = {}
+        for r in records:
+            pages.setdefault(r["page"], {}).setdefault(r["render_id"], []).append(r["latency_ms"])
+
+        summary = []
+        for page, renders in pages.items():
+            latencies = np.array([ms for items in renders.values() for ms in items])
+            render_totals = np.array([sum(items) for items in renders.values()])
+            query_counts = np.array([len(items) for items in renders.values()])
+            q50, q95, q99 = np.percentile(latencies, [50, 95, 99])
+            r50, r95, r99 = np.percentile(render_totals, [50, 95, 99])
+            summary.append({
+                "page": page,
+                "renders": len(renders),
+                "queries_per_render": round(float(query_counts.mean()), 1),
+                "max_queries_per_render": int(query_counts.max()),
+                "query_p50_ms": round(float(q50), 1),
+                "query_p95_ms": round(float(q95), 1),
+                "query_p99_ms": round(float(q99), 1),
+                "render_db_p50_ms": round(float(r50), 1),
+                "render_db_p95_ms": round(float(r95), 1),
+                "render_db_p99_ms": round(float(r99), 1),
+            })
+        return sorted(summary, key=lambda row: row["render_db_p95_ms"], reverse=True)
+
+
+class _InstrumentedBuilder:
+    """查询构建器代理：记录链式调用结构，在 execute() 时计时（内部类）"""
+
+    def __init__(self, builder, recorder: QueryRecorder, table: str, operation: str, filters: List[str]):
+        self._builder = builder
+        self._recorder = recorder
+        self._table = table
+        self._operation = operation
+        self._filters = filters
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # not_ 等属性直接返回新的构建器
+            if hasattr(attr, "execute"):
+                return self._wrap(attr, name, ())
+            return attr
+
+        def call(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs), name, args)
+
+        return call
+
+    def _wrap(self, result, name: str, args):
+        if not hasattr(result, "execute"):
+            return result
+
+        operation = name if name in _OPERATIONS else self._operation
+        filters = self._filters
+        if name in _COLUMN_FILTERS and args:
+            filters = filters + [f"{name}:{args[0]}"]
+        elif name in _SHAPE_ONLY:
+            filters = filters + [name]
+        return _InstrumentedBuilder(result, self._recorder, self._table, operation, filters)
+
+    def execute(self):
+        start = time.perf_counter()
+        try:
+            response = self._builder.execute()
+        except Exception as e:
+            self._recorder.record(self._table, self._operation, self._filters, 0,
+                                  (time.perf_counter() - start) * 1000, error=str(e)[:200])
+            raise
+
+        data = getattr(response, "data", None)
+        rows = len(data) if isinstance(data, list) else (0 if data is None else 1)
+        self._recorder.record(self._table, self._operation, self._filters, rows,
+                              (time.perf_counter() - start) * 1000)
+        return response
+
+
+class InstrumentedClient:
+    """Supabase 客户端代理：table() / rpc() 返回带监控的构建器，其余属性透传"""
+
+    def __init__(self, client, recorder: QueryRecorder):
+        self._client = client
+        self._recorder = recorder
+
+    def table(self, name: str):
+        return _InstrumentedBuilder(self._client.table(name), self._recorder, name, "select", [])
+
+    def from_(self, name: str):
+        return self.table(name)
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        builder = self._client.rpc(fn, params or {}, *args, **kwargs)
+        return _InstrumentedBuilder(builder, self._recorder, f"rpc:{fn}", "rpc", [])
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+query_recorder = QueryRecorder()
@@ -0,0 +1,54 @@
+# ==================================================
+# 背包账本模块
+# 功能：统一的背包增减接口，所有变动一次 RPC 原子写入
+# ==================================================
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .config import get_supabase_client
+
+# 一条背包变动：(user_id, item_id, delta)，delta 为负表示扣除
+InventoryChange = Tuple[str, Any, int]
+
+
+def apply_inventory_changes(changes: Iterable[InventoryChange]):
+    """
+    原子地应用一批背包变动（服务端 apply_inventory_deltas 函数）
+
+    任意一条扣除数量不足时整批回滚并抛出异常。
+
+    参数:
+        changes: [(user_id, item_id, delta), ...]
+    """
+    payload: List[Dict[str, Any]] = [
+        {"user_id": str(user_id), "item_id": item_id, "delta": int(delta)}
+        for user_id, item_id, delta in changes
+        if item_id and delta
+    ]
+    if not payload:
+        return
+
+    supabase = get_supabase_client()
+    supabase.rpc("apply_inventory_deltas", {"p_changes": payload}).execute()
+
+
+def add_items(user_id: str, items: Dict[Any, int]):
+    """
+    向用户背包添加物品
+
+    参数:
+        user_id: 用户 ID
+        items: {item_id: 数量}
+    """
+    apply_inventory_changes((user_id, item_id, qty) for item_id, qty in items.items())
+
+
+def remove_items(user_id: str, items: Dict[Any, int]):
+    """
+    从用户背包扣除物品（数量不足时抛出异常，不做部分扣除）
+
+    参数:
+        user_id: 用户 ID
+        items: {item_id: 数量}
+    """
+    apply_inventory_changes((user_id, item_id, -qty) for item_id, qty in items.items())
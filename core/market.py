@@ -0,0 +1,140 @@
+# ==================================================
+# 藏宝阁交易模块
+# 功能：购买玩家摊位 / 系统商品（服务端 purchase_listing 函数，单事务）
+#      摊位上架 / 下架 / 没收（服务端 list_items / unlist_listings / confiscate_listings，单事务）
+# ==================================================
+
+from typing import Any, Dict, List, Optional
+
+from .catalog import get_item_catalog
+from .config import get_supabase_client
+
+# 服务端错误信息 → 玩家可读的提示
+PURCHASE_ERRORS = {
+    "insufficient stock": "库存不足，商品可能已被抢购",
+    "insufficient spirit stones": "灵石不足",
+    "cannot buy own listing": "不能购买自己上架的商品",
+    "quantity must be positive": "购买数量必须大于 0",
+}
+
+LISTING_ERRORS = {
+    "insufficient inventory": "背包中该物品数量不足",
+    "price and quantity must be positive": "价格和数量必须大于 0",
+    "unknown item": "物品不存在",
+    "listing not active": "商品已售出或已下架",
+}
+
+
+def purchase_listing(buyer_id: str, quantity: int, listing_id: Optional[int] = None,
+                     item_uuid: Optional[str] = None) -> Dict[str, Any]:
+    """
+    购买商品：扣库存、扣买家灵石、给卖家加灵石、写入背包、记录成交，全部原子完成
+
+    参数:
+        buyer_id: 买家用户 ID
+        quantity: 购买数量
+        listing_id: 玩家摊位 ID（购买玩家商品时传入）
+        item_uuid: 系统商品 uuid_id（购买系统商品时传入）
+
+    返回:
+        {"trade_id", "item_id", "quantity", "unit_price", "total_price", "remaining", "sold_out"}
+    """
+    supabase = get_supabase_client()
+    result = supabase.rpc("purchase_listing", {
+        "p_buyer_id": str(buyer_id),
+        "p_quantity": int(quantity),
+        "p_listing_id": listing_id,
+        "p_item_uuid": item_uuid,
+    }).execute()
+    # 系统商品的库存在物品目录里缓存，限量商品售出后立即重新读取
+    if item_uuid is not None and result.data.get("remaining") != -1:
+        get_item_catalog().invalidate()
+    return result.data
+
+
+# ==============================
+# 📤 摊位上架 / 下架
+# ==============================
+
+def list_items(seller_id: str, listings: List[Dict[str, Any]], from_inventory: bool = True) -> List[Dict[str, Any]]:
+    """
+    批量上架：从背包扣除物品并创建摊位，全部成功或全部失败
+
+    参数:
+        seller_id: 卖家用户 ID
+        listings: [{"item_uuid", "price", "quantity"}, ...]
+        from_inventory: 是否从背包扣除（管理员上架系统商品时为 False）
+
+    返回:
+        新建的摊位行列表
+    """
+    supabase = get_supabase_client()
+    return supabase.rpc("list_items", {
+        "p_seller_id": str(seller_id),
+        "p_listings": [
+            {"item_uuid": str(x["item_uuid"]), "price": int(x["price"]), "quantity": int(x["quantity"])}
+            for x in listings
+        ],
+        "p_from_inventory": from_inventory,
+    }).execute().data or []
+
+
+def list_item(seller_id: str, item_uuid: str, price: int, quantity: int, from_inventory: bool = True) -> Dict[str, Any]:
+    """上架单个物品（参数同 list_items），返回摊位行"""
+    supabase = get_supabase_client()
+    return supabase.rpc("list_item", {
+        "p_seller_id": str(seller_id),
+        "p_item_uuid": str(item_uuid),
+        "p_price": int(price),
+        "p_quantity": int(quantity),
+        "p_from_inventory": from_inventory,
+    }).execute().data
+
+
+def unlist_listings(seller_id: str, listing_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    批量下架自己的摊位，剩余数量退回背包（已售罄 / 已下架的摊位跳过；
+    from_inventory 为 False 的系统商品摊位只下架，不退回）
+
+    返回:
+        实际下架的摊位行列表（from_inventory 为 True 时 quantity 为退回数量）
+    """
+    supabase = get_supabase_client()
+    return supabase.rpc("unlist_listings", {
+        "p_listing_ids": [int(i) for i in listing_ids],
+        "p_seller_id": str(seller_id),
+    }).execute().data or []
+
+
+def unlist_listing(seller_id: str, listing_id: int) -> Dict[str, Any]:
+    """下架单个摊位并退回背包；摊位已售罄或已下架时抛出异常"""
+    supabase = get_supabase_client()
+    return supabase.rpc("unlist_listing", {
+        "p_listing_id": int(listing_id),
+        "p_seller_id": str(seller_id),
+    }).execute().data
+
+
+def confiscate_listings(listing_ids: Optional[List[int]] = None,
+                        seller_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    管理员批量没收摊位（下架且不退回物品）
+
+    参数:
+        listing_ids: 指定摊位 ID
+        seller_ids: 没收这些卖家的全部在售摊位
+
+    返回:
+        被没收的摊位行列表
+    """
+    supabase = get_supabase_client()
+    return supabase.rpc("confiscate_listings", {
+        "p_listing_ids": [int(i) for i in listing_ids] if listing_ids is not None else None,
+        "p_seller_ids": [str(u) for u in seller_ids] if seller_ids is not None else None,
+    }).execute().data or []
+
+
+def confiscate_listing(listing_id: int) -> Dict[str, Any]:
+    """管理员没收单个摊位"""
+    supabase = get_supabase_client()
+    return supabase.rpc("confiscate_listing", {"p_listing_id": int(listing_id)}).execute().data
@@ -0,0 +1,470 @@
+# ==================================================
+# 市场行情模块
+# 功能：进程级共享的物品行情统计
+#      - 成交（market_trades）和上架（shop_listings）事件按 id 游标增量读取，
+#        逐条累加进分钟 / 小时 K 线（OHLC），不重复扫描原始成交
+#      - 1h / 24h / 7d 滚动统计（最新价、中位价、成交量、最低 / 最高价）由 K 线合并得出
+#      - 超出保留期的小时 K 线压缩进 pandas 列式历史表，可导出为 parquet
+# ==================================================
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.helpers import parse_timestamp
+
+from .config import MARKET_STATS_POLL_SECONDS, get_supabase_client
+from .feed import FeedCursor
+
+# K 线周期（秒）与内存保留时长（秒）：分钟线只服务 1h 窗口，小时线服务 24h / 7d 窗口
+CANDLE_INTERVALS = {"1m": 60, "1h": 3600}
+CANDLE_RETENTION = {"1m": 2 * 3600, "1h": 8 * 86400}
+
+# 滚动统计窗口 → (窗口秒数, 使用的 K 线周期)
+STATS_WINDOWS = {
+    "1h": (3600, "1m"),
+    "24h": (86400, "1h"),
+    "7d": (7 * 86400, "1h"),
+}
+
+# 单次拉取的最大事件数（积压时循环拉取直到追平）
+MARKET_STATS_BATCH_SIZE = 1000
+
+# 事件类型 → (表, 读取的列, 价格列)
+FEED_TABLES = {
+    "trade": ("market_trades", "id, item_uuid, unit_price, quantity, created_at", "unit_price"),
+    "listing": ("shop_listings", "id, item_uuid, price, quantity, created_at", "price"),
+}
+
+# 历史表列（压缩后的小时 K 线）
+HISTORY_COLUMNS = ["item_uuid", "kind", "bucket", "open", "high", "low", "close", "volume", "count"]
+
+
+class Candle:
+    """单根 K 线，额外记录各价位的数量分布用于计算中位价"""
+
+    __slots__ = ("open", "high", "low", "close", "volume", "count", "prices")
+
+    def __init__(self, price: int, quantity: int):
+        self.open = self.high = self.low = self.close = price
+        self.volume = quantity
+        self.count = 1
+        self.prices = Counter({price: quantity})
+
+    def add(self, price: int, quantity: int):
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.close = price
+        self.volume += quantity
+        self.count += 1
+        self.prices[price] += quantity
+
+
+def weighted_median(prices: Counter) -> Optional[int]:
+    """按数量加权的中位价（prices: 价格 → 数量）"""
+    total = sum(prices.values())
+    if total <= 0:
+        return None
+    half = (total + 1) / 2
+    seen = 0
+    for price in sorted(prices):
+        seen += prices[price]
+        if seen >= half:
+            return price
+    return None
+
+
+class MarketStats:
+    """
+    物品行情统计
+
+    每个 (事件类型, item_uuid, 周期) 维护一组按时间桶排列的 K 线，新事件只更新所在桶。
+    滚动统计按 (事件类型, item_uuid, 窗口) 缓存，事件写入或时间跨过一个桶后才重新合并。
+    事件流最多每 poll_seconds 秒拉取一次（全进程共享）。
+    """
+
+    def __init__(self, poll_seconds: float = MARKET_STATS_POLL_SECONDS, client=None):
+        self.poll_seconds = poll_seconds
+        self._client = client
+        self._lock = threading.Lock()
+        # 拉取事件流时持有；网络请求期间不持有 _lock，读取统计不被阻塞
+        self._poll_lock = threading.Lock()
+        self._polled_at = 0.0
+        self._cursors: Dict[str, FeedCursor] = {kind: FeedCursor() for kind in FEED_TABLES}
+
+        # (kind, item_uuid, interval) → {桶起始秒: Candle}
+        self._candles: Dict[Tuple[str, str, str], Dict[int, Candle]] = {}
+        # (kind, item_uuid) → (最新价, 时间)
+        self._last: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        # (kind, item_uuid, window) → (缓存键, 统计结果)
+        self._stats_cache: Dict[Tuple[str, str, str], Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        # (kind, item_uuid) → 版本号（每写入一条事件递增）
+        self._versions: Dict[Tuple[str, str], int] = {}
+
+        # 超出保留期的小时 K 线：先攒在行缓冲里，读取历史时再合并进 DataFrame
+        self._history = None
+        self._history_rows: List[Tuple] = []
+        self._evicted_at = 0.0
+
+        self.events = 0
+        self.errors = 0
+        self.stats_hits = 0
+        self.stats_misses = 0
+
+    @property
+    def client(self):
+        return self._client or get_supabase_client()
+
+    # ==============================
+    # 📥 事件写入
+    # ==============================
+
+    def ingest(self, kind: str, item_uuid: str, price: int, quantity: int, ts: float):
+        """
+        写入一条成交 / 上架事件，更新对应的分钟线和小时线
+
+        参数:
+            kind: "trade" 成交 / "listing" 上架报价
+            item_uuid: 物品 uuid_id
+            price: 单价
+            quantity: 数量
+            ts: 事件时间（Unix 秒）
+        """
+        with self._lock:
+            self._ingest(kind, str(item_uuid), int(price), int(quantity), ts, time.time())
+
+    def ingest_many(self, kind: str, events: Iterable[Tuple[str, int, int, float]]):
+        """批量写入事件 [(item_uuid, price, quantity, ts)]"""
+        now = time.time()
+        with self._lock:
+            for item_uuid, price, quantity, ts in events:
+                self._ingest(kind, str(item_uuid), int(price), int(quantity), ts, now)
+
+    def _ingest(self, kind: str, item_uuid: str, price: int, quantity: int, ts: float, now: float):
+        """写入单条事件（调用方持有锁，内部函数）"""
+        for interval, seconds in CANDLE_INTERVALS.items():
+            bucket = int(ts // seconds * seconds)
+            if bucket < now - CANDLE_RETENTION[interval]:
+                # 回放的旧事件不再需要该周期的 K 线（如 2 小时前的分钟线）
+                continue
+            series = self._candles.setdefault((kind, item_uuid, interval), {})
+            candle = series.get(bucket)
+            if candle is None:
+                series[bucket] = Candle(price, quantity)
+            else:
+                candle.add(price, quantity)
+
+        last = self._last.get((kind, item_uuid))
+        if last is None or ts >= last[1]:
+            self._last[(kind, item_uuid)] = (price, ts)
+        self._versions[(kind, item_uuid)] = self._versions.get((kind, item_uuid), 0) + 1
+        self.events += 1
+
+    # ==============================
+    # 🔄 事件流
+    # ==============================
+
+    def poll(self, force: bool = False):
+        """按间隔增量拉取新的成交和上架事件（force=True 时立即拉取）"""
+        if not force and time.time() - self._polled_at < self.poll_seconds:
+            return
+        # 同一时间只有一个线程拉取；其他线程不等待，直接使用现有统计
+        if not self._poll_lock.acquire(blocking=force):
+            return
+        try:
+            # 双重检查：获取锁之前可能已被其他线程拉取
+            if not force and time.time() - self._polled_at < self.poll_seconds:
+                return
+            self._polled_at = time.time()
+            try:
+                for kind in FEED_TABLES:
+                    self._consume(kind)
+            except Exception:
+                # 拉取失败不影响已有统计，下次继续从游标位置读取
+                self.errors += 1
+            with self._lock:
+                self._evict()
+        finally:
+            self._poll_lock.release()
+
+    def _consume(self, kind: str):
+        """
+        读取游标之后的事件，以及之前跳过、现已提交的事件（调用方持有 _poll_lock，内部函数）
+        查询不持有 _lock，每批读取完成后才加锁写入
+        """
+        supabase = self.client
+        table, columns, price_column = FEED_TABLES[kind]
+        cursor = self._cursors[kind]
+        if cursor.position is None:
+            # 首次启动：只回放保留期（7 天）内的事件，之后按 id 增量读取
+            since = datetime.fromtimestamp(time.time() - CANDLE_RETENTION["1h"], tz=timezone.utc).isoformat()
+            first = supabase.table(table).select("id").gte("created_at", since)\
+                .order("id").limit(1).execute().data or []
+            if first:
+                cursor.reset(first[0]["id"] - 1)
+            else:
+                latest = supabase.table(table).select("id").order("id", desc=True).limit(1).execute().data or []
+                cursor.reset(latest[0]["id"] if latest else 0)
+
+        gaps = cursor.pending_gaps()
+        if gaps:
+            late = supabase.table(table).select(columns).in_("id", gaps).execute().data or []
+            self._ingest_rows(kind, late, price_column)
+            cursor.fill(row["id"] for row in late)
+
+        while True:
+            rows = supabase.table(table).select(columns)\
+                .gt("id", cursor.position)\
+                .order("id")\
+                .limit(MARKET_STATS_BATCH_SIZE)\
+                .execute().data or []
+            self._ingest_rows(kind, rows, price_column)
+            cursor.advance(row["id"] for row in rows)
+            if len(rows) < MARKET_STATS_BATCH_SIZE:
+                break
+
+    def _ingest_rows(self, kind: str, rows: List[Dict[str, Any]], price_column: str):
+        """加锁写入一批事件表的行（内部函数）"""
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                self._ingest(kind, str(row["item_uuid"]), int(row[price_column]), int(row["quantity"]),
+                             parse_timestamp(row.get("created_at")), now)
+
+    def _evict(self):
+        """把超出保留期的 K 线移出内存，小时线压缩进历史表（调用方持有锁，内部函数）"""
+        now = time.time()
+        if now - self._evicted_at < 60:
+            return
+        self._evicted_at = now
+
+        for (kind, item_uuid, interval), series in self._candles.items():
+            cutoff = now - CANDLE_RETENTION[interval]
+            expired = [bucket for bucket in series if bucket < cutoff]
+            for bucket in sorted(expired):
+                candle = series.pop(bucket)
+                if interval == "1h":
+                    self._history_rows.append((
+                        item_uuid, kind, bucket, candle.open, candle.high,
+                        candle.low, candle.close, candle.volume, candle.count,
+                    ))
+
+    # ==============================
+    # 📊 滚动统计
+    # ==============================
+
+    def stats(self, item_uuid: str, window: str = "24h", kind: str = "trade") -> Dict[str, Any]:
+        """
+        获取物品在某个滚动窗口内的统计
+
+        参数:
+            item_uuid: 物品 uuid_id
+            window: "1h" / "24h" / "7d"
+            kind: "trade" 成交 / "listing" 上架报价
+
+        返回:
+            {"last", "median", "volume", "count", "min", "max"}，窗口内无事件时数值为 None / 0
+        """
+        self.poll()
+        item_uuid = str(item_uuid)
+        seconds, interval = STATS_WINDOWS[window]
+        step = CANDLE_INTERVALS[interval]
+        start = int((time.time() - seconds) // step * step)
+
+        with self._lock:
+            # 缓存键：事件版本 + 窗口起点所在桶；两者都没变时窗口内容不变
+            cache_key = (self._versions.get((kind, item_uuid), 0), start)
+            cached = self._stats_cache.get((kind, item_uuid, window))
+            if cached is not None and cached[0] == cache_key:
+                self.stats_hits += 1
+                return cached[1]
+
+            self.stats_misses += 1
+            series = self._candles.get((kind, item_uuid, interval), {})
+            candles = [series[bucket] for bucket in sorted(series) if bucket >= start]
+            prices: Counter = Counter()
+            for candle in candles:
+                prices.update(candle.prices)
+            result = {
+                "last": candles[-1].close if candles else None,
+                "median": weighted_median(prices),
+                "volume": sum(c.volume for c in candles),
+                "count": sum(c.count for c in candles),
+                "min": min((c.low for c in candles), default=None),
+                "max": max((c.high for c in candles), default=None),
+            }
+            self._stats_cache[(kind, item_uuid, window)] = (cache_key, result)
+            return result
+
+    def summary(self, item_uuid: str, kind: str = "trade") -> Dict[str, Dict[str, Any]]:
+        """获取物品全部窗口的统计 {窗口: 统计}"""
+        return {window: self.stats(item_uuid, window, kind) for window in STATS_WINDOWS}
+
+    def last_price(self, item_uuid: str, kind: str = "trade") -> Optional[int]:
+        """最近一次成交 / 上架的单价（不限窗口）"""
+        self.poll()
+        last = self._last.get((kind, str(item_uuid)))
+        return last[0] if last else None
+
+    def suggest_price(self, item_uuid: str, default: int) -> Tuple[int, str]:
+        """
+        根据行情给出建议售价
+
+        依次使用：1h 成交中位价 → 24h 成交中位价 → 7d 成交中位价 →
+        7d 上架报价中位价 → 最近成交价 → 默认价格
+
+        参数:
+            item_uuid: 物品 uuid_id
+            default: 没有任何行情时使用的价格（如物品基础价格）
+
+        返回:
+            (建议价格, 依据说明)
+        """
+        for window in STATS_WINDOWS:
+            stats = self.stats(item_uuid, window)
+            if stats["median"] is not None:
+                return stats["median"], f"近 {window} 成交中位价（{stats['count']} 笔）"
+        listing = self.stats(item_uuid, "7d", kind="listing")
+        if listing["median"] is not None:
+            return listing["median"], f"近 7d 上架报价中位价（{listing['count']} 次）"
+        last = self.last_price(item_uuid)
+        if last is not None:
+            return last, "最近一次成交价"
+        return default, "暂无行情，使用默认价格"
+
+    # ==============================
+    # 🕯️ K 线
+    # ==============================
+
+    def candles(self, item_uuid: str, interval: str = "1h", kind: str = "trade"):
+        """
+        获取物品的 K 线（pandas DataFrame，按时间升序）
+
+        参数:
+            item_uuid: 物品 uuid_id
+            interval: "1m"（最近 2 小时）/ "1h"（含压缩历史）/ "1d"（由小时线汇总）
+            kind: "trade" 成交 / "listing" 上架报价
+
+        返回:
+            列为 time, open, high, low, close, volume, count 的 DataFrame
+        """
+        import pandas as pd
+
+        self.poll()
+        item_uuid = str(item_uuid)
+        source = "1m" if interval == "1m" else "1h"
+        with self._lock:
+            series = self._candles.get((kind, item_uuid, source), {})
+            live = pd.DataFrame(
+                [(bucket, c.open, c.high, c.low, c.close, c.volume, c.count) for bucket, c in sorted(series.items())],
+                columns=["bucket", "open", "high", "low", "close", "volume", "count"],
+            )
+        frames = [live]
+        if source == "1h":
+            history = self.history_frame()
+            past = history[(history["item_uuid"] == item_uuid) & (history["kind"] == kind)]
+            frames.insert(0, past[live.columns])
+        frame = pd.concat([f for f in frames if not f.empty] or [live], ignore_index=True)
+        frame["time"] = pd.to_datetime(frame["bucket"], unit="s", utc=True)
+        frame = frame.drop(columns="bucket").set_index("time").sort_index()
+
+        if interval == "1d" and not frame.empty:
+            frame = frame.resample("1D").agg({
+                "open": "first", "high": "max", "low": "min", "close": "last",
+                "volume": "sum", "count": "sum",
+            }).dropna(subset=["open"])
+        return frame
+
+    def history_frame(self):
+        """压缩后的历史小时 K 线（列式 DataFrame，所有物品共用一张表）"""
+        import pandas as pd
+
+        with self._lock:
+            rows, self._history_rows = self._history_rows, []
+            if self._history is None:
+                self._history = _empty_history()
+            if rows:
+                fresh = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+                if not self._history.empty:
+                    fresh = pd.concat([self._history.astype({"item_uuid": str, "kind": str}), fresh],
+                                      ignore_index=True)
+                # category 列的取值集合可能变化，拼接后统一重建
+                self._history = fresh.astype(_history_dtypes())
+            return self._history
+
+    def save_history(self, path: str):
+        """把历史 K 线导出为 parquet 文件（需要 pyarrow）"""
+        self.history_frame().to_parquet(path, index=False)
+
+    def load_history(self, path: str):
+        """从 parquet 文件载入历史 K 线（进程重启后恢复超出保留期的历史）"""
+        import pandas as pd
+
+        frame = pd.read_parquet(path).astype(_history_dtypes())
+        with self._lock:
+            self._history = frame
+
+    # ==============================
+    # 🔍 统计
+    # ==============================
+
+    def clear(self):
+        """清空全部行情（下次访问时从数据库重新回放 7 天内的事件）"""
+        # 先等待进行中的拉取结束，避免旧游标读到的事件写入清空后的统计
+        with self._poll_lock, self._lock:
+            self._candles.clear()
+            self._last.clear()
+            self._stats_cache.clear()
+            self._versions.clear()
+            for cursor in self._cursors.values():
+                cursor.reset()
+            self._polled_at = 0.0
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回缓存与内存占用统计"""
+        total = self.stats_hits + self.stats_misses
+        return {
+            "items": len({item for _, item in self._versions}),
+            "events": self.events,
+            "errors": self.errors,
+            "live_candles": sum(len(series) for series in self._candles.values()),
+            "history_rows": (0 if self._history is None else len(self._history)) + len(self._history_rows),
+            "hits": self.stats_hits,
+            "misses": self.stats_misses,
+            "hit_rate": round(self.stats_hits / total, 3) if total else 0.0,
+            "cursors": {kind: cursor.stats() for kind, cursor in self._cursors.items()},
+            "poll_seconds": self.poll_seconds,
+        }
+
+
+def _history_dtypes() -> Dict[str, str]:
+    """历史表的紧凑列类型（内部函数）"""
+    return {
+        "item_uuid": "category", "kind": "category", "bucket": "int64",
+        "open": "int64", "high": "int64", "low": "int64", "close": "int64",
+        "volume": "int64", "count": "int32",
+    }
+
+
+def _empty_history():
+    """空的历史表（内部函数）"""
+    import pandas as pd
+
+    return pd.DataFrame({column: [] for column in HISTORY_COLUMNS}).astype(_history_dtypes())
+
+
+_market_stats: Optional[MarketStats] = None
+_market_stats_lock = threading.Lock()
+
+def get_market_stats() -> MarketStats:
+    """获取进程级行情统计（所有会话共享）"""
+    global _market_stats
+    if _market_stats is None:
+        with _market_stats_lock:
+            if _market_stats is None:
+                _market_stats = MarketStats()
+    return _market_stats
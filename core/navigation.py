@@ -0,0 +1,136 @@
+# ==================================================
+# 页面导航模块
+# 功能：基于 st.navigation / st.Page 的页面注册表和跳转辅助函数
+#      页面间的导航链接使用 st.page_link：一次点击只触发一次脚本运行
+#      （旧写法「按钮 → 修改 page → st.rerun()」每次点击要跑两遍脚本）
+# ==================================================
+
+import importlib
+import threading
+from typing import Callable, Dict, Optional
+
+import streamlit as st
+
+# 页面元数据：key → (标题, 图标, 访问权限)
+# 访问权限：None 公开 / "user" 需登录 / "admin" 管理员 / "super_admin" 主管理员
+# key 同时作为 URL 路径（登录页为默认页，路径为空）
+PAGE_META = {
+    'login': ("登录", "🔑", None),
+    'main': ("主城", "🏠", "user"),
+    'shop': ("藏宝阁", "🏪", "user"),
+    'backpack': ("背包", "🎒", "user"),
+    'player_trade': ("玩家交易", "🤝", "user"),
+    'sect': ("宗门", "🏯", "user"),
+    'alchemy': ("炼丹房", "🧪", "user"),
+    'forge': ("炼器坊", "🔨", "user"),
+    'array': ("阵法堂", "🌀", "user"),
+    'dungeon': ("秘境", "🕳️", "user"),
+    'list_item': ("上架商品", "📤", "user"),
+    'my_listings': ("我的摊位", "🏪", "user"),
+    'order_book': ("材料交易所", "📈", "user"),
+    'auction_house': ("拍卖行", "⚖️", "user"),
+    'admin_center': ("管理中心", "🛡️", "admin"),
+    'item_manager': ("物品管理", "📦", "admin"),
+    'xuanli_admin': ("轩璃专属", "👑", "super_admin"),
+}
+
+DEFAULT_PAGE = 'login'
+
+_pages: Dict[str, "st.Page"] = {}
+_pages_lock = threading.Lock()
+
+
+def lazy_page(module: str, function: str) -> Callable[[], None]:
+    """
+    创建延迟导入的页面函数：首次打开页面时才导入页面模块，之后复用
+
+    参数:
+        module: 页面模块路径（如 "modules.shop.shop_main"）
+        function: 页面函数名（如 "show_shop_page"）
+
+    返回:
+        可直接交给 st.Page 的无参函数
+    """
+    loaded: Dict[str, Callable[[], None]] = {}
+
+    def show_page():
+        page_fn = loaded.get("fn")
+        if page_fn is None:
+            # import_module 本身有导入锁和 sys.modules 缓存，并发首次访问也只执行一次模块代码
+            page_fn = loaded["fn"] = getattr(importlib.import_module(module), function)
+        page_fn()
+
+    show_page.__name__ = function
+    show_page.__qualname__ = function
+    return show_page
+
+
+def register_pages(page_map: Dict[str, Callable[[], None]]) -> Dict[str, "st.Page"]:
+    """
+    根据页面路由表创建 st.Page 对象（进程内只创建一次）
+
+    参数:
+        page_map: 页面 key → 页面函数
+
+    返回:
+        页面 key → st.Page
+    """
+    if not _pages:
+        with _pages_lock:
+            if not _pages:
+                for key, page_fn in page_map.items():
+                    title, icon, _ = PAGE_META[key]
+                    _pages[key] = st.Page(
+                        page_fn,
+                        title=title,
+                        icon=icon,
+                        url_path=key,
+                        default=(key == DEFAULT_PAGE),
+                    )
+    return _pages
+
+
+def page_key(page) -> str:
+    """由 st.navigation 返回的页面对象反查页面 key"""
+    for key, registered in _pages.items():
+        if registered is page:
+            return key
+    return DEFAULT_PAGE
+
+
+def can_access(key: str, user) -> bool:
+    """判断用户能否访问某个页面"""
+    access = PAGE_META.get(key, (None, None, "user"))[2]
+    if access is None:
+        return True
+    if user is None:
+        return False
+    if access == "admin":
+        return bool(user.is_admin)
+    if access == "super_admin":
+        return bool(user.is_super_admin)
+    return True
+
+
+def page_link(key: str, label: Optional[str] = None, icon: Optional[str] = None, **kwargs):
+    """
+    渲染跳转到某个页面的链接（点击后直接运行目标页面，只触发一次脚本运行）
+
+    参数:
+        key: 页面 key
+        label: 链接文字（默认使用页面标题）
+        icon: 图标（默认使用页面图标）
+        **kwargs: 透传给 st.page_link
+    """
+    st.page_link(_pages[key], label=label, icon=icon, **kwargs)
+
+
+def go_to(key: str):
+    """
+    在代码中跳转到某个页面（用于登录 / 退出等操作完成后的跳转）
+
+    参数:
+        key: 页面 key
+    """
+    st.session_state.page = key
+    st.switch_page(_pages[key])
@@ -0,0 +1,567 @@
+# ==================================================
+# 挂单撮合模块
+# 功能：按 item_uuid 维护买卖订单簿（价格优先、时间优先），
+#      新订单在内存中与对手盘撮合，成交批量写入数据库
+# 约定：
+#   - 下单时由 open_market_order 冻结买单灵石 / 卖单物品，撮合只在内存中进行
+#   - 成交按 ORDER_BOOK_FLUSH_BATCH 条或 ORDER_BOOK_FLUSH_SECONDS 秒批量调用
+#     settle_market_fills 结算（按 fill_id 幂等）：网络错误时整批稍后重试；
+#     数据库拒绝整批时二分拆开重试，单独结算仍被拒绝的成交移入隔离区，随后按数据库重建订单簿
+#   - 撮合引擎为进程级单例；同一数据库只允许一个进程撮合：
+#     recover() 先取得 order_book_matcher 租约，结算时服务端校验租约持有者
+#   - recover() 按 id 顺序重放所有未完成挂单重建订单簿（进程启动、隔离成交后），
+#     来不及落库的成交会被重新撮合出来
+# ==================================================
+
+import heapq
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from postgrest.exceptions import APIError
+
+from .config import (
+    ORDER_BOOK_FLUSH_BATCH, ORDER_BOOK_FLUSH_SECONDS, ORDER_BOOK_LEASE_SECONDS, get_supabase_client,
+)
+
+# 服务端错误信息 → 玩家可读的提示
+ORDER_ERRORS = {
+    "insufficient spirit stones": "灵石不足，无法冻结买单所需灵石",
+    "insufficient inventory": "背包中该物品数量不足",
+    "price and quantity must be positive": "价格和数量必须大于 0",
+    "unknown item": "物品不存在",
+    "order not open": "挂单已成交或已撤销",
+    "order book held by another process": "撮合服务正在其他进程运行，请稍后再试",
+}
+
+# 恢复时每次读取的挂单条数
+RECOVER_PAGE_SIZE = 1000
+
+# 隔离区保留的最近被拒绝成交条数
+QUARANTINE_SIZE = 100
+
+# 租约已被其他进程接管时 settle_market_fills 的错误信息
+LEASE_LOST = "not the active matcher"
+
+
+class Order:
+    """内存中的挂单（同价位按数据库自增 id 先后成交）"""
+
+    __slots__ = ("id", "item_uuid", "user_id", "side", "price", "quantity", "remaining", "created_at")
+
+    def __init__(self, id: int, item_uuid: str, user_id: str, side: str, price: int,
+                 quantity: int, remaining: Optional[int] = None, created_at: Optional[str] = None):
+        self.id = id
+        self.item_uuid = item_uuid
+        self.user_id = user_id
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity if remaining is None else remaining
+        self.created_at = created_at
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Order":
+        """由 market_orders 行构造"""
+        return cls(row["id"], str(row["item_uuid"]), str(row["user_id"]), row["side"],
+                   row["price"], row["quantity"], row["remaining"], row.get("created_at"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class OrderBook:
+    """
+    单个物品的订单簿
+
+    买盘堆元素为 (-价格, id, 订单)，卖盘堆元素为 (价格, id, 订单)，堆顶即最优价中最早的挂单。
+    撤单只从 orders 中删除，堆中的旧元素在到达堆顶时再丢弃（惰性删除）。
+    """
+
+    def __init__(self, item_uuid: str):
+        self.item_uuid = item_uuid
+        self.bids: List[Tuple[int, int, Order]] = []
+        self.asks: List[Tuple[int, int, Order]] = []
+        self.orders: Dict[int, Order] = {}
+        self.last_price: Optional[int] = None
+
+    def _best(self, heap: List[Tuple[int, int, Order]]) -> Optional[Order]:
+        """返回堆顶的有效挂单，顺带丢弃已成交 / 已撤销的元素（内部函数）"""
+        while heap:
+            order = heap[0][2]
+            if order.remaining > 0 and order.id in self.orders:
+                return order
+            heapq.heappop(heap)
+        return None
+
+    def _rest(self, order: Order):
+        """把挂单放入订单簿（内部函数）"""
+        self.orders[order.id] = order
+        if order.side == "buy":
+            heapq.heappush(self.bids, (-order.price, order.id, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.id, order))
+
+    def match(self, order: Order) -> List[Dict[str, Any]]:
+        """
+        撮合新订单：按对手盘最优价依次成交（成交价为挂单方价格），剩余部分挂入订单簿
+
+        参数:
+            order: 新订单
+
+        返回:
+            成交列表 [{"fill_id", "buy_order_id", "sell_order_id", "price", "quantity"}]
+        """
+        is_buy = order.side == "buy"
+        heap = self.asks if is_buy else self.bids
+        fills = []
+        # 同一玩家的挂单不与自己成交，暂时取出，撮合结束后放回
+        own = []
+
+        while order.remaining > 0:
+            resting = self._best(heap)
+            if resting is None or (resting.price > order.price if is_buy else resting.price < order.price):
+                break
+            if resting.user_id == order.user_id:
+                own.append(heapq.heappop(heap))
+                continue
+
+            qty = min(order.remaining, resting.remaining)
+            order.remaining -= qty
+            resting.remaining -= qty
+            buy, sell = (order, resting) if is_buy else (resting, order)
+            fills.append({
+                "fill_id": str(uuid.uuid4()),
+                "buy_order_id": buy.id,
+                "sell_order_id": sell.id,
+                "price": resting.price,
+                "quantity": qty,
+            })
+            self.last_price = resting.price
+            if resting.remaining == 0:
+                heapq.heappop(heap)
+                del self.orders[resting.id]
+
+        for entry in own:
+            heapq.heappush(heap, entry)
+        if order.remaining > 0:
+            self._rest(order)
+        return fills
+
+    def remove(self, order_id: int) -> Optional[Order]:
+        """从订单簿撤下挂单（惰性删除）"""
+        return self.orders.pop(order_id, None)
+
+    def restore(self, order: Order):
+        """
+        放回 remove 撤下的挂单：原堆元素仍在时只恢复索引，
+        已被撮合时的惰性清理弹出时才重新入堆（避免同一挂单在堆中出现两次）
+        """
+        self.orders[order.id] = order
+        heap = self.bids if order.side == "buy" else self.asks
+        if not any(entry[2] is order for entry in heap):
+            self._rest(order)
+
+    def depth(self, levels: int = 10) -> Dict[str, List[Dict[str, int]]]:
+        """
+        按价位汇总的盘口
+
+        返回:
+            {"bids": [{"price", "quantity", "orders"}], "asks": [...]}，买盘价格从高到低，卖盘从低到高
+        """
+        result = {}
+        for side, heap, sign in (("bids", self.bids, -1), ("asks", self.asks, 1)):
+            price_levels: Dict[int, List[int]] = {}
+            for key, _, order in heapq.nsmallest(len(heap), heap):
+                if order.remaining <= 0 or order.id not in self.orders:
+                    continue
+                price = key * sign
+                if price not in price_levels:
+                    if len(price_levels) == levels:
+                        break
+                    price_levels[price] = [0, 0]
+                price_levels[price][0] += order.remaining
+                price_levels[price][1] += 1
+            result[side] = [
+                {"price": price, "quantity": qty, "orders": count}
+                for price, (qty, count) in price_levels.items()
+            ]
+        return result
+
+
+class OrderBookEngine:
+    """
+    撮合引擎：管理所有物品的订单簿和待落库的成交
+
+    撮合在 _lock 内完成（纯内存操作）；落库和重建在 _flush_lock 内完成，
+    同一时刻只有一批成交在写数据库。
+    """
+
+    def __init__(self, client=None, flush_batch: int = ORDER_BOOK_FLUSH_BATCH,
+                 flush_seconds: float = ORDER_BOOK_FLUSH_SECONDS):
+        self._client = client
+        self.flush_batch = flush_batch
+        self.flush_seconds = flush_seconds
+        self.matcher_id = str(uuid.uuid4())
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._books: Dict[str, OrderBook] = {}
+        self._order_items: Dict[int, str] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._flusher: Optional[threading.Thread] = None
+        self._lease_renew_at = 0.0
+        # 最近一次重建时重放的挂单 id：重建期间下单的订单已被重放时不再重复撮合
+        self._replayed: Set[int] = set()
+        # 每次重建递增：撤单失败时只有订单簿未重建才放回撤下的挂单
+        self._generation = 0
+        self.recovered = False
+        self.quarantined: List[Dict[str, Any]] = []
+
+        self.orders_matched = 0
+        self.fills_matched = 0
+        self.fills_settled = 0
+        self.fills_quarantined = 0
+        self.flush_batches = 0
+        self.flush_errors = 0
+        self.recoveries = 0
+
+    @property
+    def client(self):
+        return self._client or get_supabase_client()
+
+    # ==============================
+    # 📥 下单 / 撤单
+    # ==============================
+
+    def submit(self, order: Order) -> List[Dict[str, Any]]:
+        """
+        把已冻结的订单送入内存撮合（不访问数据库）
+
+        参数:
+            order: 订单（id 必须已由数据库分配）
+
+        返回:
+            本次产生的成交列表
+        """
+        with self._lock:
+            if order.id in self._replayed:
+                return []
+            return self._match(order)
+
+    def _match(self, order: Order) -> List[Dict[str, Any]]:
+        """撮合订单并登记待落库的成交（调用方持有锁，内部函数）"""
+        book = self._books.get(order.item_uuid)
+        if book is None:
+            book = self._books[order.item_uuid] = OrderBook(order.item_uuid)
+        fills = book.match(order)
+        if order.remaining > 0:
+            self._order_items[order.id] = order.item_uuid
+        for fill in fills:
+            if fill["buy_order_id"] != order.id:
+                self._forget(book, fill["buy_order_id"])
+            if fill["sell_order_id"] != order.id:
+                self._forget(book, fill["sell_order_id"])
+        self._pending.extend(fills)
+        self.orders_matched += 1
+        self.fills_matched += len(fills)
+        return fills
+
+    def _forget(self, book: OrderBook, order_id: int):
+        """挂单全部成交后移除索引（调用方持有锁，内部函数）"""
+        if order_id not in book.orders:
+            self._order_items.pop(order_id, None)
+
+    def place(self, user_id: str, item_uuid: str, side: str, price: int, quantity: int) -> Dict[str, Any]:
+        """
+        下单：数据库冻结灵石 / 物品并写入挂单，然后在内存中撮合
+
+        参数:
+            user_id: 下单用户 ID
+            item_uuid: 物品 uuid_id
+            side: "buy" 买单 / "sell" 卖单
+            price: 限价（单价）
+            quantity: 数量
+
+        返回:
+            {"order": 订单字典, "fills": 本次成交列表}
+        """
+        self.ensure_recovered()
+        row = self.client.rpc("open_market_order", {
+            "p_user_id": str(user_id),
+            "p_item_uuid": str(item_uuid),
+            "p_side": side,
+            "p_price": int(price),
+            "p_quantity": int(quantity),
+        }).execute().data
+        order = Order.from_row(row)
+        fills = self.submit(order)
+        if len(self._pending) >= self.flush_batch:
+            self.flush()
+        return {"order": order.to_dict(), "fills": fills}
+
+    def cancel(self, order_id: int, user_id: str) -> Dict[str, Any]:
+        """
+        撤单：先从订单簿撤下（不再参与撮合），结算已产生的成交，再退还剩余冻结
+
+        参数:
+            order_id: 挂单 ID
+            user_id: 操作用户 ID（只能撤自己的挂单）
+
+        返回:
+            撤销后的挂单行
+        """
+        self.ensure_recovered()
+        generation = self._generation
+        order = self.withdraw(order_id, user_id)
+        if order is None:
+            raise ValueError("order not open")
+
+        try:
+            # 数据库中的剩余数量必须先扣掉已撮合的成交，退还金额才正确
+            self.flush(raise_errors=True)
+            result = self.client.rpc("cancel_market_order", {
+                "p_order_id": order_id, "p_user_id": str(user_id),
+            }).execute().data
+        except Exception:
+            with self._lock:
+                # 订单簿已重建时挂单已按数据库重放，不能再放回旧对象
+                if order.remaining > 0 and self._generation == generation:
+                    self._books[order.item_uuid].restore(order)
+                    self._order_items[order_id] = order.item_uuid
+            raise
+        if self._generation != generation:
+            # 结算期间订单簿已重建，撤单前的挂单被重新放入，再撤一次
+            self.withdraw(order_id, user_id)
+        return result
+
+    def withdraw(self, order_id: int, user_id: str) -> Optional[Order]:
+        """
+        从内存订单簿撤下挂单（不访问数据库）
+
+        参数:
+            order_id: 挂单 ID
+            user_id: 操作用户 ID（不是挂单所有者时不撤）
+
+        返回:
+            被撤下的订单；挂单不存在或已全部成交时返回 None
+        """
+        with self._lock:
+            book = self._books.get(self._order_items.get(order_id))
+            order = book.orders.get(order_id) if book else None
+            if order is None or order.user_id != str(user_id):
+                return None
+            book.remove(order_id)
+            del self._order_items[order_id]
+            return order
+
+    # ==============================
+    # 💾 成交落库
+    # ==============================
+
+    def flush(self, raise_errors: bool = False) -> int:
+        """
+        把待落库的成交批量结算到数据库
+
+        网络等错误时整批放回队首等待下次重试；数据库拒绝的成交移入隔离区，
+        随后按数据库重建订单簿（内存订单簿已与数据库不一致）
+
+        参数:
+            raise_errors: 整批无法结算时是否抛出异常（默认只计数，成交留待下次重试）
+
+        返回:
+            本次写入的成交条数
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                settled, rejected = self._settle(batch)
+            except Exception as error:
+                # 已结算的部分按 fill_id 幂等，整批放回重试不会重复结算
+                with self._lock:
+                    self._pending[:0] = batch
+                self.flush_errors += 1
+                if LEASE_LOST in str(error):
+                    # 其他进程已接管撮合：下次使用时重新取得租约并重建
+                    self.recovered = False
+                if raise_errors:
+                    raise
+                return 0
+
+            self.fills_settled += settled
+            if rejected:
+                self.flush_errors += 1
+                self.fills_quarantined += len(rejected)
+                self.quarantined = (self.quarantined + rejected)[-QUARANTINE_SIZE:]
+                try:
+                    self.recover()
+                except Exception:
+                    self.recovered = False
+                    if raise_errors:
+                        raise
+            return settled
+
+    def _settle(self, batch: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        结算一批成交；数据库拒绝整批时二分拆开分别重试（按原顺序），找出被拒绝的成交（内部函数）
+
+        返回:
+            (已结算条数, 单独结算仍被拒绝的成交)
+        """
+        try:
+            self.client.rpc("settle_market_fills", {
+                "p_fills": batch, "p_matcher_id": self.matcher_id,
+            }).execute()
+            self.flush_batches += 1
+            return len(batch), []
+        except APIError as error:
+            if LEASE_LOST in str(error):
+                raise
+            if len(batch) == 1:
+                return 0, batch
+        mid = len(batch) // 2
+        settled, rejected = self._settle(batch[:mid])
+        more_settled, more_rejected = self._settle(batch[mid:])
+        return settled + more_settled, rejected + more_rejected
+
+    def start_flusher(self):
+        """启动后台线程，每 flush_seconds 秒结算一次待落库的成交，并按时续期撮合租约"""
+        if self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.flush_seconds)
+                if self._pending:
+                    self.flush()
+                if self.recovered and time.time() >= self._lease_renew_at:
+                    try:
+                        self._claim_lease()
+                    except Exception:
+                        # 续期失败（租约被接管或数据库不可用）：下次使用时重新取得租约并重建
+                        self.recovered = False
+
+        self._flusher = threading.Thread(target=run, name="orderbook-flusher", daemon=True)
+        self._flusher.start()
+
+    # ==============================
+    # ♻️ 恢复
+    # ==============================
+
+    def _claim_lease(self):
+        """取得 / 续期撮合租约，已被其他进程持有时抛出异常（内部函数）"""
+        claimed = self.client.rpc("claim_order_book", {
+            "p_matcher_id": self.matcher_id, "p_lease_seconds": ORDER_BOOK_LEASE_SECONDS,
+        }).execute().data
+        if not claimed:
+            raise RuntimeError("order book held by another process")
+        self._lease_renew_at = time.time() + ORDER_BOOK_LEASE_SECONDS / 3
+
+    def release(self):
+        """释放撮合租约（进程退出或交给其他进程撮合前调用）"""
+        self.recovered = False
+        self.client.rpc("release_order_book", {"p_matcher_id": self.matcher_id}).execute()
+
+    def ensure_recovered(self):
+        """首次使用时（或失去租约后）取得撮合租约并从数据库重建订单簿"""
+        if not self.recovered:
+            with self._flush_lock:
+                if not self.recovered:
+                    self.recover()
+
+    def recover(self) -> int:
+        """
+        取得撮合租约，按 id 顺序重放所有未完成的挂单，重建内存订单簿
+        重放期间持有 _lock：并发下单的订单要么已被重放，要么在重建完成后撮合
+
+        返回:
+            重放的挂单数量
+        """
+        self._claim_lease()
+        with self._lock:
+            self._books.clear()
+            self._order_items.clear()
+            self._pending.clear()
+            self._replayed = set()
+            self._generation += 1
+
+            count, last_id = 0, 0
+            while True:
+                rows = self.client.table("market_orders")\
+                    .select("id, item_uuid, user_id, side, price, quantity, remaining, created_at")\
+                    .eq("status", "open")\
+                    .gt("id", last_id)\
+                    .order("id")\
+                    .limit(RECOVER_PAGE_SIZE)\
+                    .execute().data or []
+                for row in rows:
+                    if row["remaining"] > 0:
+                        self._replayed.add(row["id"])
+                        self._match(Order.from_row(row))
+                count += len(rows)
+                if len(rows) < RECOVER_PAGE_SIZE:
+                    break
+                last_id = rows[-1]["id"]
+
+        self.recovered = True
+        self.recoveries += 1
+        return count
+
+    # ==============================
+    # 🔍 查询
+    # ==============================
+
+    def depth(self, item_uuid: str, levels: int = 10) -> Dict[str, Any]:
+        """获取某个物品的盘口和最新成交价"""
+        self.ensure_recovered()
+        with self._lock:
+            book = self._books.get(str(item_uuid))
+            if book is None:
+                return {"bids": [], "asks": [], "last_price": None}
+            return dict(book.depth(levels), last_price=book.last_price)
+
+    def open_orders(self, user_id: str) -> List[Dict[str, Any]]:
+        """获取用户在内存订单簿中的未完成挂单（按 id 排序）"""
+        self.ensure_recovered()
+        user_id = str(user_id)
+        with self._lock:
+            orders = [
+                order.to_dict()
+                for book in self._books.values()
+                for order in book.orders.values()
+                if order.user_id == user_id
+            ]
+        return sorted(orders, key=lambda o: o["id"])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回撮合统计"""
+        return {
+            "books": len(self._books),
+            "open_orders": len(self._order_items),
+            "orders_matched": self.orders_matched,
+            "fills_matched": self.fills_matched,
+            "fills_settled": self.fills_settled,
+            "pending_fills": len(self._pending),
+            "fills_quarantined": self.fills_quarantined,
+            "flush_batches": self.flush_batches,
+            "flush_errors": self.flush_errors,
+            "recoveries": self.recoveries,
+        }
+
+
+_order_book: Optional[OrderBookEngine] = None
+_order_book_lock = threading.Lock()
+
+def get_order_book() -> OrderBookEngine:
+    """获取进程级撮合引擎（首次调用时启动后台落库线程）"""
+    global _order_book
+    if _order_book is None:
+        with _order_book_lock:
+            if _order_book is None:
+                engine = OrderBookEngine()
+                engine.start_flusher()
+                _order_book = engine
+    return _order_book
@@ -0,0 +1,198 @@
+# ==================================================
+# 修炼进度模块
+# 功能：境界表（每层所需经验、累计经验、累计属性成长）与突破
+#      - 境界表由 core/config.py 的经验曲线一次性算出（numpy 数组），
+#        累计经验 → 层数用 searchsorted 查表，可一次查询任意多个经验值
+#      - 服务端 cultivation_levels 表与这里同一公式（database/migrations/015_cultivation_progress.sql），
+#        修改配置后用 sync_level_table 覆盖
+#      - 增加经验（increment_exp）与经验活动（grant_exp）都在服务端一条集合语句内完成：
+#        查表得出新层数，境界、层数、属性成长同时写入，一次可以跨越多层 / 多个境界
+# 层数：全局层数 level = 境界序号 × CULTIVATION_STAGES + 层，练气 1 层为 1
+# user_cultivation.exp 为累计经验
+# ==================================================
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .config import (
+    CULTIVATION_REALMS, CULTIVATION_STAGES, EXP_BASE, REALM_BREAKTHROUGH_MULTIPLIER, STAGE_STAT_GAINS,
+    get_supabase_client,
+)
+from .stats import get_stat_engine
+
+# 最高层数
+MAX_LEVEL = len(CULTIVATION_REALMS) * CULTIVATION_STAGES
+
+# 服务端错误信息 → 玩家可读的提示
+PROGRESSION_ERRORS = {
+    "amount must be positive": "经验数值必须为正",
+    "unknown user": "没有修炼记录",
+    "insufficient inventory": "背包中没有该物品",
+    "unknown grant target": "未知的发放对象",
+}
+
+
+def _build_level_table() -> Dict[str, np.ndarray]:
+    """按经验曲线算出境界表（下标 = 层数 - 1）（内部函数）"""
+    levels = np.arange(1, MAX_LEVEL + 1, dtype=np.int64)
+    realm_index = (levels - 1) // CULTIVATION_STAGES
+    stage = (levels - 1) % CULTIVATION_STAGES + 1
+
+    exp_required = EXP_BASE * (levels - 1) ** 2
+    exp_required = np.where(stage == 1, exp_required * REALM_BREAKTHROUGH_MULTIPLIER, exp_required)
+    exp_required[0] = 0
+
+    # 每突破一层的成长 × 所在境界序号（练气 1 层不算突破）
+    gain = np.where(levels == 1, 0, realm_index + 1)
+    table = {
+        "level": levels,
+        "realm_index": realm_index,
+        "stage": stage,
+        "exp_required": exp_required,
+        "cumulative_exp": np.cumsum(exp_required),
+    }
+    for key, value in STAGE_STAT_GAINS.items():
+        table[f"{key}_total"] = np.cumsum(gain * value)
+    for column in table.values():
+        column.flags.writeable = False
+    return table
+
+
+LEVEL_TABLE = _build_level_table()
+
+
+# ==============================
+# 📊 查表
+# ==============================
+
+def level_for_exp(exp):
+    """
+    累计经验 → 层数
+
+    参数:
+        exp: 累计经验（整数或整数数组）
+
+    返回:
+        层数（与 exp 形状相同）
+    """
+    levels = np.searchsorted(LEVEL_TABLE["cumulative_exp"], np.maximum(exp, 0), side="right")
+    return levels if np.ndim(levels) else int(levels)
+
+
+def realm_of(level: int) -> Dict[str, Any]:
+    """层数 → {"realm", "stage"}"""
+    i = min(max(int(level), 1), MAX_LEVEL) - 1
+    return {
+        "realm": CULTIVATION_REALMS[LEVEL_TABLE["realm_index"][i]],
+        "stage": int(LEVEL_TABLE["stage"][i]),
+    }
+
+
+def progress(exp: int) -> Dict[str, Any]:
+    """
+    累计经验对应的进度（与服务端 cultivation_progress 的字段相同，不含属性）
+
+    返回:
+        {"exp", "level", "realm", "stage", "exp_into_stage", "exp_to_next", "next_exp_required"}，
+        已满级时 exp_to_next / next_exp_required 为 None
+    """
+    level = level_for_exp(int(exp))
+    i = level - 1
+    result = {"exp": int(exp), "level": level, **realm_of(level),
+              "exp_into_stage": int(exp - LEVEL_TABLE["cumulative_exp"][i]),
+              "exp_to_next": None, "next_exp_required": None}
+    if level < MAX_LEVEL:
+        result["exp_to_next"] = int(LEVEL_TABLE["cumulative_exp"][i + 1] - exp)
+        result["next_exp_required"] = int(LEVEL_TABLE["exp_required"][i + 1])
+    return result
+
+
+def level_table_rows() -> List[Dict[str, Any]]:
+    """境界表的行（cultivation_levels 的字段）"""
+    rows = []
+    for i in range(MAX_LEVEL):
+        row = {"level": int(LEVEL_TABLE["level"][i]), **realm_of(i + 1),
+               "exp_required": int(LEVEL_TABLE["exp_required"][i]),
+               "cumulative_exp": int(LEVEL_TABLE["cumulative_exp"][i])}
+        for key in STAGE_STAT_GAINS:
+            row[f"{key}_total"] = int(LEVEL_TABLE[f"{key}_total"][i])
+        rows.append(row)
+    return rows
+
+
+# ==============================
+# 📡 对外接口
+# ==============================
+
+def get_progress(user_id: str) -> Optional[Dict[str, Any]]:
+    """玩家当前的修炼进度（只读取累计经验，境界与本层进度本地查表）；没有修炼记录时返回 None"""
+    rows = get_supabase_client().table("user_cultivation")\
+        .select("exp")\
+        .eq("user_id", str(user_id))\
+        .execute().data
+    return progress(rows[0]["exp"] or 0) if rows else None
+
+
+def increment_exp(user_id: str, amount: int, item_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    增加经验，达到门槛时自动突破（可一次跨越多层），全部原子完成
+
+    参数:
+        user_id: 用户 ID
+        amount: 增加的经验
+        item_id: 使用的物品（同一事务内从背包扣除 1 件），None 表示不消耗物品
+
+    返回:
+        cultivation_progress 的字段，另含 {"previous_level", "levels_gained"}
+    """
+    result = get_supabase_client().rpc("increment_exp", {
+        "p_user_id": str(user_id),
+        "p_amount": int(amount),
+        "p_item_id": item_id,
+    }).execute().data
+    # 基础属性随突破变化
+    if result.get("levels_gained"):
+        get_stat_engine().invalidate(user_id)
+    return result
+
+
+def grant_exp(event_id: str, amount: int, user_ids: Optional[List[str]] = None,
+              target_filter: Optional[str] = None, granted_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    经验活动：为一批玩家增加经验（服务端一条集合语句，原子且按 event_id 幂等）
+
+    参数:
+        event_id: 活动批次 ID（重试时复用同一个 ID 不会重复发放）
+        amount: 每人增加的经验
+        user_ids: 指定用户 ID 列表（与 target_filter 二选一）
+        target_filter: GRANT_FILTERS 中的筛选条件
+        granted_by: 操作人 ID
+
+    返回:
+        {"event_id", "affected_rows", "breakthroughs", "already_applied"}
+    """
+    result = get_supabase_client().rpc("grant_exp", {
+        "p_event_id": event_id,
+        "p_amount": int(amount),
+        "p_user_ids": user_ids,
+        "p_filter": target_filter,
+        "p_granted_by": granted_by,
+    }).execute().data
+    # 有玩家突破时批量重读已缓存玩家的基础属性
+    if result.get("breakthroughs") and not result.get("already_applied"):
+        get_stat_engine().recompute_all(reload_items=False)
+    return result
+
+
+def sync_level_table() -> int:
+    """
+    用当前配置的经验曲线覆盖服务端境界表（修改 EXP_BASE 等配置后使用）
+    已有玩家的境界不会随之改变，下次增加经验时按新表计算
+
+    返回:
+        写入的行数
+    """
+    rows = level_table_rows()
+    get_supabase_client().table("cultivation_levels").upsert(rows, on_conflict="level").execute()
+    return len(rows)
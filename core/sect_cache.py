@@ -0,0 +1,213 @@
+# ==================================================
+# 宗门归属缓存模块
+# 功能：进程级共享的「用户 → 宗门」缓存，
+#      通过 sect_membership_events 变更流感知其他会话中的加入 / 退出 / 踢出
+# ==================================================
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import SECT_FEED_POLL_SECONDS, get_supabase_client
+from .feed import FeedCursor
+
+# 单次拉取的最大事件数；超过时直接清空缓存，避免追赶大量积压事件
+SECT_FEED_BATCH_SIZE = 500
+
+# 首次启动时读取最近多少个事件 id，用于发现其中尚未提交的空洞
+SECT_FEED_BOOTSTRAP = 50
+
+# 缓存中「散修」的占位值（与未缓存区分）
+_NO_SECT = object()
+
+
+class SectMembershipCache:
+    """
+    宗门归属缓存
+
+    每个用户的宗门行只在首次访问或失效后查询一次（单条嵌入查询）。
+    变更流最多每 poll_seconds 秒拉取一次（全进程共享），
+    普通页面跳转不产生任何宗门查询。
+    返回的宗门字典为共享数据，调用方只读不改。
+    """
+
+    def __init__(self, poll_seconds: float = SECT_FEED_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        # 拉取变更流时持有；网络请求期间不持有 _lock，读取缓存不被阻塞
+        self._poll_lock = threading.Lock()
+        self._entries: Dict[str, Any] = {}
+        self._cursor = FeedCursor()
+        self._polled_at = 0.0
+        # 每次失效递增；查询期间发生过失效则不写入缓存，避免写回旧数据
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    # ==============================
+    # 🔍 查询接口
+    # ==============================
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """获取用户所属宗门（散修返回 None）"""
+        self._poll_feed()
+
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self.hits += 1
+            return None if entry is _NO_SECT else entry
+
+        self.misses += 1
+        generation = self._generation
+        sect = self._fetch(user_id)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = _NO_SECT if sect is None else sect
+        return sect
+
+    def _fetch(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """一次嵌入查询取出成员行和宗门行（内部函数）"""
+        supabase = get_supabase_client()
+        rows = supabase.table("sect_members")\
+            .select("sect_id, sects(*)")\
+            .eq("user_id", user_id)\
+            .limit(1)\
+            .execute().data or []
+        return rows[0].get("sects") if rows else None
+
+    # ==============================
+    # 🔄 失效
+    # ==============================
+
+    def invalidate(self, user_id: str):
+        """使某个用户的缓存失效（本会话加入 / 创建 / 退出宗门后调用）"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def invalidate_sect(self, sect_id):
+        """使某个宗门所有成员的缓存失效（宗门信息变更或解散）"""
+        with self._lock:
+            self._drop_sect(sect_id)
+
+    def _drop_sect(self, sect_id):
+        """删除缓存中属于该宗门的所有用户（调用方持有锁，内部函数）"""
+        self._generation += 1
+        for user_id, entry in list(self._entries.items()):
+            if entry is not _NO_SECT and entry.get("id") == sect_id:
+                del self._entries[user_id]
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _poll_feed(self):
+        """按间隔拉取宗门变更流并使相关缓存失效（内部函数）"""
+        if time.time() - self._polled_at < self.poll_seconds:
+            return
+        # 同一时间只有一个线程拉取，其他线程直接使用现有缓存
+        if not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            if time.time() - self._polled_at < self.poll_seconds:
+                return
+            self._polled_at = time.time()
+
+            try:
+                events, backlog = self._fetch_events()
+            except Exception:
+                # 拉取失败时无法确认缓存是否过期，整体清空最稳妥
+                with self._lock:
+                    self._generation += 1
+                    self._entries.clear()
+                return
+
+            if events or backlog:
+                with self._lock:
+                    self._apply_events(events, backlog)
+        finally:
+            self._poll_lock.release()
+
+    def _fetch_events(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        读取游标之后的事件，以及之前跳过、现已提交的事件（调用方持有 _poll_lock，内部函数）
+
+        返回:
+            (事件列表, 是否还有积压)
+        """
+        supabase = get_supabase_client()
+        table = "sect_membership_events"
+
+        if self._cursor.position is None:
+            # 首次启动：缓存为空，只需记下当前位置（以及最近事件之间尚未提交的空洞）
+            latest = supabase.table(table)\
+                .select("id")\
+                .order("id", desc=True)\
+                .limit(SECT_FEED_BOOTSTRAP)\
+                .execute().data or []
+            self._cursor.reset(0 if not latest else None)
+            self._cursor.advance(sorted(row["id"] for row in latest))
+            return [], False
+
+        late = []
+        gaps = self._cursor.pending_gaps()
+        if gaps:
+            late = supabase.table(table)\
+                .select("id, user_id, sect_id")\
+                .in_("id", gaps)\
+                .execute().data or []
+            self._cursor.fill(event["id"] for event in late)
+
+        events = supabase.table(table)\
+            .select("id, user_id, sect_id")\
+            .gt("id", self._cursor.position)\
+            .order("id")\
+            .limit(SECT_FEED_BATCH_SIZE)\
+            .execute().data or []
+        self._cursor.advance(event["id"] for event in events)
+        return late + events, len(events) == SECT_FEED_BATCH_SIZE
+
+    def _apply_events(self, events: List[Dict[str, Any]], backlog: bool):
+        """按事件使缓存失效（调用方持有锁，内部函数）"""
+        self._generation += 1
+        if backlog:
+            # 积压过多，剩余事件下次继续读，本次直接清空
+            self._entries.clear()
+            self._polled_at = 0.0
+            return
+
+        for event in events:
+            if event.get("user_id"):
+                self._entries.pop(str(event["user_id"]), None)
+            else:
+                # 宗门级事件（信息变更 / 解散）：失效该宗门全部成员
+                self._drop_sect(event["sect_id"])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "last_event_id": self._cursor.position,
+            "pending_gaps": self._cursor.stats()["gaps"],
+            "poll_seconds": self.poll_seconds,
+        }
+
+
+_sect_cache: Optional[SectMembershipCache] = None
+_sect_cache_lock = threading.Lock()
+
+def get_sect_cache() -> SectMembershipCache:
+    """获取进程级宗门归属缓存（所有会话共享）"""
+    global _sect_cache
+    if _sect_cache is None:
+        with _sect_cache_lock:
+            if _sect_cache is None:
+                _sect_cache = SectMembershipCache()
+    return _sect_cache
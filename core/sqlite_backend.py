@@ -0,0 +1,597 @@
+# ==================================================
+# 本地 SQLite 存储后端
+# 功能：用 SQLite 实现各模块用到的 postgrest 查询构建器子集，
+#      可在 core.config 中替换 Supabase，用于单机部署和离线开发
+# ==================================================
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "sqlite_schema.sql")
+
+# 插入时需要自动生成 UUID 的列（对应 Postgres 的 gen_random_uuid() 默认值）
+UUID_DEFAULTS = {
+    "users": ["id"],
+    "items": ["uuid_id"],
+}
+
+# RPC 注册表：函数名 → 实现（conn, **params）
+SQLITE_RPC: Dict[str, Callable[..., Any]] = {}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def sqlite_rpc(name: str):
+    """注册一个 SQLite 版本的服务端函数（装饰器）"""
+    def decorator(fn):
+        SQLITE_RPC[name] = fn
+        return fn
+    return decorator
+
+
+def _api_error(message: str, code: str = "SQLITE") -> APIError:
+    return APIError({"message": message, "code": code, "hint": None, "details": None})
+
+
+def _ident(name: str) -> str:
+    """校验并引用列名 / 表名，防止 SQL 注入（内部函数）"""
+    name = name.strip().strip('"')
+    if not _IDENTIFIER.match(name):
+        raise _api_error(f"invalid identifier: {name}")
+    return f'"{name}"'
+
+
+def _coerce(value: str) -> Any:
+    """把 PostgREST 文本条件中的值还原为 Python 值（内部函数）"""
+    if value == "null":
+        return None
+    if value == "true":
+        return True
+    if value == "false":
+        return False
+    if _NUMBER.match(value):
+        return float(value) if "." in value else int(value)
+    return value
+
+
+def _bind(value: Any) -> Any:
+    """把 Python 值转换为 SQLite 可绑定的值（内部函数）"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _split_top_level(text: str, sep: str = ",") -> List[str]:
+    """按顶层分隔符切分，忽略括号与双引号内部（内部函数）"""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+# ==============================
+# 🔍 select 字符串解析
+# ==============================
+
+def _parse_select(spec: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    解析 select 字符串
+
+    返回:
+        (普通列列表, 嵌入资源列表 [{"alias", "table", "hint", "spec"}])
+    """
+    columns, embeds = [], []
+    for token in _split_top_level(" ".join(spec.split())):
+        if "(" in token:
+            head, inner = token.split("(", 1)
+            inner = inner.rsplit(")", 1)[0]
+            alias = None
+            if ":" in head:
+                alias, head = head.split(":", 1)
+            table, hint = (head.split("!", 1) + [None])[:2]
+            table = table.strip().strip('"')
+            embeds.append({
+                "alias": (alias or table).strip(),
+                "table": table,
+                "hint": hint.strip() if hint else None,
+                "spec": inner or "*",
+            })
+        else:
+            columns.append(token.strip('"'))
+    return columns, embeds
+
+
+# ==============================
+# 🧱 查询构建器
+# ==============================
+
+class SQLiteResponse:
+    """与 postgrest APIResponse 相同的最小接口：data / count"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteQueryBuilder:
+    """postgrest 查询构建器的 SQLite 实现（链式调用，execute() 执行）"""
+
+    def __init__(self, db: "SQLiteClient", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._select = "*"
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict = ""
+        self._ignore_duplicates = False
+        self._where: List[str] = []
+        self._params: List[Any] = []
+        self._orders: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+        self._single = False
+        self._maybe_single = False
+
+    # ---------- 操作 ----------
+
+    def select(self, *columns: str, count: Optional[str] = None, head: bool = False):
+        self._select = ",".join(columns) if columns else "*"
+        self._count = count
+        return self
+
+    def insert(self, json: Any, *, count: Optional[str] = None, returning: str = "representation",
+               upsert: bool = False, default_to_null: bool = True):
+        self._op = "upsert" if upsert else "insert"
+        self._payload = json
+        return self
+
+    def upsert(self, json: Any, *, count: Optional[str] = None, returning: str = "representation",
+               ignore_duplicates: bool = False, on_conflict: str = "", default_to_null: bool = True):
+        self._op = "upsert"
+        self._payload = json
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json: Dict[str, Any], *, count: Optional[str] = None, returning: str = "representation"):
+        self._op = "update"
+        self._payload = json
+        return self
+
+    def delete(self, *, count: Optional[str] = None, returning: str = "representation"):
+        self._op = "delete"
+        return self
+
+    # ---------- 过滤 ----------
+
+    def _add(self, sql: str, *params: Any):
+        self._where.append(sql)
+        self._params.extend(params)
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._add(f"{_ident(column)} = ?", _bind(value))
+
+    def neq(self, column: str, value: Any):
+        return self._add(f"{_ident(column)} <> ?", _bind(value))
+
+    def gt(self, column: str, value: Any):
+        return self._add(f"{_ident(column)} > ?", _bind(value))
+
+    def gte(self, column: str, value: Any):
+        return self._add(f"{_ident(column)} >= ?", _bind(value))
+
+    def lt(self, column: str, value: Any):
+        return self._add(f"{_ident(column)} < ?", _bind(value))
+
+    def lte(self, column: str, value: Any):
+        return self._add(f"{_ident(column)} <= ?", _bind(value))
+
+    def like(self, column: str, pattern: str):
+        return self._add(f"{_ident(column)} LIKE ?", pattern.replace("*", "%"))
+
+    def ilike(self, column: str, pattern: str):
+        return self._add(f"lower({_ident(column)}) LIKE lower(?)", pattern.replace("*", "%"))
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if not values:
+            return self._add("0")
+        placeholders = ",".join("?" for _ in values)
+        return self._add(f"{_ident(column)} IN ({placeholders})", *[_bind(v) for v in values])
+
+    def is_(self, column: str, value: Any):
+        if value in (None, "null"):
+            return self._add(f"{_ident(column)} IS NULL")
+        return self._add(f"{_ident(column)} = ?", 1 if value in (True, "true") else 0)
+
+    def filter(self, column: str, operator: str, criteria: Any):
+        sql, params = _condition(column, operator, str(criteria))
+        return self._add(sql, *params)
+
+    def match(self, query: Dict[str, Any]):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def or_(self, filters: str, reference_table: Optional[str] = None):
+        sql, params = _logic("or", filters)
+        return self._add(sql, *params)
+
+    # ---------- 排序与分页 ----------
+
+    def order(self, column: str, *, desc: bool = False, nullsfirst: Optional[bool] = None,
+              foreign_table: Optional[str] = None):
+        direction = "DESC" if desc else "ASC"
+        nulls = ""
+        if nullsfirst is not None:
+            nulls = " NULLS FIRST" if nullsfirst else " NULLS LAST"
+        self._orders.append(f"{_ident(column)} {direction}{nulls}")
+        return self
+
+    def limit(self, size: int, *, foreign_table: Optional[str] = None):
+        self._limit = int(size)
+        return self
+
+    def range(self, start: int, end: int, foreign_table: Optional[str] = None):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        self._maybe_single = True
+        return self
+
+    # ---------- 执行 ----------
+
+    def _where_sql(self) -> str:
+        return f" WHERE {' AND '.join(self._where)}" if self._where else ""
+
+    def execute(self) -> SQLiteResponse:
+        try:
+            if self._op == "select":
+                response = self._db._run_select(self)
+            else:
+                response = self._db._run_write(self)
+        except sqlite3.Error as e:
+            raise _api_error(str(e))
+
+        if self._single or self._maybe_single:
+            rows = response.data or []
+            if self._single and len(rows) != 1:
+                raise _api_error("JSON object requested, multiple (or no) rows returned", "PGRST116")
+            response.data = rows[0] if rows else None
+        return response
+
+
+def _condition(column: str, op: str, value: str) -> Tuple[str, List[Any]]:
+    """把 col.op.value 形式的文本条件转换为 SQL（内部函数）"""
+    col = _ident(column)
+    if op == "in":
+        items = [_coerce(v.strip().strip('"')) for v in _split_top_level(value.strip("()"))]
+        if not items:
+            return "0", []
+        return f"{col} IN ({','.join('?' for _ in items)})", items
+    if op == "is":
+        if value == "null":
+            return f"{col} IS NULL", []
+        return f"{col} = ?", [1 if value == "true" else 0]
+
+    raw = value
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        raw = value[1:-1].replace('\\"', '"')
+    operators = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+    if op in operators:
+        return f"{col} {operators[op]} ?", [_coerce(raw)]
+    if op == "like":
+        return f"{col} LIKE ?", [raw.replace("*", "%")]
+    if op == "ilike":
+        return f"lower({col}) LIKE lower(?)", [raw.replace("*", "%")]
+    raise _api_error(f"unsupported operator: {op}")
+
+
+def _logic(kind: str, text: str) -> Tuple[str, List[Any]]:
+    """解析 or(...) / and(...) 逻辑条件（内部函数）"""
+    parts, params = [], []
+    for term in _split_top_level(text):
+        if term.startswith(("and(", "or(")):
+            nested_kind, inner = term.split("(", 1)
+            sql, sub = _logic(nested_kind, inner[:-1])
+        else:
+            column, op, value = term.split(".", 2)
+            sql, sub = _condition(column, op, value)
+        parts.append(f"({sql})")
+        params.extend(sub)
+    joiner = " OR " if kind == "or" else " AND "
+    return f"({joiner.join(parts)})", params
+
+
+class SQLiteRPCBuilder:
+    """rpc() 调用构建器"""
+
+    def __init__(self, db: "SQLiteClient", fn: str, params: Dict[str, Any]):
+        self._db = db
+        self._fn = fn
+        self._params = params or {}
+
+    def execute(self) -> SQLiteResponse:
+        impl = SQLITE_RPC.get(self._fn)
+        if impl is None:
+            raise _api_error(f"function {self._fn} does not exist", "PGRST202")
+        try:
+            with self._db.transaction() as conn:
+                data = impl(conn, **self._params)
+        except APIError:
+            raise
+        except (sqlite3.Error, ValueError) as e:
+            raise _api_error(str(e), "P0001")
+        return SQLiteResponse(data)
+
+
+# ==============================
+# 🗄️ 客户端
+# ==============================
+
+class SQLiteClient:
+    """
+    SQLite 客户端
+
+    单连接 + 可重入锁串行化所有访问；写操作和 RPC 使用 BEGIN IMMEDIATE 事务，
+    保证与服务端函数一致的原子性。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            self._conn.executescript(f.read())
+
+        self._columns: Dict[str, List[str]] = {}
+        self._booleans: Dict[str, set] = {}
+        self._primary_keys: Dict[str, List[str]] = {}
+        self._foreign_keys: Dict[str, List[Tuple[str, str, str]]] = {}
+        self.query_count = 0
+
+    # ---------- 公共接口 ----------
+
+    def table(self, name: str) -> SQLiteQueryBuilder:
+        _ident(name)
+        return SQLiteQueryBuilder(self, name)
+
+    def from_(self, name: str) -> SQLiteQueryBuilder:
+        return self.table(name)
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, *args, **kwargs) -> SQLiteRPCBuilder:
+        return SQLiteRPCBuilder(self, fn, params or {})
+
+    @contextmanager
+    def transaction(self):
+        """写事务（持有锁，BEGIN IMMEDIATE … COMMIT，异常时回滚）"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self.query_count += 1
+
+    # ---------- 表结构元数据 ----------
+
+    def _table_info(self, table: str):
+        if table not in self._columns:
+            info = self._conn.execute(f"PRAGMA table_info({_ident(table)})").fetchall()
+            if not info:
+                raise _api_error(f'relation "{table}" does not exist', "42P01")
+            self._columns[table] = [row["name"] for row in info]
+            self._booleans[table] = {row["name"] for row in info if (row["type"] or "").upper() == "BOOLEAN"}
+            self._primary_keys[table] = [row["name"] for row in sorted(info, key=lambda r: r["pk"]) if row["pk"]]
+            self._foreign_keys[table] = [
+                (row["from"], row["table"], row["to"])
+                for row in self._conn.execute(f"PRAGMA foreign_key_list({_ident(table)})").fetchall()
+            ]
+        return self._columns[table]
+
+    def _row_to_dict(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        booleans = self._booleans.get(table, set())
+        return {key: (bool(row[key]) if key in booleans and row[key] is not None else row[key]) for key in row.keys()}
+
+    def _resolve_embed(self, base: str, target: str, hint: Optional[str]) -> Tuple[str, str, str]:
+        """
+        解析嵌入关系
+
+        返回:
+            ("one" | "many", 本表列, 目标表列)
+        """
+        self._table_info(base)
+        self._table_info(target)
+        to_one = [fk for fk in self._foreign_keys[base] if fk[1] == target and hint in (None, fk[0])]
+        if len(to_one) == 1:
+            return "one", to_one[0][0], to_one[0][2]
+        to_many = [fk for fk in self._foreign_keys[target] if fk[1] == base and hint in (None, fk[0])]
+        if len(to_one) == 0 and len(to_many) == 1:
+            return "many", to_many[0][2], to_many[0][0]
+        raise _api_error(f"could not embed {target} from {base} (hint={hint})", "PGRST201")
+
+    # ---------- 执行 ----------
+
+    def _run_select(self, q: SQLiteQueryBuilder) -> SQLiteResponse:
+        columns, embeds = _parse_select(q._select)
+        sql = f"SELECT * FROM {_ident(q._table)}{q._where_sql()}"
+        if q._orders:
+            sql += f" ORDER BY {', '.join(q._orders)}"
+        if q._limit is not None:
+            sql += f" LIMIT {q._limit}"
+            if q._offset:
+                sql += f" OFFSET {q._offset}"
+
+        with self._lock:
+            self._table_info(q._table)
+            rows = [self._row_to_dict(q._table, r) for r in self._conn.execute(sql, q._params).fetchall()]
+            count = None
+            if q._count:
+                count = self._conn.execute(
+                    f"SELECT count(*) FROM {_ident(q._table)}{q._where_sql()}", q._params
+                ).fetchone()[0]
+            self._attach_embeds(q._table, rows, embeds)
+            self.query_count += 1
+
+        return SQLiteResponse(self._project(rows, columns, embeds), count)
+
+    def _attach_embeds(self, table: str, rows: List[Dict[str, Any]], embeds: List[Dict[str, Any]]):
+        """为结果行附加嵌入资源（每个嵌入一次 IN 查询）（内部函数）"""
+        for embed in embeds:
+            kind, local, remote = self._resolve_embed(table, embed["table"], embed["hint"])
+            keys = list({row[local] for row in rows if row.get(local) is not None})
+            related: Dict[Any, List[Dict[str, Any]]] = {}
+            if keys:
+                sub_columns, sub_embeds = _parse_select(embed["spec"])
+                placeholders = ",".join("?" for _ in keys)
+                sub_rows = [
+                    self._row_to_dict(embed["table"], r)
+                    for r in self._conn.execute(
+                        f"SELECT * FROM {_ident(embed['table'])} WHERE {_ident(remote)} IN ({placeholders})", keys
+                    ).fetchall()
+                ]
+                self._attach_embeds(embed["table"], sub_rows, sub_embeds)
+                for sub, projected in zip(sub_rows, self._project(sub_rows, sub_columns, sub_embeds)):
+                    related.setdefault(sub[remote], []).append(projected)
+
+            for row in rows:
+                matches = related.get(row.get(local), [])
+                row[embed["alias"]] = (matches[0] if matches else None) if kind == "one" else matches
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], columns: List[str], embeds: List[Dict[str, Any]]):
+        if "*" in columns or not columns:
+            return rows
+        keep = columns + [e["alias"] for e in embeds]
+        return [{key: row.get(key) for key in keep} for row in rows]
+
+    def _run_write(self, q: SQLiteQueryBuilder) -> SQLiteResponse:
+        with self.transaction() as conn:
+            columns = self._table_info(q._table)
+            table = _ident(q._table)
+
+            if q._op == "update":
+                assignments = ", ".join(f"{_ident(k)} = ?" for k in q._payload)
+                params = [_bind(v) for v in q._payload.values()] + q._params
+                cursor = conn.execute(f"UPDATE {table} SET {assignments}{q._where_sql()} RETURNING *", params)
+                rows = cursor.fetchall()
+
+            elif q._op == "delete":
+                rows = conn.execute(f"DELETE FROM {table}{q._where_sql()} RETURNING *", q._params).fetchall()
+
+            else:
+                payload = q._payload if isinstance(q._payload, list) else [q._payload]
+                rows = []
+                for record in payload:
+                    record = dict(record)
+                    for col in UUID_DEFAULTS.get(q._table, []):
+                        if q._op == "insert" and not record.get(col):
+                            record[col] = str(uuid.uuid4())
+                    unknown = [k for k in record if k not in columns]
+                    if unknown:
+                        raise _api_error(f"column {unknown[0]} of relation {q._table} does not exist", "PGRST204")
+                    cols = ", ".join(_ident(k) for k in record)
+                    placeholders = ", ".join("?" for _ in record)
+                    sql = f"INSERT INTO {table} ({cols}) VALUES ({placeholders})"
+                    if q._op == "upsert":
+                        target = [c.strip() for c in q._on_conflict.split(",") if c.strip()] or self._primary_keys[q._table]
+                        if q._ignore_duplicates:
+                            sql += f" ON CONFLICT ({', '.join(_ident(c) for c in target)}) DO NOTHING"
+                        else:
+                            updates = ", ".join(f"{_ident(k)} = excluded.{_ident(k)}" for k in record if k not in target)
+                            sql += f" ON CONFLICT ({', '.join(_ident(c) for c in target)}) "
+                            sql += f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+                    rows.extend(conn.execute(sql + " RETURNING *", [_bind(v) for v in record.values()]).fetchall())
+
+        return SQLiteResponse([self._row_to_dict(q._table, r) for r in rows])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteBackendManager:
+    """
+    SQLite 后端管理器
+
+    与 SupabaseClientManager 接口一致（client / pool_stats / health_check），
+    core.config 按配置二选一。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._client: Optional[SQLiteClient] = None
+
+    @property
+    def client(self) -> SQLiteClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # 注册 RPC 实现
+                    from . import sqlite_rpc  # noqa: F401
+                    self._client = SQLiteClient(self.path)
+        return self._client
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        size = os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "db_size_bytes": size,
+            "total_queries": self._client.query_count if self._client else 0,
+        }
+
+    def health_check(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            with self.client._lock:
+                self.client._conn.execute("SELECT 1").fetchone()
+            return {"ok": True, "status_code": 200, "latency_ms": round((time.perf_counter() - start) * 1000, 2), "error": None}
+        except sqlite3.Error as e:
+            return {"ok": False, "status_code": None, "latency_ms": round((time.perf_counter() - start) * 1000, 2), "error": str(e)[:200]}
@@ -0,0 +1,978 @@
+# ==================================================
+# SQLite 服务端函数
+# 功能：与 Supabase 上的 RPC 同名同参数的 SQLite 实现
+#      （每个函数都在 SQLiteClient.transaction() 事务内执行）
+# ==================================================
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from .sqlite_backend import sqlite_rpc
+
+
+# ==============================
+# 💎 灵石
+# ==============================
+
+@sqlite_rpc("add_spirit_stones")
+def add_spirit_stones(conn, uid: str, amount: int):
+    conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?", (amount, uid))
+
+
+@sqlite_rpc("deduct_spirit_stones")
+def deduct_spirit_stones(conn, uid: str, amount: int):
+    _debit_spirit_stones(conn, uid, amount)
+
+
+def _debit_spirit_stones(conn, uid: str, amount: int):
+    """扣除灵石，不足时抛出异常（内部函数）"""
+    cursor = conn.execute(
+        "UPDATE users SET spirit_stones = spirit_stones - ? WHERE id = ? AND spirit_stones >= ?",
+        (amount, uid, amount),
+    )
+    if cursor.rowcount == 0:
+        raise ValueError("insufficient spirit stones")
+
+
+@sqlite_rpc("get_user_exp")
+def get_user_exp(conn, uid: str):
+    row = conn.execute("SELECT exp FROM user_cultivation WHERE user_id = ?", (uid,)).fetchone()
+    return row["exp"] if row else 0
+
+
+@sqlite_rpc("grant_spirit_stones")
+def grant_spirit_stones(conn, p_grant_id: str, p_amount: int, p_user_ids: List[str] = None,
+                        p_filter: str = None, p_granted_by: str = None):
+    if p_amount <= 0:
+        raise ValueError("amount must be positive")
+
+    existing = conn.execute(
+        "SELECT affected_rows FROM spirit_stone_grants WHERE grant_id = ?", (p_grant_id,)
+    ).fetchone()
+    if existing:
+        return {"grant_id": p_grant_id, "affected_rows": existing["affected_rows"], "already_applied": True}
+
+    if p_user_ids is not None:
+        placeholders = ",".join("?" for _ in p_user_ids) or "NULL"
+        cursor = conn.execute(
+            f"UPDATE users SET spirit_stones = spirit_stones + ? WHERE id IN ({placeholders})",
+            [p_amount, *p_user_ids],
+        )
+    elif p_filter == "all_active":
+        cursor = conn.execute(
+            "UPDATE users SET spirit_stones = spirit_stones + ? WHERE NOT coalesce(is_banned, 0)", (p_amount,)
+        )
+    elif p_filter == "all":
+        cursor = conn.execute("UPDATE users SET spirit_stones = spirit_stones + ?", (p_amount,))
+    else:
+        raise ValueError(f"unknown grant target: {p_filter}")
+
+    conn.execute(
+        "INSERT INTO spirit_stone_grants (grant_id, amount, target, affected_rows, granted_by) VALUES (?, ?, ?, ?, ?)",
+        (p_grant_id, p_amount, p_filter or "user_ids", cursor.rowcount, p_granted_by),
+    )
+    return {"grant_id": p_grant_id, "affected_rows": cursor.rowcount, "already_applied": False}
+
+
+# ==============================
+# 🎒 背包账本
+# ==============================
+
+def _apply_inventory_deltas(conn, changes: List[Dict[str, Any]]):
+    """合并同一 (user_id, item_id) 的变动后原子应用（内部函数）"""
+    merged: Dict[tuple, int] = {}
+    for change in changes:
+        key = (str(change["user_id"]), change["item_id"])
+        merged[key] = merged.get(key, 0) + int(change["delta"])
+
+    for (user_id, item_id), delta in merged.items():
+        if delta < 0:
+            cursor = conn.execute(
+                "UPDATE user_inventory SET quantity = quantity + ? "
+                "WHERE user_id = ? AND item_id = ? AND quantity >= ?",
+                (delta, user_id, item_id, -delta),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError("insufficient inventory")
+        elif delta > 0:
+            conn.execute(
+                "INSERT INTO user_inventory (user_id, item_id, quantity) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+                (user_id, item_id, delta),
+            )
+        conn.execute(
+            "DELETE FROM user_inventory WHERE user_id = ? AND item_id = ? AND quantity <= 0",
+            (user_id, item_id),
+        )
+
+
+@sqlite_rpc("apply_inventory_deltas")
+def apply_inventory_deltas(conn, p_changes: List[Dict[str, Any]]):
+    _apply_inventory_deltas(conn, p_changes)
+
+
+@sqlite_rpc("craft_batch")
+def craft_batch(conn, p_user_id: str, p_stone_cost: int, p_changes: List[Dict[str, Any]]):
+    _debit_spirit_stones(conn, p_user_id, p_stone_cost)
+    _apply_inventory_deltas(conn, [dict(change, user_id=p_user_id) for change in p_changes])
+    return {"spirit_stones_spent": p_stone_cost}
+
+
+# ==============================
+# 🏪 藏宝阁
+# ==============================
+
+@sqlite_rpc("shop_feed_category_counts")
+def shop_feed_category_counts(conn):
+    rows = conn.execute(
+        "SELECT category, count(*) AS entries FROM shop_feed GROUP BY category ORDER BY category"
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+@sqlite_rpc("purchase_listing")
+def purchase_listing(conn, p_buyer_id: str, p_quantity: int, p_listing_id: int = None, p_item_uuid: str = None):
+    if p_quantity is None or p_quantity <= 0:
+        raise ValueError("quantity must be positive")
+
+    # 1. 扣库存（BEGIN IMMEDIATE 已串行化写事务，条件更新即可防止超卖）
+    if p_listing_id is not None:
+        listing = conn.execute(
+            "SELECT item_uuid, seller_id, price, quantity FROM shop_listings WHERE id = ? AND is_active",
+            (p_listing_id,),
+        ).fetchone()
+        if listing and listing["seller_id"] == p_buyer_id:
+            raise ValueError("cannot buy own listing")
+        if not listing or listing["quantity"] < p_quantity:
+            raise ValueError("insufficient stock")
+
+        remaining = listing["quantity"] - p_quantity
+        conn.execute(
+            "UPDATE shop_listings SET quantity = ?, is_active = ? WHERE id = ?",
+            (remaining, remaining > 0, p_listing_id),
+        )
+        item = conn.execute("SELECT id FROM items WHERE uuid_id = ?", (listing["item_uuid"],)).fetchone()
+        item_id, item_uuid = item["id"], listing["item_uuid"]
+        seller_id, unit_price = listing["seller_id"], listing["price"]
+    elif p_item_uuid is not None:
+        item = conn.execute(
+            "SELECT id, price, stock FROM items WHERE uuid_id = ? AND is_system", (p_item_uuid,)
+        ).fetchone()
+        if not item or (item["stock"] != -1 and item["stock"] < p_quantity):
+            raise ValueError("insufficient stock")
+
+        remaining = -1 if item["stock"] == -1 else item["stock"] - p_quantity
+        conn.execute("UPDATE items SET stock = ? WHERE id = ?", (remaining, item["id"]))
+        item_id, item_uuid = item["id"], p_item_uuid
+        seller_id, unit_price = None, item["price"]
+    else:
+        raise ValueError("listing_id or item_uuid is required")
+
+    total = unit_price * p_quantity
+
+    # 2. 灵石转账
+    _debit_spirit_stones(conn, p_buyer_id, total)
+    if seller_id is not None:
+        conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?", (total, seller_id))
+
+    # 3. 写入买家背包
+    conn.execute(
+        "INSERT INTO user_inventory (user_id, item_id, item_uuid, quantity) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (user_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+        (p_buyer_id, item_id, item_uuid, p_quantity),
+    )
+
+    # 4. 成交记录
+    cursor = conn.execute(
+        "INSERT INTO market_trades (listing_id, item_id, item_uuid, buyer_id, seller_id, quantity, unit_price, total_price) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (p_listing_id, item_id, item_uuid, p_buyer_id, seller_id, p_quantity, unit_price, total),
+    )
+    return {
+        "trade_id": cursor.lastrowid,
+        "item_id": item_id,
+        "quantity": p_quantity,
+        "unit_price": unit_price,
+        "total_price": total,
+        "remaining": remaining,
+        "sold_out": remaining == 0,
+    }
+
+
+@sqlite_rpc("list_items")
+def list_items(conn, p_seller_id: str, p_listings: List[Dict[str, Any]], p_from_inventory: bool = True):
+    if any(not x.get("price") or x["price"] <= 0 or not x.get("quantity") or x["quantity"] <= 0
+           for x in p_listings):
+        raise ValueError("price and quantity must be positive")
+    item_ids = {}
+    for x in p_listings:
+        item = conn.execute("SELECT id FROM items WHERE uuid_id = ?", (x["item_uuid"],)).fetchone()
+        if not item:
+            raise ValueError("unknown item")
+        item_ids[x["item_uuid"]] = item["id"]
+
+    if p_from_inventory:
+        _apply_inventory_deltas(conn, [
+            {"user_id": p_seller_id, "item_id": item_ids[x["item_uuid"]], "delta": -int(x["quantity"])}
+            for x in p_listings
+        ])
+
+    rows = []
+    for x in p_listings:
+        cursor = conn.execute(
+            "INSERT INTO shop_listings (item_uuid, seller_id, price, quantity, is_active, from_inventory) "
+            "VALUES (?, ?, ?, ?, 1, ?)",
+            (x["item_uuid"], p_seller_id, int(x["price"]), int(x["quantity"]), bool(p_from_inventory)),
+        )
+        rows.append(dict(conn.execute("SELECT * FROM shop_listings WHERE id = ?", (cursor.lastrowid,)).fetchone()))
+    return rows
+
+
+@sqlite_rpc("list_item")
+def list_item(conn, p_seller_id: str, p_item_uuid: str, p_price: int, p_quantity: int, p_from_inventory: bool = True):
+    return list_items(conn, p_seller_id,
+                      [{"item_uuid": p_item_uuid, "price": p_price, "quantity": p_quantity}], p_from_inventory)[0]
+
+
+def _deactivate_listings(conn, where: str, params: List[Any]) -> List[Dict[str, Any]]:
+    """把满足条件的在售摊位置为下架，返回被下架的摊位（内部函数）"""
+    rows = [dict(row) for row in conn.execute(
+        f"SELECT * FROM shop_listings WHERE is_active AND {where} ORDER BY id", params
+    ).fetchall()]
+    conn.executemany("UPDATE shop_listings SET is_active = 0 WHERE id = ?", [(row["id"],) for row in rows])
+    for row in rows:
+        row["is_active"] = False
+    return rows
+
+
+def _placeholders(values) -> str:
+    """IN 子句占位符（内部函数）"""
+    return ",".join("?" for _ in values) or "NULL"
+
+
+@sqlite_rpc("unlist_listings")
+def unlist_listings(conn, p_listing_ids: List[int], p_seller_id: str):
+    rows = _deactivate_listings(conn, f"seller_id = ? AND id IN ({_placeholders(p_listing_ids)})",
+                                [p_seller_id, *p_listing_ids])
+    changes = []
+    for row in rows:
+        # 管理员上架的系统商品没有从背包扣除，下架时不退回
+        if row["quantity"] > 0 and row["from_inventory"]:
+            item = conn.execute("SELECT id FROM items WHERE uuid_id = ?", (row["item_uuid"],)).fetchone()
+            changes.append({"user_id": p_seller_id, "item_id": item["id"], "delta": row["quantity"]})
+    _apply_inventory_deltas(conn, changes)
+    return rows
+
+
+@sqlite_rpc("unlist_listing")
+def unlist_listing(conn, p_listing_id: int, p_seller_id: str):
+    rows = unlist_listings(conn, [p_listing_id], p_seller_id)
+    if not rows:
+        raise ValueError("listing not active")
+    return rows[0]
+
+
+@sqlite_rpc("confiscate_listings")
+def confiscate_listings(conn, p_listing_ids: List[int] = None, p_seller_ids: List[str] = None):
+    if p_listing_ids is None and p_seller_ids is None:
+        raise ValueError("listing_ids or seller_ids is required")
+    clauses, params = ["1"], []
+    if p_listing_ids is not None:
+        clauses.append(f"id IN ({_placeholders(p_listing_ids)})")
+        params.extend(p_listing_ids)
+    if p_seller_ids is not None:
+        clauses.append(f"seller_id IN ({_placeholders(p_seller_ids)})")
+        params.extend(p_seller_ids)
+    return _deactivate_listings(conn, " AND ".join(clauses), params)
+
+
+@sqlite_rpc("confiscate_listing")
+def confiscate_listing(conn, p_listing_id: int):
+    rows = confiscate_listings(conn, [p_listing_id])
+    if not rows:
+        raise ValueError("listing not active")
+    return rows[0]
+
+
+# ==============================
+# 📈 挂单撮合
+# ==============================
+
+@sqlite_rpc("open_market_order")
+def open_market_order(conn, p_user_id: str, p_item_uuid: str, p_side: str, p_price: int, p_quantity: int):
+    if p_side not in ("buy", "sell"):
+        raise ValueError("invalid side")
+    if not p_price or p_price <= 0 or not p_quantity or p_quantity <= 0:
+        raise ValueError("price and quantity must be positive")
+
+    item = conn.execute("SELECT id FROM items WHERE uuid_id = ?", (p_item_uuid,)).fetchone()
+    if not item:
+        raise ValueError("unknown item")
+
+    # 下单即冻结：买单预扣「限价 × 数量」灵石，卖单预扣物品
+    if p_side == "buy":
+        _debit_spirit_stones(conn, p_user_id, p_price * p_quantity)
+    else:
+        _apply_inventory_deltas(conn, [{"user_id": p_user_id, "item_id": item["id"], "delta": -p_quantity}])
+
+    cursor = conn.execute(
+        "INSERT INTO market_orders (item_id, item_uuid, user_id, side, price, quantity, remaining) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (item["id"], p_item_uuid, p_user_id, p_side, p_price, p_quantity, p_quantity),
+    )
+    row = conn.execute("SELECT * FROM market_orders WHERE id = ?", (cursor.lastrowid,)).fetchone()
+    return dict(row)
+
+
+@sqlite_rpc("claim_order_book")
+def claim_order_book(conn, p_matcher_id: str, p_lease_seconds: int):
+    # 没有持有者、持有者就是自己或租约已过期时取得 / 续期租约
+    cursor = conn.execute(
+        "INSERT INTO order_book_matcher (id, matcher_id, expires_at) "
+        "VALUES (1, ?, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now', ?)) "
+        "ON CONFLICT (id) DO UPDATE SET matcher_id = excluded.matcher_id, expires_at = excluded.expires_at "
+        "WHERE order_book_matcher.matcher_id = excluded.matcher_id "
+        "OR order_book_matcher.expires_at < strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')",
+        (p_matcher_id, f"+{int(p_lease_seconds)} seconds"),
+    )
+    return cursor.rowcount > 0
+
+
+@sqlite_rpc("release_order_book")
+def release_order_book(conn, p_matcher_id: str):
+    conn.execute("DELETE FROM order_book_matcher WHERE matcher_id = ?", (p_matcher_id,))
+
+
+@sqlite_rpc("settle_market_fills")
+def settle_market_fills(conn, p_fills: List[Dict[str, Any]], p_matcher_id: str):
+    # 只接受当前租约持有者的结算
+    if not conn.execute("SELECT 1 FROM order_book_matcher WHERE matcher_id = ?", (p_matcher_id,)).fetchone():
+        raise ValueError("not the active matcher")
+
+    new_fills = []
+    for fill in p_fills:
+        # 已结算过的 fill_id 被跳过（重试同一批次是幂等的）
+        cursor = conn.execute(
+            "INSERT INTO market_fills (fill_id, buy_order_id, sell_order_id, item_id, price, quantity) "
+            "SELECT ?, ?, ?, item_id, ?, ? FROM market_orders WHERE id = ? "
+            "ON CONFLICT (fill_id) DO NOTHING",
+            (fill["fill_id"], fill["buy_order_id"], fill["sell_order_id"],
+             fill["price"], fill["quantity"], fill["buy_order_id"]),
+        )
+        if cursor.rowcount:
+            new_fills.append(fill)
+    if not new_fills:
+        return 0
+
+    order_ids = {f["buy_order_id"] for f in new_fills} | {f["sell_order_id"] for f in new_fills}
+    placeholders = ",".join("?" * len(order_ids))
+    orders = {
+        row["id"]: dict(row)
+        for row in conn.execute(f"SELECT * FROM market_orders WHERE id IN ({placeholders})", tuple(order_ids))
+    }
+
+    used: Dict[int, int] = {}
+    stones: Dict[str, int] = {}
+    inventory = []
+    for fill in new_fills:
+        buy, sell = orders[fill["buy_order_id"]], orders[fill["sell_order_id"]]
+        price, qty = fill["price"], fill["quantity"]
+        used[buy["id"]] = used.get(buy["id"], 0) + qty
+        used[sell["id"]] = used.get(sell["id"], 0) + qty
+
+        # 买家得物品；卖家得灵石；买单以低于限价的价格成交时退还差价
+        inventory.append({"user_id": buy["user_id"], "item_id": buy["item_id"], "delta": qty})
+        stones[sell["user_id"]] = stones.get(sell["user_id"], 0) + price * qty
+        if buy["price"] > price:
+            stones[buy["user_id"]] = stones.get(buy["user_id"], 0) + (buy["price"] - price) * qty
+
+        conn.execute(
+            "INSERT INTO market_trades (item_id, item_uuid, buyer_id, seller_id, quantity, unit_price, total_price) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (buy["item_id"], buy["item_uuid"], buy["user_id"], sell["user_id"], qty, price, price * qty),
+        )
+
+    for order_id, qty in used.items():
+        cursor = conn.execute(
+            "UPDATE market_orders SET remaining = remaining - ?, "
+            "status = CASE WHEN remaining = ? THEN 'filled' ELSE status END, "
+            "updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') "
+            "WHERE id = ? AND status = 'open' AND remaining >= ?",
+            (qty, qty, order_id, qty),
+        )
+        if cursor.rowcount == 0:
+            raise ValueError("fill exceeds remaining quantity")
+
+    _apply_inventory_deltas(conn, inventory)
+    conn.executemany(
+        "UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?",
+        [(amount, user_id) for user_id, amount in stones.items()],
+    )
+    return len(new_fills)
+
+
+@sqlite_rpc("cancel_market_order")
+def cancel_market_order(conn, p_order_id: int, p_user_id: str):
+    order = conn.execute(
+        "SELECT * FROM market_orders WHERE id = ? AND user_id = ? AND status = 'open'",
+        (p_order_id, p_user_id),
+    ).fetchone()
+    if not order:
+        raise ValueError("order not open")
+
+    conn.execute(
+        "UPDATE market_orders SET status = 'cancelled', "
+        "updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = ?",
+        (p_order_id,),
+    )
+    # 退还剩余冻结
+    if order["side"] == "buy":
+        conn.execute(
+            "UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?",
+            (order["price"] * order["remaining"], p_user_id),
+        )
+    elif order["remaining"] > 0:
+        _apply_inventory_deltas(conn, [{"user_id": p_user_id, "item_id": order["item_id"], "delta": order["remaining"]}])
+    return dict(order, status="cancelled")
+
+
+# ==============================
+# ⚖️ 拍卖
+# ==============================
+
+def _utc_iso(offset_seconds: float = 0) -> str:
+    """与 SQLite strftime('%Y-%m-%dT%H:%M:%f+00:00') 同格式的 UTC 时间（内部函数）"""
+    moment = datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)
+    return moment.isoformat(timespec="milliseconds")
+
+
+@sqlite_rpc("create_auction")
+def create_auction(conn, p_seller_id: str, p_item_uuid: str, p_quantity: int, p_start_price: int,
+                   p_min_increment: int, p_duration_seconds: int):
+    if not p_quantity or p_quantity <= 0 or not p_start_price or p_start_price <= 0 \
+            or not p_min_increment or p_min_increment <= 0:
+        raise ValueError("price and quantity must be positive")
+    if not p_duration_seconds or p_duration_seconds <= 0:
+        raise ValueError("invalid duration")
+
+    item = conn.execute("SELECT id FROM items WHERE uuid_id = ?", (p_item_uuid,)).fetchone()
+    if not item:
+        raise ValueError("unknown item")
+
+    # 物品托管：从卖家背包扣除，结算时交给买家或退还
+    _apply_inventory_deltas(conn, [{"user_id": p_seller_id, "item_id": item["id"], "delta": -p_quantity}])
+
+    cursor = conn.execute(
+        "INSERT INTO auctions (item_id, item_uuid, seller_id, quantity, start_price, min_increment, ends_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (item["id"], p_item_uuid, p_seller_id, p_quantity, p_start_price, p_min_increment,
+         _utc_iso(p_duration_seconds)),
+    )
+    return dict(conn.execute("SELECT * FROM auctions WHERE id = ?", (cursor.lastrowid,)).fetchone())
+
+
+@sqlite_rpc("place_bid")
+def place_bid(conn, p_auction_id: int, p_bidder_id: str, p_amount: int,
+              p_snipe_window_seconds: int = 60, p_extend_seconds: int = 60):
+    now = _utc_iso()
+    auction = conn.execute("SELECT * FROM auctions WHERE id = ?", (p_auction_id,)).fetchone()
+    if not auction or auction["status"] != "open" or auction["ends_at"] <= now:
+        raise ValueError("auction closed")
+    if auction["seller_id"] == p_bidder_id:
+        raise ValueError("cannot bid on own auction")
+    minimum = auction["start_price"] if auction["current_bid"] is None \
+        else auction["current_bid"] + auction["min_increment"]
+    if p_amount < minimum:
+        raise ValueError("bid too low")
+
+    # 冻结新出价，退还上一位最高出价者（同一人加价时净扣差额）
+    if auction["current_bidder_id"] is not None:
+        conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?",
+                     (auction["current_bid"], auction["current_bidder_id"]))
+    _debit_spirit_stones(conn, p_bidder_id, p_amount)
+
+    # 防狙击：结束前 p_snipe_window_seconds 秒内出价，结束时间顺延到出价后 p_extend_seconds 秒
+    ends_at = auction["ends_at"]
+    if ends_at < _utc_iso(p_snipe_window_seconds):
+        ends_at = max(ends_at, _utc_iso(p_extend_seconds))
+
+    conn.execute(
+        "UPDATE auctions SET current_bid = ?, current_bidder_id = ?, bid_count = bid_count + 1, "
+        "version = version + 1, ends_at = ? WHERE id = ?",
+        (p_amount, p_bidder_id, ends_at, p_auction_id),
+    )
+    conn.execute("INSERT INTO auction_bids (auction_id, bidder_id, amount) VALUES (?, ?, ?)",
+                 (p_auction_id, p_bidder_id, p_amount))
+    return dict(conn.execute("SELECT * FROM auctions WHERE id = ?", (p_auction_id,)).fetchone())
+
+
+@sqlite_rpc("settle_auction")
+def settle_auction(conn, p_auction_id: int):
+    auction = conn.execute("SELECT * FROM auctions WHERE id = ?", (p_auction_id,)).fetchone()
+    if not auction:
+        raise ValueError("unknown auction")
+    # 已结算或尚未到期：原样返回，调用方据 status / ends_at 决定是否重新排期
+    if auction["status"] != "open" or auction["ends_at"] > _utc_iso():
+        return dict(auction)
+
+    winner = auction["current_bidder_id"]
+    if winner is not None:
+        _apply_inventory_deltas(conn, [{"user_id": winner, "item_id": auction["item_id"], "delta": auction["quantity"]}])
+        conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?",
+                     (auction["current_bid"], auction["seller_id"]))
+        conn.execute(
+            "INSERT INTO market_trades (item_id, item_uuid, buyer_id, seller_id, quantity, unit_price, total_price) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (auction["item_id"], auction["item_uuid"], winner, auction["seller_id"], auction["quantity"],
+             auction["current_bid"] // auction["quantity"], auction["current_bid"]),
+        )
+    else:
+        _apply_inventory_deltas(conn, [{"user_id": auction["seller_id"], "item_id": auction["item_id"],
+                                        "delta": auction["quantity"]}])
+
+    conn.execute(
+        "UPDATE auctions SET status = ?, settled_at = ? WHERE id = ?",
+        ("sold" if winner is not None else "unsold", _utc_iso(), p_auction_id),
+    )
+    return dict(conn.execute("SELECT * FROM auctions WHERE id = ?", (p_auction_id,)).fetchone())
+
+
+# ==============================
+# 🤝 玩家交易
+# ==============================
+
+@sqlite_rpc("open_player_trade")
+def open_player_trade(conn, p_initiator_id: str, p_counterparty_id: str, p_ttl_seconds: int):
+    if p_initiator_id == p_counterparty_id:
+        raise ValueError("cannot trade with yourself")
+    if not conn.execute("SELECT 1 FROM users WHERE id = ?", (p_counterparty_id,)).fetchone():
+        raise ValueError("unknown user")
+
+    cursor = conn.execute(
+        "INSERT INTO player_trades (initiator_id, counterparty_id, expires_at) VALUES (?, ?, ?)",
+        (p_initiator_id, p_counterparty_id, _utc_iso(p_ttl_seconds)),
+    )
+    return dict(conn.execute("SELECT * FROM player_trades WHERE id = ?", (cursor.lastrowid,)).fetchone())
+
+
+def _lock_player_trade(conn, p_trade_id: int, p_user_id: str):
+    """读取交易并校验参与者与状态（内部函数）"""
+    trade = conn.execute("SELECT * FROM player_trades WHERE id = ?", (p_trade_id,)).fetchone()
+    if not trade or p_user_id not in (trade["initiator_id"], trade["counterparty_id"]):
+        raise ValueError("unknown trade")
+    if trade["status"] != "open" or trade["expires_at"] <= _utc_iso():
+        raise ValueError("trade closed")
+    return trade
+
+
+def _refund_player_trade(conn, trade):
+    """把托管退回双方（内部函数）"""
+    items = conn.execute("SELECT user_id, item_id, quantity FROM player_trade_items WHERE trade_id = ?",
+                         (trade["id"],)).fetchall()
+    _apply_inventory_deltas(conn, [
+        {"user_id": row["user_id"], "item_id": row["item_id"], "delta": row["quantity"]} for row in items
+    ])
+    conn.execute("DELETE FROM player_trade_items WHERE trade_id = ?", (trade["id"],))
+    for user_id, amount in ((trade["initiator_id"], trade["initiator_stones"]),
+                            (trade["counterparty_id"], trade["counterparty_stones"])):
+        if amount > 0:
+            conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?", (amount, user_id))
+
+
+@sqlite_rpc("set_trade_offer")
+def set_trade_offer(conn, p_trade_id: int, p_user_id: str, p_items: List[Dict[str, Any]], p_spirit_stones: int):
+    trade = _lock_player_trade(conn, p_trade_id, p_user_id)
+    if p_spirit_stones is None or p_spirit_stones < 0 \
+            or any(not item.get("quantity") or item["quantity"] <= 0 for item in p_items):
+        raise ValueError("quantity must be positive")
+
+    # 物品：旧托管退回、新报价转入托管，合并成一次净变动
+    old_items = conn.execute("SELECT item_id, quantity FROM player_trade_items WHERE trade_id = ? AND user_id = ?",
+                             (p_trade_id, p_user_id)).fetchall()
+    _apply_inventory_deltas(conn, [
+        {"user_id": p_user_id, "item_id": row["item_id"], "delta": row["quantity"]} for row in old_items
+    ] + [
+        {"user_id": p_user_id, "item_id": item["item_id"], "delta": -int(item["quantity"])} for item in p_items
+    ])
+    offered: Dict[int, int] = {}
+    for item in p_items:
+        offered[item["item_id"]] = offered.get(item["item_id"], 0) + int(item["quantity"])
+    conn.execute("DELETE FROM player_trade_items WHERE trade_id = ? AND user_id = ?", (p_trade_id, p_user_id))
+    conn.executemany(
+        "INSERT INTO player_trade_items (trade_id, user_id, item_id, quantity) VALUES (?, ?, ?, ?)",
+        [(p_trade_id, p_user_id, item_id, quantity) for item_id, quantity in offered.items()],
+    )
+
+    # 灵石：只转移差额
+    side = "initiator" if p_user_id == trade["initiator_id"] else "counterparty"
+    old_stones = trade[f"{side}_stones"]
+    if p_spirit_stones > old_stones:
+        _debit_spirit_stones(conn, p_user_id, p_spirit_stones - old_stones)
+    elif p_spirit_stones < old_stones:
+        conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?",
+                     (old_stones - p_spirit_stones, p_user_id))
+
+    conn.execute(
+        f"UPDATE player_trades SET {side}_stones = ?, initiator_confirmed = 0, counterparty_confirmed = 0, "
+        "version = version + 1, updated_at = ? WHERE id = ?",
+        (p_spirit_stones, _utc_iso(), p_trade_id),
+    )
+    return dict(conn.execute("SELECT * FROM player_trades WHERE id = ?", (p_trade_id,)).fetchone())
+
+
+@sqlite_rpc("confirm_player_trade")
+def confirm_player_trade(conn, p_trade_id: int, p_user_id: str, p_version: int):
+    trade = _lock_player_trade(conn, p_trade_id, p_user_id)
+    if trade["version"] != p_version:
+        raise ValueError("trade changed")
+
+    side = "initiator" if p_user_id == trade["initiator_id"] else "counterparty"
+    conn.execute(f"UPDATE player_trades SET {side}_confirmed = 1, updated_at = ? WHERE id = ?",
+                 (_utc_iso(), p_trade_id))
+    trade = conn.execute("SELECT * FROM player_trades WHERE id = ?", (p_trade_id,)).fetchone()
+
+    if trade["initiator_confirmed"] and trade["counterparty_confirmed"]:
+        # 第二阶段：托管物品交给对方，托管灵石交给对方
+        other = {trade["initiator_id"]: trade["counterparty_id"], trade["counterparty_id"]: trade["initiator_id"]}
+        items = conn.execute("SELECT user_id, item_id, quantity FROM player_trade_items WHERE trade_id = ?",
+                             (p_trade_id,)).fetchall()
+        _apply_inventory_deltas(conn, [
+            {"user_id": other[row["user_id"]], "item_id": row["item_id"], "delta": row["quantity"]} for row in items
+        ])
+        for user_id, amount in ((trade["counterparty_id"], trade["initiator_stones"]),
+                                (trade["initiator_id"], trade["counterparty_stones"])):
+            if amount > 0:
+                conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?", (amount, user_id))
+        conn.execute("UPDATE player_trades SET status = 'settled', updated_at = ? WHERE id = ?",
+                     (_utc_iso(), p_trade_id))
+    return dict(conn.execute("SELECT * FROM player_trades WHERE id = ?", (p_trade_id,)).fetchone())
+
+
+@sqlite_rpc("cancel_player_trade")
+def cancel_player_trade(conn, p_trade_id: int, p_user_id: str):
+    trade = _lock_player_trade(conn, p_trade_id, p_user_id)
+    _refund_player_trade(conn, trade)
+    conn.execute("UPDATE player_trades SET status = 'cancelled', updated_at = ? WHERE id = ?",
+                 (_utc_iso(), p_trade_id))
+    return dict(conn.execute("SELECT * FROM player_trades WHERE id = ?", (p_trade_id,)).fetchone())
+
+
+@sqlite_rpc("expire_player_trades")
+def expire_player_trades(conn, p_limit: int = 100):
+    now = _utc_iso()
+    trades = conn.execute(
+        "SELECT * FROM player_trades WHERE status = 'open' AND expires_at <= ? ORDER BY expires_at LIMIT ?",
+        (now, p_limit),
+    ).fetchall()
+    for trade in trades:
+        _refund_player_trade(conn, trade)
+        conn.execute("UPDATE player_trades SET status = 'expired', updated_at = ? WHERE id = ?", (now, trade["id"]))
+    return len(trades)
+
+
+# ==============================
+# 🕳️ 秘境
+# ==============================
+
+def _cooldown_end(last_claimed_at: str, cooldown_hours) -> datetime:
+    """冷却结束时间（内部函数）"""
+    return datetime.fromisoformat(last_claimed_at) + timedelta(hours=cooldown_hours if cooldown_hours is not None else 24)
+
+
+@sqlite_rpc("claim_dungeon")
+def claim_dungeon(conn, p_user_id: str, p_dungeon_id: int, p_victory: bool = True):
+    dungeon = conn.execute("SELECT * FROM dungeons WHERE id = ?", (p_dungeon_id,)).fetchone()
+    if not dungeon:
+        raise ValueError("unknown dungeon")
+    user = conn.execute("SELECT cultivation_level FROM users WHERE id = ?", (p_user_id,)).fetchone()
+    if not user:
+        raise ValueError("unknown user")
+    if user["cultivation_level"] < (dungeon["required_level"] or 1):
+        raise ValueError("level too low")
+
+    now = _utc_iso()
+    cooldown = conn.execute(
+        "SELECT last_claimed_at FROM user_dungeon_cooldowns WHERE user_id = ? AND dungeon_id = ?",
+        (p_user_id, p_dungeon_id),
+    ).fetchone()
+    if cooldown and _cooldown_end(cooldown["last_claimed_at"], dungeon["cooldown_hours"]) > datetime.fromisoformat(now):
+        raise ValueError("dungeon on cooldown")
+    conn.execute(
+        "INSERT INTO user_dungeon_cooldowns (user_id, dungeon_id, last_claimed_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (user_id, dungeon_id) DO UPDATE SET last_claimed_at = excluded.last_claimed_at, "
+        "claim_count = claim_count + 1",
+        (p_user_id, p_dungeon_id, now),
+    )
+
+    # 战败同样消耗冷却，但不发放奖励
+    stones = (dungeon["reward_spirit_stones"] or 0) if p_victory else 0
+    if stones > 0:
+        conn.execute("UPDATE users SET spirit_stones = spirit_stones + ? WHERE id = ?", (stones, p_user_id))
+    item_qty = (dungeon["reward_item_qty"] or 0) if p_victory else 0
+    if dungeon["reward_item_id"] is not None and item_qty > 0:
+        _apply_inventory_deltas(conn, [{"user_id": p_user_id, "item_id": dungeon["reward_item_id"], "delta": item_qty}])
+
+    conn.execute(
+        "INSERT INTO user_progress (user_id, last_dungeon_time) VALUES (?, ?) "
+        "ON CONFLICT (user_id) DO UPDATE SET last_dungeon_time = excluded.last_dungeon_time",
+        (p_user_id, now),
+    )
+    return {
+        "dungeon_id": p_dungeon_id,
+        "victory": bool(p_victory),
+        "spirit_stones": stones,
+        "item_id": dungeon["reward_item_id"],
+        "item_qty": item_qty,
+        "next_available_at": _cooldown_end(now, dungeon["cooldown_hours"]).isoformat(timespec="milliseconds"),
+    }
+
+
+@sqlite_rpc("dungeon_status")
+def dungeon_status(conn, p_user_id: str):
+    user = conn.execute("SELECT cultivation_level FROM users WHERE id = ?", (p_user_id,)).fetchone()
+    level = user["cultivation_level"] if user else 0
+    rows = conn.execute(
+        "SELECT d.*, i.name AS reward_item_name, c.last_claimed_at "
+        "FROM dungeons d "
+        "LEFT JOIN items i ON i.id = d.reward_item_id "
+        "LEFT JOIN user_dungeon_cooldowns c ON c.user_id = ? AND c.dungeon_id = d.id "
+        "ORDER BY coalesce(d.required_level, 1), d.id",
+        (p_user_id,),
+    ).fetchall()
+
+    now = datetime.now(timezone.utc)
+    result = []
+    for row in rows:
+        row = dict(row)
+        last_claimed_at = row.pop("last_claimed_at")
+        for column, default in (("required_level", 1), ("cooldown_hours", 24),
+                                ("reward_spirit_stones", 0), ("reward_item_qty", 0)):
+            if row[column] is None:
+                row[column] = default
+        remaining = 0
+        if last_claimed_at:
+            remaining = max(0, math.ceil((_cooldown_end(last_claimed_at, row["cooldown_hours"]) - now).total_seconds()))
+        row["level_ok"] = level >= row["required_level"]
+        row["cooldown_remaining"] = remaining
+        row["eligible"] = row["level_ok"] and remaining == 0
+        result.append(row)
+    return result
+
+
+# ==============================
+# 🌀 阵法
+# ==============================
+
+@sqlite_rpc("activate_array")
+def activate_array(conn, p_user_id: str, p_array_id: int, p_max_active: int, p_max_stacks: int):
+    array = conn.execute("SELECT * FROM arrays WHERE id = ?", (p_array_id,)).fetchone()
+    if not array:
+        raise ValueError("unknown array")
+    duration = timedelta(minutes=array["duration_minutes"] or 0)
+    if duration <= timedelta(0):
+        raise ValueError("invalid duration")
+
+    _debit_spirit_stones(conn, p_user_id, array["spirit_stone_cost"] or 0)
+
+    now = _utc_iso()
+    active = conn.execute(
+        "SELECT count(*) AS n FROM user_buffs WHERE user_id = ? AND array_id <> ? AND expires_at > ?",
+        (p_user_id, p_array_id, now),
+    ).fetchone()["n"]
+    if active >= p_max_active:
+        raise ValueError("too many active arrays")
+
+    # 生效中则续期，已到期则重新开始
+    now_dt = datetime.fromisoformat(now)
+    buff = conn.execute(
+        "SELECT started_at, expires_at FROM user_buffs WHERE user_id = ? AND array_id = ?",
+        (p_user_id, p_array_id),
+    ).fetchone()
+    started_at, expires_at = now, now_dt + duration
+    if buff and datetime.fromisoformat(buff["expires_at"]) > now_dt:
+        started_at = buff["started_at"]
+        expires_at = datetime.fromisoformat(buff["expires_at"]) + duration
+    if expires_at > now_dt + duration * p_max_stacks:
+        raise ValueError("array fully stacked")
+
+    conn.execute(
+        "INSERT INTO user_buffs (user_id, array_id, effect_type, effect_value, started_at, expires_at) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (user_id, array_id) DO UPDATE SET effect_type = excluded.effect_type, "
+        "effect_value = excluded.effect_value, started_at = excluded.started_at, expires_at = excluded.expires_at",
+        (p_user_id, p_array_id, array["effect_type"], array["effect_value"] or 0,
+         started_at, expires_at.isoformat(timespec="milliseconds")),
+    )
+    return dict(conn.execute(
+        "SELECT * FROM user_buffs WHERE user_id = ? AND array_id = ?", (p_user_id, p_array_id)
+    ).fetchone())
+
+
+# ==============================
+# 🗡️ 装备
+# ==============================
+
+def _item_equip_slot(conn, item) -> str:
+    """物品可装备的部位：equip_slot 列优先，炼器图纸的产物默认为 weapon（内部函数）"""
+    # 旧版本地数据库的 items 表可能没有 equip_slot 列
+    slot = dict(item).get("equip_slot")
+    if slot:
+        return slot
+    forged = conn.execute("SELECT 1 FROM forge_blueprints WHERE result_item_id = ? LIMIT 1", (item["id"],)).fetchone()
+    return "weapon" if forged else None
+
+
+@sqlite_rpc("equip_item")
+def equip_item(conn, p_user_id: str, p_item_id: int):
+    item = conn.execute("SELECT * FROM items WHERE id = ?", (p_item_id,)).fetchone()
+    if not item:
+        raise ValueError("unknown item")
+    slot = _item_equip_slot(conn, item)
+    if slot is None:
+        raise ValueError("item not equippable")
+
+    current = conn.execute(
+        "SELECT item_id FROM user_equipment WHERE user_id = ? AND slot = ?", (p_user_id, slot)
+    ).fetchone()
+    previous = current["item_id"] if current else None
+    if previous == p_item_id:
+        raise ValueError("already equipped")
+
+    changes = [{"user_id": p_user_id, "item_id": p_item_id, "delta": -1}]
+    if previous is not None:
+        changes.append({"user_id": p_user_id, "item_id": previous, "delta": 1})
+    _apply_inventory_deltas(conn, changes)
+
+    conn.execute(
+        "INSERT INTO user_equipment (user_id, slot, item_id, equipped_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (user_id, slot) DO UPDATE SET item_id = excluded.item_id, equipped_at = excluded.equipped_at",
+        (p_user_id, slot, p_item_id, _utc_iso()),
+    )
+    return {"slot": slot, "item_id": p_item_id, "previous_item_id": previous}
+
+
+@sqlite_rpc("unequip_item")
+def unequip_item(conn, p_user_id: str, p_slot: str):
+    current = conn.execute(
+        "SELECT item_id FROM user_equipment WHERE user_id = ? AND slot = ?", (p_user_id, p_slot)
+    ).fetchone()
+    if not current:
+        raise ValueError("slot empty")
+    conn.execute("DELETE FROM user_equipment WHERE user_id = ? AND slot = ?", (p_user_id, p_slot))
+    _apply_inventory_deltas(conn, [{"user_id": p_user_id, "item_id": current["item_id"], "delta": 1}])
+    return {"slot": p_slot, "item_id": None, "previous_item_id": current["item_id"]}
+
+
+# ==============================
+# 🧘 修炼进度
+# ==============================
+
+def _apply_exp(conn, target_sql: str, params: List[Any], amount: int) -> List[Dict[str, Any]]:
+    """
+    为一批玩家增加经验，按境界表得出新层数并写入境界、层数与属性成长（内部函数）
+
+    target_sql 为选出 user_id 的子查询；先把每个玩家的新旧层数算进临时表，
+    再各用一条 UPDATE … FROM 写入 users 与 user_cultivation
+    """
+    conn.execute("DROP TABLE IF EXISTS temp._exp_targets")
+    conn.execute(
+        "CREATE TEMP TABLE _exp_targets AS "
+        "SELECT t.user_id, t.new_exp, o.level AS old_level, n.level AS new_level, n.realm, n.stage, "
+        "       n.hp_total - o.hp_total AS d_hp, n.mp_total - o.mp_total AS d_mp, "
+        "       n.attack_total - o.attack_total AS d_attack, n.defense_total - o.defense_total AS d_defense "
+        "  FROM (SELECT uc.user_id, uc.exp + ? AS new_exp, "
+        "               (SELECT max(level) FROM cultivation_levels WHERE cumulative_exp <= uc.exp) AS old_level, "
+        "               (SELECT max(level) FROM cultivation_levels WHERE cumulative_exp <= uc.exp + ?) AS new_level "
+        "          FROM user_cultivation uc "
+        f"        WHERE uc.user_id IN ({target_sql})) t "
+        "  JOIN cultivation_levels o ON o.level = t.old_level "
+        "  JOIN cultivation_levels n ON n.level = t.new_level",
+        [amount, amount, *params],
+    )
+    conn.execute(
+        "UPDATE users SET cultivation_level = t.new_level, realm = t.realm, stage = t.stage, "
+        "       hp = coalesce(users.hp, 0) + t.d_hp, mp = coalesce(users.mp, 0) + t.d_mp, "
+        "       attack = coalesce(users.attack, 0) + t.d_attack, defense = coalesce(users.defense, 0) + t.d_defense "
+        "  FROM _exp_targets t WHERE users.id = t.user_id"
+    )
+    conn.execute(
+        "UPDATE user_cultivation SET exp = t.new_exp, realm = t.realm, stage = t.stage, "
+        "       hp = coalesce(user_cultivation.hp, 0) + t.d_hp, mp = coalesce(user_cultivation.mp, 0) + t.d_mp, "
+        "       attack = coalesce(user_cultivation.attack, 0) + t.d_attack, "
+        "       defense = coalesce(user_cultivation.defense, 0) + t.d_defense, updated_at = ? "
+        "  FROM _exp_targets t WHERE user_cultivation.user_id = t.user_id",
+        (_utc_iso(),),
+    )
+    rows = [dict(row) for row in conn.execute("SELECT user_id, old_level, new_level FROM _exp_targets")]
+    conn.execute("DROP TABLE temp._exp_targets")
+    return rows
+
+
+def _cultivation_progress(conn, uid: str) -> Dict[str, Any]:
+    """玩家当前的境界、层数、本层进度与属性（内部函数）"""
+    row = conn.execute(
+        "SELECT uc.exp, l.level, l.realm, l.stage, uc.exp - l.cumulative_exp AS exp_into_stage, "
+        "       nxt.cumulative_exp - uc.exp AS exp_to_next, nxt.exp_required AS next_exp_required, "
+        "       uc.hp, uc.mp, uc.attack, uc.defense "
+        "  FROM user_cultivation uc "
+        "  JOIN cultivation_levels l "
+        "    ON l.level = (SELECT max(level) FROM cultivation_levels WHERE cumulative_exp <= uc.exp) "
+        "  LEFT JOIN cultivation_levels nxt ON nxt.level = l.level + 1 "
+        " WHERE uc.user_id = ?",
+        (uid,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+@sqlite_rpc("cultivation_progress")
+def cultivation_progress(conn, p_user_id: str):
+    return _cultivation_progress(conn, p_user_id)
+
+
+@sqlite_rpc("increment_exp")
+def increment_exp(conn, p_user_id: str, p_amount: int, p_item_id: int = None):
+    if p_amount is None or p_amount <= 0:
+        raise ValueError("amount must be positive")
+    if p_item_id is not None:
+        _apply_inventory_deltas(conn, [{"user_id": p_user_id, "item_id": p_item_id, "delta": -1}])
+
+    rows = _apply_exp(conn, "?", [p_user_id], p_amount)
+    if not rows:
+        raise ValueError("unknown user")
+    progress = _cultivation_progress(conn, p_user_id)
+    progress["previous_level"] = rows[0]["old_level"]
+    progress["levels_gained"] = rows[0]["new_level"] - rows[0]["old_level"]
+    return progress
+
+
+@sqlite_rpc("grant_exp")
+def grant_exp(conn, p_event_id: str, p_amount: int, p_user_ids: List[str] = None,
+              p_filter: str = None, p_granted_by: str = None):
+    if p_amount <= 0:
+        raise ValueError("amount must be positive")
+
+    existing = conn.execute(
+        "SELECT affected_rows, breakthroughs FROM exp_events WHERE event_id = ?", (p_event_id,)
+    ).fetchone()
+    if existing:
+        return {"event_id": p_event_id, "affected_rows": existing["affected_rows"],
+                "breakthroughs": existing["breakthroughs"], "already_applied": True}
+
+    if p_user_ids is not None:
+        rows = _apply_exp(conn, ",".join("?" for _ in p_user_ids) or "NULL", list(p_user_ids), p_amount)
+    elif p_filter == "all_active":
+        rows = _apply_exp(conn, "SELECT id FROM users WHERE NOT coalesce(is_banned, 0)", [], p_amount)
+    elif p_filter == "all":
+        rows = _apply_exp(conn, "SELECT id FROM users", [], p_amount)
+    else:
+        raise ValueError(f"unknown grant target: {p_filter}")
+
+    breakthroughs = sum(1 for row in rows if row["new_level"] > row["old_level"])
+    conn.execute(
+        "INSERT INTO exp_events (event_id, amount, target, affected_rows, breakthroughs, granted_by) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (p_event_id, p_amount, p_filter or "user_ids", len(rows), breakthroughs, p_granted_by),
+    )
+    return {"event_id": p_event_id, "affected_rows": len(rows),
+            "breakthroughs": breakthroughs, "already_applied": False}
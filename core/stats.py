@@ -0,0 +1,387 @@
+# ==================================================
+# 玩家属性汇总模块
+# 功能：把基础属性（user_cultivation）、装备、宗门、阵法四层加成汇总成每个玩家的一份属性块，
+#      战斗、炼丹 / 炼器、页面显示都读取这份属性块
+#      - 属性块按玩家缓存在进程内，带 version，任一层变化时 version + 1
+#      - 装备：穿戴 / 卸下时只按新旧两件装备的差值更新装备层（不重新查询）
+#      - 宗门、阵法：每次读取时比较宗门类别与阵法修正矩阵（均来自各自的进程级缓存），变化才重算
+#      - 数值调整（物品 attack_bonus、炼器材料加成、宗门加成）后可一次重算所有已缓存玩家：
+#        批量查询基础属性与装备，所有玩家的属性块用一次矩阵运算得出
+# 计算方式：属性 = (基础 + 各层固定值加成之和) × (1 + 各层百分比加成之和)
+# 装备加成：物品 attack_bonus 为固定值加成；
+#          炼器图纸所用材料在 FORGE_MATERIAL_BONUS 中的系数之和为攻击百分比加成
+# ==================================================
+
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .buffs import FLAT, PCT, STAT_KEYS, aggregate_modifiers, apply_modifiers, get_buff_engine
+from .catalog import get_item_catalog
+from .config import EQUIP_SLOTS, FORGE_MATERIAL_BONUS, SECT_STAT_BONUS, get_supabase_client
+from .database import get_user_sect
+
+# 加成层（基础属性之外）
+LAYERS = ("equipment", "sect", "array")
+
+# 基础属性的列（user_cultivation / users）
+BASE_COLUMNS = ("hp", "mp", "attack", "defense")
+
+# 批量重算时每次查询的玩家数
+BATCH_SIZE = 500
+
+# 服务端错误信息 → 玩家可读的提示
+EQUIP_ERRORS = {
+    "item not equippable": "该物品无法装备",
+    "already equipped": "已经装备了该物品",
+    "insufficient inventory": "背包中没有该物品",
+    "slot empty": "该部位没有装备",
+    "unknown item": "物品不存在",
+}
+
+
+def _zero_layer() -> np.ndarray:
+    return np.zeros((2, len(STAT_KEYS)))
+
+
+def _base_vector(row: Dict[str, Any]) -> np.ndarray:
+    """基础属性行 → 属性向量（炼制成功率的基础值为 0）（内部函数）"""
+    return np.array([float(row.get(col) or 0) for col in BASE_COLUMNS] + [0.0])
+
+
+def sect_modifiers(category: Optional[str]) -> np.ndarray:
+    """宗门类别的修正矩阵"""
+    bonus = SECT_STAT_BONUS.get(category) or {}
+    return aggregate_modifiers([{"effect_type": k, "effect_value": v} for k, v in bonus.items()])
+
+
+class StatEngine:
+    """
+    玩家属性块缓存
+
+    _entries[user_id] = {
+        "base": 基础属性向量, "equipment": {部位: item_id},
+        "layers": {层名: 修正矩阵}, "sect_category": 宗门类别, "array_ref": 阵法修正矩阵（用于比较是否变化）,
+        "block": 属性向量, "version": 版本号,
+    }
+    _item_bonus 为物品 → 装备修正矩阵的查表缓存（炼器图纸只查询一次）。
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._item_bonus: Dict[Any, np.ndarray] = {}
+        self._forged: Optional[Dict[Any, List[Any]]] = None
+
+        self.loads = 0
+        self.recomputes = 0
+        self.incremental = 0
+        self.batch_recomputes = 0
+
+    @property
+    def client(self):
+        return self._client or get_supabase_client()
+
+    # ==============================
+    # 🗡️ 装备加成
+    # ==============================
+
+    def _forged_materials(self) -> Dict[Any, List[Any]]:
+        """炼器产物 → 所用材料 ID（内部函数）"""
+        if self._forged is None:
+            rows = self.client.table("forge_blueprints")\
+                .select("result_item_id, material_1_id, material_2_id")\
+                .execute().data or []
+            forged: Dict[Any, List[Any]] = {}
+            for row in rows:
+                if row.get("result_item_id") is not None:
+                    forged.setdefault(row["result_item_id"], [row.get("material_1_id"), row.get("material_2_id")])
+            self._forged = forged
+        return self._forged
+
+    def equip_slot(self, item: Optional[Dict[str, Any]]) -> Optional[str]:
+        """物品可装备的部位（与服务端 item_equip_slot 规则相同）"""
+        if not item:
+            return None
+        if item.get("equip_slot"):
+            return item["equip_slot"]
+        return "weapon" if item.get("id") in self._forged_materials() else None
+
+    def item_bonus(self, item_id) -> np.ndarray:
+        """一件装备的修正矩阵（查表，首次计算后缓存）"""
+        bonus = self._item_bonus.get(item_id)
+        if bonus is not None:
+            return bonus
+        catalog = get_item_catalog()
+        item = catalog.get_by_id(item_id) or {}
+        bonus = _zero_layer()
+        bonus[FLAT, STAT_KEYS.index("attack")] = float(item.get("attack_bonus") or 0)
+        for material_id in self._forged_materials().get(item_id, []):
+            material = catalog.get_by_id(material_id) if material_id is not None else None
+            if material:
+                bonus[PCT, STAT_KEYS.index("attack")] += FORGE_MATERIAL_BONUS.get(material["name"], 0.0)
+        bonus.flags.writeable = False
+        self._item_bonus[item_id] = bonus
+        return bonus
+
+    def _equipment_layer(self, equipment: Dict[str, Any]) -> np.ndarray:
+        """装备层：各部位装备的修正矩阵之和（内部函数）"""
+        layer = _zero_layer()
+        for item_id in equipment.values():
+            layer += self.item_bonus(item_id)
+        return layer
+
+    # ==============================
+    # 📥 加载
+    # ==============================
+
+    def _fetch_base(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量读取基础属性（内部函数）"""
+        rows = self.client.table("user_cultivation")\
+            .select("user_id, " + ", ".join(BASE_COLUMNS))\
+            .in_("user_id", user_ids)\
+            .execute().data or []
+        return {row["user_id"]: row for row in rows}
+
+    def _fetch_equipment(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量读取装备（内部函数）"""
+        rows = self.client.table("user_equipment")\
+            .select("user_id, slot, item_id")\
+            .in_("user_id", user_ids)\
+            .execute().data or []
+        equipment: Dict[str, Dict[str, Any]] = {user_id: {} for user_id in user_ids}
+        for row in rows:
+            equipment[row["user_id"]][row["slot"]] = row["item_id"]
+        return equipment
+
+    def _load(self, user) -> Dict[str, Any]:
+        """首次访问时加载玩家的基础属性与装备（内部函数）"""
+        user_id = str(user.id)
+        base = self._fetch_base([user_id]).get(user_id)
+        if base is None:
+            # 没有修炼记录（如虚拟管理员）时使用会话中的属性
+            base = {col: getattr(user, col, 0) for col in BASE_COLUMNS}
+        equipment = self._fetch_equipment([user_id])[user_id]
+        layers = {name: _zero_layer() for name in LAYERS}
+        layers["equipment"] = self._equipment_layer(equipment)
+        entry = {
+            "base": _base_vector(base),
+            "equipment": equipment,
+            "layers": layers,
+            "sect_category": None,
+            "array_ref": None,
+            "block": None,
+            "version": 0,
+        }
+        self.loads += 1
+        return entry
+
+    # ==============================
+    # 🧮 计算
+    # ==============================
+
+    def _recompute(self, entry: Dict[str, Any]):
+        """由各层重新计算属性块（调用方持有锁）（内部函数）"""
+        modifiers = sum(entry["layers"].values())
+        entry["block"] = apply_modifiers(entry["base"], modifiers)
+        entry["version"] += 1
+        self.recomputes += 1
+
+    @staticmethod
+    def _refresh_cached_layers(entry: Dict[str, Any], category: Optional[str], array: np.ndarray) -> bool:
+        """比较宗门类别与阵法修正矩阵，有变化时更新对应层，返回是否变化（调用方持有锁）（内部函数）"""
+        changed = entry["block"] is None
+        if category != entry["sect_category"] or changed:
+            entry["sect_category"] = category
+            entry["layers"]["sect"] = sect_modifiers(category)
+            changed = True
+        if array is not entry["array_ref"]:
+            entry["array_ref"] = array
+            entry["layers"]["array"] = array
+            changed = True
+        return changed
+
+    def get(self, user) -> Dict[str, Any]:
+        """
+        玩家的属性块
+
+        参数:
+            user: 会话中的 User
+
+        返回:
+            {"hp", "mp", "attack", "defense"}（整数）、{"craft_success"}（成功率加成，小数）、
+            {"version"} 与 {"base": 基础属性}
+        """
+        user_id = str(user.id)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            loaded = self._load(user)
+            with self._lock:
+                entry = self._entries.setdefault(user_id, loaded)
+        # 宗门与阵法都读自各自的进程级缓存，未变化时不产生查询
+        sect = get_user_sect(user_id)
+        array = get_buff_engine().modifiers(user_id)
+        with self._lock:
+            if self._refresh_cached_layers(entry, sect.get("category") if sect else None, array):
+                self._recompute(entry)
+            return self._to_dict(entry)
+
+    @staticmethod
+    def _to_dict(entry: Dict[str, Any]) -> Dict[str, Any]:
+        block, base = entry["block"], entry["base"]
+        stats: Dict[str, Any] = {key: int(block[i]) for i, key in enumerate(BASE_COLUMNS)}
+        stats["craft_success"] = float(block[STAT_KEYS.index("craft_success")])
+        stats["version"] = entry["version"]
+        stats["base"] = {key: int(base[i]) for i, key in enumerate(BASE_COLUMNS)}
+        return stats
+
+    def equipment(self, user) -> Dict[str, Any]:
+        """玩家当前的装备 {部位: item_id}"""
+        self.get(user)
+        with self._lock:
+            return dict(self._entries[str(user.id)]["equipment"])
+
+    def apply_equipment_change(self, user_id: str, change: Dict[str, Any]):
+        """
+        按穿戴 / 卸下的结果增量更新装备层：加上新装备、减去换下的装备
+
+        参数:
+            user_id: 用户 ID
+            change: equip_item / unequip_item 的返回值 {"slot", "item_id", "previous_item_id"}
+        """
+        with self._lock:
+            entry = self._entries.get(str(user_id))
+            if entry is None:
+                return
+            layer = entry["layers"]["equipment"].copy()
+            if change.get("previous_item_id") is not None:
+                layer -= self.item_bonus(change["previous_item_id"])
+            if change.get("item_id") is not None:
+                layer += self.item_bonus(change["item_id"])
+                entry["equipment"][change["slot"]] = change["item_id"]
+            else:
+                entry["equipment"].pop(change["slot"], None)
+            entry["layers"]["equipment"] = layer
+            self._recompute(entry)
+            self.incremental += 1
+
+    def invalidate(self, user_id: str):
+        """丢弃玩家的属性块（基础属性变化后调用），下次访问时重新加载"""
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def recompute_all(self, reload_items: bool = True) -> int:
+        """
+        数值调整后重算所有已缓存玩家：清空装备查表，批量重新读取基础属性与装备，
+        所有玩家的属性块用一次矩阵运算得出
+
+        参数:
+            reload_items: 是否清空物品图鉴与装备查表（只有基础属性变化时传 False，如经验活动后）
+
+        返回:
+            重算的玩家数
+        """
+        if reload_items:
+            get_item_catalog().invalidate()
+        with self._lock:
+            if reload_items:
+                self._item_bonus = {}
+                self._forged = None
+            user_ids = list(self._entries)
+        if not user_ids:
+            return 0
+
+        base_rows: Dict[str, Dict[str, Any]] = {}
+        equipment: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            chunk = user_ids[start:start + BATCH_SIZE]
+            base_rows.update(self._fetch_base(chunk))
+            equipment.update(self._fetch_equipment(chunk))
+
+        with self._lock:
+            entries = [(uid, self._entries[uid]) for uid in user_ids if uid in self._entries]
+            for user_id, entry in entries:
+                if user_id in base_rows:
+                    entry["base"] = _base_vector(base_rows[user_id])
+                entry["equipment"] = equipment.get(user_id, {})
+                entry["layers"]["equipment"] = self._equipment_layer(entry["equipment"])
+                entry["layers"]["sect"] = sect_modifiers(entry["sect_category"])
+
+            bases = np.stack([entry["base"] for _, entry in entries])
+            modifiers = np.stack([sum(entry["layers"].values()) for _, entry in entries])
+            blocks = apply_modifiers(bases, modifiers)
+            for (_, entry), block in zip(entries, blocks):
+                entry["block"] = block
+                entry["version"] += 1
+            self.batch_recomputes += 1
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        return {
+            "users": len(self._entries),
+            "item_bonus_entries": len(self._item_bonus),
+            "loads": self.loads,
+            "recomputes": self.recomputes,
+            "incremental": self.incremental,
+            "batch_recomputes": self.batch_recomputes,
+        }
+
+
+_engine: Optional[StatEngine] = None
+_engine_lock = threading.Lock()
+
+def get_stat_engine() -> StatEngine:
+    """获取进程级属性汇总引擎"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = StatEngine()
+    return _engine
+
+
+# ==============================
+# 📡 对外接口
+# ==============================
+
+def get_stat_block(user) -> Dict[str, Any]:
+    """玩家的属性块（基础 + 装备 + 宗门 + 阵法），见 StatEngine.get"""
+    return get_stat_engine().get(user)
+
+
+def equip_item(user_id: str, item_id: int) -> Dict[str, Any]:
+    """
+    穿戴装备：从背包取出 1 件，同部位的旧装备放回背包，全部原子完成
+
+    返回:
+        {"slot", "item_id", "previous_item_id"}
+    """
+    change = get_supabase_client().rpc("equip_item", {
+        "p_user_id": str(user_id),
+        "p_item_id": int(item_id),
+    }).execute().data
+    get_stat_engine().apply_equipment_change(user_id, change)
+    return change
+
+
+def unequip_item(user_id: str, slot: str) -> Dict[str, Any]:
+    """
+    卸下装备放回背包
+
+    返回:
+        {"slot", "item_id": None, "previous_item_id"}
+    """
+    change = get_supabase_client().rpc("unequip_item", {
+        "p_user_id": str(user_id),
+        "p_slot": slot,
+    }).execute().data
+    get_stat_engine().apply_equipment_change(user_id, change)
+    return change
+
+
+def slot_label(slot: Optional[str]) -> str:
+    """部位名称"""
+    return EQUIP_SLOTS.get(slot, slot or "未知")
@@ -0,0 +1,158 @@
+# ==================================================
+# 玩家交易模块
+# 功能：两名玩家直接交换物品与灵石（托管 + 两阶段确认）
+# 流程：
+#   1. 发起交易（open_player_trade）
+#   2. 双方各自设置报价：物品与灵石立即转入托管，背包里只剩未报价的部分
+#      （只更新报价涉及的 (user_id, item_id) 背包行，炼丹 / 炼器用到的其他物品不受影响）
+#   3. 双方按当前 version 确认；任一方修改报价会使 version + 1 并清空双方确认，
+#      第二个确认在同一事务内完成结算
+#   4. 取消或过期时托管全部退回
+# ==================================================
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import PLAYER_TRADE_EXPIRE_INTERVAL_SECONDS, PLAYER_TRADE_TTL_SECONDS, get_supabase_client
+
+# 服务端错误信息 → 玩家可读的提示
+TRADE_ERRORS = {
+    "cannot trade with yourself": "不能和自己交易",
+    "unknown user": "对方道号不存在",
+    "unknown trade": "交易不存在",
+    "trade closed": "交易已结束或已过期",
+    "trade changed": "报价已被修改，请确认最新报价后再确认",
+    "insufficient spirit stones": "灵石不足",
+    "insufficient inventory": "背包中该物品数量不足",
+    "quantity must be positive": "数量必须大于 0",
+}
+
+# 交易状态显示文字
+TRADE_STATUS_LABELS = {"open": "进行中", "settled": "已成交", "cancelled": "已取消", "expired": "已过期"}
+
+# 每次清理的过期交易上限
+EXPIRE_BATCH_SIZE = 100
+
+
+def open_trade(initiator_id: str, counterparty_id: str) -> Dict[str, Any]:
+    """
+    发起交易
+
+    参数:
+        initiator_id: 发起方用户 ID
+        counterparty_id: 对方用户 ID
+
+    返回:
+        交易行
+    """
+    return get_supabase_client().rpc("open_player_trade", {
+        "p_initiator_id": str(initiator_id),
+        "p_counterparty_id": str(counterparty_id),
+        "p_ttl_seconds": PLAYER_TRADE_TTL_SECONDS,
+    }).execute().data
+
+
+def set_offer(trade_id: int, user_id: str, items: Dict[int, int], spirit_stones: int) -> Dict[str, Any]:
+    """
+    设置己方报价（整体替换旧报价）
+
+    参数:
+        trade_id: 交易 ID
+        user_id: 报价方用户 ID
+        items: {item_id: 数量}
+        spirit_stones: 报价灵石
+
+    返回:
+        交易行（version 已 + 1，双方确认已清空）
+    """
+    return get_supabase_client().rpc("set_trade_offer", {
+        "p_trade_id": int(trade_id),
+        "p_user_id": str(user_id),
+        "p_items": [{"item_id": int(item_id), "quantity": int(qty)} for item_id, qty in items.items() if qty > 0],
+        "p_spirit_stones": int(spirit_stones),
+    }).execute().data
+
+
+def confirm_trade(trade_id: int, user_id: str, version: int) -> Dict[str, Any]:
+    """
+    确认交易（只确认指定 version 的报价）
+
+    返回:
+        交易行，双方都已确认时 status 为 "settled"
+    """
+    return get_supabase_client().rpc("confirm_player_trade", {
+        "p_trade_id": int(trade_id),
+        "p_user_id": str(user_id),
+        "p_version": int(version),
+    }).execute().data
+
+
+def cancel_trade(trade_id: int, user_id: str) -> Dict[str, Any]:
+    """取消交易，托管退回双方"""
+    return get_supabase_client().rpc("cancel_player_trade", {
+        "p_trade_id": int(trade_id),
+        "p_user_id": str(user_id),
+    }).execute().data
+
+
+def get_trade_items(trade_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    批量读取交易中托管的物品
+
+    返回:
+        {trade_id: [{user_id, item_id, quantity}, ...]}
+    """
+    if not trade_ids:
+        return {}
+    rows = get_supabase_client().table("player_trade_items")\
+        .select("trade_id, user_id, item_id, quantity")\
+        .in_("trade_id", list(trade_ids))\
+        .execute().data or []
+    grouped: Dict[int, List[Dict[str, Any]]] = {trade_id: [] for trade_id in trade_ids}
+    for row in rows:
+        grouped[row["trade_id"]].append(row)
+    return grouped
+
+
+def get_user_trades(user_id: str, status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    读取用户参与的交易（最新在前）
+
+    参数:
+        user_id: 用户 ID
+        status: 只返回该状态的交易（默认全部）
+        limit: 最多条数
+    """
+    query = get_supabase_client().table("player_trades")\
+        .select("*")\
+        .or_(f"initiator_id.eq.{user_id},counterparty_id.eq.{user_id}")
+    if status:
+        query = query.eq("status", status)
+    return query.order("created_at", desc=True).limit(limit).execute().data or []
+
+
+# ==============================
+# ⏰ 过期清理
+# ==============================
+
+_last_expire_at = 0.0
+_expire_lock = threading.Lock()
+
+def expire_stale_trades(force: bool = False) -> int:
+    """
+    退回已过期交易的托管（每个进程最多每 PLAYER_TRADE_EXPIRE_INTERVAL_SECONDS 秒执行一次）
+
+    参数:
+        force: 忽略间隔立即执行
+
+    返回:
+        本次过期的交易数
+    """
+    global _last_expire_at
+    with _expire_lock:
+        now = time.time()
+        if not force and now - _last_expire_at < PLAYER_TRADE_EXPIRE_INTERVAL_SECONDS:
+            return 0
+        _last_expire_at = now
+    return get_supabase_client().rpc("expire_player_trades", {"p_limit": EXPIRE_BATCH_SIZE}).execute().data or 0
@@ -0,0 +1,52 @@
+-- ==================================================
+-- 批量合成（炼丹 / 炼器 ×N）
+-- 一次调用内完成：扣除灵石、扣除材料、发放产物
+-- p_changes: [{"item_id": 1, "delta": -20}, {"item_id": 9, "delta": 7}, ...]
+-- ==================================================
+
+create or replace function craft_batch(p_user_id uuid, p_stone_cost bigint, p_changes jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    ch record;
+begin
+    -- 扣除灵石（不足则整体回滚）
+    update users
+       set spirit_stones = spirit_stones - p_stone_cost
+     where id = p_user_id
+       and spirit_stones >= p_stone_cost;
+    if not found then
+        raise exception 'insufficient spirit stones';
+    end if;
+
+    for ch in
+        select (e->>'item_id')::bigint as item_id, (e->>'delta')::bigint as delta
+          from jsonb_array_elements(p_changes) as e
+    loop
+        if ch.delta < 0 then
+            update user_inventory
+               set quantity = quantity + ch.delta
+             where user_id = p_user_id
+               and item_id = ch.item_id
+               and quantity >= -ch.delta;
+            if not found then
+                raise exception 'insufficient item %', ch.item_id;
+            end if;
+        elsif ch.delta > 0 then
+            update user_inventory
+               set quantity = quantity + ch.delta
+             where user_id = p_user_id
+               and item_id = ch.item_id;
+            if not found then
+                insert into user_inventory (user_id, item_id, quantity)
+                values (p_user_id, ch.item_id, ch.delta);
+            end if;
+        end if;
+    end loop;
+
+    delete from user_inventory where user_id = p_user_id and quantity <= 0;
+
+    return jsonb_build_object('spirit_stones_spent', p_stone_cost);
+end;
+$$;
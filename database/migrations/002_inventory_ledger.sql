@@ -0,0 +1,106 @@
+-- ==================================================
+-- 背包账本
+-- 所有背包增减都通过 apply_inventory_deltas 一次性原子写入
+-- p_changes: [{"user_id": "...", "item_id": 1, "delta": -3}, ...]
+-- ==================================================
+
+-- 合并历史重复行，再建立 (user_id, item_id) 唯一键
+with dup as (
+    select user_id, item_id, min(id) as keep_id, sum(quantity) as total
+      from user_inventory
+     where item_id is not null
+     group by user_id, item_id
+    having count(*) > 1
+)
+update user_inventory ui
+   set quantity = dup.total
+  from dup
+ where ui.id = dup.keep_id;
+
+delete from user_inventory ui
+ using user_inventory other
+ where ui.user_id = other.user_id
+   and ui.item_id = other.item_id
+   and ui.id > other.id;
+
+create unique index if not exists user_inventory_user_item_key
+    on user_inventory (user_id, item_id);
+
+-- 同一 (user_id, item_id) 的多条变动先合并
+create or replace function _aggregate_inventory_deltas(p_changes jsonb)
+returns table (user_id uuid, item_id bigint, delta bigint)
+language sql
+immutable
+as $$
+    select x.user_id, x.item_id, sum(x.delta)::bigint
+      from jsonb_to_recordset(p_changes) as x(user_id uuid, item_id bigint, delta bigint)
+     group by x.user_id, x.item_id
+    having sum(x.delta) <> 0;
+$$;
+
+create or replace function apply_inventory_deltas(p_changes jsonb)
+returns void
+language plpgsql
+as $$
+declare
+    expected int;
+    applied int;
+begin
+    -- 扣减：数量不足的行不会被更新，比对行数即可判断
+    with d as (
+        select * from _aggregate_inventory_deltas(p_changes)
+    ), upd as (
+        update user_inventory ui
+           set quantity = ui.quantity + d.delta
+          from d
+         where ui.user_id = d.user_id
+           and ui.item_id = d.item_id
+           and d.delta < 0
+           and ui.quantity >= -d.delta
+        returning 1
+    )
+    select (select count(*) from d where d.delta < 0), (select count(*) from upd)
+      into expected, applied;
+
+    if applied < expected then
+        raise exception 'insufficient inventory';
+    end if;
+
+    -- 增加：依赖唯一键做 upsert 累加
+    insert into user_inventory (user_id, item_id, quantity)
+    select d.user_id, d.item_id, d.delta
+      from _aggregate_inventory_deltas(p_changes) as d
+     where d.delta > 0
+    on conflict (user_id, item_id)
+    do update set quantity = user_inventory.quantity + excluded.quantity;
+
+    delete from user_inventory ui
+     using _aggregate_inventory_deltas(p_changes) as d
+     where ui.user_id = d.user_id
+       and ui.item_id = d.item_id
+       and ui.quantity <= 0;
+end;
+$$;
+
+-- 批量合成改为复用背包账本
+create or replace function craft_batch(p_user_id uuid, p_stone_cost bigint, p_changes jsonb)
+returns jsonb
+language plpgsql
+as $$
+begin
+    update users
+       set spirit_stones = spirit_stones - p_stone_cost
+     where id = p_user_id
+       and spirit_stones >= p_stone_cost;
+    if not found then
+        raise exception 'insufficient spirit stones';
+    end if;
+
+    perform apply_inventory_deltas((
+        select coalesce(jsonb_agg(e || jsonb_build_object('user_id', p_user_id)), '[]'::jsonb)
+          from jsonb_array_elements(p_changes) as e
+    ));
+
+    return jsonb_build_object('spirit_stones_spent', p_stone_cost);
+end;
+$$;
@@ -0,0 +1,56 @@
+-- ==================================================
+-- 藏宝阁商品流
+-- 系统商品与玩家上架合并为一个视图，支持服务端分类过滤、
+-- 价格 / 上架时间排序和游标分页（feed_id 作为唯一的次级排序键）
+-- ==================================================
+
+create index if not exists items_system_category_idx
+    on items (category, price) where is_system;
+
+create index if not exists shop_listings_active_price_idx
+    on shop_listings (price, id) where is_active;
+
+create index if not exists shop_listings_active_created_idx
+    on shop_listings (created_at desc, id) where is_active;
+
+create index if not exists shop_listings_item_uuid_idx
+    on shop_listings (item_uuid);
+
+create or replace view shop_feed as
+select 's-' || i.uuid_id::text          as feed_id,
+       'system'                          as entry_type,
+       null::bigint                      as listing_id,
+       i.uuid_id                         as item_uuid,
+       i.name,
+       i.category,
+       i.effect,
+       i.price,
+       i.stock                           as quantity,
+       null::uuid                        as seller_id,
+       'epoch'::timestamptz              as listed_at
+  from items i
+ where i.is_system
+union all
+select 'p-' || lpad(l.id::text, 19, '0') as feed_id,
+       'player'                          as entry_type,
+       l.id                              as listing_id,
+       l.item_uuid,
+       i.name,
+       i.category,
+       i.effect,
+       l.price,
+       l.quantity,
+       l.seller_id,
+       coalesce(l.created_at, 'epoch'::timestamptz) as listed_at
+  from shop_listings l
+  join items i on i.uuid_id = l.item_uuid
+ where l.is_active;
+
+-- 各分类商品数量（一次聚合查询）
+create or replace function shop_feed_category_counts()
+returns table (category text, entries bigint)
+language sql
+stable
+as $$
+    select category, count(*) from shop_feed group by category order by category;
+$$;
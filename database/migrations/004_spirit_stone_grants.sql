@@ -0,0 +1,63 @@
+-- ==================================================
+-- 批量发放灵石
+-- 一条集合语句完成发放；grant_id 保证重复提交（超时重试）只生效一次
+-- p_user_ids 与 p_filter 二选一：
+--   p_filter = 'all_active' → 全部未封禁用户
+--   p_filter = 'all'        → 全部用户
+-- ==================================================
+
+create table if not exists spirit_stone_grants (
+    grant_id      uuid primary key,
+    amount        bigint not null,
+    target        text not null,
+    affected_rows integer not null default 0,
+    granted_by    uuid,
+    created_at    timestamptz not null default now()
+);
+
+create or replace function grant_spirit_stones(
+    p_grant_id uuid,
+    p_amount bigint,
+    p_user_ids uuid[] default null,
+    p_filter text default null,
+    p_granted_by uuid default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    affected integer;
+begin
+    if p_amount <= 0 then
+        raise exception 'amount must be positive';
+    end if;
+
+    -- 并发重复提交时第二个事务会在这里等待第一个提交，然后走已发放分支
+    insert into spirit_stone_grants (grant_id, amount, target, granted_by)
+    values (p_grant_id, p_amount, coalesce(p_filter, 'user_ids'), p_granted_by)
+    on conflict (grant_id) do nothing;
+
+    if not found then
+        return (
+            select jsonb_build_object('grant_id', grant_id, 'affected_rows', affected_rows, 'already_applied', true)
+              from spirit_stone_grants
+             where grant_id = p_grant_id
+        );
+    end if;
+
+    if p_user_ids is not null then
+        update users set spirit_stones = spirit_stones + p_amount where id = any(p_user_ids);
+    elsif p_filter = 'all_active' then
+        update users set spirit_stones = spirit_stones + p_amount where not coalesce(is_banned, false);
+    elsif p_filter = 'all' then
+        update users set spirit_stones = spirit_stones + p_amount;
+    else
+        raise exception 'unknown grant target: %', p_filter;
+    end if;
+    get diagnostics affected = row_count;
+
+    update spirit_stone_grants set affected_rows = affected where grant_id = p_grant_id;
+
+    return jsonb_build_object('grant_id', p_grant_id, 'affected_rows', affected, 'already_applied', false);
+end;
+$$;
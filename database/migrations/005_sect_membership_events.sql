@@ -0,0 +1,58 @@
+-- ==================================================
+-- 宗门变更流
+-- sect_members / sects 的每次写入都追加一条事件，
+-- 应用进程按 id 增量拉取，使「用户 → 宗门」缓存失效（见 core/sect_cache.py）
+--   user_id 非空 → 该用户的宗门归属变化（加入 / 退出 / 被踢 / 职位变化）
+--   user_id 为空 → 宗门本身变化（信息修改 / 解散），失效其全部成员
+-- ==================================================
+
+create table if not exists sect_membership_events (
+    id         bigserial primary key,
+    user_id    uuid,
+    sect_id    bigint,
+    action     text not null,
+    created_at timestamptz not null default now()
+);
+
+-- 单条嵌入查询 sect_members.select("sect_id, sects(*)") 依赖 sect_members.sect_id → sects.id 外键
+create index if not exists sect_members_user_idx on sect_members (user_id);
+
+create or replace function log_sect_member_change()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'DELETE' then
+        insert into sect_membership_events (user_id, sect_id, action) values (old.user_id, old.sect_id, 'leave');
+        return old;
+    end if;
+
+    if tg_op = 'UPDATE' and old.user_id is distinct from new.user_id then
+        insert into sect_membership_events (user_id, sect_id, action) values (old.user_id, old.sect_id, 'leave');
+    end if;
+    insert into sect_membership_events (user_id, sect_id, action)
+    values (new.user_id, new.sect_id, lower(tg_op));
+    return new;
+end;
+$$;
+
+drop trigger if exists sect_members_change_feed on sect_members;
+create trigger sect_members_change_feed
+after insert or update or delete on sect_members
+for each row execute function log_sect_member_change();
+
+create or replace function log_sect_change()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into sect_membership_events (user_id, sect_id, action)
+    values (null, old.id, case when tg_op = 'DELETE' then 'disband' else 'update' end);
+    return coalesce(new, old);
+end;
+$$;
+
+drop trigger if exists sects_change_feed on sects;
+create trigger sects_change_feed
+after update or delete on sects
+for each row execute function log_sect_change();
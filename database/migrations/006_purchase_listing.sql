@@ -0,0 +1,122 @@
+-- ==================================================
+-- 藏宝阁购买
+-- purchase_listing 在一个事务内完成：扣库存 → 扣买家灵石 → 给卖家加灵石
+-- → 写入买家背包 → 记录成交；任一步失败整体回滚
+--   p_listing_id 非空 → 购买玩家摊位（卖完自动下架）
+--   p_item_uuid  非空 → 购买系统商品（stock = -1 表示不限量）
+-- 并发：库存用带条件的 UPDATE 扣减，抢最后一件的两个事务中后到者在行锁上等待，
+--       前者提交后条件重新求值失败，返回「库存不足」而不会超卖
+-- ==================================================
+
+create table if not exists market_trades (
+    id          bigserial primary key,
+    listing_id  bigint,
+    item_id     bigint not null,
+    item_uuid   uuid not null,
+    buyer_id    uuid not null,
+    seller_id   uuid,
+    quantity    integer not null,
+    unit_price  bigint not null,
+    total_price bigint not null,
+    created_at  timestamptz not null default now()
+);
+create index if not exists market_trades_item_time_idx on market_trades (item_id, created_at desc);
+create index if not exists market_trades_buyer_idx on market_trades (buyer_id, created_at desc);
+
+create or replace function purchase_listing(
+    p_buyer_id uuid,
+    p_quantity integer,
+    p_listing_id bigint default null,
+    p_item_uuid uuid default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_item_id    bigint;
+    v_item_uuid  uuid;
+    v_seller_id  uuid;
+    v_unit_price bigint;
+    v_remaining  integer;
+    v_total      bigint;
+    v_trade_id   bigint;
+begin
+    if p_quantity is null or p_quantity <= 0 then
+        raise exception 'quantity must be positive';
+    end if;
+
+    -- 1. 扣库存（条件更新同时完成加锁和校验）
+    if p_listing_id is not null then
+        update shop_listings l
+           set quantity = l.quantity - p_quantity,
+               is_active = l.quantity - p_quantity > 0
+         where l.id = p_listing_id
+           and l.is_active
+           and l.quantity >= p_quantity
+           and l.seller_id is distinct from p_buyer_id
+        returning l.item_uuid, l.seller_id, l.price, l.quantity
+             into v_item_uuid, v_seller_id, v_unit_price, v_remaining;
+
+        if not found then
+            if exists (select 1 from shop_listings where id = p_listing_id and seller_id = p_buyer_id) then
+                raise exception 'cannot buy own listing';
+            end if;
+            raise exception 'insufficient stock';
+        end if;
+
+        select id into v_item_id from items where uuid_id = v_item_uuid;
+    elsif p_item_uuid is not null then
+        update items i
+           set stock = case when i.stock = -1 then -1 else i.stock - p_quantity end
+         where i.uuid_id = p_item_uuid
+           and i.is_system
+           and (i.stock = -1 or i.stock >= p_quantity)
+        returning i.id, i.uuid_id, i.price, i.stock
+             into v_item_id, v_item_uuid, v_unit_price, v_remaining;
+
+        if not found then
+            raise exception 'insufficient stock';
+        end if;
+    else
+        raise exception 'listing_id or item_uuid is required';
+    end if;
+
+    v_total := v_unit_price * p_quantity;
+
+    -- 2. 灵石转账：先按 id 顺序锁住买卖双方，避免互相购买时死锁
+    perform 1 from users where id in (p_buyer_id, v_seller_id) order by id for update;
+
+    update users
+       set spirit_stones = spirit_stones - v_total
+     where id = p_buyer_id
+       and spirit_stones >= v_total;
+    if not found then
+        raise exception 'insufficient spirit stones';
+    end if;
+
+    if v_seller_id is not null then
+        update users set spirit_stones = spirit_stones + v_total where id = v_seller_id;
+    end if;
+
+    -- 3. 写入买家背包
+    insert into user_inventory (user_id, item_id, item_uuid, quantity)
+    values (p_buyer_id, v_item_id, v_item_uuid, p_quantity)
+    on conflict (user_id, item_id)
+    do update set quantity = user_inventory.quantity + excluded.quantity;
+
+    -- 4. 成交记录
+    insert into market_trades (listing_id, item_id, item_uuid, buyer_id, seller_id, quantity, unit_price, total_price)
+    values (p_listing_id, v_item_id, v_item_uuid, p_buyer_id, v_seller_id, p_quantity, v_unit_price, v_total)
+    returning id into v_trade_id;
+
+    return jsonb_build_object(
+        'trade_id', v_trade_id,
+        'item_id', v_item_id,
+        'quantity', p_quantity,
+        'unit_price', v_unit_price,
+        'total_price', v_total,
+        'remaining', v_remaining,
+        'sold_out', v_remaining = 0
+    );
+end;
+$$;
@@ -0,0 +1,255 @@
+-- ==================================================
+-- 挂单撮合（订单簿）
+-- 撮合在应用进程内存中进行（core/orderbook.py），数据库只负责：
+--   open_market_order   下单：冻结买单灵石 / 卖单物品，写入挂单
+--   settle_market_fills 批量结算成交：按 fill_id 幂等，买家得物品、卖家得灵石、
+--                       买单以更优价格成交时退还差价
+--   cancel_market_order 撤单：退还剩余冻结的灵石 / 物品
+--   claim_order_book    撮合租约：同一时间只有一个进程撮合，settle_market_fills 只接受租约持有者的结算
+--   release_order_book  释放租约（进程退出时）
+-- 租约保存在表中而不是 pg_advisory_lock：经 PostgREST 调用时每个 RPC 是独立事务，会话级锁无法跨请求保持
+-- 进程重启时按 id 顺序读取 status = 'open' 的挂单重建订单簿；
+-- 未来得及结算的成交会在重建时重新撮合出来（冻结仍在，不会丢失或重复）
+-- ==================================================
+
+create table if not exists market_orders (
+    id         bigserial primary key,
+    item_id    bigint not null,
+    item_uuid  uuid not null,
+    user_id    uuid not null,
+    side       text not null check (side in ('buy', 'sell')),
+    price      bigint not null check (price > 0),
+    quantity   integer not null check (quantity > 0),
+    remaining  integer not null check (remaining >= 0),
+    status     text not null default 'open' check (status in ('open', 'filled', 'cancelled')),
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+create index if not exists market_orders_open_idx on market_orders (id) where status = 'open';
+create index if not exists market_orders_user_idx on market_orders (user_id, status);
+
+create table if not exists market_fills (
+    fill_id       uuid primary key,
+    buy_order_id  bigint not null references market_orders (id),
+    sell_order_id bigint not null references market_orders (id),
+    item_id       bigint not null,
+    price         bigint not null,
+    quantity      integer not null,
+    created_at    timestamptz not null default now()
+);
+create index if not exists market_fills_item_time_idx on market_fills (item_id, created_at desc);
+
+create table if not exists order_book_matcher (
+    id         boolean primary key default true check (id),
+    matcher_id uuid not null,
+    expires_at timestamptz not null
+);
+
+create or replace function claim_order_book(p_matcher_id uuid, p_lease_seconds integer)
+returns boolean
+language plpgsql
+as $$
+begin
+    -- 没有持有者、持有者就是自己或租约已过期时取得 / 续期租约
+    insert into order_book_matcher (id, matcher_id, expires_at)
+    values (true, p_matcher_id, now() + make_interval(secs => p_lease_seconds))
+    on conflict (id) do update
+       set matcher_id = excluded.matcher_id, expires_at = excluded.expires_at
+     where order_book_matcher.matcher_id = excluded.matcher_id
+        or order_book_matcher.expires_at < now();
+    return found;
+end;
+$$;
+
+create or replace function release_order_book(p_matcher_id uuid)
+returns void
+language sql
+as $$
+    delete from order_book_matcher where matcher_id = p_matcher_id;
+$$;
+
+create or replace function open_market_order(
+    p_user_id uuid,
+    p_item_uuid uuid,
+    p_side text,
+    p_price bigint,
+    p_quantity integer
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_item_id bigint;
+    v_order   market_orders;
+begin
+    if p_side not in ('buy', 'sell') then
+        raise exception 'invalid side';
+    end if;
+    if p_price is null or p_price <= 0 or p_quantity is null or p_quantity <= 0 then
+        raise exception 'price and quantity must be positive';
+    end if;
+
+    select id into v_item_id from items where uuid_id = p_item_uuid;
+    if not found then
+        raise exception 'unknown item';
+    end if;
+
+    if p_side = 'buy' then
+        update users
+           set spirit_stones = spirit_stones - p_price * p_quantity
+         where id = p_user_id
+           and spirit_stones >= p_price * p_quantity;
+        if not found then
+            raise exception 'insufficient spirit stones';
+        end if;
+    else
+        perform apply_inventory_deltas(jsonb_build_array(
+            jsonb_build_object('user_id', p_user_id, 'item_id', v_item_id, 'delta', -p_quantity)
+        ));
+    end if;
+
+    insert into market_orders (item_id, item_uuid, user_id, side, price, quantity, remaining)
+    values (v_item_id, p_item_uuid, p_user_id, p_side, p_price, p_quantity, p_quantity)
+    returning * into v_order;
+
+    return to_jsonb(v_order);
+end;
+$$;
+
+create or replace function settle_market_fills(p_fills jsonb, p_matcher_id uuid)
+returns integer
+language plpgsql
+as $$
+declare
+    v_applied integer;
+    v_bad     integer;
+begin
+    -- 只接受当前租约持有者的结算（锁住租约行，其他进程接管时等待本批结算完成）
+    perform 1 from order_book_matcher where matcher_id = p_matcher_id for update;
+    if not found then
+        raise exception 'not the active matcher';
+    end if;
+
+    -- 先按 id 顺序锁住涉及的挂单，避免并发结算死锁
+    perform 1
+       from market_orders
+      where id in (
+            select (f ->> 'buy_order_id')::bigint from jsonb_array_elements(p_fills) f
+            union
+            select (f ->> 'sell_order_id')::bigint from jsonb_array_elements(p_fills) f
+      )
+      order by id
+        for update;
+
+    -- 写入成交：已结算过的 fill_id 被跳过（重试同一批次是幂等的）
+    create temporary table _new_fills (
+        buy_order_id  bigint,
+        sell_order_id bigint,
+        item_id       bigint,
+        item_uuid     uuid,
+        price         bigint,
+        quantity      integer,
+        limit_price   bigint,
+        buyer_id      uuid,
+        seller_id     uuid
+    ) on commit drop;
+
+    with ins as (
+        insert into market_fills (fill_id, buy_order_id, sell_order_id, item_id, price, quantity)
+        select x.fill_id, x.buy_order_id, x.sell_order_id, b.item_id, x.price, x.quantity
+          from jsonb_to_recordset(p_fills)
+               as x(fill_id uuid, buy_order_id bigint, sell_order_id bigint, price bigint, quantity integer)
+          join market_orders b on b.id = x.buy_order_id
+        on conflict (fill_id) do nothing
+        returning *
+    )
+    insert into _new_fills
+    select ins.buy_order_id, ins.sell_order_id, ins.item_id, b.item_uuid, ins.price, ins.quantity,
+           b.price, b.user_id, s.user_id
+      from ins
+      join market_orders b on b.id = ins.buy_order_id
+      join market_orders s on s.id = ins.sell_order_id;
+
+    select count(*) into v_applied from _new_fills;
+    if v_applied = 0 then
+        return 0;
+    end if;
+
+    -- 扣减挂单剩余数量
+    with used as (
+        select order_id, sum(quantity) as qty
+          from (select buy_order_id as order_id, quantity from _new_fills
+                union all
+                select sell_order_id, quantity from _new_fills) u
+         group by order_id
+    ), upd as (
+        update market_orders o
+           set remaining = o.remaining - used.qty,
+               status = case when o.remaining - used.qty = 0 then 'filled' else o.status end,
+               updated_at = now()
+          from used
+         where o.id = used.order_id
+           and o.status = 'open'
+           and o.remaining >= used.qty
+        returning 1
+    )
+    select (select count(*) from used) - (select count(*) from upd) into v_bad;
+    if v_bad > 0 then
+        raise exception 'fill exceeds remaining quantity';
+    end if;
+
+    -- 买家得物品
+    perform apply_inventory_deltas((
+        select jsonb_agg(jsonb_build_object('user_id', buyer_id, 'item_id', item_id, 'delta', quantity))
+          from _new_fills
+    ));
+
+    -- 卖家得灵石；买单以低于限价的价格成交时退还差价
+    update users u
+       set spirit_stones = u.spirit_stones + t.amount
+      from (
+            select user_id, sum(amount) as amount
+              from (select seller_id as user_id, price * quantity as amount from _new_fills
+                    union all
+                    select buyer_id, (limit_price - price) * quantity from _new_fills where limit_price > price) c
+             group by user_id
+           ) t
+     where u.id = t.user_id;
+
+    -- 成交同时记入 market_trades，与一口价成交共用一份历史
+    insert into market_trades (item_id, item_uuid, buyer_id, seller_id, quantity, unit_price, total_price)
+    select item_id, item_uuid, buyer_id, seller_id, quantity, price, price * quantity
+      from _new_fills;
+
+    return v_applied;
+end;
+$$;
+
+create or replace function cancel_market_order(p_order_id bigint, p_user_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_order market_orders;
+begin
+    update market_orders
+       set status = 'cancelled', updated_at = now()
+     where id = p_order_id
+       and user_id = p_user_id
+       and status = 'open'
+    returning * into v_order;
+    if not found then
+        raise exception 'order not open';
+    end if;
+
+    if v_order.side = 'buy' then
+        update users set spirit_stones = spirit_stones + v_order.price * v_order.remaining where id = p_user_id;
+    elsif v_order.remaining > 0 then
+        perform apply_inventory_deltas(jsonb_build_array(
+            jsonb_build_object('user_id', p_user_id, 'item_id', v_order.item_id, 'delta', v_order.remaining)
+        ));
+    end if;
+
+    return to_jsonb(v_order);
+end;
+$$;
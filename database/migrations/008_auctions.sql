@@ -0,0 +1,184 @@
+-- ==================================================
+-- 拍卖行
+--   create_auction  卖家发起拍卖：物品从背包托管到拍卖
+--   place_bid       出价：冻结出价灵石并退还上一位最高出价者；
+--                   临近结束时出价会顺延结束时间（防狙击），每次出价 version + 1
+--   settle_auction  结算：到期后把物品交给最高出价者、灵石交给卖家（流拍则退还物品）
+--                   已结算的拍卖重复调用直接返回；未到期返回 status = 'open' 的当前行
+-- 到期扫描由应用进程内的最小堆调度器完成（core/auctions.py），
+-- 堆中元素带 version，出价顺延后的旧元素在出堆时丢弃
+-- ==================================================
+
+create table if not exists auctions (
+    id                bigserial primary key,
+    item_id           bigint not null,
+    item_uuid         uuid not null,
+    seller_id         uuid not null,
+    quantity          integer not null check (quantity > 0),
+    start_price       bigint not null check (start_price > 0),
+    min_increment     bigint not null check (min_increment > 0),
+    current_bid       bigint,
+    current_bidder_id uuid,
+    bid_count         integer not null default 0,
+    ends_at           timestamptz not null,
+    version           integer not null default 0,
+    status            text not null default 'open' check (status in ('open', 'sold', 'unsold')),
+    created_at        timestamptz not null default now(),
+    settled_at        timestamptz
+);
+create index if not exists auctions_open_ends_idx on auctions (ends_at, id) where status = 'open';
+create index if not exists auctions_seller_idx on auctions (seller_id, created_at desc);
+create index if not exists auctions_bidder_idx on auctions (current_bidder_id) where status = 'open';
+
+create table if not exists auction_bids (
+    id         bigserial primary key,
+    auction_id bigint not null references auctions (id),
+    bidder_id  uuid not null,
+    amount     bigint not null,
+    created_at timestamptz not null default now()
+);
+create index if not exists auction_bids_auction_idx on auction_bids (auction_id, id desc);
+
+create or replace function create_auction(
+    p_seller_id uuid,
+    p_item_uuid uuid,
+    p_quantity integer,
+    p_start_price bigint,
+    p_min_increment bigint,
+    p_duration_seconds integer
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_item_id bigint;
+    v_auction auctions;
+begin
+    if p_quantity is null or p_quantity <= 0 or p_start_price is null or p_start_price <= 0
+       or p_min_increment is null or p_min_increment <= 0 then
+        raise exception 'price and quantity must be positive';
+    end if;
+    if p_duration_seconds is null or p_duration_seconds <= 0 then
+        raise exception 'invalid duration';
+    end if;
+
+    select id into v_item_id from items where uuid_id = p_item_uuid;
+    if not found then
+        raise exception 'unknown item';
+    end if;
+
+    -- 物品托管：从卖家背包扣除，结算时交给买家或退还
+    perform apply_inventory_deltas(jsonb_build_array(
+        jsonb_build_object('user_id', p_seller_id, 'item_id', v_item_id, 'delta', -p_quantity)
+    ));
+
+    insert into auctions (item_id, item_uuid, seller_id, quantity, start_price, min_increment, ends_at)
+    values (v_item_id, p_item_uuid, p_seller_id, p_quantity, p_start_price, p_min_increment,
+            now() + make_interval(secs => p_duration_seconds))
+    returning * into v_auction;
+
+    return to_jsonb(v_auction);
+end;
+$$;
+
+create or replace function place_bid(
+    p_auction_id bigint,
+    p_bidder_id uuid,
+    p_amount bigint,
+    p_snipe_window_seconds integer default 60,
+    p_extend_seconds integer default 60
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_auction auctions;
+begin
+    select * into v_auction from auctions where id = p_auction_id for update;
+    if not found or v_auction.status <> 'open' or v_auction.ends_at <= now() then
+        raise exception 'auction closed';
+    end if;
+    if v_auction.seller_id = p_bidder_id then
+        raise exception 'cannot bid on own auction';
+    end if;
+    if p_amount < coalesce(v_auction.current_bid + v_auction.min_increment, v_auction.start_price) then
+        raise exception 'bid too low';
+    end if;
+
+    -- 冻结新出价，退还上一位最高出价者（同一人加价时净扣差额）
+    -- 先按 id 顺序锁住双方，避免两人在两场拍卖中互相加价时死锁
+    perform 1 from users where id in (v_auction.current_bidder_id, p_bidder_id) order by id for update;
+    if v_auction.current_bidder_id is not null then
+        update users set spirit_stones = spirit_stones + v_auction.current_bid
+         where id = v_auction.current_bidder_id;
+    end if;
+    update users set spirit_stones = spirit_stones - p_amount
+     where id = p_bidder_id and spirit_stones >= p_amount;
+    if not found then
+        raise exception 'insufficient spirit stones';
+    end if;
+
+    update auctions
+       set current_bid = p_amount,
+           current_bidder_id = p_bidder_id,
+           bid_count = bid_count + 1,
+           version = version + 1,
+           -- 防狙击：结束前 p_snipe_window_seconds 秒内出价，结束时间顺延到出价后 p_extend_seconds 秒
+           ends_at = case
+               when ends_at - now() < make_interval(secs => p_snipe_window_seconds)
+               then greatest(ends_at, now() + make_interval(secs => p_extend_seconds))
+               else ends_at
+           end
+     where id = p_auction_id
+    returning * into v_auction;
+
+    insert into auction_bids (auction_id, bidder_id, amount) values (p_auction_id, p_bidder_id, p_amount);
+
+    return to_jsonb(v_auction);
+end;
+$$;
+
+create or replace function settle_auction(p_auction_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_auction auctions;
+begin
+    select * into v_auction from auctions where id = p_auction_id for update;
+    if not found then
+        raise exception 'unknown auction';
+    end if;
+    -- 已结算或尚未到期：原样返回，调用方据 status / ends_at 决定是否重新排期
+    if v_auction.status <> 'open' or v_auction.ends_at > now() then
+        return to_jsonb(v_auction);
+    end if;
+
+    if v_auction.current_bidder_id is not null then
+        -- 与 place_bid 相同，按 id 顺序锁住卖家与买家
+        perform 1 from users where id in (v_auction.seller_id, v_auction.current_bidder_id) order by id for update;
+        perform apply_inventory_deltas(jsonb_build_array(
+            jsonb_build_object('user_id', v_auction.current_bidder_id, 'item_id', v_auction.item_id,
+                               'delta', v_auction.quantity)
+        ));
+        update users set spirit_stones = spirit_stones + v_auction.current_bid where id = v_auction.seller_id;
+
+        insert into market_trades (item_id, item_uuid, buyer_id, seller_id, quantity, unit_price, total_price)
+        values (v_auction.item_id, v_auction.item_uuid, v_auction.current_bidder_id, v_auction.seller_id,
+                v_auction.quantity, v_auction.current_bid / v_auction.quantity, v_auction.current_bid);
+    else
+        perform apply_inventory_deltas(jsonb_build_array(
+            jsonb_build_object('user_id', v_auction.seller_id, 'item_id', v_auction.item_id,
+                               'delta', v_auction.quantity)
+        ));
+    end if;
+
+    update auctions
+       set status = case when current_bidder_id is not null then 'sold' else 'unsold' end,
+           settled_at = now()
+     where id = p_auction_id
+    returning * into v_auction;
+
+    return to_jsonb(v_auction);
+end;
+$$;
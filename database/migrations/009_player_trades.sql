@@ -0,0 +1,257 @@
+-- ==================================================
+-- 玩家直接交易（托管 + 两阶段确认）
+--   open_player_trade     发起交易
+--   set_trade_offer       设置 / 修改己方报价：物品与灵石立即从背包 / 余额转入托管，
+--                         旧报价同时退回；任一方修改后 version + 1，双方确认清零
+--   confirm_player_trade  按 version 确认（只确认自己看到的那一版报价）；
+--                         第二个确认在同一事务内完成结算
+--   cancel_player_trade   任一方取消，托管全部退回
+--   expire_player_trades  到期未完成的交易自动退回托管
+-- 托管只在设置报价的瞬间更新涉及的 user_inventory 行（按 (user_id, item_id) 行锁），
+-- 不锁整个背包，炼丹 / 炼器等其他物品的背包操作不受影响
+-- ==================================================
+
+create table if not exists player_trades (
+    id                     bigserial primary key,
+    initiator_id           uuid not null,
+    counterparty_id        uuid not null,
+    initiator_stones       bigint not null default 0 check (initiator_stones >= 0),
+    counterparty_stones    bigint not null default 0 check (counterparty_stones >= 0),
+    initiator_confirmed    boolean not null default false,
+    counterparty_confirmed boolean not null default false,
+    version                integer not null default 0,
+    status                 text not null default 'open'
+                           check (status in ('open', 'settled', 'cancelled', 'expired')),
+    expires_at             timestamptz not null,
+    created_at             timestamptz not null default now(),
+    updated_at             timestamptz not null default now(),
+    check (initiator_id <> counterparty_id)
+);
+create index if not exists player_trades_initiator_idx on player_trades (initiator_id, status);
+create index if not exists player_trades_counterparty_idx on player_trades (counterparty_id, status);
+create index if not exists player_trades_open_expiry_idx on player_trades (expires_at) where status = 'open';
+
+-- 托管中的物品（结算后保留，作为交易记录）
+create table if not exists player_trade_items (
+    trade_id bigint not null references player_trades (id),
+    user_id  uuid not null,
+    item_id  bigint not null,
+    quantity integer not null check (quantity > 0),
+    primary key (trade_id, user_id, item_id)
+);
+
+create or replace function open_player_trade(p_initiator_id uuid, p_counterparty_id uuid, p_ttl_seconds integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_trade player_trades;
+begin
+    if p_initiator_id = p_counterparty_id then
+        raise exception 'cannot trade with yourself';
+    end if;
+    if not exists (select 1 from users where id = p_counterparty_id) then
+        raise exception 'unknown user';
+    end if;
+
+    insert into player_trades (initiator_id, counterparty_id, expires_at)
+    values (p_initiator_id, p_counterparty_id, now() + make_interval(secs => p_ttl_seconds))
+    returning * into v_trade;
+    return to_jsonb(v_trade);
+end;
+$$;
+
+-- 锁定交易行并校验参与者与状态（内部函数）
+create or replace function _lock_player_trade(p_trade_id bigint, p_user_id uuid)
+returns player_trades
+language plpgsql
+as $$
+declare
+    v_trade player_trades;
+begin
+    select * into v_trade from player_trades where id = p_trade_id for update;
+    if not found or p_user_id not in (v_trade.initiator_id, v_trade.counterparty_id) then
+        raise exception 'unknown trade';
+    end if;
+    if v_trade.status <> 'open' or v_trade.expires_at <= now() then
+        raise exception 'trade closed';
+    end if;
+    return v_trade;
+end;
+$$;
+
+-- 把托管退回双方（内部函数）
+create or replace function _refund_player_trade(p_trade player_trades)
+returns void
+language plpgsql
+as $$
+begin
+    perform apply_inventory_deltas((
+        select coalesce(jsonb_agg(jsonb_build_object('user_id', user_id, 'item_id', item_id, 'delta', quantity)),
+                        '[]'::jsonb)
+          from player_trade_items
+         where trade_id = p_trade.id
+    ));
+    delete from player_trade_items where trade_id = p_trade.id;
+
+    update users u
+       set spirit_stones = u.spirit_stones + r.amount
+      from (values (p_trade.initiator_id, p_trade.initiator_stones),
+                   (p_trade.counterparty_id, p_trade.counterparty_stones)) as r(user_id, amount)
+     where u.id = r.user_id
+       and r.amount > 0;
+end;
+$$;
+
+create or replace function set_trade_offer(
+    p_trade_id bigint,
+    p_user_id uuid,
+    p_items jsonb,
+    p_spirit_stones bigint
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_trade     player_trades;
+    v_old_stones bigint;
+begin
+    v_trade := _lock_player_trade(p_trade_id, p_user_id);
+    if p_spirit_stones is null or p_spirit_stones < 0
+       or exists (select 1 from jsonb_to_recordset(p_items) as x(item_id bigint, quantity integer)
+                   where x.quantity is null or x.quantity <= 0) then
+        raise exception 'quantity must be positive';
+    end if;
+
+    -- 物品：旧托管退回、新报价转入托管，合并成一次净变动
+    perform apply_inventory_deltas((
+        select coalesce(jsonb_agg(jsonb_build_object('user_id', p_user_id, 'item_id', item_id, 'delta', delta)),
+                        '[]'::jsonb)
+          from (select item_id, sum(delta) as delta
+                  from (select item_id, quantity::bigint as delta
+                          from player_trade_items
+                         where trade_id = p_trade_id and user_id = p_user_id
+                        union all
+                        select x.item_id, -x.quantity::bigint
+                          from jsonb_to_recordset(p_items) as x(item_id bigint, quantity integer)) d
+                 group by item_id
+                having sum(delta) <> 0) n
+    ));
+    delete from player_trade_items where trade_id = p_trade_id and user_id = p_user_id;
+    insert into player_trade_items (trade_id, user_id, item_id, quantity)
+    select p_trade_id, p_user_id, x.item_id, sum(x.quantity)
+      from jsonb_to_recordset(p_items) as x(item_id bigint, quantity integer)
+     group by x.item_id;
+
+    -- 灵石：只转移差额
+    v_old_stones := case when p_user_id = v_trade.initiator_id
+                         then v_trade.initiator_stones else v_trade.counterparty_stones end;
+    if p_spirit_stones > v_old_stones then
+        update users set spirit_stones = spirit_stones - (p_spirit_stones - v_old_stones)
+         where id = p_user_id and spirit_stones >= p_spirit_stones - v_old_stones;
+        if not found then
+            raise exception 'insufficient spirit stones';
+        end if;
+    elsif p_spirit_stones < v_old_stones then
+        update users set spirit_stones = spirit_stones + (v_old_stones - p_spirit_stones) where id = p_user_id;
+    end if;
+
+    update player_trades
+       set initiator_stones = case when p_user_id = initiator_id then p_spirit_stones else initiator_stones end,
+           counterparty_stones = case when p_user_id = counterparty_id then p_spirit_stones else counterparty_stones end,
+           initiator_confirmed = false,
+           counterparty_confirmed = false,
+           version = version + 1,
+           updated_at = now()
+     where id = p_trade_id
+    returning * into v_trade;
+    return to_jsonb(v_trade);
+end;
+$$;
+
+create or replace function confirm_player_trade(p_trade_id bigint, p_user_id uuid, p_version integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_trade player_trades;
+begin
+    v_trade := _lock_player_trade(p_trade_id, p_user_id);
+    if v_trade.version <> p_version then
+        raise exception 'trade changed';
+    end if;
+
+    update player_trades
+       set initiator_confirmed = initiator_confirmed or p_user_id = initiator_id,
+           counterparty_confirmed = counterparty_confirmed or p_user_id = counterparty_id,
+           updated_at = now()
+     where id = p_trade_id
+    returning * into v_trade;
+
+    if v_trade.initiator_confirmed and v_trade.counterparty_confirmed then
+        -- 第二阶段：托管物品交给对方，托管灵石交给对方
+        perform apply_inventory_deltas((
+            select coalesce(jsonb_agg(jsonb_build_object(
+                       'user_id', case when user_id = v_trade.initiator_id
+                                       then v_trade.counterparty_id else v_trade.initiator_id end,
+                       'item_id', item_id,
+                       'delta', quantity)), '[]'::jsonb)
+              from player_trade_items
+             where trade_id = p_trade_id
+        ));
+        -- 按 id 顺序锁住双方，避免与其他同时涉及这两名玩家的结算交叉加锁而死锁
+        perform 1 from users where id in (v_trade.initiator_id, v_trade.counterparty_id) order by id for update;
+        update users u
+           set spirit_stones = u.spirit_stones + r.amount
+          from (values (v_trade.counterparty_id, v_trade.initiator_stones),
+                       (v_trade.initiator_id, v_trade.counterparty_stones)) as r(user_id, amount)
+         where u.id = r.user_id
+           and r.amount > 0;
+
+        update player_trades set status = 'settled', updated_at = now()
+         where id = p_trade_id
+        returning * into v_trade;
+    end if;
+    return to_jsonb(v_trade);
+end;
+$$;
+
+create or replace function cancel_player_trade(p_trade_id bigint, p_user_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_trade player_trades;
+begin
+    v_trade := _lock_player_trade(p_trade_id, p_user_id);
+    perform _refund_player_trade(v_trade);
+    update player_trades set status = 'cancelled', updated_at = now()
+     where id = p_trade_id
+    returning * into v_trade;
+    return to_jsonb(v_trade);
+end;
+$$;
+
+create or replace function expire_player_trades(p_limit integer default 100)
+returns integer
+language plpgsql
+as $$
+declare
+    v_trade player_trades;
+    v_count integer := 0;
+begin
+    -- skip locked：正在被双方操作的交易留给下一轮
+    for v_trade in
+        select * from player_trades
+         where status = 'open' and expires_at <= now()
+         order by expires_at
+         limit p_limit
+           for update skip locked
+    loop
+        perform _refund_player_trade(v_trade);
+        update player_trades set status = 'expired', updated_at = now() where id = v_trade.id;
+        v_count := v_count + 1;
+    end loop;
+    return v_count;
+end;
+$$;
@@ -0,0 +1,147 @@
+-- ==================================================
+-- 摊位上架 / 下架 / 没收
+-- 每个操作都在一个事务内同时完成摊位行与背包的变动，中途失败整体回滚，
+-- 不会出现「摊位已删、物品没退回」或「物品已扣、摊位没建」的情况
+--   list_items           批量上架：背包扣除 → 插入摊位（p_from_inventory = false 时为管理员上架系统商品，不扣背包）
+--   unlist_listings      批量下架：摊位置为下架 → 剩余数量退回卖家背包（只退从背包上架的摊位）
+--   confiscate_listings  管理员批量没收：摊位置为下架，物品不退回
+-- 单个版本 list_item / unlist_listing / confiscate_listing 复用批量版本
+-- 并发：下架与购买都用带 is_active 条件的 UPDATE 锁定摊位行，
+--       退回的是购买提交之后的剩余数量；已售罄 / 已下架的摊位在批量操作中跳过
+-- shop_listings.from_inventory 记录摊位的物品是否从卖家背包扣除，下架时据此决定是否退回
+-- （本迁移之前的摊位一律视为从背包上架）
+-- ==================================================
+
+alter table shop_listings add column if not exists from_inventory boolean not null default true;
+
+create or replace function list_items(p_seller_id uuid, p_listings jsonb, p_from_inventory boolean default true)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_rows jsonb;
+begin
+    if jsonb_array_length(p_listings) = 0 then
+        return '[]'::jsonb;
+    end if;
+    if exists (select 1 from jsonb_to_recordset(p_listings) as x(item_uuid uuid, price integer, quantity integer)
+                where x.price is null or x.price <= 0 or x.quantity is null or x.quantity <= 0) then
+        raise exception 'price and quantity must be positive';
+    end if;
+    if exists (select 1 from jsonb_to_recordset(p_listings) as x(item_uuid uuid)
+                where not exists (select 1 from items i where i.uuid_id = x.item_uuid)) then
+        raise exception 'unknown item';
+    end if;
+
+    if p_from_inventory then
+        perform apply_inventory_deltas((
+            select jsonb_agg(jsonb_build_object('user_id', p_seller_id, 'item_id', i.id, 'delta', -x.quantity))
+              from jsonb_to_recordset(p_listings) as x(item_uuid uuid, quantity integer)
+              join items i on i.uuid_id = x.item_uuid
+        ));
+    end if;
+
+    with ins as (
+        insert into shop_listings (item_uuid, seller_id, price, quantity, is_active, from_inventory)
+        select x.item_uuid, p_seller_id, x.price, x.quantity, true, p_from_inventory
+          from jsonb_to_recordset(p_listings) as x(item_uuid uuid, price integer, quantity integer)
+        returning *
+    )
+    select jsonb_agg(to_jsonb(ins) order by ins.id) into v_rows from ins;
+    return v_rows;
+end;
+$$;
+
+create or replace function list_item(p_seller_id uuid, p_item_uuid uuid, p_price integer, p_quantity integer,
+                                     p_from_inventory boolean default true)
+returns jsonb
+language sql
+as $$
+    select list_items(p_seller_id,
+                      jsonb_build_array(jsonb_build_object('item_uuid', p_item_uuid, 'price', p_price,
+                                                           'quantity', p_quantity)),
+                      p_from_inventory) -> 0;
+$$;
+
+create or replace function unlist_listings(p_listing_ids bigint[], p_seller_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_rows jsonb;
+begin
+    with upd as (
+        update shop_listings l
+           set is_active = false
+         where l.id = any (p_listing_ids)
+           and l.seller_id = p_seller_id
+           and l.is_active
+        returning l.*
+    )
+    select coalesce(jsonb_agg(to_jsonb(upd) order by upd.id), '[]'::jsonb) into v_rows from upd;
+
+    perform apply_inventory_deltas((
+        select coalesce(jsonb_agg(jsonb_build_object('user_id', p_seller_id, 'item_id', i.id, 'delta', x.quantity)),
+                        '[]'::jsonb)
+          from jsonb_to_recordset(v_rows) as x(item_uuid uuid, quantity integer, from_inventory boolean)
+          join items i on i.uuid_id = x.item_uuid
+         where x.quantity > 0
+           and x.from_inventory
+    ));
+    return v_rows;
+end;
+$$;
+
+create or replace function unlist_listing(p_listing_id bigint, p_seller_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_rows jsonb;
+begin
+    v_rows := unlist_listings(array[p_listing_id], p_seller_id);
+    if jsonb_array_length(v_rows) = 0 then
+        raise exception 'listing not active';
+    end if;
+    return v_rows -> 0;
+end;
+$$;
+
+create or replace function confiscate_listings(p_listing_ids bigint[] default null, p_seller_ids uuid[] default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_rows jsonb;
+begin
+    if p_listing_ids is null and p_seller_ids is null then
+        raise exception 'listing_ids or seller_ids is required';
+    end if;
+
+    with upd as (
+        update shop_listings l
+           set is_active = false
+         where l.is_active
+           and (p_listing_ids is null or l.id = any (p_listing_ids))
+           and (p_seller_ids is null or l.seller_id = any (p_seller_ids))
+        returning l.*
+    )
+    select coalesce(jsonb_agg(to_jsonb(upd) order by upd.id), '[]'::jsonb) into v_rows from upd;
+    return v_rows;
+end;
+$$;
+
+create or replace function confiscate_listing(p_listing_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_rows jsonb;
+begin
+    v_rows := confiscate_listings(array[p_listing_id]);
+    if jsonb_array_length(v_rows) = 0 then
+        raise exception 'listing not active';
+    end if;
+    return v_rows -> 0;
+end;
+$$;
@@ -0,0 +1,111 @@
+-- ==================================================
+-- 秘境战斗
+--   dungeons 新增守关妖兽属性（为空时由 core/battle.py 按要求等级推算）
+--   claim_dungeon 新增 p_victory：战败同样消耗本次冷却，但不发放奖励
+--   dungeon_status 返回妖兽属性，供页面估算胜率
+-- ==================================================
+
+alter table dungeons add column if not exists monster_name text;
+alter table dungeons add column if not exists monster_hp integer;
+alter table dungeons add column if not exists monster_attack integer;
+alter table dungeons add column if not exists monster_defense integer;
+
+drop function if exists claim_dungeon(uuid, bigint);
+
+create or replace function claim_dungeon(p_user_id uuid, p_dungeon_id bigint, p_victory boolean default true)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_dungeon dungeons;
+    v_level   integer;
+    v_claimed timestamptz;
+begin
+    select * into v_dungeon from dungeons where id = p_dungeon_id;
+    if not found then
+        raise exception 'unknown dungeon';
+    end if;
+
+    select cultivation_level into v_level from users where id = p_user_id;
+    if not found then
+        raise exception 'unknown user';
+    end if;
+    if v_level < coalesce(v_dungeon.required_level, 1) then
+        raise exception 'level too low';
+    end if;
+
+    -- 冷却：插入或在冷却结束后更新，冷却中时不返回行
+    insert into user_dungeon_cooldowns as c (user_id, dungeon_id, last_claimed_at)
+    values (p_user_id, p_dungeon_id, now())
+    on conflict (user_id, dungeon_id) do update
+       set last_claimed_at = excluded.last_claimed_at,
+           claim_count = c.claim_count + 1
+     where c.last_claimed_at + coalesce(v_dungeon.cooldown_hours, 24) * interval '1 hour' <= now()
+    returning last_claimed_at into v_claimed;
+    if v_claimed is null then
+        raise exception 'dungeon on cooldown';
+    end if;
+
+    if p_victory and coalesce(v_dungeon.reward_spirit_stones, 0) > 0 then
+        update users set spirit_stones = spirit_stones + v_dungeon.reward_spirit_stones where id = p_user_id;
+    end if;
+    if p_victory and v_dungeon.reward_item_id is not null and coalesce(v_dungeon.reward_item_qty, 0) > 0 then
+        perform apply_inventory_deltas(jsonb_build_array(jsonb_build_object(
+            'user_id', p_user_id, 'item_id', v_dungeon.reward_item_id, 'delta', v_dungeon.reward_item_qty)));
+    end if;
+
+    insert into user_progress (user_id, last_dungeon_time)
+    values (p_user_id, v_claimed)
+    on conflict (user_id) do update set last_dungeon_time = excluded.last_dungeon_time;
+
+    return jsonb_build_object(
+        'dungeon_id', p_dungeon_id,
+        'victory', p_victory,
+        'spirit_stones', case when p_victory then coalesce(v_dungeon.reward_spirit_stones, 0) else 0 end,
+        'item_id', v_dungeon.reward_item_id,
+        'item_qty', case when p_victory then coalesce(v_dungeon.reward_item_qty, 0) else 0 end,
+        'next_available_at', v_claimed + coalesce(v_dungeon.cooldown_hours, 24) * interval '1 hour'
+    );
+end;
+$$;
+
+drop function if exists dungeon_status(uuid);
+
+create or replace function dungeon_status(p_user_id uuid)
+returns table (
+    id                   bigint,
+    name                 text,
+    description          text,
+    required_level       integer,
+    cooldown_hours       numeric,
+    reward_spirit_stones bigint,
+    reward_item_id       bigint,
+    reward_item_qty      integer,
+    reward_item_name     text,
+    monster_name         text,
+    monster_hp           integer,
+    monster_attack       integer,
+    monster_defense      integer,
+    level_ok             boolean,
+    cooldown_remaining   integer,
+    eligible             boolean
+)
+language sql
+stable
+as $$
+    select d.id, d.name, d.description, coalesce(d.required_level, 1), coalesce(d.cooldown_hours, 24),
+           coalesce(d.reward_spirit_stones, 0), d.reward_item_id, coalesce(d.reward_item_qty, 0), i.name,
+           d.monster_name, d.monster_hp, d.monster_attack, d.monster_defense,
+           s.level_ok, s.remaining, s.level_ok and s.remaining = 0
+      from dungeons d
+      left join items i on i.id = d.reward_item_id
+      left join user_dungeon_cooldowns c on c.user_id = p_user_id and c.dungeon_id = d.id
+     cross join lateral (
+         select coalesce((select u.cultivation_level from users u where u.id = p_user_id), 0)
+                    >= coalesce(d.required_level, 1) as level_ok,
+                greatest(0, ceil(extract(epoch from
+                    c.last_claimed_at + coalesce(d.cooldown_hours, 24) * interval '1 hour' - now())))::integer
+                    as remaining
+     ) s
+     order by coalesce(d.required_level, 1), d.id;
+$$;
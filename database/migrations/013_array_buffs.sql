@@ -0,0 +1,82 @@
+-- ==================================================
+-- 阵法增益（buff）
+--   user_buffs      每个 (玩家, 阵法) 一行，记录激活时的效果快照与到期时间
+--   activate_array  一次调用完成：扣除灵石 → 校验叠加规则 → 写入 / 续期增益
+-- 叠加规则：
+--   - 同一阵法再次激活：在剩余时间上续期，剩余时间最多为 p_max_stacks 个持续时间
+--   - 不同阵法可同时生效，最多 p_max_active 个
+--   - 不同阵法的同类效果不叠加，只取最强的一个（在应用层 core/buffs.py 汇总）
+-- 到期的行不删除，再次激活同一阵法时原地复用，行数不超过「玩家 × 阵法」
+-- ==================================================
+
+create table if not exists user_buffs (
+    id           bigserial primary key,
+    user_id      uuid not null,
+    array_id     bigint not null references arrays (id),
+    effect_type  text,
+    effect_value numeric not null default 0,
+    started_at   timestamptz not null default now(),
+    expires_at   timestamptz not null,
+    unique (user_id, array_id)
+);
+create index if not exists user_buffs_user_expiry_idx on user_buffs (user_id, expires_at);
+
+-- 迁移旧数据：原先每个玩家只有 user_progress 中的一个阵法
+insert into user_buffs (user_id, array_id, effect_type, effect_value, expires_at)
+select p.user_id, a.id, a.effect_type, coalesce(a.effect_value, 0), p.array_expire_time
+  from user_progress p
+  join arrays a on a.id = p.active_array_id
+ where p.array_expire_time > now()
+on conflict (user_id, array_id) do nothing;
+
+create or replace function activate_array(p_user_id uuid, p_array_id bigint,
+                                          p_max_active integer, p_max_stacks integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_array    arrays;
+    v_buff     user_buffs;
+    v_duration interval;
+    v_active   integer;
+begin
+    select * into v_array from arrays where id = p_array_id;
+    if not found then
+        raise exception 'unknown array';
+    end if;
+    v_duration := coalesce(v_array.duration_minutes, 0) * interval '1 minute';
+    if v_duration <= interval '0' then
+        raise exception 'invalid duration';
+    end if;
+
+    -- 扣除灵石（同时锁住玩家行，同一玩家的并发激活在此排队）
+    update users set spirit_stones = spirit_stones - coalesce(v_array.spirit_stone_cost, 0)
+     where id = p_user_id and spirit_stones >= coalesce(v_array.spirit_stone_cost, 0);
+    if not found then
+        raise exception 'insufficient spirit stones';
+    end if;
+
+    select count(*) into v_active
+      from user_buffs
+     where user_id = p_user_id and array_id <> p_array_id and expires_at > now();
+    if v_active >= p_max_active then
+        raise exception 'too many active arrays';
+    end if;
+
+    -- 生效中则续期，已到期则重新开始；超过续期上限时不返回行
+    insert into user_buffs as b (user_id, array_id, effect_type, effect_value, started_at, expires_at)
+    values (p_user_id, p_array_id, v_array.effect_type, coalesce(v_array.effect_value, 0), now(), now() + v_duration)
+    on conflict (user_id, array_id) do update
+       set effect_type  = excluded.effect_type,
+           effect_value = excluded.effect_value,
+           started_at   = case when b.expires_at > now() then b.started_at else now() end,
+           expires_at   = greatest(b.expires_at, now()) + v_duration
+     where greatest(b.expires_at, now()) + v_duration <= now() + v_duration * p_max_stacks
+    returning * into v_buff;
+    if v_buff.id is null then
+        raise exception 'array fully stacked';
+    end if;
+
+    return to_jsonb(v_buff);
+end;
+$$;
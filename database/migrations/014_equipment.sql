@@ -0,0 +1,94 @@
+-- ==================================================
+-- 装备
+--   items.equip_slot  物品可装备的部位（weapon / armor / accessory）；
+--                     未设置时，炼器图纸的产物默认可装备为 weapon
+--   user_equipment    每个 (玩家, 部位) 一行
+--   equip_item        一次调用完成：从背包取出 1 件 → 换下同部位的旧装备放回背包 → 记录装备
+--   unequip_item      卸下装备放回背包
+-- 装备属性（attack_bonus 与炼器材料加成）在应用层 core/stats.py 汇总
+-- ==================================================
+
+alter table items add column if not exists equip_slot text;
+
+create table if not exists user_equipment (
+    user_id     uuid not null,
+    slot        text not null,
+    item_id     bigint not null references items (id),
+    equipped_at timestamptz not null default now(),
+    primary key (user_id, slot)
+);
+
+create or replace function item_equip_slot(p_item_id bigint)
+returns text
+language sql
+stable
+as $$
+    select coalesce(
+        i.equip_slot,
+        case when exists (select 1 from forge_blueprints b where b.result_item_id = i.id) then 'weapon' end
+    )
+      from items i
+     where i.id = p_item_id;
+$$;
+
+create or replace function equip_item(p_user_id uuid, p_item_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_slot     text;
+    v_previous bigint;
+begin
+    if not exists (select 1 from items where id = p_item_id) then
+        raise exception 'unknown item';
+    end if;
+    v_slot := item_equip_slot(p_item_id);
+    if v_slot is null then
+        raise exception 'item not equippable';
+    end if;
+
+    -- 锁住该部位（未装备时锁不到行，由主键冲突保证同一部位只有一行）
+    select item_id into v_previous
+      from user_equipment
+     where user_id = p_user_id and slot = v_slot
+       for update;
+    if v_previous = p_item_id then
+        raise exception 'already equipped';
+    end if;
+
+    perform apply_inventory_deltas(
+        jsonb_build_array(jsonb_build_object('user_id', p_user_id, 'item_id', p_item_id, 'delta', -1))
+        || case when v_previous is null then '[]'::jsonb
+                else jsonb_build_array(jsonb_build_object('user_id', p_user_id, 'item_id', v_previous, 'delta', 1))
+           end
+    );
+
+    insert into user_equipment (user_id, slot, item_id)
+    values (p_user_id, v_slot, p_item_id)
+    on conflict (user_id, slot) do update
+       set item_id = excluded.item_id, equipped_at = now();
+
+    return jsonb_build_object('slot', v_slot, 'item_id', p_item_id, 'previous_item_id', v_previous);
+end;
+$$;
+
+create or replace function unequip_item(p_user_id uuid, p_slot text)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_item bigint;
+begin
+    delete from user_equipment
+     where user_id = p_user_id and slot = p_slot
+    returning item_id into v_item;
+    if v_item is null then
+        raise exception 'slot empty';
+    end if;
+
+    perform apply_inventory_deltas(
+        jsonb_build_array(jsonb_build_object('user_id', p_user_id, 'item_id', v_item, 'delta', 1)));
+
+    return jsonb_build_object('slot', p_slot, 'item_id', null, 'previous_item_id', v_item);
+end;
+$$;
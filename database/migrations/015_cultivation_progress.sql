@@ -0,0 +1,201 @@
+-- ==================================================
+-- 修炼进度与突破
+--   cultivation_levels    预先算好的境界表：每层所需经验、累计经验、累计属性成长
+--                         （与 core/config.py 中的 EXP_BASE / REALM_BREAKTHROUGH_MULTIPLIER /
+--                          STAGE_STAT_GAINS 同一公式；修改配置后由 core/progression.sync_level_table 覆盖）
+--   _apply_exp            集合语句：一次为一批玩家增加经验，按累计经验查表得出新层数，
+--                         同时写入境界、层数与属性成长（可一次跨越多层）
+--   increment_exp         单个玩家增加经验（丹药、奖励）；传入 p_item_id 时同一事务内从背包扣除 1 件
+--   cultivation_progress  玩家当前的境界、层数、本层进度与属性
+--   grant_exp             经验活动：按 event_id 幂等，目标与 grant_spirit_stones 相同
+-- user_cultivation.exp 为累计经验；层数 = 累计经验不低于 cumulative_exp 的最高层
+-- ==================================================
+
+create table if not exists cultivation_levels (
+    level          integer primary key,
+    realm          text not null,
+    stage          integer not null,
+    exp_required   bigint not null,
+    cumulative_exp bigint not null,
+    hp_total       integer not null default 0,
+    mp_total       integer not null default 0,
+    attack_total   integer not null default 0,
+    defense_total  integer not null default 0,
+    unique (realm, stage)
+);
+create index if not exists cultivation_levels_cumulative_idx on cultivation_levels (cumulative_exp);
+
+insert into cultivation_levels (level, realm, stage, exp_required, cumulative_exp,
+                                hp_total, mp_total, attack_total, defense_total)
+select level, realm, stage, exp_required,
+       sum(exp_required) over w,
+       sum(20 * gain) over w, sum(10 * gain) over w, sum(3 * gain) over w, sum(2 * gain) over w
+  from (
+    select l as level,
+           (array['练气', '筑基', '金丹', '元婴', '化神', '炼虚', '合体', '大乘', '渡劫'])[(l - 1) / 9 + 1] as realm,
+           (l - 1) % 9 + 1 as stage,
+           case when l = 1 then 0
+                else 100::bigint * (l - 1) * (l - 1) * case when (l - 1) % 9 = 0 then 3 else 1 end
+           end as exp_required,
+           case when l = 1 then 0 else (l - 1) / 9 + 1 end as gain
+      from generate_series(1, 81) as l
+  ) s
+window w as (order by level)
+on conflict (level) do nothing;
+
+create table if not exists exp_events (
+    event_id      uuid primary key,
+    amount        bigint not null,
+    target        text not null,
+    affected_rows integer not null default 0,
+    breakthroughs integer not null default 0,
+    granted_by    uuid,
+    created_at    timestamptz not null default now()
+);
+
+create or replace function _apply_exp(p_user_ids uuid[], p_amount bigint)
+returns table (user_id uuid, old_level integer, new_level integer)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+    -- 先按固定顺序锁住目标行，下面的查表读取到的就是最新经验
+    perform 1 from user_cultivation where user_id = any(p_user_ids) order by user_id for update;
+
+    return query
+    with t as (
+        select uc.user_id, uc.exp + p_amount as new_exp,
+               o.level as old_level, n.level as new_level, n.realm, n.stage,
+               n.hp_total - o.hp_total as d_hp, n.mp_total - o.mp_total as d_mp,
+               n.attack_total - o.attack_total as d_attack, n.defense_total - o.defense_total as d_defense
+          from user_cultivation uc
+         cross join lateral (
+            select * from cultivation_levels l where l.cumulative_exp <= uc.exp order by l.level desc limit 1
+         ) o
+         cross join lateral (
+            select * from cultivation_levels l where l.cumulative_exp <= uc.exp + p_amount order by l.level desc limit 1
+         ) n
+         where uc.user_id = any(p_user_ids)
+    ), usr as (
+        update users u
+           set cultivation_level = t.new_level, realm = t.realm, stage = t.stage,
+               hp = coalesce(u.hp, 0) + t.d_hp, mp = coalesce(u.mp, 0) + t.d_mp,
+               attack = coalesce(u.attack, 0) + t.d_attack, defense = coalesce(u.defense, 0) + t.d_defense
+          from t
+         where u.id = t.user_id
+    )
+    update user_cultivation uc
+       set exp = t.new_exp, realm = t.realm, stage = t.stage,
+           hp = coalesce(uc.hp, 0) + t.d_hp, mp = coalesce(uc.mp, 0) + t.d_mp,
+           attack = coalesce(uc.attack, 0) + t.d_attack, defense = coalesce(uc.defense, 0) + t.d_defense,
+           updated_at = now()
+      from t
+     where uc.user_id = t.user_id
+    returning uc.user_id, t.old_level, t.new_level;
+end;
+$$;
+
+create or replace function cultivation_progress(p_user_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'exp', uc.exp,
+        'level', l.level,
+        'realm', l.realm,
+        'stage', l.stage,
+        'exp_into_stage', uc.exp - l.cumulative_exp,
+        'exp_to_next', nxt.cumulative_exp - uc.exp,
+        'next_exp_required', nxt.exp_required,
+        'hp', uc.hp, 'mp', uc.mp, 'attack', uc.attack, 'defense', uc.defense
+    )
+      from user_cultivation uc
+     cross join lateral (
+        select * from cultivation_levels c where c.cumulative_exp <= uc.exp order by c.level desc limit 1
+     ) l
+      left join cultivation_levels nxt on nxt.level = l.level + 1
+     where uc.user_id = p_user_id;
+$$;
+
+create or replace function increment_exp(p_user_id uuid, p_amount bigint, p_item_id bigint default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_result record;
+begin
+    if p_amount is null or p_amount <= 0 then
+        raise exception 'amount must be positive';
+    end if;
+
+    if p_item_id is not null then
+        perform apply_inventory_deltas(
+            jsonb_build_array(jsonb_build_object('user_id', p_user_id, 'item_id', p_item_id, 'delta', -1)));
+    end if;
+
+    select * into v_result from _apply_exp(array[p_user_id], p_amount);
+    if not found then
+        raise exception 'unknown user';
+    end if;
+
+    return cultivation_progress(p_user_id) || jsonb_build_object(
+        'previous_level', v_result.old_level,
+        'levels_gained', v_result.new_level - v_result.old_level
+    );
+end;
+$$;
+
+create or replace function grant_exp(
+    p_event_id uuid,
+    p_amount bigint,
+    p_user_ids uuid[] default null,
+    p_filter text default null,
+    p_granted_by uuid default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_ids           uuid[];
+    v_affected      integer;
+    v_breakthroughs integer;
+begin
+    if p_amount <= 0 then
+        raise exception 'amount must be positive';
+    end if;
+
+    insert into exp_events (event_id, amount, target, granted_by)
+    values (p_event_id, p_amount, coalesce(p_filter, 'user_ids'), p_granted_by)
+    on conflict (event_id) do nothing;
+
+    if not found then
+        return (
+            select jsonb_build_object('event_id', event_id, 'affected_rows', affected_rows,
+                                      'breakthroughs', breakthroughs, 'already_applied', true)
+              from exp_events
+             where event_id = p_event_id
+        );
+    end if;
+
+    if p_user_ids is not null then
+        v_ids := p_user_ids;
+    elsif p_filter = 'all_active' then
+        select array_agg(id) into v_ids from users where not coalesce(is_banned, false);
+    elsif p_filter = 'all' then
+        select array_agg(id) into v_ids from users;
+    else
+        raise exception 'unknown grant target: %', p_filter;
+    end if;
+
+    select count(*), count(*) filter (where new_level > old_level)
+      into v_affected, v_breakthroughs
+      from _apply_exp(coalesce(v_ids, '{}'), p_amount);
+
+    update exp_events set affected_rows = v_affected, breakthroughs = v_breakthroughs
+     where event_id = p_event_id;
+
+    return jsonb_build_object('event_id', p_event_id, 'affected_rows', v_affected,
+                              'breakthroughs', v_breakthroughs, 'already_applied', false);
+end;
+$$;
@@ -0,0 +1,458 @@
+-- ==================================================
+-- 本地 SQLite 后端表结构
+-- 与 Supabase 上的表保持同名同字段，供单机部署和离线开发使用
+-- 外键声明同时用于解析 items!result_item_id(...) 这类嵌入查询
+-- ==================================================
+
+PRAGMA foreign_keys = OFF;
+
+CREATE TABLE IF NOT EXISTS users (
+    id                TEXT PRIMARY KEY,
+    username          TEXT NOT NULL UNIQUE,
+    password_hash     TEXT,
+    spirit_stones     INTEGER NOT NULL DEFAULT 0,
+    cultivation_level INTEGER NOT NULL DEFAULT 1,
+    realm             TEXT DEFAULT '练气',
+    stage             INTEGER DEFAULT 1,
+    hp                INTEGER DEFAULT 100,
+    mp                INTEGER DEFAULT 50,
+    attack            INTEGER DEFAULT 10,
+    defense           INTEGER DEFAULT 5,
+    lifespan          INTEGER DEFAULT 80,
+    is_admin          BOOLEAN NOT NULL DEFAULT 0,
+    is_banned         BOOLEAN NOT NULL DEFAULT 0,
+    last_login        TEXT,
+    created_at        TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS users_spirit_stones_idx ON users (spirit_stones);
+
+CREATE TABLE IF NOT EXISTS admins (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL REFERENCES users (id),
+    role    TEXT
+);
+CREATE INDEX IF NOT EXISTS admins_user_idx ON admins (user_id);
+
+CREATE TABLE IF NOT EXISTS user_cultivation (
+    user_id    TEXT PRIMARY KEY REFERENCES users (id),
+    realm      TEXT DEFAULT '练气',
+    stage      INTEGER DEFAULT 1,
+    exp        INTEGER NOT NULL DEFAULT 0,
+    hp         INTEGER DEFAULT 100,
+    mp         INTEGER DEFAULT 50,
+    attack     INTEGER DEFAULT 10,
+    defense    INTEGER DEFAULT 5,
+    lifespan   INTEGER DEFAULT 80,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid_id      TEXT NOT NULL UNIQUE,
+    name         TEXT NOT NULL,
+    category     TEXT,
+    effect       TEXT,
+    price        INTEGER NOT NULL DEFAULT 0,
+    stock        INTEGER NOT NULL DEFAULT -1,
+    is_system    BOOLEAN NOT NULL DEFAULT 0,
+    owner_id     TEXT,
+    rarity       TEXT,
+    usable       BOOLEAN NOT NULL DEFAULT 0,
+    effect_type  TEXT,
+    effect_value INTEGER DEFAULT 0,
+    attack_bonus INTEGER DEFAULT 0,
+    -- 可装备部位（与 database/migrations/014_equipment.sql 对应）
+    equip_slot   TEXT,
+    created_at   TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS items_name_idx ON items (name);
+CREATE INDEX IF NOT EXISTS items_system_category_idx ON items (category, price) WHERE is_system;
+
+CREATE TABLE IF NOT EXISTS user_inventory (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id       TEXT NOT NULL REFERENCES users (id),
+    item_id       INTEGER REFERENCES items (id),
+    item_uuid     TEXT,
+    quantity      INTEGER NOT NULL DEFAULT 0,
+    acquired_date TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS user_inventory_user_item_key ON user_inventory (user_id, item_id);
+
+CREATE TABLE IF NOT EXISTS shop_listings (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_uuid  TEXT NOT NULL REFERENCES items (uuid_id),
+    seller_id  TEXT REFERENCES users (id),
+    price      INTEGER NOT NULL,
+    quantity   INTEGER NOT NULL,
+    is_active  BOOLEAN NOT NULL DEFAULT 1,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    -- 物品是否从卖家背包扣除（与 database/migrations/010_listing_lifecycle.sql 对应），下架时据此决定是否退回
+    from_inventory BOOLEAN NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS shop_listings_active_price_idx ON shop_listings (price, id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS shop_listings_active_created_idx ON shop_listings (created_at DESC, id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS shop_listings_item_uuid_idx ON shop_listings (item_uuid);
+CREATE INDEX IF NOT EXISTS shop_listings_seller_idx ON shop_listings (seller_id, is_active);
+
+CREATE TABLE IF NOT EXISTS alchemy_recipes (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    name              TEXT NOT NULL,
+    grade             TEXT,
+    result_item_id    INTEGER REFERENCES items (id),
+    result_qty        INTEGER DEFAULT 1,
+    material_1_id     INTEGER REFERENCES items (id),
+    material_1_qty    INTEGER DEFAULT 0,
+    material_2_id     INTEGER REFERENCES items (id),
+    material_2_qty    INTEGER DEFAULT 0,
+    spirit_stone_cost INTEGER DEFAULT 0,
+    success_rate      REAL DEFAULT 1.0
+);
+
+CREATE TABLE IF NOT EXISTS forge_blueprints (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    name              TEXT NOT NULL,
+    grade             TEXT,
+    result_item_id    INTEGER REFERENCES items (id),
+    result_qty        INTEGER DEFAULT 1,
+    material_1_id     INTEGER REFERENCES items (id),
+    material_1_qty    INTEGER DEFAULT 0,
+    material_2_id     INTEGER REFERENCES items (id),
+    material_2_qty    INTEGER DEFAULT 0,
+    spirit_stone_cost INTEGER DEFAULT 0,
+    success_rate      REAL DEFAULT 0.8
+);
+
+CREATE TABLE IF NOT EXISTS dungeons (
+    id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+    name                 TEXT NOT NULL,
+    description          TEXT,
+    required_level       INTEGER DEFAULT 1,
+    cooldown_hours       REAL DEFAULT 24,
+    reward_spirit_stones INTEGER DEFAULT 0,
+    reward_item_id       INTEGER REFERENCES items (id),
+    reward_item_qty      INTEGER DEFAULT 0,
+    -- 守关妖兽属性（与 database/migrations/012_dungeon_battles.sql 对应，为空时按要求等级推算）
+    monster_name         TEXT,
+    monster_hp           INTEGER,
+    monster_attack       INTEGER,
+    monster_defense      INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_id           TEXT PRIMARY KEY REFERENCES users (id),
+    last_dungeon_time TEXT,
+    active_array_id   INTEGER,
+    array_expire_time TEXT
+);
+
+CREATE TABLE IF NOT EXISTS arrays (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    name              TEXT NOT NULL,
+    description       TEXT,
+    effect_type       TEXT,
+    effect_value      REAL DEFAULT 0,
+    duration_minutes  INTEGER DEFAULT 0,
+    spirit_stone_cost INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sects (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    sect_name     TEXT NOT NULL UNIQUE,
+    description   TEXT,
+    category      TEXT,
+    founder_id    TEXT REFERENCES users (id),
+    leader_id     TEXT REFERENCES users (id),
+    member_count  INTEGER DEFAULT 0,
+    max_members   INTEGER DEFAULT 50,
+    is_open_join  BOOLEAN NOT NULL DEFAULT 0,
+    spirit_stones INTEGER DEFAULT 0,
+    created_at    TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS sects_category_idx ON sects (category);
+
+CREATE TABLE IF NOT EXISTS sect_members (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    sect_id   INTEGER NOT NULL REFERENCES sects (id),
+    user_id   TEXT NOT NULL UNIQUE REFERENCES users (id),
+    role      TEXT DEFAULT 'member',
+    joined_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS sect_members_sect_idx ON sect_members (sect_id);
+
+CREATE TABLE IF NOT EXISTS system_config (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    shop     BOOLEAN NOT NULL DEFAULT 1,
+    backpack BOOLEAN NOT NULL DEFAULT 1,
+    sect     BOOLEAN NOT NULL DEFAULT 1,
+    alchemy  BOOLEAN NOT NULL DEFAULT 1,
+    forge    BOOLEAN NOT NULL DEFAULT 1,
+    array    BOOLEAN NOT NULL DEFAULT 1,
+    dungeon  BOOLEAN NOT NULL DEFAULT 1,
+    admin    BOOLEAN NOT NULL DEFAULT 1
+);
+INSERT OR IGNORE INTO system_config (id) VALUES (1);
+
+-- 藏宝阁商品流（与 database/migrations/003_shop_feed.sql 对应）
+CREATE VIEW IF NOT EXISTS shop_feed AS
+SELECT 's-' || i.uuid_id                         AS feed_id,
+       'system'                                  AS entry_type,
+       NULL                                      AS listing_id,
+       i.uuid_id                                 AS item_uuid,
+       i.name                                    AS name,
+       i.category                                AS category,
+       i.effect                                  AS effect,
+       i.price                                   AS price,
+       i.stock                                   AS quantity,
+       NULL                                      AS seller_id,
+       '1970-01-01T00:00:00+00:00'               AS listed_at
+  FROM items i
+ WHERE i.is_system
+UNION ALL
+SELECT 'p-' || substr('0000000000000000000' || l.id, -19, 19),
+       'player',
+       l.id,
+       l.item_uuid,
+       i.name,
+       i.category,
+       i.effect,
+       l.price,
+       l.quantity,
+       l.seller_id,
+       coalesce(l.created_at, '1970-01-01T00:00:00+00:00')
+  FROM shop_listings l
+  JOIN items i ON i.uuid_id = l.item_uuid
+ WHERE l.is_active;
+
+-- 批量发放灵石记录（与 database/migrations/004_spirit_stone_grants.sql 对应）
+CREATE TABLE IF NOT EXISTS spirit_stone_grants (
+    grant_id      TEXT PRIMARY KEY,
+    amount        INTEGER NOT NULL,
+    target        TEXT NOT NULL,
+    affected_rows INTEGER NOT NULL DEFAULT 0,
+    granted_by    TEXT,
+    created_at    TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- 宗门变更流（与 database/migrations/005_sect_membership_events.sql 对应）
+CREATE TABLE IF NOT EXISTS sect_membership_events (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id    TEXT,
+    sect_id    INTEGER,
+    action     TEXT NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TRIGGER IF NOT EXISTS sect_members_insert_feed AFTER INSERT ON sect_members
+BEGIN
+    INSERT INTO sect_membership_events (user_id, sect_id, action) VALUES (NEW.user_id, NEW.sect_id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sect_members_update_feed AFTER UPDATE ON sect_members
+BEGIN
+    INSERT INTO sect_membership_events (user_id, sect_id, action)
+    SELECT OLD.user_id, OLD.sect_id, 'leave' WHERE OLD.user_id IS NOT NEW.user_id;
+    INSERT INTO sect_membership_events (user_id, sect_id, action) VALUES (NEW.user_id, NEW.sect_id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sect_members_delete_feed AFTER DELETE ON sect_members
+BEGIN
+    INSERT INTO sect_membership_events (user_id, sect_id, action) VALUES (OLD.user_id, OLD.sect_id, 'leave');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sects_update_feed AFTER UPDATE ON sects
+BEGIN
+    INSERT INTO sect_membership_events (user_id, sect_id, action) VALUES (NULL, OLD.id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sects_delete_feed AFTER DELETE ON sects
+BEGIN
+    INSERT INTO sect_membership_events (user_id, sect_id, action) VALUES (NULL, OLD.id, 'disband');
+END;
+
+-- 成交记录（与 database/migrations/006_purchase_listing.sql 对应）
+CREATE TABLE IF NOT EXISTS market_trades (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    listing_id  INTEGER,
+    item_id     INTEGER NOT NULL,
+    item_uuid   TEXT NOT NULL,
+    buyer_id    TEXT NOT NULL,
+    seller_id   TEXT,
+    quantity    INTEGER NOT NULL,
+    unit_price  INTEGER NOT NULL,
+    total_price INTEGER NOT NULL,
+    created_at  TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS market_trades_item_time_idx ON market_trades (item_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS market_trades_buyer_idx ON market_trades (buyer_id, created_at DESC);
+
+-- 挂单与成交（与 database/migrations/007_market_orders.sql 对应）
+CREATE TABLE IF NOT EXISTS market_orders (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id    INTEGER NOT NULL,
+    item_uuid  TEXT NOT NULL,
+    user_id    TEXT NOT NULL,
+    side       TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+    price      INTEGER NOT NULL CHECK (price > 0),
+    quantity   INTEGER NOT NULL CHECK (quantity > 0),
+    remaining  INTEGER NOT NULL CHECK (remaining >= 0),
+    status     TEXT NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'filled', 'cancelled')),
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS market_orders_open_idx ON market_orders (id) WHERE status = 'open';
+CREATE INDEX IF NOT EXISTS market_orders_user_idx ON market_orders (user_id, status);
+
+CREATE TABLE IF NOT EXISTS order_book_matcher (
+    id         INTEGER PRIMARY KEY CHECK (id = 1),
+    matcher_id TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS market_fills (
+    fill_id       TEXT PRIMARY KEY,
+    buy_order_id  INTEGER NOT NULL REFERENCES market_orders (id),
+    sell_order_id INTEGER NOT NULL REFERENCES market_orders (id),
+    item_id       INTEGER NOT NULL,
+    price         INTEGER NOT NULL,
+    quantity      INTEGER NOT NULL,
+    created_at    TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS market_fills_item_time_idx ON market_fills (item_id, created_at DESC);
+
+-- 拍卖（与 database/migrations/008_auctions.sql 对应）
+CREATE TABLE IF NOT EXISTS auctions (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id           INTEGER NOT NULL,
+    item_uuid         TEXT NOT NULL,
+    seller_id         TEXT NOT NULL,
+    quantity          INTEGER NOT NULL CHECK (quantity > 0),
+    start_price       INTEGER NOT NULL CHECK (start_price > 0),
+    min_increment     INTEGER NOT NULL CHECK (min_increment > 0),
+    current_bid       INTEGER,
+    current_bidder_id TEXT,
+    bid_count         INTEGER NOT NULL DEFAULT 0,
+    ends_at           TEXT NOT NULL,
+    version           INTEGER NOT NULL DEFAULT 0,
+    status            TEXT NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'sold', 'unsold')),
+    created_at        TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    settled_at        TEXT
+);
+CREATE INDEX IF NOT EXISTS auctions_open_ends_idx ON auctions (ends_at, id) WHERE status = 'open';
+CREATE INDEX IF NOT EXISTS auctions_seller_idx ON auctions (seller_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS auctions_bidder_idx ON auctions (current_bidder_id) WHERE status = 'open';
+
+CREATE TABLE IF NOT EXISTS auction_bids (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    auction_id INTEGER NOT NULL REFERENCES auctions (id),
+    bidder_id  TEXT NOT NULL,
+    amount     INTEGER NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS auction_bids_auction_idx ON auction_bids (auction_id, id DESC);
+
+-- 玩家直接交易（与 database/migrations/009_player_trades.sql 对应）
+CREATE TABLE IF NOT EXISTS player_trades (
+    id                     INTEGER PRIMARY KEY AUTOINCREMENT,
+    initiator_id           TEXT NOT NULL,
+    counterparty_id        TEXT NOT NULL,
+    initiator_stones       INTEGER NOT NULL DEFAULT 0 CHECK (initiator_stones >= 0),
+    counterparty_stones    INTEGER NOT NULL DEFAULT 0 CHECK (counterparty_stones >= 0),
+    initiator_confirmed    BOOLEAN NOT NULL DEFAULT 0,
+    counterparty_confirmed BOOLEAN NOT NULL DEFAULT 0,
+    version                INTEGER NOT NULL DEFAULT 0,
+    status                 TEXT NOT NULL DEFAULT 'open'
+                           CHECK (status IN ('open', 'settled', 'cancelled', 'expired')),
+    expires_at             TEXT NOT NULL,
+    created_at             TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at             TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    CHECK (initiator_id <> counterparty_id)
+);
+CREATE INDEX IF NOT EXISTS player_trades_initiator_idx ON player_trades (initiator_id, status);
+CREATE INDEX IF NOT EXISTS player_trades_counterparty_idx ON player_trades (counterparty_id, status);
+CREATE INDEX IF NOT EXISTS player_trades_open_expiry_idx ON player_trades (expires_at) WHERE status = 'open';
+
+CREATE TABLE IF NOT EXISTS player_trade_items (
+    trade_id INTEGER NOT NULL REFERENCES player_trades (id),
+    user_id  TEXT NOT NULL,
+    item_id  INTEGER NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    PRIMARY KEY (trade_id, user_id, item_id)
+);
+
+-- 秘境冷却（与 database/migrations/011_dungeon_claims.sql 对应）
+CREATE TABLE IF NOT EXISTS user_dungeon_cooldowns (
+    user_id         TEXT NOT NULL,
+    dungeon_id      INTEGER NOT NULL REFERENCES dungeons (id),
+    last_claimed_at TEXT NOT NULL,
+    claim_count     INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, dungeon_id)
+);
+
+-- 阵法增益（与 database/migrations/013_array_buffs.sql 对应）
+CREATE TABLE IF NOT EXISTS user_buffs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id      TEXT NOT NULL,
+    array_id     INTEGER NOT NULL REFERENCES arrays (id),
+    effect_type  TEXT,
+    effect_value REAL NOT NULL DEFAULT 0,
+    started_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    expires_at   TEXT NOT NULL,
+    UNIQUE (user_id, array_id)
+);
+CREATE INDEX IF NOT EXISTS user_buffs_user_expiry_idx ON user_buffs (user_id, expires_at);
+
+-- 装备（与 database/migrations/014_equipment.sql 对应）
+CREATE TABLE IF NOT EXISTS user_equipment (
+    user_id     TEXT NOT NULL,
+    slot        TEXT NOT NULL,
+    item_id     INTEGER NOT NULL REFERENCES items (id),
+    equipped_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    PRIMARY KEY (user_id, slot)
+);
+
+-- 境界表与经验活动（与 database/migrations/015_cultivation_progress.sql 对应）
+CREATE TABLE IF NOT EXISTS cultivation_levels (
+    level          INTEGER PRIMARY KEY,
+    realm          TEXT NOT NULL,
+    stage          INTEGER NOT NULL,
+    exp_required   INTEGER NOT NULL,
+    cumulative_exp INTEGER NOT NULL,
+    hp_total       INTEGER NOT NULL DEFAULT 0,
+    mp_total       INTEGER NOT NULL DEFAULT 0,
+    attack_total   INTEGER NOT NULL DEFAULT 0,
+    defense_total  INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (realm, stage)
+);
+CREATE INDEX IF NOT EXISTS cultivation_levels_cumulative_idx ON cultivation_levels (cumulative_exp);
+
+INSERT OR IGNORE INTO cultivation_levels (level, realm, stage, exp_required, cumulative_exp,
+                                          hp_total, mp_total, attack_total, defense_total)
+WITH RECURSIVE l (level) AS (SELECT 1 UNION ALL SELECT level + 1 FROM l WHERE level < 81),
+s AS (
+    SELECT level,
+           CASE (level - 1) / 9
+               WHEN 0 THEN '练气' WHEN 1 THEN '筑基' WHEN 2 THEN '金丹' WHEN 3 THEN '元婴' WHEN 4 THEN '化神'
+               WHEN 5 THEN '炼虚' WHEN 6 THEN '合体' WHEN 7 THEN '大乘' ELSE '渡劫'
+           END AS realm,
+           (level - 1) % 9 + 1 AS stage,
+           CASE WHEN level = 1 THEN 0
+                ELSE 100 * (level - 1) * (level - 1) * CASE WHEN (level - 1) % 9 = 0 THEN 3 ELSE 1 END
+           END AS exp_required,
+           CASE WHEN level = 1 THEN 0 ELSE (level - 1) / 9 + 1 END AS gain
+      FROM l
+)
+SELECT level, realm, stage, exp_required,
+       sum(exp_required) OVER w,
+       sum(20 * gain) OVER w, sum(10 * gain) OVER w, sum(3 * gain) OVER w, sum(2 * gain) OVER w
+  FROM s
+WINDOW w AS (ORDER BY level);
+
+CREATE TABLE IF NOT EXISTS exp_events (
+    event_id      TEXT PRIMARY KEY,
+    amount        INTEGER NOT NULL,
+    target        TEXT NOT NULL,
+    affected_rows INTEGER NOT NULL DEFAULT 0,
+    breakthroughs INTEGER NOT NULL DEFAULT 0,
+    granted_by    TEXT,
+    created_at    TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
@@ -1,13 +1,25 @@
 # ==================================================
 # 管理员后台模块
-# 功能：用户管理、灵石发放、系统配置
+# 功能：用户管理、灵石发放、经验活动、系统配置
 # ==================================================
 
+import uuid
+
+import pandas as pd
 import streamlit as st
-from core.config import FEATURES, get_supabase_client, MAIN_ADMIN_USERNAME
-from core.database import get_user_sect
+from core.config import FEATURES, get_supabase_client, get_client_manager, MAIN_ADMIN_USERNAME
+from core.database import get_user_sect, grant_spirit_stones, GRANT_FILTERS
+from core.catalog import get_item_catalog
+from core.market import confiscate_listings
+from core.sect_cache import get_sect_cache
+from core.market_stats import get_market_stats
+from core.stats import get_stat_engine
+from core.progression import grant_exp, level_table_rows, sync_level_table
+from core.instrumentation import query_recorder
 from core.errors import safe_page_load
 from utils.helpers import hash_password
+from core.navigation import page_link
+from modules.shop.feed import invalidate_feed
 
 def show_xuanli_admin_page():
     """
@@ -17,24 +29,20 @@ def show_xuanli_admin_page():
     # 权限检查
     if st.session_state.user.username != MAIN_ADMIN_USERNAME:
         st.error("❌ 权限不足！此页面仅限轩璃访问")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 轩璃专属", layout="wide")
     st.title("👑 轩璃专属管理台")
     
-    if st.button("⬅️ 返回主城", key="admin_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("管理后台"):
         _render_admin_content()
 
 def _render_admin_content():
     """渲染管理后台内容（内部函数）"""
-    tabs = st.tabs(["👥 用户管理", "💎 灵石发放", "⚙️ 系统配置", "📜 操作日志"])
+    tabs = st.tabs(["👥 用户管理", "💎 灵石发放", "✨ 经验活动", "⚙️ 系统配置", "📜 操作日志"])
     
     with tabs[0]:
         _render_user_management()
@@ -43,61 +51,151 @@ def _render_admin_content():
         _render_spirit_stones_grant()
     
     with tabs[2]:
-        _render_system_config()
+        _render_exp_event()
     
     with tabs[3]:
+        _render_system_config()
+    
+    with tabs[4]:
         _render_operation_log()
 
+# 用户列表只查询这些列（不含密码哈希）
+USER_TABLE_COLUMNS = "id, username, realm, stage, spirit_stones, is_admin, is_banned, created_at"
+USER_TABLE_PAGE_SIZE = 50
+USER_SORT_OPTIONS = {
+    "注册时间": "created_at",
+    "用户名": "username",
+    "灵石": "spirit_stones",
+    "境界层数": "stage",
+}
+_YES_NO_FILTER = {"全部": None, "是": True, "否": False}
+
 def _render_user_management():
     """渲染用户管理标签页（内部函数）"""
-    st.subheader("👥 所有用户列表")
+    st.subheader("👥 用户管理")
     
     supabase = get_supabase_client()
     
-    try:
-        # 获取所有用户
-        users = supabase.table("users").select("*").execute()
-        users_data = users.data if users else []
-        
-        if not users_data:
-            st.info("暂无用户数据")
-            return
-        
-        st.write(f"共 {len(users_data)} 名用户")
-        
-        # 显示用户列表
-        for user in users_data:
-            with st.expander(f"👤 {user['username']} (ID: {user['id'][:8]}...)"):
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.write(f"**灵石**: {user.get('spirit_stones', 0):,}")
-                    st.write(f"**境界**: {user.get('realm', '未知')} {user.get('stage', 0)}层")
-                
-                with col2:
-                    st.write(f"**管理员**: {'是' if user.get('is_admin', False) else '否'}")
-                    st.write(f"**封禁**: {'是' if user.get('is_banned', False) else '否'}")
-                
-                with col3:
-                    # 封禁/解封按钮
-                    is_banned = user.get("is_banned", False)
-                    btn_label = "🔓 解封" if is_banned else "🔒 封禁"
-                    if st.button(btn_label, key=f"ban_user_{user['id']}"):
-                        supabase.table("users").update({"is_banned": not is_banned}).eq("id", user["id"]).execute()
-                        st.toast(f"✅ 已{'解封' if is_banned else '封禁'} {user['username']}", icon="✅")
-                        st.rerun()
-                    
-                    # 删除按钮
-                    if st.button("🗑️ 删除", key=f"del_user_{user['id']}"):
-                        if user['username'] != MAIN_ADMIN_USERNAME:
-                            supabase.table("users").delete().eq("id", user["id"]).execute()
-                            st.toast(f"🗑️ 已删除 {user['username']}", icon="✅")
-                            st.rerun()
-                        else:
-                            st.error("❌ 不能删除主管理员账号！")
+    # 筛选条件（全部在服务端执行）
+    with st.expander("🔍 筛选与排序", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            prefix = st.text_input("用户名前缀", key="user_filter_prefix")
+            realm = st.text_input("境界", key="user_filter_realm")
+        with col2:
+            banned = st.selectbox("封禁", list(_YES_NO_FILTER), key="user_filter_banned")
+            is_admin = st.selectbox("管理员", list(_YES_NO_FILTER), key="user_filter_admin")
+        with col3:
+            min_stones = st.number_input("灵石下限", min_value=0, value=0, step=1000, key="user_filter_min")
+            max_stones = st.number_input("灵石上限（0 为不限）", min_value=0, value=0, step=1000, key="user_filter_max")
+        col4, col5 = st.columns(2)
+        with col4:
+            sort_label = st.selectbox("排序", list(USER_SORT_OPTIONS), key="user_sort")
+        with col5:
+            sort_desc = st.toggle("降序", value=True, key="user_sort_desc")
+    
+    query = supabase.table("users").select(USER_TABLE_COLUMNS, count="exact")
+    if prefix.strip():
+        query = query.like("username", f"{prefix.strip()}%")
+    if realm.strip():
+        query = query.eq("realm", realm.strip())
+    if _YES_NO_FILTER[banned] is not None:
+        query = query.eq("is_banned", _YES_NO_FILTER[banned])
+    if _YES_NO_FILTER[is_admin] is not None:
+        query = query.eq("is_admin", _YES_NO_FILTER[is_admin])
+    if min_stones:
+        query = query.gte("spirit_stones", int(min_stones))
+    if max_stones:
+        query = query.lte("spirit_stones", int(max_stones))
     
+    # 筛选或排序变化时回到第一页
+    view = (prefix, realm, banned, is_admin, min_stones, max_stones, sort_label, sort_desc)
+    if st.session_state.get("user_table_view") != view:
+        st.session_state.user_table_view = view
+        st.session_state.user_table_page = 1
+    page = st.session_state.user_table_page
+    start = (page - 1) * USER_TABLE_PAGE_SIZE
+    
+    try:
+        result = query\
+            .order(USER_SORT_OPTIONS[sort_label], desc=sort_desc)\
+            .order("id")\
+            .range(start, start + USER_TABLE_PAGE_SIZE - 1)\
+            .execute()
     except Exception as e:
         st.error(f"加载用户失败：{str(e)[:200]}")
+        return
+    
+    users_data = result.data or []
+    total = result.count or 0
+    total_pages = max(1, -(-total // USER_TABLE_PAGE_SIZE))
+    
+    st.write(f"共 {total} 名用户 · 第 {page} / {total_pages} 页")
+    if not users_data:
+        st.info("暂无用户数据")
+    else:
+        df = pd.DataFrame(users_data)
+        event = st.dataframe(
+            df,
+            width="stretch",
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="multi-row",
+            # 选择状态按 key 保存：翻页、筛选、排序后换一个 key，避免沿用旧的行号选中其他用户
+            key=f"user_table_{page}_{hash(view)}",
+            column_config={"id": st.column_config.TextColumn("ID", width="small")},
+        )
+        selected = [users_data[row] for row in event.selection.rows if row < len(users_data)]
+        _render_user_bulk_actions(supabase, selected)
+    
+    # 翻页
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if st.button("⬅️ 上一页", key="user_table_prev", disabled=page <= 1):
+            st.session_state.user_table_page = page - 1
+            st.rerun()
+    with col_next:
+        if st.button("下一页 ➡️", key="user_table_next", disabled=page >= total_pages):
+            st.session_state.user_table_page = page + 1
+            st.rerun()
+
+def _render_user_bulk_actions(supabase, selected):
+    """对表格中选中的用户批量操作（内部函数）"""
+    # 主管理员不可被批量操作
+    targets = [u for u in selected if u["username"] != MAIN_ADMIN_USERNAME]
+    if not targets:
+        st.caption("勾选表格左侧的行以批量封禁 / 解封")
+        return
+    
+    ids = [u["id"] for u in targets]
+    names = "、".join(u["username"] for u in targets[:5]) + ("…" if len(targets) > 5 else "")
+    st.write(f"已选择 {len(targets)} 名用户：{names}")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if st.button("🔒 封禁所选", key="bulk_ban"):
+            supabase.table("users").update({"is_banned": True}).in_("id", ids).execute()
+            st.toast(f"✅ 已封禁 {len(ids)} 名用户", icon="✅")
+            st.rerun()
+    with col2:
+        if st.button("🔓 解封所选", key="bulk_unban"):
+            supabase.table("users").update({"is_banned": False}).in_("id", ids).execute()
+            st.toast(f"✅ 已解封 {len(ids)} 名用户", icon="✅")
+            st.rerun()
+    with col3:
+        with st.popover("🗑️ 删除所选"):
+            st.write(f"确定要删除 **{len(ids)}** 名用户吗？")
+            st.warning("此操作不可恢复！")
+            if st.button("✅ 确认删除", key="bulk_delete"):
+                supabase.table("users").delete().in_("id", ids).execute()
+                st.toast(f"🗑️ 已删除 {len(ids)} 名用户", icon="✅")
+                st.rerun()
+    with col4:
+        if st.button("🚫 没收摊位", key="bulk_confiscate"):
+            confiscated = confiscate_listings(seller_ids=ids)
+            invalidate_feed()
+            st.toast(f"🚫 已没收 {len(confiscated)} 个在售摊位", icon="✅")
+            st.rerun()
 
 def _render_spirit_stones_grant():
     """渲染灵石发放标签页（内部函数）"""
@@ -105,33 +203,100 @@ def _render_spirit_stones_grant():
     
     supabase = get_supabase_client()
     
-    # 获取所有用户
-    users = supabase.table("users").select("id, username").execute()
-    users_data = users.data if users else []
-    
-    if not users_data:
-        st.info("暂无用户")
-        return
-    
-    usernames = [u["username"] for u in users_data]
-    
     col1, col2 = st.columns(2)
     with col1:
-        selected = st.multiselect("选择用户", usernames, default=usernames)
+        target_options = ["指定用户"] + list(GRANT_FILTERS.keys())
+        target = st.radio(
+            "发放对象", target_options, horizontal=True, key="grant_target",
+            format_func=lambda t: GRANT_FILTERS.get(t, t),
+        )
     with col2:
         amount = st.number_input("灵石数量", min_value=1, value=1000, step=100)
     
+    user_ids = None
+    if target == "指定用户":
+        users = supabase.table("users").select("id, username").order("username").execute()
+        users_data = users.data if users else []
+        if not users_data:
+            st.info("暂无用户")
+            return
+        id_by_name = {u["username"]: u["id"] for u in users_data}
+        selected = st.multiselect("选择用户", list(id_by_name.keys()))
+        user_ids = sorted(id_by_name[name] for name in selected)
+    
+    # 同一组参数复用同一个 grant_id：超时后重试不会重复发放
+    grant_key = (target, int(amount), tuple(user_ids or ()))
+    if st.session_state.get("grant_pending_key") != grant_key:
+        st.session_state.grant_pending_key = grant_key
+        st.session_state.grant_pending_id = str(uuid.uuid4())
+    
     if st.button("🎁 发放灵石"):
-        if not selected:
+        if target == "指定用户" and not user_ids:
             st.warning("请至少选择一名用户")
+            return
+        try:
+            result = grant_spirit_stones(
+                st.session_state.grant_pending_id,
+                int(amount),
+                user_ids=user_ids,
+                target_filter=None if target == "指定用户" else target,
+                granted_by=st.session_state.user.id,
+            )
+        except Exception as e:
+            st.error(f"❌ 发放失败（可直接重试，不会重复发放）：{str(e)[:200]}")
+            return
+        
+        # 发放完成，下次点击生成新批次
+        st.session_state.grant_pending_key = None
+        if result.get("already_applied"):
+            st.info(f"ℹ️ 该批次已发放过，共 {result['affected_rows']} 名用户")
+        else:
+            st.success(f"✅ 已向 {result['affected_rows']} 名用户发放 {int(amount):,} 灵石")
+
+def _render_exp_event():
+    """渲染经验活动标签页（内部函数）"""
+    st.subheader("✨ 经验活动")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        target = st.radio(
+            "活动对象", list(GRANT_FILTERS.keys()), horizontal=True, key="exp_event_target",
+            format_func=lambda t: GRANT_FILTERS.get(t, t),
+        )
+    with col2:
+        amount = st.number_input("每人修为", min_value=1, value=1000, step=100, key="exp_event_amount")
+    
+    # 同一组参数复用同一个 event_id：超时后重试不会重复发放
+    event_key = (target, int(amount))
+    if st.session_state.get("exp_event_pending_key") != event_key:
+        st.session_state.exp_event_pending_key = event_key
+        st.session_state.exp_event_pending_id = str(uuid.uuid4())
+    
+    if st.button("✨ 开启经验活动"):
+        try:
+            result = grant_exp(
+                st.session_state.exp_event_pending_id,
+                int(amount),
+                target_filter=target,
+                granted_by=st.session_state.user.id,
+            )
+        except Exception as e:
+            st.error(f"❌ 发放失败（可直接重试，不会重复发放）：{str(e)[:200]}")
+            return
+        
+        st.session_state.exp_event_pending_key = None
+        if result.get("already_applied"):
+            st.info(f"ℹ️ 该活动已发放过，共 {result['affected_rows']} 名用户")
         else:
-            count = 0
-            for u in users_data:
-                if u["username"] in selected:
-                    supabase.rpc("add_spirit_stones", {"uid": u["id"], "amount": amount}).execute()
-                    count += 1
-            
-            st.success(f"✅ 已向 {count} 名用户发放 {amount:,} 灵石")
+            st.success(f"✅ 已向 {result['affected_rows']} 名用户发放 {int(amount):,} 修为，"
+                       f"{result['breakthroughs']} 人突破")
+    
+    with st.expander("📖 境界表"):
+        st.dataframe(pd.DataFrame(level_table_rows()), width="stretch", hide_index=True)
+        if st.button("🔄 同步境界表", key="sync_level_table",
+                     help="修改经验曲线或属性成长配置后，用当前配置覆盖数据库中的境界表"):
+            count = sync_level_table()
+            st.toast(f"✅ 已同步 {count} 层", icon="✅")
 
 def _render_system_config():
     """渲染系统配置标签页（内部函数）"""
@@ -166,6 +331,52 @@ def _render_system_config():
         if submitted:
             supabase.table("system_config").update(updated_config).eq("id", config_data.get("id", 1)).execute()
             st.success("✅ 配置已保存")
+    
+    _render_connection_pool_status()
+
+def _render_connection_pool_status():
+    """渲染数据库连接池状态（内部函数）"""
+    st.markdown("---")
+    st.subheader("🔌 数据库连接池")
+    
+    manager = get_client_manager()
+    st.json(manager.pool_stats())
+    
+    if st.button("🩺 健康检查", key="db_health_check"):
+        result = manager.health_check()
+        if result["ok"]:
+            st.success(f"✅ 数据库可达（{result['latency_ms']} ms）")
+        else:
+            st.error(f"❌ 数据库不可达：{result['error'] or result['status_code']}")
+    
+    st.subheader("📦 物品图鉴缓存")
+    catalog = get_item_catalog()
+    st.json(catalog.stats())
+    if st.button("🔄 刷新图鉴缓存", key="catalog_invalidate"):
+        catalog.invalidate()
+        st.toast("✅ 图鉴缓存已失效，下次访问将重新加载", icon="✅")
+    
+    st.subheader("🏯 宗门归属缓存")
+    sect_cache = get_sect_cache()
+    st.json(sect_cache.stats())
+    if st.button("🔄 清空宗门缓存", key="sect_cache_clear"):
+        sect_cache.clear()
+        st.toast("✅ 宗门缓存已清空", icon="✅")
+    
+    st.subheader("⚔️ 玩家属性缓存")
+    stat_engine = get_stat_engine()
+    st.json(stat_engine.stats())
+    if st.button("🔄 重算全部玩家属性", key="stat_recompute_all",
+                 help="调整物品攻击加成、炼器材料加成或宗门加成后使用"):
+        count = stat_engine.recompute_all()
+        st.toast(f"✅ 已重算 {count} 名玩家的属性", icon="✅")
+    
+    st.subheader("📈 行情统计")
+    market_stats = get_market_stats()
+    st.json(market_stats.cache_stats())
+    if st.button("🔄 重建行情统计", key="market_stats_clear"):
+        market_stats.clear()
+        st.toast("✅ 行情统计已清空，下次访问将回放近 7 天的成交", icon="✅")
 
 def _render_operation_log():
     """渲染操作日志标签页（内部函数）"""
@@ -180,4 +391,28 @@ def _render_operation_log():
         st.info("暂无错误记录")
     
     st.markdown("---")
-    st.info("💡 完整日志功能待开发，当前仅显示最近错误")
\ No newline at end of file
+    _render_query_stats()
+
+def _render_query_stats():
+    """渲染数据库查询监控（内部函数）"""
+    st.subheader("📈 数据库查询监控")
+    
+    enabled = st.toggle("记录查询", value=query_recorder.enabled, key="query_recorder_toggle")
+    if enabled != query_recorder.enabled:
+        query_recorder.enabled = enabled
+        st.rerun()
+    
+    summary = query_recorder.page_summary()
+    if not summary:
+        st.info("暂无查询记录" if enabled else "查询监控未开启")
+        return
+    
+    st.write("**各页面每次渲染的查询统计**")
+    st.dataframe(summary, width="stretch", hide_index=True)
+    
+    with st.expander("最近 200 条查询"):
+        st.dataframe(query_recorder.recent(200), width="stretch", hide_index=True)
+    
+    if st.button("🧹 清空记录", key="query_recorder_clear"):
+        query_recorder.clear()
+        st.rerun()
\ No newline at end of file
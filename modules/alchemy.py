@@ -5,8 +5,11 @@
 
 import streamlit as st
 from core.config import FEATURES, get_supabase_client
-from core.database import get_user_sect
+from core.database import get_user_sect, get_user_inventory_quantities
 from core.errors import safe_page_load
+from core.crafting import compute_max_craftable, plan_craft_batch, apply_craft_batch
+from core.navigation import page_link
+from core.stats import get_stat_block
 
 def show_alchemy_page():
     """
@@ -15,17 +18,13 @@ def show_alchemy_page():
     """
     if not FEATURES.get("alchemy", True):
         st.warning("炼丹房暂未开放")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 炼丹房", layout="wide")
     st.title("🧪 炼丹房")
     
-    if st.button("⬅️ 返回主城", key="alchemy_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("炼丹房"):
         _render_alchemy_content()
@@ -49,16 +48,22 @@ def _render_alchemy_content():
         st.info("暂无炼丹配方")
         return
     
-    # 按品级分组显示
+    # 背包只查询一次，批量计算每个配方的可炼制次数
+    inventory = get_user_inventory_quantities(user_id)
+    craftable = compute_max_craftable(recipes_data, inventory, st.session_state.user.spirit_stones)
+    
     st.subheader("📜 丹方列表")
     
-    for recipe in recipes_data:
-        _render_alchemy_recipe(recipe, user_id)
+    sort_mode = st.selectbox("排序方式", ["默认顺序", "可炼制次数（多→少）"], key="alchemy_sort")
+    order = range(len(recipes_data))
+    if sort_mode == "可炼制次数（多→少）":
+        order = (-craftable).argsort(kind="stable")
+    
+    for idx in order:
+        _render_alchemy_recipe(recipes_data[idx], user_id, int(craftable[idx]))
 
-def _render_alchemy_recipe(recipe, user_id: int):
+def _render_alchemy_recipe(recipe, user_id: int, max_craftable: int):
     """渲染单个配方卡片（内部函数）"""
-    supabase = get_supabase_client()
-    
     with st.container(border=True):
         col1, col2 = st.columns([2, 1])
         
@@ -82,118 +87,82 @@ def _render_alchemy_recipe(recipe, user_id: int):
                 st.write(f"  • {mat2.get('name', '未知')} x{mat2_qty}")
             
             st.write(f"**消耗灵石**: {recipe.get('spirit_stone_cost', 0):,}")
-            st.write(f"**成功率**: {int(recipe.get('success_rate', 1.0) * 100)}%")
+            _render_success_rate(recipe.get('success_rate', 1.0))
         
         with col2:
             # 检查材料是否足够
-            has_materials = _check_materials(user_id, recipe)
+            has_materials = max_craftable > 0
+            st.metric("可炼制次数", max_craftable)
             
             btn_label = "🔥 开始炼制" if has_materials else "❌ 材料不足"
             btn_disabled = not has_materials
             
             if st.button(btn_label, key=f"alchemy_craft_{recipe['id']}", disabled=btn_disabled):
                 _handle_craft_alchemy(recipe)
+            
+            # 批量炼制：一次掷出 N 次结果，一次写入
+            if max_craftable > 1:
+                times = st.number_input("炼制次数", min_value=1, max_value=max_craftable, value=max_craftable,
+                                        key=f"alchemy_times_{recipe['id']}")
+                if st.button(f"⚡ 批量炼制 ×{times}", key=f"alchemy_bulk_{recipe['id']}"):
+                    _handle_bulk_craft_alchemy(recipe, int(times), max_craftable)
 
-def _check_materials(user_id: int, recipe) -> bool:
-    """检查用户是否有足够材料（内部函数）"""
-    supabase = get_supabase_client()
-    
-    # 获取用户背包
-    inventory = supabase.table("user_inventory")\
-        .select("item_id, quantity")\
-        .eq("user_id", user_id)\
-        .execute()
-    
-    inv_dict = {item["item_id"]: item["quantity"] for item in (inventory.data or [])}
-    
-    # 检查材料 1
-    mat1_id = recipe.get("material_1_id")
-    mat1_qty = recipe.get("material_1_qty", 0)
-    if inv_dict.get(mat1_id, 0) < mat1_qty:
-        return False
-    
-    # 检查材料 2
-    mat2_id = recipe.get("material_2_id")
-    mat2_qty = recipe.get("material_2_qty", 0)
-    if mat2_id and inv_dict.get(mat2_id, 0) < mat2_qty:
-        return False
-    
-    # 检查灵石
-    user = st.session_state.user
-    if user.spirit_stones < recipe.get("spirit_stone_cost", 0):
-        return False
-    
-    return True
+def _render_success_rate(success_rate: float):
+    """显示成功率，阵法加成单独标出（内部函数）"""
+    bonus = get_stat_block(st.session_state.user)["craft_success"]
+    text = f"**成功率**: {int(min(1.0, success_rate + bonus) * 100)}%"
+    if bonus:
+        text += f"（含阵法 +{bonus:.0%}）"
+    st.write(text)
 
 def _handle_craft_alchemy(recipe):
     """处理炼制逻辑（内部函数）"""
-    supabase = get_supabase_client()
-    user_id = st.session_state.user.id
-    
-    # 扣除材料
-    mat1_id = recipe.get("material_1_id")
-    mat1_qty = recipe.get("material_1_qty", 0)
-    _remove_item(user_id, mat1_id, mat1_qty)
-    
-    mat2_id = recipe.get("material_2_id")
-    mat2_qty = recipe.get("material_2_qty", 0)
-    if mat2_id:
-        _remove_item(user_id, mat2_id, mat2_qty)
+    user = st.session_state.user
     
-    # 扣除灵石
-    cost = recipe.get("spirit_stone_cost", 0)
-    supabase.rpc("deduct_spirit_stones", {"uid": user_id, "amount": cost}).execute()
+    # 判定成功率，扣除材料 / 灵石与发放产物在同一次 RPC 内完成
+    plan = plan_craft_batch(recipe, 1, default_success_rate=1.0,
+                            success_bonus=get_stat_block(user)["craft_success"])
+    try:
+        apply_craft_batch(user.id, plan)
+    except Exception as e:
+        st.toast(f"❌ 炼制失败：{str(e)[:100]}", icon="❌")
+        return
     
-    # 判定成功率
-    import random
-    success_rate = recipe.get("success_rate", 1.0)
-    success = random.random() <= success_rate
+    user.spirit_stones -= plan["stone_cost"]
     
-    if success:
-        # 添加产物
-        result_id = recipe.get("result_item_id")
-        result_qty = recipe.get("result_qty", 1)
-        _add_item(user_id, result_id, result_qty)
-        
+    if plan["successes"]:
         result_item = recipe.get("result_item", {})
+        result_qty = recipe.get("result_qty", 1)
         st.toast(f"✅ 炼制成功！获得 {result_item.get('name', '丹药')} x{result_qty}", icon="✅")
     else:
         st.toast(f"❌ 炼制失败！材料已消耗", icon="❌")
     
     st.rerun()
 
-def _remove_item(user_id: int, item_id: int, qty: int):
-    """从背包移除物品（内部函数）"""
-    supabase = get_supabase_client()
-    inv = supabase.table("user_inventory")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .eq("item_id", item_id)\
-        .execute()
-    
-    if inv.data:
-        current_qty = inv.data[0]["quantity"]
-        new_qty = current_qty - qty
-        if new_qty <= 0:
-            supabase.table("user_inventory").delete().eq("id", inv.data[0]["id"]).execute()
-        else:
-            supabase.table("user_inventory").update({"quantity": new_qty}).eq("id", inv.data[0]["id"]).execute()
-
-def _add_item(user_id: int, item_id: int, qty: int):
-    """添加物品到背包（内部函数）"""
-    supabase = get_supabase_client()
-    inv = supabase.table("user_inventory")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .eq("item_id", item_id)\
-        .execute()
-    
-    if inv.data:
-        current_qty = inv.data[0]["quantity"]
-        supabase.table("user_inventory").update({"quantity": current_qty + qty}).eq("id", inv.data[0]["id"]).execute()
-    else:
-        supabase.table("user_inventory").insert({
-            "user_id": user_id,
-            "item_id": item_id,
-            "quantity": qty
-        }).execute()
\ No newline at end of file
+def _handle_bulk_craft_alchemy(recipe, times: int, max_craftable: int):
+    """处理批量炼制逻辑（内部函数）"""
+    user = st.session_state.user
+    
+    # 可行性只检查一次
+    if times > max_craftable:
+        st.toast(f"❌ 材料或灵石不足，最多可炼制 {max_craftable} 次", icon="❌")
+        return
+    
+    plan = plan_craft_batch(recipe, times, default_success_rate=1.0,
+                            success_bonus=get_stat_block(user)["craft_success"])
+    try:
+        apply_craft_batch(user.id, plan)
+    except Exception as e:
+        st.toast(f"❌ 批量炼制失败：{str(e)[:100]}", icon="❌")
+        return
+    
+    user.spirit_stones -= plan["stone_cost"]
+    
+    result_item = recipe.get("result_item", {})
+    gained = plan["successes"] * recipe.get("result_qty", 1)
+    st.toast(
+        f"✅ 炼制 {times} 次：成功 {plan['successes']} 次，失败 {plan['failures']} 次，"
+        f"获得 {result_item.get('name', '丹药')} x{gained}",
+        icon="✅",
+    )
+    st.rerun()
@@ -1,13 +1,17 @@
 # ==================================================
 # 阵法堂模块
-# 功能：查看阵法、激活阵法、效果管理
+# 功能：查看阵法、激活 / 续期阵法、查看生效中的增益
+#      增益的叠加、到期与属性计算见 core/buffs.py
 # ==================================================
 
+import time
+
 import streamlit as st
-from core.config import FEATURES, get_supabase_client
-from core.database import get_user_sect
-from core.errors import safe_page_load
-from datetime import datetime, timedelta
+from core.buffs import ARRAY_ERRORS, activate_array, describe_effect, get_active_buffs
+from core.config import ARRAY_MAX_ACTIVE, ARRAY_MAX_STACKS, FEATURES, get_supabase_client
+from core.errors import describe_error, safe_page_load
+from core.navigation import page_link
+from core.stats import get_stat_block
 
 def show_array_page():
     """
@@ -16,17 +20,13 @@ def show_array_page():
     """
     if not FEATURES.get("array", True):
         st.warning("阵法堂暂未开放")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 阵法堂", layout="wide")
     st.title("🌀 阵法堂")
     
-    if st.button("⬅️ 返回主城", key="array_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("阵法堂"):
         _render_array_content()
@@ -34,7 +34,7 @@ def show_array_page():
 def _render_array_content():
     """渲染阵法堂内容（内部函数）"""
     supabase = get_supabase_client()
-    user_id = st.session_state.user.id
+    user = st.session_state.user
     
     # 获取所有阵法
     arrays = supabase.table("arrays").select("*").execute()
@@ -44,72 +44,78 @@ def _render_array_content():
         st.info("暂无可用阵法")
         return
     
-    # 检查当前激活的阵法
-    progress = supabase.table("user_progress")\
-        .select("active_array_id, array_expire_time")\
-        .eq("user_id", user_id)\
-        .execute()
-    
-    active_array = None
-    if progress.data:
-        active = progress.data[0]
-        expire_time = active.get("array_expire_time")
-        if expire_time:
-            expire_dt = datetime.fromisoformat(expire_time.replace("Z", "+00:00"))
-            if datetime.now(expire_dt.tzinfo) < expire_dt:
-                active_array = active
+    # 生效中的增益（进程级缓存，到期由最小堆移除）
+    active = {buff["array_id"]: buff for buff in get_active_buffs(user.id)}
+    _render_active_buffs(user, active, {arr["id"]: arr for arr in arrays_data})
     
     st.subheader("🔮 可用阵法")
+    st.caption(f"最多同时激活 {ARRAY_MAX_ACTIVE} 个阵法，不同阵法的同类效果只取最强的一个；"
+               f"生效中的阵法可以续期，剩余时间最多为 {ARRAY_MAX_STACKS} 个持续时间")
     
     for arr in arrays_data:
-        _render_array_item(arr, user_id, active_array)
+        _render_array_item(arr, active.get(arr["id"]))
+
+def _render_active_buffs(user, active, arrays_by_id):
+    """显示生效中的阵法与加成后的属性（内部函数）"""
+    st.subheader("🧿 生效中的阵法")
+    if not active:
+        st.info("当前没有生效中的阵法")
+        return
+    
+    now = time.time()
+    for array_id, buff in active.items():
+        name = arrays_by_id.get(array_id, {}).get("name", "未知阵法")
+        minutes_left = max(0, int(buff["_expires"] - now)) // 60
+        st.write(f"✨ **{name}** · {describe_effect(buff['effect_type'], buff['effect_value'])} · ⏳ 剩余约 {minutes_left} 分钟")
+    
+    stats = get_stat_block(user)
+    base = stats["base"]
+    st.caption(
+        f"加成后属性：生命 {stats['hp']:,}（基础 {base['hp']:,}） · 灵力 {stats['mp']:,}（基础 {base['mp']:,}） · "
+        f"攻击 {stats['attack']:,}（基础 {base['attack']:,}） · 防御 {stats['defense']:,}（基础 {base['defense']:,}）"
+        + (f" · 炼制成功率 +{stats['craft_success']:.0%}" if stats["craft_success"] else "")
+    )
 
-def _render_array_item(arr, user_id: int, active_array):
+def _render_array_item(arr, buff):
     """渲染单个阵法卡片（内部函数）"""
     with st.container(border=True):
         col1, col2 = st.columns([2, 1])
         
         with col1:
             st.subheader(f"✨ {arr['name']}")
-            st.write(f"**效果**: {arr.get('effect_type', '未知')} +{arr.get('effect_value', 0)}")
+            st.write(f"**效果**: {describe_effect(arr.get('effect_type'), arr.get('effect_value'))}")
             st.write(f"**持续时间**: {arr.get('duration_minutes', 0)} 分钟")
             st.write(f"**消耗灵石**: {arr.get('spirit_stone_cost', 0):,}")
             st.caption(arr.get('description', ''))
         
         with col2:
-            # 检查是否已激活
-            is_active = active_array and active_array.get("active_array_id") == arr["id"]
-            
-            if is_active:
-                st.success("✅ 已激活")
-            else:
-                if st.button("🔮 激活阵法", key=f"activate_array_{arr['id']}"):
-                    _handle_activate_array(arr)
+            if buff:
+                minutes_left = max(0, int(buff["_expires"] - time.time())) // 60
+                st.success(f"✅ 生效中（剩余约 {minutes_left} 分钟）")
+                if st.button("⏫ 续期", key=f"activate_array_{arr['id']}"):
+                    _handle_activate_array(arr, renew=True)
+            elif st.button("🔮 激活阵法", key=f"activate_array_{arr['id']}"):
+                _handle_activate_array(arr)
 
-def _handle_activate_array(arr):
-    """处理激活阵法逻辑（内部函数）"""
-    supabase = get_supabase_client()
-    user_id = st.session_state.user.id
+def _handle_activate_array(arr, renew: bool = False):
+    """处理激活 / 续期：扣除灵石与写入增益在服务端一次完成（内部函数）"""
+    user = st.session_state.user
     
     # 检查灵石
-    cost = arr.get("spirit_stone_cost", 0)
-    if st.session_state.user.spirit_stones < cost:
+    cost = arr.get("spirit_stone_cost") or 0
+    if user.spirit_stones < cost:
         st.toast(f"❌ 灵石不足，需要 {cost:,}", icon="❌")
         return
     
-    # 扣除灵石
-    supabase.rpc("deduct_spirit_stones", {"uid": user_id, "amount": cost}).execute()
-    
-    # 计算过期时间
-    duration = arr.get("duration_minutes", 0)
-    expire_time = datetime.now() + timedelta(minutes=duration)
+    try:
+        activate_array(user.id, arr["id"])
+    except Exception as e:
+        st.toast(f"❌ {'续期' if renew else '激活'}失败：{describe_error(e, ARRAY_ERRORS)}", icon="❌")
+        return
     
-    # 更新用户进度
-    supabase.table("user_progress").upsert({
-        "user_id": user_id,
-        "active_array_id": arr["id"],
-        "array_expire_time": expire_time.isoformat()
-    }).execute()
+    user.spirit_stones -= cost
     
-    st.toast(f"✅ 阵法「{arr['name']}」已激活，持续 {duration} 分钟！", icon="✅")
-    st.rerun()
\ No newline at end of file
+    duration = arr.get("duration_minutes", 0)
+    action = "已续期" if renew else "已激活"
+    st.toast(f"✅ 阵法「{arr['name']}」{action}，增加 {duration} 分钟！", icon="✅")
+    st.rerun()
@@ -1,12 +1,17 @@
 # ==================================================
 # 背包模块
-# 功能：查看物品、使用物品、丢弃物品
+# 功能：查看物品、使用物品、丢弃物品、穿戴 / 卸下装备
 # ==================================================
 
 import streamlit as st
 from core.config import FEATURES, get_supabase_client
-from core.errors import safe_page_load
+from core.catalog import get_item_catalog
+from core.errors import describe_error, safe_page_load
+from core.inventory import remove_items
+from core.progression import PROGRESSION_ERRORS, increment_exp
+from core.stats import EQUIP_ERRORS, equip_item, get_stat_engine, slot_label, unequip_item
 from utils.helpers import get_current_time_str
+from core.navigation import page_link
 
 def show_backpack_page():
     """
@@ -15,17 +20,13 @@ def show_backpack_page():
     """
     if not FEATURES.get("backpack", True):
         st.warning("背包功能暂未开放")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 背包", layout="wide")
     st.title("🎒 个人背包")
     
-    if st.button("⬅️ 返回主城", key="backpack_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("背包"):
         _render_backpack_content()
@@ -43,6 +44,8 @@ def _render_backpack_content():
     
     inventory_data = inventory.data if inventory else []
     
+    _render_equipment()
+    
     if not inventory_data:
         st.info("背包空空如也，快去藏宝阁逛逛吧！")
         return
@@ -53,6 +56,30 @@ def _render_backpack_content():
     for inv_item in inventory_data:
         _render_inventory_item(inv_item)
 
+def _render_equipment():
+    """显示已穿戴的装备（内部函数）"""
+    user = st.session_state.user
+    engine = get_stat_engine()
+    equipment = engine.equipment(user)
+    stats = engine.get(user)
+    
+    st.subheader("⚔️ 已装备")
+    st.caption(f"当前属性：生命 {stats['hp']:,} · 灵力 {stats['mp']:,} · 攻击 {stats['attack']:,} · 防御 {stats['defense']:,}")
+    if not equipment:
+        st.info("尚未穿戴装备，炼器坊打造的法宝可以在下方背包中装备")
+        return
+    
+    catalog = get_item_catalog()
+    for slot, item_id in sorted(equipment.items()):
+        item = catalog.get_by_id(item_id) or {}
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**{slot_label(slot)}**：{item.get('name', '未知物品')}")
+        with col2:
+            if st.button("卸下", key=f"unequip_{slot}"):
+                _handle_unequip(slot, item.get("name", "装备"))
+    st.divider()
+
 def _render_inventory_item(inv_item):
     """渲染单个物品卡片（内部函数）"""
     item_info = inv_item.get("items", {})
@@ -64,6 +91,12 @@ def _render_inventory_item(inv_item):
         st.write(f"**效果**: {item_info.get('effect', '无')}")
         st.write(f"**获得时间**: {inv_item.get('acquired_date', '未知')[:19].replace('T', ' ')}")
         
+        # 可装备物品
+        slot = get_stat_engine().equip_slot(get_item_catalog().get_by_id(inv_item.get("item_id")))
+        if slot:
+            if st.button(f"🗡️ 装备（{slot_label(slot)}）", key=f"equip_{inv_item['id']}"):
+                _handle_equip(inv_item, item_name)
+        
         # 可使用物品
         if item_info.get("usable", False):
             if st.button("✨ 使用", key=f"use_{inv_item['id']}"):
@@ -81,25 +114,76 @@ def _handle_use_item(inv_item, item_info):
     effect_type = item_info.get("effect_type", "")
     effect_value = item_info.get("effect_value", 0)
     
+    if effect_type == "add_exp":
+        # 增加经验：扣除物品、增加经验、突破在服务端同一事务内完成
+        _handle_add_exp(inv_item, item_info)
+        return
+    
+    # 从背包扣除 1 件（背包账本，数量不足时不生效）
+    try:
+        remove_items(user_id, {inv_item["item_id"]: 1})
+    except Exception as e:
+        st.toast(f"❌ 使用失败：{str(e)[:100]}", icon="❌")
+        return
+    
     if effect_type == "heal_hp":
         # 恢复生命值
         current_hp = st.session_state.user.hp
         new_hp = current_hp + effect_value
         supabase.table("user_cultivation").update({"hp": new_hp}).eq("user_id", user_id).execute()
         st.session_state.user.hp = new_hp
-        
-    elif effect_type == "add_exp":
-        # 增加经验
-        current_exp = supabase.rpc("get_user_exp", {"uid": user_id}).execute().data or 0
-        new_exp = current_exp + effect_value
-        supabase.table("user_cultivation").update({"exp": new_exp}).eq("user_id", user_id).execute()
-    
-    # 从背包移除
-    supabase.table("user_inventory").delete().eq("id", inv_item["id"]).execute()
+        get_stat_engine().invalidate(user_id)
     
     st.toast(f"✅ 使用了 1 个{item_info['name']}！", icon="✅")
     st.rerun()
 
+def _handle_add_exp(inv_item, item_info):
+    """处理增加经验的物品：达到门槛时自动突破，可一次跨越多层（内部函数）"""
+    user = st.session_state.user
+    try:
+        result = increment_exp(user.id, item_info.get("effect_value", 0), item_id=inv_item["item_id"])
+    except Exception as e:
+        st.toast(f"❌ 使用失败：{describe_error(e, PROGRESSION_ERRORS)}", icon="❌")
+        return
+    
+    user.cultivation_level = result["level"]
+    user.realm = result["realm"]
+    user.stage = result["stage"]
+    for key in ("hp", "mp", "attack", "defense"):
+        setattr(user, key, result[key])
+    
+    msg = f"✅ 使用了 1 个{item_info['name']}，修为 +{item_info.get('effect_value', 0):,}"
+    if result.get("levels_gained"):
+        msg += f"，突破至 {result['realm']} {result['stage']} 层！"
+    st.toast(msg, icon="✅")
+    st.rerun()
+
+def _handle_equip(inv_item, item_name: str):
+    """处理穿戴：取出 1 件装备，同部位的旧装备放回背包（内部函数）"""
+    user = st.session_state.user
+    try:
+        change = equip_item(user.id, inv_item["item_id"])
+    except Exception as e:
+        st.toast(f"❌ 装备失败：{describe_error(e, EQUIP_ERRORS)}", icon="❌")
+        return
+    
+    msg = f"✅ 已装备 {item_name}"
+    if change.get("previous_item_id") is not None:
+        previous = get_item_catalog().get_by_id(change["previous_item_id"]) or {}
+        msg += f"，{previous.get('name', '旧装备')} 已放回背包"
+    st.toast(msg, icon="✅")
+    st.rerun()
+
+def _handle_unequip(slot: str, item_name: str):
+    """处理卸下装备（内部函数）"""
+    try:
+        unequip_item(st.session_state.user.id, slot)
+    except Exception as e:
+        st.toast(f"❌ 卸下失败：{describe_error(e, EQUIP_ERRORS)}", icon="❌")
+        return
+    st.toast(f"✅ 已卸下 {item_name}", icon="✅")
+    st.rerun()
+
 def _handle_discard_item(inv_id: int, item_name: str, quantity: int):
     """处理物品丢弃（内部函数）"""
     # 显示确认弹窗
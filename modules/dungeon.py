@@ -1,13 +1,15 @@
 # ==================================================
 # 秘境模块
-# 功能：查看秘境、挑战秘境、奖励发放
+# 功能：查看秘境、挑战秘境（自动战斗）、奖励发放、扫荡模拟
 # ==================================================
 
 import streamlit as st
-from core.config import FEATURES, get_supabase_client
-from core.database import get_user_sect
-from core.errors import safe_page_load
-from datetime import datetime, timedelta
+from core.battle import Combatant, estimate_dungeon, fight, monster_for, simulate
+from core.config import BATTLE_SWEEP_MAX_RUNS, FEATURES
+from core.dungeons import DUNGEON_ERRORS, claim_dungeon, get_dungeon_status
+from core.errors import describe_error, safe_page_load
+from core.navigation import page_link
+from core.stats import get_stat_block
 
 def show_dungeon_page():
     """
@@ -16,141 +18,123 @@ def show_dungeon_page():
     """
     if not FEATURES.get("dungeon", True):
         st.warning("秘境暂未开放")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 秘境", layout="wide")
     st.title("🕳️ 秘境挑战")
     
-    if st.button("⬅️ 返回主城", key="dungeon_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("秘境"):
         _render_dungeon_content()
 
 def _render_dungeon_content():
     """渲染秘境内容（内部函数）"""
-    supabase = get_supabase_client()
-    user_id = st.session_state.user.id
-    
-    # 获取所有秘境
-    dungeons = supabase.table("dungeons").select("""
-        *,
-        reward_item:items!reward_item_id(name)
-    """).execute()
+    user = st.session_state.user
     
-    dungeons_data = dungeons.data if dungeons else []
+    # 所有秘境及等级 / 冷却状态（服务端一次查询算好）
+    dungeons_data = get_dungeon_status(user.id)
     
     if not dungeons_data:
         st.info("暂无秘境开放")
         return
     
-    # 获取用户挑战记录
-    progress = supabase.table("user_progress")\
-        .select("last_dungeon_time")\
-        .eq("user_id", user_id)\
-        .execute()
+    _render_last_battle()
     
-    last_time = None
-    if progress.data:
-        last_time = progress.data[0].get("last_dungeon_time")
+    player = Combatant.from_user(user, get_stat_block(user))
+    st.caption(f"你的战斗属性（含装备、宗门、阵法加成）：生命 {player.hp:,} · 灵力 {player.mp:,} · 攻击 {player.attack:,} · 防御 {player.defense:,}")
+    _render_sweep(player, dungeons_data)
     
     st.subheader("⚔️ 可挑战秘境")
     
     for dungeon in dungeons_data:
-        _render_dungeon_item(dungeon, user_id, last_time)
+        _render_dungeon_item(dungeon, player)
+
+def _render_last_battle():
+    """显示上一场战斗的记录（内部函数）"""
+    battle = st.session_state.pop("last_battle", None)
+    if not battle:
+        return
+    title = "🏆 上一场战斗：胜利" if battle["victory"] else "💀 上一场战斗：战败"
+    with st.expander(f"{title}（{battle['rounds']} 回合）", expanded=True):
+        st.text("\n".join(battle["log"]))
+
+def _render_sweep(player, dungeons_data):
+    """扫荡模拟：一次模拟 N 场，显示胜率与期望收益（内部函数）"""
+    with st.expander("🧮 扫荡模拟"):
+        options = {d["name"]: d for d in dungeons_data}
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            name = st.selectbox("秘境", list(options), key="sweep_dungeon")
+        with col2:
+            runs = st.number_input("模拟场数", min_value=1, max_value=BATTLE_SWEEP_MAX_RUNS, value=1000, step=100,
+                                   key="sweep_runs")
+        with col3:
+            seed = st.number_input("随机种子", min_value=0, value=0, key="sweep_seed")
+        
+        if st.button("🧮 扫荡 ×N", key="sweep_run"):
+            dungeon = options[name]
+            result = simulate(player, monster_for(dungeon), int(runs), int(seed))
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("胜率", f"{result['win_rate']:.1%}")
+            m2.metric("平均回合", f"{result['avg_rounds']:.1f}")
+            m3.metric(f"{int(runs):,} 场期望灵石", f"{result['win_rate'] * dungeon['reward_spirit_stones'] * runs:,.0f}")
+            m4.metric("获胜时剩余生命", f"{result['avg_hp_left']:,.0f}")
+            st.caption(f"胜 {result['wins']:,} / {int(runs):,} 场，耗时 {result['elapsed_ms']:.1f} ms")
 
-def _render_dungeon_item(dungeon, user_id: int, last_time):
+def _render_dungeon_item(dungeon, player):
     """渲染单个秘境卡片（内部函数）"""
+    monster = monster_for(dungeon)
     with st.container(border=True):
         col1, col2 = st.columns([2, 1])
         
         with col1:
             st.subheader(f"🗡️ {dungeon['name']}")
-            st.write(f"**要求等级**: {dungeon.get('required_level', 1)}")
-            st.write(f"**冷却时间**: {dungeon.get('cooldown_hours', 24)} 小时")
-            st.write(f"**灵石奖励**: {dungeon.get('reward_spirit_stones', 0):,}")
+            st.write(f"**要求等级**: {dungeon['required_level']}")
+            st.write(f"**冷却时间**: {dungeon['cooldown_hours']:g} 小时")
+            st.write(f"**灵石奖励**: {dungeon['reward_spirit_stones']:,}")
             
-            reward_item = dungeon.get("reward_item", {})
-            if reward_item:
-                st.write(f"**物品奖励**: {reward_item.get('name', '未知')} x{dungeon.get('reward_item_qty', 0)}")
+            if dungeon.get("reward_item_name"):
+                st.write(f"**物品奖励**: {dungeon['reward_item_name']} x{dungeon['reward_item_qty']}")
             
-            st.caption(dungeon.get('description', ''))
+            st.write(f"**守关妖兽**: {monster.name}（生命 {monster.hp:,} · 攻击 {monster.attack:,} · 防御 {monster.defense:,}）")
+            st.caption(dungeon.get('description') or '')
         
         with col2:
-            # 检查冷却
-            can_enter = True
-            wait_hours = 0
+            odds = estimate_dungeon(player, dungeon)
+            st.metric("预估胜率", f"{odds['win_rate']:.0%}", help=f"按当前属性模拟 {odds['runs']:,} 场")
+            st.caption(f"期望灵石 {odds['expected_stones']:,.0f} / 次")
             
-            if last_time:
-                last_dt = datetime.fromisoformat(last_time.replace("Z", "+00:00"))
-                cooldown = timedelta(hours=dungeon.get("cooldown_hours", 24))
-                if datetime.now(last_dt.tzinfo) < last_dt + cooldown:
-                    can_enter = False
-                    wait_hours = (last_dt + cooldown - datetime.now(last_dt.tzinfo)).total_seconds() / 3600
-            
-            # 检查等级
-            user_level = st.session_state.user.cultivation_level
-            if user_level < dungeon.get("required_level", 1):
-                can_enter = False
-            
-            if can_enter:
+            if dungeon["eligible"]:
                 if st.button("⚔️ 进入秘境", key=f"enter_dungeon_{dungeon['id']}"):
-                    _handle_enter_dungeon(dungeon)
+                    _handle_enter_dungeon(dungeon, player, monster)
+            elif not dungeon["level_ok"]:
+                st.warning(f"⚠️ 等级不足 (需要 {dungeon['required_level']})")
             else:
-                if wait_hours > 0:
-                    st.warning(f"⏳ 冷却中 ({wait_hours:.1f}小时)")
-                else:
-                    st.warning(f"⚠️ 等级不足 (需要 {dungeon.get('required_level', 1)})")
+                st.warning(f"⏳ 冷却中 ({dungeon['cooldown_remaining'] / 3600:.1f}小时)")
 
-def _handle_enter_dungeon(dungeon):
-    """处理进入秘境逻辑（内部函数）"""
-    supabase = get_supabase_client()
-    user_id = st.session_state.user.id
-    
-    # 发放奖励
-    spirit_reward = dungeon.get("reward_spirit_stones", 0)
-    supabase.rpc("add_spirit_stones", {"uid": user_id, "amount": spirit_reward}).execute()
+def _handle_enter_dungeon(dungeon, player, monster):
+    """处理进入秘境：自动战斗后结算，等级、冷却校验与奖励发放在服务端一次完成（内部函数）"""
+    user = st.session_state.user
+    battle = fight(player, monster)
+    try:
+        reward = claim_dungeon(user.id, dungeon["id"], battle["victory"])
+    except Exception as e:
+        st.toast(f"❌ 挑战失败：{describe_error(e, DUNGEON_ERRORS)}", icon="❌")
+        return
     
-    # 发放物品奖励
-    item_id = dungeon.get("reward_item_id")
-    item_qty = dungeon.get("reward_item_qty", 0)
-    if item_id and item_qty > 0:
-        _add_item(user_id, item_id, item_qty)
+    st.session_state.last_battle = battle
+    if not battle["victory"]:
+        st.toast(f"💀 不敌{monster.name}，铩羽而归", icon="💀")
+        st.rerun()
     
-    # 更新挑战时间
-    supabase.table("user_progress").upsert({
-        "user_id": user_id,
-        "last_dungeon_time": datetime.now().isoformat()
-    }).execute()
+    user.spirit_stones += reward["spirit_stones"]
     
     # 显示奖励
-    msg = f"✅ 通关「{dungeon['name']}」！获得 {spirit_reward:,} 灵石"
-    reward_item = dungeon.get("reward_item", {})
-    if reward_item:
-        msg += f" 和 {reward_item.get('name', '物品')} x{dungeon.get('reward_item_qty', 0)}"
+    msg = f"✅ 通关「{dungeon['name']}」！获得 {reward['spirit_stones']:,} 灵石"
+    if dungeon.get("reward_item_name") and reward["item_qty"] > 0:
+        msg += f" 和 {dungeon['reward_item_name']} x{reward['item_qty']}"
     
     st.toast(msg, icon="✅")
     st.rerun()
-
-def _add_item(user_id: int, item_id: int, qty: int):
-    """添加物品到背包（内部函数）"""
-    supabase = get_supabase_client()
-    inv = supabase.table("user_inventory")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .eq("item_id", item_id)\
-        .execute()
-    
-    if inv.data:
-        current_qty = inv.data[0]["quantity"]
-        supabase.table("user_inventory").update({"quantity": current_qty + qty}).eq("id", inv.data[0]["id"]).execute()
-    else:
-        supabase.table("user_inventory").insert({
-            "user_id": user_id,
-            "item_id": item_id,
-            "quantity": qty
-        }).execute()
\ No newline at end of file
@@ -4,10 +4,12 @@
 # ==================================================
 
 import streamlit as st
-from core.config import FEATURES, get_supabase_client
-from core.database import get_user_sect
+from core.config import FEATURES, FORGE_MATERIAL_BONUS, get_supabase_client
+from core.database import get_user_sect, get_user_inventory_quantities
 from core.errors import safe_page_load
-import random
+from core.crafting import compute_max_craftable, plan_craft_batch, apply_craft_batch
+from core.navigation import page_link
+from core.stats import get_stat_block
 
 def show_forge_page():
     """
@@ -16,17 +18,13 @@ def show_forge_page():
     """
     if not FEATURES.get("forge", True):
         st.warning("炼器坊暂未开放")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 炼器坊", layout="wide")
     st.title("🔨 炼器坊")
     
-    if st.button("⬅️ 返回主城", key="forge_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("炼器坊"):
         _render_forge_content()
@@ -50,13 +48,22 @@ def _render_forge_content():
         st.info("暂无炼器图纸")
         return
     
-    # 按品级分组显示
+    # 背包只查询一次，批量计算每张图纸的可打造次数
+    inventory = get_user_inventory_quantities(user_id)
+    craftable = compute_max_craftable(blueprints_data, inventory, st.session_state.user.spirit_stones)
+    
     st.subheader("📐 图纸列表")
+    st.caption("打造出的法宝可在背包中装备，攻击加成与材料加成在装备后生效")
+    
+    sort_mode = st.selectbox("排序方式", ["默认顺序", "可打造次数（多→少）"], key="forge_sort")
+    order = range(len(blueprints_data))
+    if sort_mode == "可打造次数（多→少）":
+        order = (-craftable).argsort(kind="stable")
     
-    for bp in blueprints_data:
-        _render_forge_blueprint(bp, user_id)
+    for idx in order:
+        _render_forge_blueprint(blueprints_data[idx], user_id, int(craftable[idx]))
 
-def _render_forge_blueprint(bp, user_id: int):
+def _render_forge_blueprint(bp, user_id: int, max_craftable: int):
     """渲染单个图纸卡片（内部函数）"""
     with st.container(border=True):
         col1, col2 = st.columns([2, 1])
@@ -68,10 +75,14 @@ def _render_forge_blueprint(bp, user_id: int):
             result_item = bp.get("result_item", {})
             st.write(f"**产出**: {result_item.get('name', '未知')} x{bp.get('result_qty', 1)}")
             
-            # 显示攻击加成
+            # 显示攻击加成（装备后生效）
             attack_bonus = result_item.get("attack_bonus", 0)
             if attack_bonus > 0:
                 st.write(f"**攻击加成**: +{attack_bonus} ⚔️")
+            material_bonus = sum(FORGE_MATERIAL_BONUS.get((bp.get(key) or {}).get("name"), 0.0)
+                                 for key in ("material_1", "material_2"))
+            if material_bonus > 0:
+                st.write(f"**材料加成**: 攻击 +{material_bonus:.0%} ⚔️")
             
             # 显示材料需求
             st.write("**材料需求:**")
@@ -85,117 +96,82 @@ def _render_forge_blueprint(bp, user_id: int):
                 st.write(f"  • {mat2.get('name', '未知')} x{mat2_qty}")
             
             st.write(f"**消耗灵石**: {bp.get('spirit_stone_cost', 0):,}")
-            st.write(f"**成功率**: {int(bp.get('success_rate', 0.8) * 100)}%")
+            _render_success_rate(bp.get('success_rate', 0.8))
         
         with col2:
             # 检查材料是否足够
-            has_materials = _check_forge_materials(user_id, bp)
+            has_materials = max_craftable > 0
+            st.metric("可打造次数", max_craftable)
             
             btn_label = "⚒️ 开始打造" if has_materials else "❌ 材料不足"
             btn_disabled = not has_materials
             
             if st.button(btn_label, key=f"forge_craft_{bp['id']}", disabled=btn_disabled):
                 _handle_craft_forge(bp)
+            
+            # 批量打造：一次掷出 N 次结果，一次写入
+            if max_craftable > 1:
+                times = st.number_input("打造次数", min_value=1, max_value=max_craftable, value=max_craftable,
+                                        key=f"forge_times_{bp['id']}")
+                if st.button(f"⚡ 批量打造 ×{times}", key=f"forge_bulk_{bp['id']}"):
+                    _handle_bulk_craft_forge(bp, int(times), max_craftable)
 
-def _check_forge_materials(user_id: int, bp) -> bool:
-    """检查用户是否有足够材料（内部函数）"""
-    supabase = get_supabase_client()
-    
-    # 获取用户背包
-    inventory = supabase.table("user_inventory")\
-        .select("item_id, quantity")\
-        .eq("user_id", user_id)\
-        .execute()
-    
-    inv_dict = {item["item_id"]: item["quantity"] for item in (inventory.data or [])}
-    
-    # 检查材料 1
-    mat1_id = bp.get("material_1_id")
-    mat1_qty = bp.get("material_1_qty", 0)
-    if inv_dict.get(mat1_id, 0) < mat1_qty:
-        return False
-    
-    # 检查材料 2
-    mat2_id = bp.get("material_2_id")
-    mat2_qty = bp.get("material_2_qty", 0)
-    if mat2_id and inv_dict.get(mat2_id, 0) < mat2_qty:
-        return False
-    
-    # 检查灵石
-    user = st.session_state.user
-    if user.spirit_stones < bp.get("spirit_stone_cost", 0):
-        return False
-    
-    return True
+def _render_success_rate(success_rate: float):
+    """显示成功率，阵法加成单独标出（内部函数）"""
+    bonus = get_stat_block(st.session_state.user)["craft_success"]
+    text = f"**成功率**: {int(min(1.0, success_rate + bonus) * 100)}%"
+    if bonus:
+        text += f"（含阵法 +{bonus:.0%}）"
+    st.write(text)
 
 def _handle_craft_forge(bp):
     """处理打造逻辑（内部函数）"""
-    supabase = get_supabase_client()
-    user_id = st.session_state.user.id
-    
-    # 扣除材料
-    mat1_id = bp.get("material_1_id")
-    mat1_qty = bp.get("material_1_qty", 0)
-    _remove_item(user_id, mat1_id, mat1_qty)
-    
-    mat2_id = bp.get("material_2_id")
-    mat2_qty = bp.get("material_2_qty", 0)
-    if mat2_id:
-        _remove_item(user_id, mat2_id, mat2_qty)
+    user = st.session_state.user
     
-    # 扣除灵石
-    cost = bp.get("spirit_stone_cost", 0)
-    supabase.rpc("deduct_spirit_stones", {"uid": user_id, "amount": cost}).execute()
+    # 判定成功率，扣除材料 / 灵石与发放产物在同一次 RPC 内完成
+    plan = plan_craft_batch(bp, 1, default_success_rate=0.8,
+                            success_bonus=get_stat_block(user)["craft_success"])
+    try:
+        apply_craft_batch(user.id, plan)
+    except Exception as e:
+        st.toast(f"❌ 打造失败：{str(e)[:100]}", icon="❌")
+        return
     
-    # 判定成功率
-    success_rate = bp.get("success_rate", 0.8)
-    success = random.random() <= success_rate
+    user.spirit_stones -= plan["stone_cost"]
     
-    if success:
-        # 添加产物
-        result_id = bp.get("result_item_id")
-        result_qty = bp.get("result_qty", 1)
-        _add_item(user_id, result_id, result_qty)
-        
+    if plan["successes"]:
         result_item = bp.get("result_item", {})
+        result_qty = bp.get("result_qty", 1)
         st.toast(f"✅ 打造成功！获得 {result_item.get('name', '装备')} x{result_qty}", icon="✅")
     else:
         st.toast(f"❌ 打造失败！材料已消耗", icon="❌")
     
     st.rerun()
 
-def _remove_item(user_id: int, item_id: int, qty: int):
-    """从背包移除物品（内部函数）"""
-    supabase = get_supabase_client()
-    inv = supabase.table("user_inventory")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .eq("item_id", item_id)\
-        .execute()
-    
-    if inv.data:
-        current_qty = inv.data[0]["quantity"]
-        new_qty = current_qty - qty
-        if new_qty <= 0:
-            supabase.table("user_inventory").delete().eq("id", inv.data[0]["id"]).execute()
-        else:
-            supabase.table("user_inventory").update({"quantity": new_qty}).eq("id", inv.data[0]["id"]).execute()
-
-def _add_item(user_id: int, item_id: int, qty: int):
-    """添加物品到背包（内部函数）"""
-    supabase = get_supabase_client()
-    inv = supabase.table("user_inventory")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .eq("item_id", item_id)\
-        .execute()
-    
-    if inv.data:
-        current_qty = inv.data[0]["quantity"]
-        supabase.table("user_inventory").update({"quantity": current_qty + qty}).eq("id", inv.data[0]["id"]).execute()
-    else:
-        supabase.table("user_inventory").insert({
-            "user_id": user_id,
-            "item_id": item_id,
-            "quantity": qty
-        }).execute()
\ No newline at end of file
+def _handle_bulk_craft_forge(bp, times: int, max_craftable: int):
+    """处理批量打造逻辑（内部函数）"""
+    user = st.session_state.user
+    
+    # 可行性只检查一次
+    if times > max_craftable:
+        st.toast(f"❌ 材料或灵石不足，最多可打造 {max_craftable} 次", icon="❌")
+        return
+    
+    plan = plan_craft_batch(bp, times, default_success_rate=0.8,
+                            success_bonus=get_stat_block(user)["craft_success"])
+    try:
+        apply_craft_batch(user.id, plan)
+    except Exception as e:
+        st.toast(f"❌ 批量打造失败：{str(e)[:100]}", icon="❌")
+        return
+    
+    user.spirit_stones -= plan["stone_cost"]
+    
+    result_item = bp.get("result_item", {})
+    gained = plan["successes"] * bp.get("result_qty", 1)
+    st.toast(
+        f"✅ 打造 {times} 次：成功 {plan['successes']} 次，失败 {plan['failures']} 次，"
+        f"获得 {result_item.get('name', '装备')} x{gained}",
+        icon="✅",
+    )
+    st.rerun()
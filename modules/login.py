@@ -7,6 +7,7 @@ import streamlit as st
 from typing import Dict, Any, Optional
 from core.config import get_supabase_client, MAIN_ADMIN_USERNAME, MAIN_ADMIN_PASSWORD
 from utils.helpers import hash_password, verify_password
+from core.navigation import go_to
 
 # ==============================#
 # 👤 用户类定义
@@ -124,8 +125,7 @@ def show_login_page():
                     user = User.login(username, password)
                     if user:
                         st.session_state.user = user
-                        st.session_state.page = 'main'
-                        st.rerun()
+                        go_to('main')
                     else:
                         st.error("用户名或密码错误")
 
@@ -179,9 +179,8 @@ def _handle_registration(username: str, password: str):
         user = User(result.data[0])
         _ensure_user_cultivation_record(user.id)
         st.session_state.user = user
-        st.session_state.page = 'main'
         st.success("注册成功！欢迎踏入修仙界！")
-        st.rerun()
+        go_to('main')
     else:
         st.error("注册失败，请稍后再试")
 
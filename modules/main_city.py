@@ -7,6 +7,9 @@ import streamlit as st
 from core.config import FEATURES, SECT_CATEGORIES
 from core.database import get_user_sect  # ✅ 确保是这一行！
 from core.errors import safe_page_load
+from core.navigation import page_link, go_to
+from core.progression import get_progress
+from core.stats import get_stat_block
 
 def show_main_page():
     """ 显示主城主界面 包含侧边栏用户信息和导航菜单 """
@@ -14,8 +17,7 @@ def show_main_page():
 
     # 检查用户是否登录
     if 'user' not in st.session_state or st.session_state.user is None:
-        st.session_state.page = 'login'
-        st.rerun()
+        go_to('login')
 
     user = st.session_state.user
 
@@ -24,85 +26,56 @@ def show_main_page():
     # ==============================#
     with st.sidebar:
         st.title(f"👤 {user.username}")
+        # 境界与本层修为进度（其他会话的经验活动也会反映在这里）
+        progress = get_progress(user.id)
+        if progress:
+            user.realm, user.stage = progress["realm"], progress["stage"]
         st.write(f"境界：{user.realm} {user.stage}层")
+        if progress and progress["next_exp_required"]:
+            st.progress(
+                progress["exp_into_stage"] / progress["next_exp_required"],
+                text=f"修为 {progress['exp_into_stage']:,} / {progress['next_exp_required']:,}",
+            )
         st.write(f"灵石：{user.spirit_stones:,} 💎")
-        st.write(f"生命：{user.hp} ❤️")
-        st.write(f"攻击：{user.attack} ⚔️")
-        st.write(f"防御：{user.defense} 🛡️")
+        # 属性含装备、宗门、阵法加成
+        stats = get_stat_block(user)
+        st.write(f"生命：{stats['hp']} ❤️")
+        st.write(f"攻击：{stats['attack']} ⚔️")
+        st.write(f"防御：{stats['defense']} 🛡️")
 
         # 显示宗门信息
         current_sect = get_user_sect(user.id)
         if current_sect:
-            st.write(f"宗门：{current_sect['name']}")
+            st.write(f"宗门：{current_sect['sect_name']}")
         else:
             st.write("宗门：散修")
 
         st.markdown("---")
         st.subheader("🧭 导航")
 
-        # 构建导航菜单
-        nav_options = ["🏠 主城", "🏪 藏宝阁", "🎒 背包"]
-        if FEATURES["sect"]:
-            nav_options.append("🏯 宗门")
-        if FEATURES["alchemy"]:
-            nav_options.append("🧪 炼丹房")
-        if FEATURES["forge"]:
-            nav_options.append("🔨 炼器坊")
-        if FEATURES["array"]:
-            nav_options.append("🌀 阵法堂")
-        if FEATURES["dungeon"]:
-            nav_options.append("🕳️ 秘境")
+        # 导航链接：点击后直接运行目标页面（一次脚本运行）
+        nav_pages = ['main', 'shop', 'backpack', 'player_trade']
+        for feature in ['sect', 'alchemy', 'forge', 'array', 'dungeon']:
+            if FEATURES[feature]:
+                nav_pages.append(feature)
 
         # 管理员入口（安全分级）
         if user.is_admin:
-            nav_options.append("🛡️ 管理中心")  # 所有管理员可见
+            nav_pages.append('admin_center')  # 所有管理员可见
         if user.is_super_admin:
-            nav_options.append("👑 轩璃专属")
+            nav_pages.append('xuanli_admin')
 
-        # 导航选择器
-        selected_nav = st.radio("选择功能", nav_options, key="main_nav_radio")
+        for key in nav_pages:
+            page_link(key)
 
         if st.button("🚪 退出登录", key="logout_btn"):
             st.session_state.user = None
-            st.session_state.page = 'login'
-            st.rerun()
+            go_to('login')
 
     # ==============================#
-    # 主内容区：根据选择显示不同页面
+    # 主内容区
     # ==============================#
-    _handle_navigation(selected_nav)
-
-def _handle_navigation(selected_nav: str):
-    """处理导航选择（内部函数）"""
-    if selected_nav == "🏠 主城":
-        _render_main_city_content()
-    elif selected_nav == "🏪 藏宝阁":
-        st.session_state.page = 'shop'
-        st.rerun()
-    elif selected_nav == "🎒 背包":
-        st.session_state.page = 'backpack'
-        st.rerun()
-    elif selected_nav == "🏯 宗门":
-        st.session_state.page = 'sect'
-        st.rerun()
-    elif selected_nav == "🧪 炼丹房":
-        st.session_state.page = 'alchemy'
-        st.rerun()
-    elif selected_nav == "🔨 炼器坊":
-        st.session_state.page = 'forge'
-        st.rerun()
-    elif selected_nav == "🌀 阵法堂":
-        st.session_state.page = 'array'
-        st.rerun()
-    elif selected_nav == "🕳️ 秘境":
-        st.session_state.page = 'dungeon'
-        st.rerun()
-    elif selected_nav == "🛡️ 管理中心":
-        st.session_state.page = 'admin_center'  # ← 指向新管理员中心
-        st.rerun()
-    elif selected_nav == "👑 轩璃专属":
-        st.session_state.page = 'xuanli_admin'
-        st.rerun()
+    _render_main_city_content()
 
 def _render_main_city_content():
     """渲染主城内容（内部函数）"""
@@ -116,6 +89,7 @@ def _render_main_city_content():
     cols = st.columns(2)
     buttons = [
         ("🏪 藏宝阁", "shop"),
+        ("🤝 玩家交易", "player_trade"),
         ("🏯 宗门", "sect"),
         ("🧪 炼丹房", "alchemy"),
         ("🔨 炼器坊", "forge"),
@@ -124,10 +98,9 @@ def _render_main_city_content():
     ]
     
     for i, (label, page) in enumerate(buttons):
+        icon, text = label.split(" ", 1)
         with cols[i % 2]:
-            if st.button(label, key=f"main_btn_{page}"):
-                st.session_state.page = page
-                st.rerun()
+            page_link(page, text, icon=icon)
 
     # 🔒 管理员快捷入口（仅对管理员显示）
     user = st.session_state.user
@@ -136,11 +109,7 @@ def _render_main_city_content():
         st.subheader("🛠️ 管理快捷入口")
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("🛡️ 管理中心", key="quick_admin"):
-                st.session_state.page = 'admin_center'
-                st.rerun()
+            page_link('admin_center', "管理中心", icon="🛡️")
         if user.is_super_admin:
             with col2:
-                if st.button("👑 轩璃专属", key="quick_xuanli"):
-                    st.session_state.page = 'xuanli_admin'
-                    st.rerun()
\ No newline at end of file
+                page_link('xuanli_admin', "轩璃专属", icon="👑")
\ No newline at end of file
@@ -0,0 +1,225 @@
+# ==================================================
+# 玩家交易模块
+# 功能：向其他玩家发起交易、设置报价（物品 + 灵石托管）、双方确认后结算
+#      托管 / 结算逻辑见 core/trades.py
+# ==================================================
+
+import time
+
+import streamlit as st
+
+from core.catalog import get_item_catalog
+from core.config import PLAYER_TRADE_TTL_SECONDS, get_supabase_client
+from core.database import get_user_inventory_quantities
+from core.errors import describe_error, safe_page_load
+from core.navigation import page_link
+from core.trades import (
+    TRADE_ERRORS, TRADE_STATUS_LABELS, cancel_trade, confirm_trade, expire_stale_trades,
+    get_trade_items, get_user_trades, open_trade, set_offer,
+)
+from utils.helpers import parse_timestamp
+
+# 交易记录的最大显示条数
+HISTORY_LIMIT = 20
+
+
+def show_player_trade_page():
+    st.set_page_config(page_title="寰宇系统 - 玩家交易", layout="wide")
+    from modules.sidebar import render_sidebar
+    render_sidebar()
+
+    st.title("🤝 玩家交易")
+    page_link('main', "返回主城", icon="⬅️")
+    st.caption(
+        f"报价的物品和灵石会立即托管，双方确认同一版报价后一次性交换；"
+        f"{PLAYER_TRADE_TTL_SECONDS // 60} 分钟内未完成的交易自动取消并退回托管"
+    )
+
+    with safe_page_load("玩家交易"):
+        expire_stale_trades()
+        user = st.session_state.user
+        _sync_balance(user)
+        _render_open_form(user)
+        st.divider()
+        _render_open_trades(user)
+        st.divider()
+        _render_history(user)
+
+
+def _sync_balance(user):
+    """同步灵石余额：对方确认结算、交易过期都会在其他会话中改变本方余额（内部函数）"""
+    rows = get_supabase_client().table("users").select("spirit_stones").eq("id", user.id).execute().data
+    if rows:
+        user.spirit_stones = rows[0]["spirit_stones"]
+
+
+def _usernames(user_ids) -> dict:
+    """批量读取道号（内部函数）"""
+    ids = list({str(uid) for uid in user_ids})
+    if not ids:
+        return {}
+    rows = get_supabase_client().table("users").select("id, username").in_("id", ids).execute().data or []
+    return {row["id"]: row["username"] for row in rows}
+
+
+def _format_items(items) -> str:
+    """托管物品文字（内部函数）"""
+    catalog = get_item_catalog()
+    parts = []
+    for row in items:
+        item = catalog.get_by_id(row["item_id"])
+        parts.append(f"{item['name'] if item else '未知物品'} ×{row['quantity']}")
+    return "、".join(parts) or "无物品"
+
+
+def _render_open_form(user):
+    """渲染发起交易表单（内部函数）"""
+    with st.form("open_trade_form"):
+        username = st.text_input("对方道号")
+        submitted = st.form_submit_button("🤝 发起交易", type="primary")
+    if not submitted:
+        return
+
+    rows = get_supabase_client().table("users").select("id").eq("username", username.strip()).execute().data
+    if not rows:
+        st.error("❌ 对方道号不存在")
+        return
+    try:
+        open_trade(user.id, rows[0]["id"])
+    except Exception as e:
+        st.error(f"❌ 发起交易失败：{describe_error(e, TRADE_ERRORS)}")
+        return
+    st.toast("✅ 交易已发起，请设置报价")
+    st.rerun()
+
+
+def _render_open_trades(user):
+    """渲染进行中的交易（内部函数）"""
+    st.subheader("📋 进行中的交易")
+    trades = get_user_trades(user.id, status="open")
+    if not trades:
+        st.info("📭 暂无进行中的交易")
+        return
+
+    items_by_trade = get_trade_items([t["id"] for t in trades])
+    names = _usernames([t["initiator_id"] for t in trades] + [t["counterparty_id"] for t in trades])
+    inventory = get_user_inventory_quantities(user.id)
+    for trade in trades:
+        _render_trade(user, trade, items_by_trade.get(trade["id"], []), names, inventory)
+
+
+def _render_trade(user, trade, items, names, inventory):
+    """渲染单个交易：双方报价、报价编辑、确认与取消（内部函数）"""
+    mine = "initiator" if trade["initiator_id"] == user.id else "counterparty"
+    theirs = "counterparty" if mine == "initiator" else "initiator"
+    other_name = names.get(trade[f"{theirs}_id"], "未知道友")
+    my_items = [row for row in items if row["user_id"] == user.id]
+    their_items = [row for row in items if row["user_id"] != user.id]
+    minutes_left = max(0, int(parse_timestamp(trade["expires_at"]) - time.time()) // 60)
+
+    with st.container(border=True):
+        st.markdown(f"**与 {other_name} 的交易** · 第 {trade['version']} 版报价 · ⏳ 剩余约 {minutes_left} 分钟")
+        col_mine, col_theirs = st.columns(2)
+        with col_mine:
+            st.markdown("**我方报价**" + (" ✅ 已确认" if trade[f"{mine}_confirmed"] else ""))
+            st.write(f"{_format_items(my_items)} · 💰{trade[f'{mine}_stones']:,} 灵石")
+        with col_theirs:
+            st.markdown("**对方报价**" + (" ✅ 已确认" if trade[f"{theirs}_confirmed"] else ""))
+            st.write(f"{_format_items(their_items)} · 💰{trade[f'{theirs}_stones']:,} 灵石")
+
+        _render_offer_editor(user, trade, my_items, trade[f"{mine}_stones"], inventory)
+
+        col_confirm, col_cancel = st.columns(2)
+        with col_confirm:
+            if st.button("✅ 确认当前报价", key=f"confirm_trade_{trade['id']}",
+                         disabled=bool(trade[f"{mine}_confirmed"]), type="primary"):
+                _handle_confirm(user, trade, theirs)
+        with col_cancel:
+            if st.button("❌ 取消交易", key=f"cancel_trade_{trade['id']}"):
+                _handle_cancel(user, trade, mine)
+
+
+def _render_offer_editor(user, trade, my_items, my_stones, inventory):
+    """渲染报价编辑表单：可报价数量 = 背包剩余 + 已托管（内部函数）"""
+    offered = {row["item_id"]: row["quantity"] for row in my_items}
+    available = dict(inventory)
+    for item_id, qty in offered.items():
+        available[item_id] = available.get(item_id, 0) + qty
+    catalog = get_item_catalog()
+
+    with st.expander("✏️ 修改我方报价（修改后双方需重新确认）"):
+        with st.form(f"trade_offer_{trade['id']}"):
+            quantities = {}
+            for item_id, max_qty in sorted(available.items()):
+                item = catalog.get_by_id(item_id)
+                if max_qty <= 0 or not item:
+                    continue
+                quantities[item_id] = st.number_input(
+                    f"{item['name']}（最多 {max_qty}）", min_value=0, max_value=max_qty,
+                    value=offered.get(item_id, 0), key=f"trade_{trade['id']}_item_{item_id}",
+                )
+            stones = st.number_input("灵石", min_value=0, max_value=int(user.spirit_stones) + my_stones,
+                                     value=my_stones, key=f"trade_{trade['id']}_stones")
+            submitted = st.form_submit_button("💾 更新报价")
+
+    if not submitted:
+        return
+    try:
+        set_offer(trade["id"], user.id, quantities, int(stones))
+    except Exception as e:
+        st.error(f"❌ 更新报价失败：{describe_error(e, TRADE_ERRORS)}")
+        return
+    user.spirit_stones -= int(stones) - my_stones
+    st.toast("✅ 报价已更新，物品与灵石已托管")
+    st.rerun()
+
+
+def _handle_confirm(user, trade, theirs):
+    """处理确认；对方已确认时本次确认即完成结算（内部函数）"""
+    try:
+        result = confirm_trade(trade["id"], user.id, trade["version"])
+    except Exception as e:
+        st.error(f"❌ 确认失败：{describe_error(e, TRADE_ERRORS)}")
+        return
+    if result["status"] == "settled":
+        user.spirit_stones += result[f"{theirs}_stones"]
+        st.toast("🎉 交易完成，物品与灵石已交换")
+    else:
+        st.toast("✅ 已确认，等待对方确认")
+    st.rerun()
+
+
+def _handle_cancel(user, trade, mine):
+    """处理取消，托管退回双方（内部函数）"""
+    try:
+        cancel_trade(trade["id"], user.id)
+    except Exception as e:
+        st.error(f"❌ 取消失败：{describe_error(e, TRADE_ERRORS)}")
+        return
+    user.spirit_stones += trade[f"{mine}_stones"]
+    st.toast("已取消交易，托管已退回")
+    st.rerun()
+
+
+def _render_history(user):
+    """渲染已结束的交易记录（内部函数）"""
+    st.subheader("📜 交易记录")
+    trades = [t for t in get_user_trades(user.id, limit=HISTORY_LIMIT) if t["status"] != "open"]
+    if not trades:
+        st.caption("暂无交易记录")
+        return
+
+    settled = [t["id"] for t in trades if t["status"] == "settled"]
+    items_by_trade = get_trade_items(settled)
+    names = _usernames([t["initiator_id"] for t in trades] + [t["counterparty_id"] for t in trades])
+    for trade in trades:
+        mine = "initiator" if trade["initiator_id"] == user.id else "counterparty"
+        theirs = "counterparty" if mine == "initiator" else "initiator"
+        line = f"与 {names.get(trade[f'{theirs}_id'], '未知道友')} · {TRADE_STATUS_LABELS.get(trade['status'])}"
+        if trade["status"] == "settled":
+            items = items_by_trade.get(trade["id"], [])
+            gave = [row for row in items if row["user_id"] == user.id]
+            got = [row for row in items if row["user_id"] != user.id]
+            line += (f" · 付出 {_format_items(gave)} + {trade[f'{mine}_stones']:,} 灵石"
+                     f" · 获得 {_format_items(got)} + {trade[f'{theirs}_stones']:,} 灵石")
+        st.markdown(line)
@@ -1,18 +1,15 @@
+from core.catalog import get_item_catalog
+
 # 在个人信息下方添加功法模块
 st.divider()
 st.subheader("📖 我的功法")
 
-# 从数据库获取用户已学习的功法（示例，实际需要 user_arts 表）
-supabase = get_supabase_client()
+# 从物品图鉴缓存获取用户已学习的功法（示例，实际需要 user_arts 表）
 # 这里先显示所有系统功法作为示例
-user_arts = supabase.table("items")\
-    .select('"name", "effect"')\
-    .eq('"is_system"', True)\
-    .eq('"category"', '黄阶功法')\
-    .execute()
+user_arts = [art for art in get_item_catalog().by_category('黄阶功法') if art.get("is_system")]
 
-if user_arts.data:
-    for art in user_arts.data:
+if user_arts:
+    for art in user_arts:
         with st.expander(art['name']):
             description = art.get('effect') or "（无）"
             st.write(description)
@@ -5,8 +5,9 @@
 
 import streamlit as st
 from core.config import FEATURES, SECT_CATEGORIES, get_supabase_client
-from core.database import get_user_sect  # ✅ 从核心数据库模块导入
+from core.database import get_user_sect, invalidate_user_sect  # ✅ 从核心数据库模块导入
 from core.errors import safe_page_load
+from core.navigation import page_link
 
 def show_sect_page():
     """
@@ -15,17 +16,13 @@ def show_sect_page():
     """
     if not FEATURES.get("sect", True):
         st.warning("宗门系统暂未开放")
-        if st.button("返回主城"):
-            st.session_state.page = 'main'
-            st.rerun()
+        page_link('main', "返回主城")
         return
     
     st.set_page_config(page_title="寰宇系统 - 宗门", layout="wide")
     st.title("🏯 宗门系统")
     
-    if st.button("⬅️ 返回主城", key="sect_back_btn"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
     
     with safe_page_load("宗门"):
         _render_sect_content()
@@ -94,6 +91,7 @@ def _handle_join_sect(sect_id: str, sect_name: str):
         "user_id": user_id,
         "role": "member"
     }).execute()
+    invalidate_user_sect(user_id)
     
     st.toast(f"✅ 已加入「{sect_name}」！", icon="✅")
     st.rerun()
@@ -134,6 +132,7 @@ def _handle_create_sect(name: str, desc: str, category: str):
             "user_id": user_id,
             "role": "leader"
         }).execute()
+        invalidate_user_sect(user_id)
         
         st.toast(f"✅ 宗门「{name}」创建成功！", icon="✅")
         st.rerun()
@@ -182,5 +181,6 @@ def _handle_leave_sect():
         supabase = get_supabase_client()
         user_id = st.session_state.user.id
         supabase.table("sect_members").delete().eq("user_id", user_id).execute()
+        invalidate_user_sect(user_id)
         st.toast("✅ 已退出宗门", icon="✅")
         st.rerun()
\ No newline at end of file
@@ -0,0 +1,180 @@
+# modules/shop/auction_house.py
+# ==================================================
+# 拍卖行
+# 功能：竞拍炼器坊图纸产出的境界装备；发起拍卖、出价、查看我的拍卖
+#      到期结算由进程级调度器完成（core/auctions.py）
+# ==================================================
+
+import time
+
+import streamlit as st
+
+from core.auctions import (
+    AUCTION_ERRORS, create_auction, min_next_bid, place_bid,
+)
+from core.catalog import get_item_catalog
+from core.config import AUCTION_DURATIONS, AUCTION_SNIPE_EXTEND_SECONDS, AUCTION_SNIPE_WINDOW_SECONDS, get_supabase_client
+from core.database import get_user_inventory_quantities
+from core.errors import describe_error
+from core.navigation import page_link
+from utils.helpers import parse_timestamp
+
+# 正在拍卖列表的最大显示条数
+OPEN_AUCTION_LIMIT = 50
+
+STATUS_LABELS = {"open": "竞拍中", "sold": "已成交", "unsold": "流拍"}
+
+
+def show_auction_house_page():
+    st.set_page_config(page_title="寰宇系统 - 拍卖行", layout="wide")
+    from modules.sidebar import render_sidebar
+    render_sidebar()
+
+    st.title("⚖️ 拍卖行")
+    page_link('shop', "返回藏宝阁", icon="⬅️")
+    st.caption(
+        f"结束前 {AUCTION_SNIPE_WINDOW_SECONDS} 秒内有人出价，结束时间顺延至出价后 {AUCTION_SNIPE_EXTEND_SECONDS} 秒；"
+        "出价时冻结灵石，被超过后立即退还"
+    )
+
+    user = st.session_state.user
+    tab_open, tab_create, tab_mine = st.tabs(["🔥 正在拍卖", "📤 发起拍卖", "📋 我的拍卖"])
+    with tab_open:
+        _render_open_auctions(user)
+    with tab_create:
+        _render_create_form(user)
+    with tab_mine:
+        _render_my_auctions(user)
+
+
+def _format_remaining(ends_at) -> str:
+    """剩余时间文字（内部函数）"""
+    seconds = int(parse_timestamp(ends_at) - time.time())
+    if seconds <= 0:
+        return "结算中"
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours >= 24:
+        return f"{hours // 24} 天 {hours % 24} 小时"
+    if hours:
+        return f"{hours} 小时 {minutes} 分"
+    return f"{minutes} 分 {seconds} 秒"
+
+
+def _item_name(item_uuid) -> str:
+    """由图鉴缓存取物品名称（内部函数）"""
+    item = get_item_catalog().get_by_uuid(str(item_uuid))
+    return item["name"] if item else "未知物品"
+
+
+def _render_open_auctions(user):
+    """渲染正在进行的拍卖（按结束时间升序）和出价表单（内部函数）"""
+    supabase = get_supabase_client()
+    auctions = supabase.table("auctions")\
+        .select("*")\
+        .eq("status", "open")\
+        .order("ends_at")\
+        .limit(OPEN_AUCTION_LIMIT)\
+        .execute().data or []
+    if not auctions:
+        st.info("📭 暂无进行中的拍卖")
+        return
+
+    for auction in auctions:
+        with st.container(border=True):
+            col_info, col_bid = st.columns([3, 2])
+            with col_info:
+                st.markdown(f"**{_item_name(auction['item_uuid'])}** ×{auction['quantity']}")
+                if auction["current_bid"] is not None:
+                    price_text = f"当前出价 {auction['current_bid']:,}"
+                else:
+                    price_text = f"起拍价 {auction['start_price']:,}"
+                st.write(f"💰 {price_text} 灵石 · 出价 {auction['bid_count']} 次 · "
+                         f"⏳ {_format_remaining(auction['ends_at'])}")
+                if auction["current_bidder_id"] == user.id:
+                    st.caption("🏆 你目前是最高出价者")
+            with col_bid:
+                if auction["seller_id"] == user.id:
+                    st.caption("你的拍品")
+                    continue
+                minimum = min_next_bid(auction)
+                amount = st.number_input("出价（灵石）", min_value=minimum, value=minimum, step=auction["min_increment"],
+                                         key=f"bid_amount_{auction['id']}")
+                if st.button("⚖️ 出价", key=f"bid_{auction['id']}"):
+                    _handle_bid(user, auction, int(amount))
+
+
+def _handle_bid(user, auction, amount: int):
+    """处理出价（内部函数）"""
+    try:
+        place_bid(auction["id"], user.id, amount)
+    except Exception as e:
+        st.error(f"❌ 出价失败：{describe_error(e, AUCTION_ERRORS)}")
+        return
+
+    # 同一人加价时只冻结差额
+    previous = auction["current_bid"] if auction["current_bidder_id"] == user.id else 0
+    user.spirit_stones -= amount - previous
+    st.toast(f"✅ 出价成功：{amount:,} 灵石")
+    st.rerun()
+
+
+def _render_create_form(user):
+    """渲染发起拍卖表单：只能拍卖背包中的炼器装备（内部函数）"""
+    supabase = get_supabase_client()
+    blueprints = supabase.table("forge_blueprints").select("result_item_id").execute().data or []
+    gear_ids = {bp["result_item_id"] for bp in blueprints if bp.get("result_item_id")}
+    inventory = get_user_inventory_quantities(user.id)
+    catalog = get_item_catalog()
+    candidates = [
+        (catalog.get_by_id(item_id), qty)
+        for item_id, qty in inventory.items()
+        if item_id in gear_ids and qty > 0 and catalog.get_by_id(item_id)
+    ]
+    if not candidates:
+        st.info("🎒 背包中没有可拍卖的炼器装备")
+        return
+
+    options = {f"{item['name']} (x{qty})": (item, qty) for item, qty in candidates}
+    with st.form("create_auction_form"):
+        label = st.selectbox("拍品", list(options))
+        item, max_qty = options[label]
+        quantity = st.number_input("数量", min_value=1, max_value=max_qty, value=1)
+        start_price = st.number_input("起拍价（灵石）", min_value=1, value=max(1, int(item.get("price") or 1)))
+        min_increment = st.number_input("最低加价（灵石）", min_value=1, value=max(1, int(item.get("price") or 100) // 20))
+        duration = st.selectbox("拍卖时长", list(AUCTION_DURATIONS))
+        submitted = st.form_submit_button("📤 发起拍卖", type="primary")
+
+    if not submitted:
+        return
+    try:
+        create_auction(user.id, item["uuid_id"], int(quantity), int(start_price), int(min_increment),
+                       AUCTION_DURATIONS[duration])
+    except Exception as e:
+        st.error(f"❌ 发起拍卖失败：{describe_error(e, AUCTION_ERRORS)}")
+        return
+    st.toast("✅ 拍卖已开始，物品已托管到拍卖行")
+    st.rerun()
+
+
+def _render_my_auctions(user):
+    """渲染我发起的拍卖（内部函数）"""
+    supabase = get_supabase_client()
+    auctions = supabase.table("auctions")\
+        .select("*")\
+        .eq("seller_id", user.id)\
+        .order("created_at", desc=True)\
+        .limit(OPEN_AUCTION_LIMIT)\
+        .execute().data or []
+    if not auctions:
+        st.caption("你还没有发起过拍卖")
+        return
+
+    for auction in auctions:
+        price = auction["current_bid"] if auction["current_bid"] is not None else auction["start_price"]
+        remaining = f" · ⏳ {_format_remaining(auction['ends_at'])}" if auction["status"] == "open" else ""
+        st.markdown(
+            f"**{_item_name(auction['item_uuid'])}** ×{auction['quantity']} · "
+            f"{STATUS_LABELS.get(auction['status'], auction['status'])} · 💰{price:,} 灵石 · "
+            f"出价 {auction['bid_count']} 次{remaining}"
+        )
@@ -0,0 +1,110 @@
+# modules/shop/feed.py
+"""藏宝阁商品流模块
+功能：从 shop_feed 视图按分类、排序和游标分页读取商品
+"""
+
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+
+from core.config import get_supabase_client
+
+# 每页商品数
+FEED_PAGE_SIZE = 50
+
+# 商品流缓存有效期（秒）：其他玩家的购买 / 上下架最多延迟这么久可见，
+# 本会话的购买和下架会调用 invalidate_feed() 立即失效
+FEED_CACHE_TTL_SECONDS = 30
+
+# 排序方式 → (排序列, 是否降序)；feed_id 作为次级排序键保证游标唯一
+FEED_ORDERS = {
+    "价格从低到高": ("price", False),
+    "价格从高到低": ("price", True),
+    "最新上架": ("listed_at", True),
+}
+
+
+def _keyset_filter(column: str, desc: bool, cursor: Dict[str, Any]) -> str:
+    """生成 (排序列, feed_id) 的游标过滤条件（内部函数）"""
+    op = "lt" if desc else "gt"
+    value = cursor[column]
+    feed_id = cursor["feed_id"]
+    # 值统一加双引号，避免时间戳中的 : . + 被 PostgREST 当作保留字符
+    return f'{column}.{op}."{value}",and({column}.eq."{value}",feed_id.{op}."{feed_id}")'
+
+
+@st.cache_data(ttl=FEED_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_feed_page(
+    category: Optional[str] = None,
+    order: str = "价格从低到高",
+    cursor: Optional[Dict[str, Any]] = None,
+    page_size: int = FEED_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """
+    获取一页商品
+
+    参数:
+        category: 分类（None 表示全部）
+        order: 排序方式（FEED_ORDERS 的键）
+        cursor: 上一页最后一行的游标（None 表示第一页）
+        page_size: 每页数量
+
+    返回:
+        {"rows": [...], "next_cursor": dict 或 None}
+    """
+    column, desc = FEED_ORDERS[order]
+    supabase = get_supabase_client()
+
+    query = supabase.table("shop_feed").select("*")
+    if category:
+        query = query.eq("category", category)
+    if cursor:
+        query = query.or_(_keyset_filter(column, desc, cursor))
+
+    # 多取一行用于判断是否还有下一页
+    rows: List[Dict[str, Any]] = query\
+        .order(column, desc=desc)\
+        .order("feed_id", desc=desc)\
+        .limit(page_size + 1)\
+        .execute().data or []
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = {column: last[column], "feed_id": last["feed_id"]}
+
+    return {"rows": rows, "next_cursor": next_cursor}
+
+
+@st.cache_data(ttl=FEED_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_category_counts() -> Dict[str, int]:
+    """获取各分类商品数量（服务端一次聚合）"""
+    supabase = get_supabase_client()
+    result = supabase.rpc("shop_feed_category_counts", {}).execute()
+    return {row["category"]: row["entries"] for row in (result.data or [])}
+
+
+def invalidate_feed():
+    """商品数量或状态变化后（购买 / 上下架）清空商品流缓存"""
+    fetch_feed_page.clear()
+    fetch_category_counts.clear()
+
+
+def feed_row_to_listing(row: Dict[str, Any]) -> Dict[str, Any]:
+    """把 shop_feed 行转换为商品卡片使用的字典"""
+    listing = {
+        "type": row["entry_type"],
+        "item_uuid": row["item_uuid"],
+        "name": row["name"],
+        "category": row["category"],
+        "effect": row.get("effect"),
+        "price": row["price"],
+        "quantity": row["quantity"],
+        "is_active": True,
+        "seller_id": row.get("seller_id"),
+    }
+    # 系统商品没有 listing_id，卡片控件 key 依赖这一点区分
+    if row["entry_type"] == "player":
+        listing["listing_id"] = row["listing_id"]
+    return listing
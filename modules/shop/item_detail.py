@@ -5,22 +5,20 @@
 """
 
 import streamlit as st
-from core.config import get_supabase_client
+from core.catalog import get_item_catalog
+from core.market_stats import STATS_WINDOWS, get_market_stats
+from core.navigation import page_link
 
 def show_item_detail(item_uuid):
     """ 显示物品详情页面
     参数:
         item_uuid (str): 物品的 UUID 标识符
     """
-    # 从数据库获取物品详细信息
-    supabase = get_supabase_client()
-    item = supabase.table("items")\
-        .select('"name", "category", "effect", "price", "stock"')\
-        .eq('"uuid_id"', item_uuid)\
-        .execute()
+    # 从物品图鉴缓存获取物品详细信息
+    item_data = get_item_catalog().get_by_uuid(item_uuid)
 
     # 如果物品不存在，显示错误信息
-    if not item.data:
+    if not item_data:
         st.error("物品不存在")
         if st.button("⬅️ 返回商店"):
             if 'viewing_item_uuid' in st.session_state:
@@ -28,17 +26,12 @@ def show_item_detail(item_uuid):
             st.rerun()
         return
 
-    # 获取物品数据
-    item_data = item.data[0]
-
     # 显示页面标题
     st.title(f"📜 {item_data['name']} 详情")
 
     # === 新增：管理员编辑入口 ===
     if 'user' in st.session_state and st.session_state.user.is_admin:
-        if st.button("✏️ 编辑物品描述", key="edit_from_detail"):
-            st.session_state.page = 'item_manager'
-            st.rerun()
+        page_link('item_manager', "编辑物品描述", icon="✏️")
     # ==========================
 
     # 返回商店按钮
@@ -66,4 +59,30 @@ def show_item_detail(item_uuid):
     with col2:
         st.subheader("详细介绍")
         description = item_data.get('effect') or "（无）"
-        st.write(description)
\ No newline at end of file
+        st.write(description)
+
+    st.divider()
+    _render_market(item_uuid)
+
+
+def _render_market(item_uuid):
+    """显示物品行情：各窗口滚动统计 + 日 K 收盘价走势（内部函数）"""
+    st.subheader("📈 市场行情")
+    market = get_market_stats()
+    summary = market.summary(item_uuid)
+    if not any(stats["count"] for stats in summary.values()):
+        st.caption("近 7 天暂无成交")
+        return
+
+    cols = st.columns(len(STATS_WINDOWS))
+    for col, (window, stats) in zip(cols, summary.items()):
+        with col:
+            if stats["count"]:
+                st.metric(f"近 {window} 中位价", f"{stats['median']:,} 灵石")
+                st.caption(f"最新 {stats['last']:,} · 最低 {stats['min']:,} · 最高 {stats['max']:,} · 成交 {stats['volume']} 个")
+            else:
+                st.metric(f"近 {window} 中位价", "—")
+
+    candles = market.candles(item_uuid, "1h")
+    if len(candles) > 1:
+        st.line_chart(candles["close"], height=220)
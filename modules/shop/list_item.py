@@ -3,6 +3,12 @@
 
 import streamlit as st
 from core.config import get_supabase_client
+from core.catalog import get_item_catalog
+from core.errors import describe_error
+from core.market import LISTING_ERRORS, list_item
+from core.market_stats import get_market_stats
+from core.navigation import page_link, go_to
+from modules.shop.feed import invalidate_feed
 
 def show_list_item_page():
     st.set_page_config(page_title="寰宇系统 - 上架商品", layout="wide")
@@ -18,17 +24,12 @@ def show_list_item_page():
     user = st.session_state.user
     supabase = get_supabase_client()
     
-    if st.button("⬅️ 返回藏宝阁"):
-        st.session_state.page = 'shop'
-        st.rerun()
+    page_link('shop', "返回藏宝阁", icon="⬅️")
     
     # === 管理员：可上架任意系统商品 ===
     if user.is_admin:
         st.info("🛠️ 管理员模式：可上架任意系统商品")
-        system_items = supabase.table("items")\
-            .select('"uuid_id", "name", "category", "effect", "price"')\
-            .eq('"is_system"', True)\
-            .execute().data
+        system_items = get_item_catalog().system_items()
         
         if not system_items:
             st.warning("暂无系统商品可上架")
@@ -38,23 +39,18 @@ def show_list_item_page():
         selected_name = st.selectbox("选择系统商品", list(item_options.keys()))
         selected_item = item_options[selected_name]
         
+        _render_market_hint(selected_item["uuid_id"])
         price = st.number_input("售价（灵石）", min_value=1, value=selected_item['price'])
         quantity = st.number_input("上架数量", min_value=1, value=1)
         
         if st.button("✅ 确认上架"):
             try:
-                supabase.table("shop_listings").insert({
-                    "item_uuid": selected_item["uuid_id"],
-                    "seller_id": user.id,
-                    "price": price,
-                    "quantity": quantity,
-                    "is_active": True
-                }).execute()
+                list_item(user.id, selected_item["uuid_id"], price, quantity, from_inventory=False)
+                invalidate_feed()
                 st.success("✅ 商品已上架！")
-                st.session_state.page = 'shop'
-                st.rerun()
+                go_to('shop')
             except Exception as e:
-                st.error(f"❌ 上架失败: {str(e)}")
+                st.error(f"❌ 上架失败: {describe_error(e, LISTING_ERRORS)}")
     
     # === 普通玩家：只能上架背包物品 ===
     else:
@@ -84,7 +80,10 @@ def show_list_item_page():
         max_qty = selected_inv['quantity']
         item_uuid = selected_inv['items']['uuid_id']
         
-        price = st.number_input("售价（灵石）", min_value=1, value=100)
+        catalog_item = get_item_catalog().get_by_uuid(item_uuid) or {}
+        suggested, basis = get_market_stats().suggest_price(item_uuid, default=catalog_item.get("price") or 100)
+        _render_market_hint(item_uuid)
+        price = st.number_input("售价（灵石）", min_value=1, value=max(1, int(suggested)), help=f"建议价格：{basis}")
         quantity = st.number_input("上架数量", min_value=1, max_value=max_qty)
         
         if 'listing_in_progress' not in st.session_state:
@@ -96,27 +95,24 @@ def show_list_item_page():
             
             st.session_state.listing_in_progress = True
             try:
-                supabase.table("shop_listings").insert({
-                    "item_uuid": item_uuid,
-                    "seller_id": user.id,
-                    "price": price,
-                    "quantity": quantity,
-                    "is_active": True
-                }).execute()
-                
-                new_quantity = max_qty - quantity
-                if new_quantity == 0:
-                    supabase.table("user_inventory").delete().eq("id", inv_id).execute()
-                else:
-                    supabase.table("user_inventory").update({
-                        "quantity": new_quantity
-                    }).eq("id", inv_id).execute()
-                
+                # 扣背包与建摊位在服务端同一事务内完成
+                list_item(user.id, item_uuid, price, quantity)
+                invalidate_feed()
                 st.success("✅ 商品已上架！")
-                st.session_state.page = 'shop'
-                st.rerun()
+                go_to('shop')
             
             except Exception as e:
-                st.error(f"❌ 上架失败: {str(e)}")
+                st.error(f"❌ 上架失败: {describe_error(e, LISTING_ERRORS)}")
             finally:
-                st.session_state.listing_in_progress = False
\ No newline at end of file
+                st.session_state.listing_in_progress = False
+
+
+def _render_market_hint(item_uuid):
+    """显示物品近期行情，供定价参考（内部函数）"""
+    summary = get_market_stats().summary(item_uuid)
+    parts = [
+        f"{window}：中位 {stats['median']:,} · 区间 {stats['min']:,}~{stats['max']:,} · 成交 {stats['volume']} 个"
+        for window, stats in summary.items()
+        if stats["median"] is not None
+    ]
+    st.caption("📈 近期行情　" + "　|　".join(parts) if parts else "📈 该物品暂无成交记录")
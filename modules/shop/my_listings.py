@@ -1,6 +1,10 @@
 # modules/shop/my_listings.py
 import streamlit as st
 from core.config import get_supabase_client
+from core.errors import describe_error
+from core.market import LISTING_ERRORS, unlist_listing, unlist_listings
+from core.navigation import page_link
+from modules.shop.feed import invalidate_feed
 
 def show_my_listings_page():
     st.set_page_config(page_title="寰宇系统 - 我的摊位", layout="wide")
@@ -17,9 +21,7 @@ def show_my_listings_page():
     supabase = get_supabase_client()
     
     # 返回按钮
-    if st.button("⬅️ 返回藏宝阁"):
-        st.session_state.page = 'shop'
-        st.rerun()
+    page_link('shop', "返回藏宝阁", icon="⬅️")
     
     # 获取用户上架的商品
     listings = supabase.table("shop_listings") \
@@ -34,6 +36,10 @@ def show_my_listings_page():
         
     st.subheader(f"📦 共 {len(listings)} 件商品正在出售")
     
+    # 批量下架：全部在售摊位在服务端一个事务内下架并退回背包
+    if st.button("🗑️ 全部下架", key="unlist_all"):
+        _handle_unlist_many(user, [listing["id"] for listing in listings])
+    
     for listing in listings:
         item = listing["items"]
         col1, col2, col3 = st.columns([3, 1, 1])
@@ -50,37 +56,25 @@ def show_my_listings_page():
             # 下架按钮
             if st.button("🗑️ 下架", key=f"del_{listing['id']}"):
                 try:
-                    # 1. 删除商品 listing
-                    supabase.table("shop_listings").delete().eq("id", listing["id"]).execute()
-                    
-                    # 2. 把物品退回到 user_inventory
-                    # 检查背包是否已有该物品
-                    inv = supabase.table("user_inventory") \
-                        .select("*") \
-                        .eq("user_id", user.id) \
-                        .eq("item_uuid", item["uuid_id"]) \
-                        .execute().data
-                        
-                    if inv:
-                        # 已有 → 增加数量
-                        current_qty = inv[0]["quantity"]
-                        new_qty = current_qty + listing["quantity"]
-                        supabase.table("user_inventory") \
-                            .update({"quantity": new_qty}) \
-                            .eq("id", inv[0]["id"]) \
-                            .execute()
-                    else:
-                        # 没有 → 新增记录
-                        supabase.table("user_inventory").insert({
-                            "user_id": user.id,
-                            "item_uuid": item["uuid_id"],
-                            "quantity": listing["quantity"]
-                        }).execute()
-                    
+                    # 下架与退回背包在服务端同一事务内完成
+                    unlist_listing(user.id, listing["id"])
+                    invalidate_feed()
                     st.success(f"✅ {item['name']} 已下架并退回背包！")
                     st.rerun()
                     
                 except Exception as e:
-                    st.error(f"❌ 下架失败: {str(e)}")
+                    st.error(f"❌ 下架失败: {describe_error(e, LISTING_ERRORS)}")
         
-        st.divider()
\ No newline at end of file
+        st.divider()
+
+
+def _handle_unlist_many(user, listing_ids):
+    """批量下架（已售罄的摊位自动跳过）（内部函数）"""
+    try:
+        unlisted = unlist_listings(user.id, listing_ids)
+    except Exception as e:
+        st.error(f"❌ 下架失败: {describe_error(e, LISTING_ERRORS)}")
+        return
+    invalidate_feed()
+    st.toast(f"✅ 已下架 {len(unlisted)} 件商品，物品已退回背包", icon="✅")
+    st.rerun()
@@ -0,0 +1,129 @@
+# modules/shop/order_book.py
+# ==================================================
+# 材料交易所（挂单撮合）
+# 功能：炼丹材料的买卖盘口、限价下单、撤单
+#      撮合由进程级撮合引擎完成（core/orderbook.py）
+# ==================================================
+
+import pandas as pd
+import streamlit as st
+
+from core.catalog import get_item_catalog
+from core.config import ALCHEMY_MATERIAL_PRICES
+from core.errors import describe_error
+from core.navigation import page_link
+from core.orderbook import ORDER_ERRORS, get_order_book
+
+SIDE_LABELS = {"buy": "买入", "sell": "卖出"}
+
+
+def show_order_book_page():
+    st.set_page_config(page_title="寰宇系统 - 材料交易所", layout="wide")
+    from modules.sidebar import render_sidebar
+    render_sidebar()
+
+    st.title("📈 材料交易所")
+    page_link('shop', "返回藏宝阁", icon="⬅️")
+
+    user = st.session_state.user
+    catalog = get_item_catalog()
+    materials = {name: catalog.get_by_name(name) for name in ALCHEMY_MATERIAL_PRICES}
+    materials = {name: item for name, item in materials.items() if item}
+    if not materials:
+        st.info("📭 物品图鉴中还没有可交易的炼丹材料")
+        return
+
+    name = st.selectbox("选择材料", list(materials), key="order_book_material")
+    item = materials[name]
+    engine = get_order_book()
+
+    col_book, col_form = st.columns([3, 2])
+    with col_book:
+        _render_depth(engine.depth(item["uuid_id"]))
+    with col_form:
+        _render_order_form(engine, user, item, ALCHEMY_MATERIAL_PRICES[name])
+
+    st.divider()
+    _render_open_orders(engine, user, materials)
+
+
+def _render_depth(depth):
+    """渲染买卖盘口（内部函数）"""
+    last = depth["last_price"]
+    st.metric("最新成交价", f"{last} 灵石" if last is not None else "暂无成交")
+
+    col_bids, col_asks = st.columns(2)
+    for col, side, title in ((col_bids, "bids", "🟢 买盘"), (col_asks, "asks", "🔴 卖盘")):
+        with col:
+            st.markdown(f"**{title}**")
+            levels = depth[side]
+            if not levels:
+                st.caption("暂无挂单")
+                continue
+            st.dataframe(
+                pd.DataFrame(levels).rename(columns={"price": "价格", "quantity": "数量", "orders": "笔数"}),
+                hide_index=True,
+                width="stretch",
+            )
+
+
+def _render_order_form(engine, user, item, reference_price: int):
+    """渲染限价下单表单（内部函数）"""
+    with st.form("order_book_form"):
+        st.markdown("**限价下单**")
+        side = st.radio("方向", list(SIDE_LABELS), format_func=SIDE_LABELS.get, horizontal=True)
+        price = st.number_input("单价（灵石）", min_value=1, value=int(reference_price), step=1)
+        quantity = st.number_input("数量", min_value=1, value=1, step=1)
+        st.caption("买单会先冻结「单价 × 数量」灵石，以更低价格成交时退还差价；卖单会先冻结背包中的材料")
+        submitted = st.form_submit_button("提交挂单", type="primary", width="stretch")
+
+    if not submitted:
+        return
+    try:
+        result = engine.place(user.id, item["uuid_id"], side, int(price), int(quantity))
+    except Exception as e:
+        st.error(f"❌ 下单失败：{describe_error(e, ORDER_ERRORS)}")
+        return
+
+    if side == "buy":
+        # 冻结的灵石减去以更低价格成交退还的差价
+        refund = sum((int(price) - fill["price"]) * fill["quantity"] for fill in result["fills"])
+        user.spirit_stones -= int(price) * int(quantity) - refund
+    filled = sum(fill["quantity"] for fill in result["fills"])
+    remaining = result["order"]["remaining"]
+    if filled and remaining:
+        st.toast(f"✅ 已成交 {filled} 个，剩余 {remaining} 个挂单中")
+    elif filled:
+        st.toast(f"✅ 已全部成交 {filled} 个")
+    else:
+        st.toast("✅ 挂单成功，等待对手盘")
+    st.rerun()
+
+
+def _render_open_orders(engine, user, materials):
+    """渲染我的未完成挂单和撤单按钮（内部函数）"""
+    st.subheader("📋 我的挂单")
+    orders = engine.open_orders(user.id)
+    if not orders:
+        st.caption("暂无未完成的挂单")
+        return
+
+    names = {item["uuid_id"]: name for name, item in materials.items()}
+    for order in orders:
+        col_info, col_action = st.columns([4, 1])
+        with col_info:
+            st.markdown(
+                f"**{names.get(order['item_uuid'], order['item_uuid'])}** · {SIDE_LABELS[order['side']]} · "
+                f"💰{order['price']} 灵石 · 剩余 {order['remaining']}/{order['quantity']}"
+            )
+        with col_action:
+            if st.button("撤单", key=f"cancel_order_{order['id']}"):
+                try:
+                    cancelled = engine.cancel(order["id"], user.id)
+                except Exception as e:
+                    st.error(f"❌ 撤单失败：{describe_error(e, ORDER_ERRORS)}")
+                    return
+                if cancelled["side"] == "buy":
+                    user.spirit_stones += cancelled["price"] * cancelled["remaining"]
+                st.toast("✅ 已撤单，冻结的灵石 / 材料已退还")
+                st.rerun()
@@ -1,7 +1,14 @@
 # modules/shop/shop_main.py
 import streamlit as st
-from core.config import get_supabase_client
+from core.market import (
+    LISTING_ERRORS, PURCHASE_ERRORS, confiscate_listing, purchase_listing, unlist_listing,
+)
+from modules.shop.feed import (
+    FEED_ORDERS, FEED_PAGE_SIZE, fetch_feed_page, fetch_category_counts, feed_row_to_listing, invalidate_feed,
+)
 from modules.sidebar import render_sidebar
+from core.errors import describe_error
+from core.navigation import page_link, go_to
 
 def show_shop_page():
     st.set_page_config(page_title="寰宇系统 - 藏宝阁", layout="wide")
@@ -18,80 +25,74 @@ def show_shop_page():
     # === 权限优化：管理员和玩家都能上架 ===
     user = st.session_state.user if 'user' in st.session_state else None
     if user:
-        if st.button("📤 我要上架商品", type="primary"):
-            st.session_state.page = 'list_item'
-            st.rerun()
+        page_link('list_item', "我要上架商品", icon="📤")
+        page_link('order_book', "材料交易所（挂单买卖炼丹材料）", icon="📈")
+        page_link('auction_house', "拍卖行（竞拍炼器装备）", icon="⚖️")
     # ===================================
     
-    if st.button("⬅️ 返回主城"):
-        st.session_state.page = 'main'
-        st.rerun()
+    page_link('main', "返回主城", icon="⬅️")
 
-    supabase = get_supabase_client()
+    _render_shop_feed(user)
 
-    # === 获取所有活跃商品（系统 + 玩家）===
-    listings = []
+def _render_shop_feed(user):
+    """分页渲染商品流：服务端分类过滤 + 游标翻页"""
+    counts = fetch_category_counts()
+    total = sum(counts.values())
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        category_options = ["全部"] + sorted(counts.keys(), key=str)
+        category = st.selectbox(
+            "分类", category_options, key="shop_feed_category",
+            format_func=lambda c: f"{c}（{total if c == '全部' else counts.get(c, 0)}）",
+        )
+    with col2:
+        order = st.selectbox("排序", list(FEED_ORDERS.keys()), key="shop_feed_order")
     
-    # 1. 系统商品（is_system=true）
-    system_items = supabase.table("items")\
-        .select('"uuid_id", "name", "category", "effect", "price", "stock"')\
-        .eq('"is_system"', True)\
-        .execute().data
+    # 游标栈：栈顶是当前页的起始游标，分类或排序变化时重置
+    view_key = (category, order)
+    if st.session_state.get("shop_feed_view") != view_key:
+        st.session_state.shop_feed_view = view_key
+        st.session_state.shop_feed_cursors = [None]
+    cursors = st.session_state.shop_feed_cursors
     
-    for item in system_items:
-        listings.append({
-            "type": "system",
-            "item_uuid": item["uuid_id"],
-            "name": item["name"],
-            "category": item["category"],
-            "effect": item["effect"],
-            "price": item["price"],
-            "quantity": item["stock"],
-            "is_active": True,
-            "seller_id": None
-        })
+    page = fetch_feed_page(
+        category=None if category == "全部" else category,
+        order=order,
+        cursor=cursors[-1],
+    )
     
-    # 2. 玩家上架商品
-    player_listings = supabase.table("shop_listings")\
-        .select("*, items(uuid_id, name, category, effect)")\
-        .eq("is_active", True)\
-        .execute().data
+    st.subheader(f"📦 {category}")
+    if not page["rows"]:
+        st.info("暂无商品")
+    for row in page["rows"]:
+        _render_listing(feed_row_to_listing(row), user)
     
-    for listing in player_listings:
-        item = listing["items"]
-        listings.append({
-            "type": "player",
-            "listing_id": listing["id"],
-            "item_uuid": item["uuid_id"],
-            "name": item["name"],
-            "category": item["category"],
-            "effect": item["effect"],
-            "price": listing["price"],
-            "quantity": listing["quantity"],
-            "is_active": True,
-            "seller_id": listing["seller_id"]
-        })
-
-    # 按分类分组
-    categories = {}
-    for listing in listings:
-        cat = listing["category"]
-        if cat not in categories:
-            categories[cat] = []
-        categories[cat].append(listing)
-
-    for category, items_list in categories.items():
-        st.subheader(f"📦 {category}")
-        for item in items_list:
-            _render_listing(item, user)
+    # 翻页
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ 上一页", key="shop_feed_prev", disabled=len(cursors) <= 1):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"第 {len(cursors)} 页 · 每页 {FEED_PAGE_SIZE} 件")
+    with col_next:
+        if st.button("下一页 ➡️", key="shop_feed_next", disabled=page["next_cursor"] is None):
+            cursors.append(page["next_cursor"])
+            st.rerun()
 
+@st.fragment
 def _render_listing(listing, user):
+    """
+    渲染单个商品卡片（独立 fragment）
+    修改数量只重跑这张卡片；购买、下架成功后清空商品流缓存并整页重跑
+    """
     col1, col2, col3 = st.columns([3, 1, 1])
     
     with col1:
         if st.button(f"**{listing['name']}**", key=f"detail_{listing['item_uuid']}_{listing.get('listing_id', 'sys')}"):
             st.session_state.viewing_item_uuid = listing['item_uuid']
-            st.rerun()
+            st.rerun(scope="app")
         st.caption(listing['effect'])
 
     with col2:
@@ -101,7 +102,8 @@ def _render_listing(listing, user):
 
         # 购买按钮（仅活跃商品）
         if listing['is_active']:
-            qty = st.number_input("数量", min_value=1, max_value=999, value=1,
+            max_qty = 999 if listing['quantity'] == -1 else max(1, min(999, listing['quantity']))
+            qty = st.number_input("数量", min_value=1, max_value=max_qty, value=1,
                                 key=f"qty_{listing.get('listing_id', listing['item_uuid'])}")
             if st.button("🛒 购买", key=f"buy_{listing.get('listing_id', listing['item_uuid'])}"):
                 _handle_purchase(listing, qty)
@@ -117,53 +119,53 @@ def _render_listing(listing, user):
             
             if st.button("✏️ 编辑", key=edit_key):
                 st.session_state.editing_item_uuid = listing['item_uuid']
-                st.session_state.page = 'item_manager'
-                st.rerun()
+                go_to('item_manager')
             
             # 下架按钮（管理员可下架所有）
             if listing['type'] == 'player':  # 系统商品不能下架
                 if st.button("🔽 强制下架", key=f"admin_unlist_{listing['listing_id']}"):
-                    _toggle_listing_status(listing['listing_id'], False, is_admin=True)
+                    _unlist(listing['listing_id'], is_admin=True)
         
         # === 普通玩家：只能管理自己的上架 ===
         elif user and listing['type'] == 'player' and str(listing['seller_id']) == str(user.id):
             if st.button("🔽 下架", key=f"unlist_{listing['listing_id']}"):
-                _toggle_listing_status(listing['listing_id'], False, is_admin=False)
+                _unlist(listing['listing_id'], is_admin=False)
 
 def _handle_purchase(listing, quantity):
-    st.warning("购买功能暂未实现")
-
-def _toggle_listing_status(listing_id, is_active, is_admin=False):
-    supabase = get_supabase_client()
-    user = st.session_state.user
+    """处理购买（服务端单事务完成扣库存、转账和入包）"""
+    user = st.session_state.user if 'user' in st.session_state else None
+    if not user:
+        st.warning("请先登录")
+        return
     
-    if not is_active:  # 下架时处理物品返还
-        listing = supabase.table("shop_listings")\
-            .select("*").eq("id", listing_id).execute().data[0]
-        
-        # 只有非管理员下架才返还物品（管理员下架视为没收）
-        if not is_admin:
-            item_uuid = listing["item_uuid"]
-            quantity = listing["quantity"]
-            
-            existing = supabase.table("user_inventory")\
-                .select("*").eq("user_id", user.id).eq("item_uuid", item_uuid)\
-                .execute().data
-            
-            if existing:
-                current_qty = existing[0]["quantity"]
-                supabase.table("user_inventory").update({
-                    "quantity": current_qty + quantity
-                }).eq("id", existing[0]["id"]).execute()
-            else:
-                supabase.table("user_inventory").insert({
-                    "user_id": user.id,
-                    "item_uuid": item_uuid,
-                    "quantity": quantity
-                }).execute()
+    try:
+        trade = purchase_listing(
+            user.id,
+            quantity,
+            listing_id=listing.get('listing_id'),
+            item_uuid=None if listing['type'] == 'player' else listing['item_uuid'],
+        )
+    except Exception as e:
+        st.toast(f"❌ 购买失败：{describe_error(e, PURCHASE_ERRORS)}", icon="❌")
+        return
     
-    # 更新上架状态
-    supabase.table("shop_listings").update({"is_active": is_active}).eq("id", listing_id).execute()
+    user.spirit_stones -= trade["total_price"]
+    invalidate_feed()
+    st.toast(f"✅ 购买成功！{listing['name']} x{quantity}，花费 {trade['total_price']:,} 灵石", icon="✅")
+    st.rerun(scope="app")
+
+def _unlist(listing_id, is_admin=False):
+    """下架摊位：玩家下架退回背包，管理员强制下架视为没收（服务端单事务）"""
+    user = st.session_state.user
+    try:
+        if is_admin:
+            confiscate_listing(listing_id)
+        else:
+            unlist_listing(user.id, listing_id)
+    except Exception as e:
+        st.toast(f"❌ 下架失败：{describe_error(e, LISTING_ERRORS)}", icon="❌")
+        return
+    invalidate_feed()
     action = "强制下架" if is_admin else "下架"
-    st.success(f"✅ {action}成功！")
-    st.rerun()
\ No newline at end of file
+    st.toast(f"✅ {action}成功！", icon="✅")
+    st.rerun(scope="app")
\ No newline at end of file
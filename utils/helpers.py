@@ -4,7 +4,8 @@
 # ==================================================
 
 import hashlib
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from typing import Any, Dict, List
 
 # ==============================
@@ -48,6 +49,17 @@ def format_datetime(dt: datetime) -> str:
     """格式化 datetime 对象为易读字符串"""
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
+def parse_timestamp(value) -> float:
+    """把数据库时间戳（ISO 字符串，无时区按 UTC）转换为 Unix 秒；空值返回当前时间"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return time.time()
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
 # ==============================
 # 📦 数据处理
 # ==============================